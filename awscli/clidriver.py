@@ -46,6 +46,7 @@ from awscli.alias import AliasLoader
 from awscli.alias import AliasCommandInjector
 from awscli.utils import emit_top_level_args_parsed_event
 from awscli.utils import write_exception
+from awscli.utils import PrefetchingPageIterator
 
 
 LOG = logging.getLogger('awscli.clidriver')
@@ -603,6 +604,10 @@ class CLIOperationCaller(object):
 
     """Call an AWS operation and format the response."""
 
+    # The number of pages of a paginated response that are requested
+    # ahead of the page being formatted.
+    DEFAULT_PREFETCH_DEPTH = 2
+
     def __init__(self, session):
         self._session = session
 
@@ -645,11 +650,27 @@ class CLIOperationCaller(object):
         if client.can_paginate(py_operation_name) and parsed_globals.paginate:
             paginator = client.get_paginator(py_operation_name)
             response = paginator.paginate(**parameters)
+            prefetch_depth = self._get_prefetch_depth()
+            if prefetch_depth:
+                response = PrefetchingPageIterator(response, prefetch_depth)
         else:
             response = getattr(client, xform_name(operation_name))(
                 **parameters)
         return response
 
+    def _get_prefetch_depth(self):
+        value = self._session.get_scoped_config().get(
+            'cli_pagination_prefetch', self.DEFAULT_PREFETCH_DEPTH)
+        try:
+            depth = int(value)
+        except ValueError:
+            depth = -1
+        if depth < 0:
+            raise ValueError(
+                'Invalid cli_pagination_prefetch value: %s, the value must '
+                'be a number of pages that is 0 or more' % value)
+        return depth
+
     def _display_response(self, command_name, response,
                           parsed_globals):
         output = parsed_globals.output
@@ -12,6 +12,7 @@
 # language governing permissions and limitations under the License.
 from awscli.customizations.cloudformation.package import PackageCommand
 from awscli.customizations.cloudformation.deploy import DeployCommand
+from awscli.customizations.cloudformation.deploy_many import DeployManyCommand
 
 
 def initialize(cli):
@@ -29,3 +30,4 @@ def inject_commands(command_table, session, **kwargs):
     """
     command_table['package'] = PackageCommand(session)
     command_table['deploy'] = DeployCommand(session)
+    command_table['deploy-many'] = DeployManyCommand(session)
@@ -0,0 +1,151 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+import hashlib
+import json
+import logging
+import os
+import stat
+
+from botocore.credentials import JSONFileCache
+
+from awscli.customizations.zipbuilder import find_files
+
+LOG = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.expanduser(
+    os.path.join('~', '.aws', 'cli', 'cache', 'cloudformation-artifacts'))
+
+
+class ArtifactCache(object):
+    """
+    Cache of the S3 URLs that local folders were zipped and uploaded to
+
+    Folders are looked up by a fingerprint of the paths, sizes and
+    modification times of their files, which is cheap to compute. If that
+    misses, for example because the folder was freshly checked out or
+    copied, they are looked up by a hash of the paths and contents of their
+    files, which is still much cheaper than zipping the folder.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, cache=None):
+        self._cache = cache
+        if self._cache is None:
+            self._cache = JSONFileCache(cache_dir)
+
+    def lookup(self, folder_path, bucket_name, prefix=None):
+        """
+        Look up the S3 URL that the folder was previously uploaded to
+
+        :param folder_path: Path to the folder
+        :param bucket_name: Name of the bucket the folder is uploaded to
+        :param prefix: Prefix the folder is uploaded under
+        :return: ArtifactCacheEntry whose ``url`` is the S3 URL of the
+            uploaded folder or None if the folder has not been uploaded
+            with the same contents
+        """
+        files = find_files(folder_path)
+        entry = ArtifactCacheEntry(self, files, bucket_name, prefix)
+        entry.url = self._get_url(entry.stat_key)
+        if entry.url is not None:
+            LOG.debug("Artifact cache hit for {0}".format(folder_path))
+            return entry
+
+        entry.url = self._get_url(entry.content_key)
+        if entry.url is not None:
+            LOG.debug("Artifact cache hit for contents of {0}"
+                      .format(folder_path))
+            # Remember the current modification times so the next lookup
+            # does not need to read the files.
+            self.set_url([entry.stat_key], entry.url)
+        return entry
+
+    def set_url(self, keys, url):
+        for key in keys:
+            try:
+                self._cache[key] = {"url": url}
+            except (OSError, IOError):
+                # The cache is only an optimization so failing to write to
+                # it, for example because the home directory is read-only,
+                # should not fail the command.
+                LOG.debug("Unable to write to the artifact cache",
+                          exc_info=True)
+                return
+
+    def get_stat_key(self, files, bucket_name, prefix):
+        fingerprint = []
+        for full_path, arcname in files:
+            stat_result = os.stat(full_path)
+            fingerprint.append([arcname, stat_result.st_size,
+                                stat_result.st_mtime, stat_result.st_mode])
+        return self._make_key("stat", fingerprint, bucket_name, prefix)
+
+    def get_content_key(self, files, bucket_name, prefix):
+        content_hash = hashlib.sha256()
+        for full_path, arcname in files:
+            is_executable = bool(
+                os.stat(full_path).st_mode &
+                (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH))
+            content_hash.update(json.dumps(
+                [arcname, is_executable]).encode("utf-8"))
+            file_hash = hashlib.sha256()
+            with open(full_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    file_hash.update(chunk)
+            content_hash.update(file_hash.digest())
+        return self._make_key(
+            "content", content_hash.hexdigest(), bucket_name, prefix)
+
+    def _make_key(self, key_type, fingerprint, bucket_name, prefix):
+        serialized = json.dumps(
+            [fingerprint, bucket_name, prefix or ""], sort_keys=True)
+        return "{0}-{1}".format(
+            key_type, hashlib.sha256(serialized.encode("utf-8")).hexdigest())
+
+    def _get_url(self, key):
+        try:
+            return self._cache[key]["url"]
+        except (KeyError, TypeError):
+            return None
+
+
+class ArtifactCacheEntry(object):
+    def __init__(self, artifact_cache, files, bucket_name, prefix=None):
+        self.url = None
+        self._artifact_cache = artifact_cache
+        self._files = files
+        self._bucket_name = bucket_name
+        self._prefix = prefix
+        self._stat_key = None
+        self._content_key = None
+
+    @property
+    def stat_key(self):
+        if self._stat_key is None:
+            self._stat_key = self._artifact_cache.get_stat_key(
+                self._files, self._bucket_name, self._prefix)
+        return self._stat_key
+
+    @property
+    def content_key(self):
+        if self._content_key is None:
+            self._content_key = self._artifact_cache.get_content_key(
+                self._files, self._bucket_name, self._prefix)
+        return self._content_key
+
+    def store(self, url):
+        """
+        Record the S3 URL that the folder was uploaded to
+        """
+        self.url = url
+        self._artifact_cache.set_url([self.stat_key, self.content_key], url)
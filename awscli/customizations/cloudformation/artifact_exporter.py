@@ -11,18 +11,24 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 
+import copy
+import hashlib
 import logging
 import os
 import tempfile
+import threading
 import zipfile
-import contextlib
 import uuid
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+
 from awscli.compat import six
 
 from awscli.compat import urlparse
 from contextlib import contextmanager
 from awscli.customizations.cloudformation import exceptions
+from awscli.customizations.zipbuilder import make_zip_archive
+from awscli.utils import wait_until
 from awscli.customizations.cloudformation.yamlhelper import yaml_dump, \
     yaml_parse
 
@@ -152,9 +158,27 @@ def upload_local_artifacts(resource_id, resource_dict, property_name,
 
 
 def zip_and_upload(local_path, uploader):
-    with zip_folder(local_path) as zipfile:
+    artifact_cache = uploader.artifact_cache
+    if artifact_cache is None or uploader.force_upload:
+        with zip_folder(local_path) as zipfile:
             return uploader.upload_with_dedup(zipfile)
 
+    # Zipping the folder is skipped if the folder was previously uploaded
+    # with the same contents and the uploaded object still exists.
+    cache_entry = artifact_cache.lookup(
+        local_path, uploader.bucket_name, uploader.prefix)
+    if cache_entry.url is not None:
+        key = parse_s3_url(cache_entry.url)["Key"]
+        if uploader.file_exists(key):
+            LOG.debug("Folder {0} is already uploaded to {1}"
+                      .format(local_path, cache_entry.url))
+            return cache_entry.url
+
+    with zip_folder(local_path) as zipfile:
+        url = uploader.upload_with_dedup(zipfile)
+    cache_entry.store(url)
+    return url
+
 
 @contextmanager
 def zip_folder(folder_path):
@@ -179,16 +203,8 @@ def zip_folder(folder_path):
 
 def make_zip(filename, source_root):
     zipfile_name = "{0}.zip".format(filename)
-    source_root = os.path.abspath(source_root)
     with open(zipfile_name, 'wb') as f:
-        zip_file = zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED)
-        with contextlib.closing(zip_file) as zf:
-            for root, dirs, files in os.walk(source_root):
-                for filename in files:
-                    full_path = os.path.join(root, filename)
-                    relative_path = os.path.relpath(
-                        full_path, source_root)
-                    zf.write(full_path, relative_path)
+        make_zip_archive(f, source_root, compression=zipfile.ZIP_DEFLATED)
 
     return zipfile_name
 
@@ -254,16 +270,19 @@ class Resource(object):
             self.do_export(resource_id, resource_dict, parent_dir)
 
         except Exception as ex:
-            LOG.debug("Unable to export", exc_info=ex)
-            raise exceptions.ExportFailedError(
-                    resource_id=resource_id,
-                    property_name=self.PROPERTY_NAME,
-                    property_value=property_value,
-                    ex=ex)
+            raise self._export_failed_error(resource_id, property_value, ex)
         finally:
             if temp_dir:
                 shutil.rmtree(temp_dir)
 
+    def _export_failed_error(self, resource_id, property_value, ex):
+        LOG.debug("Unable to export", exc_info=ex)
+        return exceptions.ExportFailedError(
+                resource_id=resource_id,
+                property_name=self.PROPERTY_NAME,
+                property_value=property_value,
+                ex=ex)
+
     def do_export(self, resource_id, resource_dict, parent_dir):
         """
         Default export action is to upload artifacts and set the property to
@@ -388,12 +407,25 @@ class CloudFormationStackResource(Resource):
         and set property to URL of the uploaded S3 template
         """
 
+        template = self.get_nested_template(
+            resource_id, resource_dict, parent_dir)
+        if template is None:
+            # Nothing to do
+            return
+
+        self.upload_exported_template(resource_dict, template.export())
+
+    def get_nested_template(self, resource_id, resource_dict, parent_dir):
+        """
+        Returns the nested stack template that needs to be exported or None
+        if the property does not refer to a local template
+        """
+
         template_path = resource_dict.get(self.PROPERTY_NAME, None)
 
         if template_path is None or is_s3_url(template_path) or \
                 template_path.startswith("https://s3.amazonaws.com/"):
-            # Nothing to do
-            return
+            return None
 
         abs_template_path = make_abs_path(parent_dir, template_path)
         if not is_local_file(abs_template_path):
@@ -402,8 +434,13 @@ class CloudFormationStackResource(Resource):
                     resource_id=resource_id,
                     template_path=abs_template_path)
 
-        exported_template_dict = \
-            Template(template_path, parent_dir, self.uploader).export()
+        return Template(template_path, parent_dir, self.uploader)
+
+    def upload_exported_template(self, resource_dict, exported_template_dict):
+        """
+        Uploads the exported nested stack template to S3 and sets the
+        property to the URL of the uploaded template
+        """
 
         exported_template_str = yaml_dump(exported_template_dict)
 
@@ -419,6 +456,40 @@ class CloudFormationStackResource(Resource):
             resource_dict[self.PROPERTY_NAME] = self.uploader.to_path_style_s3_url(
                     parts["Key"], parts.get("Version", None))
 
+    def add_export_jobs(self, job_graph, resource_id, resource_dict,
+                        parent_dir):
+        """
+        Adds the jobs to export the nested stack template to the job graph.
+        The nested template is uploaded once all of its own artifacts have
+        been exported.
+
+        :return: List of the ids of the added jobs
+        """
+
+        if resource_dict is None or \
+                isinstance(resource_dict.get(self.PROPERTY_NAME), dict):
+            return []
+
+        property_value = resource_dict.get(self.PROPERTY_NAME)
+        try:
+            template = self.get_nested_template(
+                resource_id, resource_dict, parent_dir)
+        except Exception as ex:
+            raise self._export_failed_error(resource_id, property_value, ex)
+        if template is None:
+            return []
+
+        def upload():
+            try:
+                self.upload_exported_template(
+                    resource_dict, template.template_dict)
+            except Exception as ex:
+                raise self._export_failed_error(
+                    resource_id, property_value, ex)
+
+        nested_jobs = template.add_export_jobs(job_graph)
+        return nested_jobs + [job_graph.add_job(upload, nested_jobs)]
+
 
 EXPORT_LIST = [
     ServerlessFunctionResource,
@@ -445,6 +516,56 @@ GLOBAL_EXPORT_DICT = {
 }
 
 
+class TemplateParseCache(object):
+    """
+    Parsed templates by the hash of their contents, so that a nested
+    template that is referenced by several stacks is only parsed once
+    """
+
+    def __init__(self):
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def parse(self, template_str):
+        data = template_str
+        if isinstance(data, six.text_type):
+            data = data.encode("utf-8")
+        key = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            template_dict = self._templates.get(key)
+        if template_dict is None:
+            template_dict = yaml_parse(template_str)
+            with self._lock:
+                self._templates[key] = template_dict
+        # Exporting modifies the template, so each template gets its own copy
+        return copy.deepcopy(template_dict)
+
+
+_active_parse_cache = None
+
+
+@contextmanager
+def template_parse_cache():
+    """
+    Caches the templates parsed by parse_template within the context
+    """
+    global _active_parse_cache
+    if _active_parse_cache is not None:
+        yield _active_parse_cache
+        return
+    _active_parse_cache = TemplateParseCache()
+    try:
+        yield _active_parse_cache
+    finally:
+        _active_parse_cache = None
+
+
+def parse_template(template_str):
+    if _active_parse_cache is not None:
+        return _active_parse_cache.parse(template_str)
+    return yaml_parse(template_str)
+
+
 class Template(object):
     """
     Class to export a CloudFormation template
@@ -467,7 +588,7 @@ class Template(object):
         with open(abs_template_path, "r") as handle:
             template_str = handle.read()
 
-        self.template_dict = yaml_parse(template_str)
+        self.template_dict = parse_template(template_str)
         self.template_dir = template_dir
         self.resources_to_export = resources_to_export
         self.uploader = uploader
@@ -496,25 +617,158 @@ class Template(object):
         Exports the local artifacts referenced by the given template to an
         s3 bucket.
 
+        Artifacts of different resources, including the resources of nested
+        stack templates, are exported concurrently.
+
         :return: The template with references to artifacts that have been
         exported to s3.
         """
         if "Resources" not in self.template_dict:
             return self.template_dict
 
-        self.template_dict = self.export_global_artifacts(self.template_dict)
+        job_graph = ExportJobGraph()
+        # Nested templates are read while the jobs are added
+        with template_parse_cache():
+            self.add_export_jobs(job_graph)
+        job_graph.run()
+
+        return self.template_dict
+
+    def add_export_jobs(self, job_graph):
+        """
+        Adds the jobs to export the template to the job graph
+
+        :return: List of the ids of the added jobs. The template is exported
+        once all of these jobs complete.
+        """
+        if "Resources" not in self.template_dict:
+            return []
+
+        def export_global_artifacts():
+            self.template_dict = \
+                self.export_global_artifacts(self.template_dict)
+
+        # Global artifacts can be anywhere in the template so they are
+        # exported before any resource modifies the template.
+        global_job = job_graph.add_job(export_global_artifacts)
+        jobs = [global_job]
 
         for resource_id, resource in self.template_dict["Resources"].items():
 
             resource_type = resource.get("Type", None)
             resource_dict = resource.get("Properties", None)
 
+            exporters = []
             for exporter_class in self.resources_to_export:
                 if exporter_class.RESOURCE_TYPE != resource_type:
                     continue
 
                 # Export code resources
                 exporter = exporter_class(self.uploader)
+                if isinstance(exporter, CloudFormationStackResource):
+                    jobs.extend(exporter.add_export_jobs(
+                        job_graph, resource_id, resource_dict,
+                        self.template_dir))
+                else:
+                    exporters.append(exporter)
+
+            if exporters:
+                jobs.append(job_graph.add_job(
+                    self._make_export_resource_job(
+                        exporters, resource_id, resource_dict),
+                    [global_job]))
+
+        return jobs
+
+    def _make_export_resource_job(self, exporters, resource_id,
+                                  resource_dict):
+        # Exporters of the same resource run one after another so the
+        # properties they add to the resource are always in the same order.
+        def export_resource():
+            for exporter in exporters:
                 exporter.export(resource_id, resource_dict, self.template_dir)
+        return export_resource
 
-        return self.template_dict
+
+class ExportJobGraph(object):
+    """
+    Runs export jobs concurrently, starting each job once all of the jobs
+    it depends on have completed
+    """
+
+    DEFAULT_MAX_WORKERS = 8
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self._max_workers = max_workers
+        self._jobs = []
+        self._dependents = []
+        self._remaining_dependencies = []
+        self._errors = {}
+        self._num_running = 0
+        self._num_completed = 0
+        self._condition = threading.Condition()
+        self._executor = None
+
+    def add_job(self, func, dependencies=None):
+        """
+        Adds a job to the graph
+
+        :param func: Function that runs the job
+        :param dependencies: List of the ids of the jobs that must complete
+            before this job starts
+        :return: Id of the job
+        """
+        dependencies = dependencies or []
+        job_id = len(self._jobs)
+        self._jobs.append(func)
+        self._dependents.append([])
+        self._remaining_dependencies.append(len(dependencies))
+        for dependency in dependencies:
+            self._dependents[dependency].append(job_id)
+        return job_id
+
+    def run(self):
+        """
+        Runs all of the jobs and waits for them to complete. If any job
+        fails, no more jobs are started and the error of the first failed
+        job, in the order they were added, is raised once the running jobs
+        complete.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+        try:
+            with self._condition:
+                for job_id in range(len(self._jobs)):
+                    if self._remaining_dependencies[job_id] == 0:
+                        self._submit(job_id)
+                wait_until(self._is_done, self._condition.wait)
+        finally:
+            self._executor.shutdown()
+        if self._errors:
+            raise self._errors[min(self._errors)]
+
+    def _is_done(self):
+        if self._errors:
+            return self._num_running == 0
+        return self._num_completed == len(self._jobs)
+
+    def _submit(self, job_id):
+        self._num_running += 1
+        self._executor.submit(self._run_job, job_id)
+
+    def _run_job(self, job_id):
+        error = None
+        try:
+            self._jobs[job_id]()
+        except Exception as ex:
+            error = ex
+        with self._condition:
+            self._num_running -= 1
+            self._num_completed += 1
+            if error is not None:
+                self._errors[job_id] = error
+            elif not self._errors:
+                for dependent in self._dependents[job_id]:
+                    self._remaining_dependencies[dependent] -= 1
+                    if self._remaining_dependencies[dependent] == 0:
+                        self._submit(dependent)
+            self._condition.notify_all()
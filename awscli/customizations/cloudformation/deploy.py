@@ -217,6 +217,19 @@ class DeployCommand(BasicCommand):
                 'changes to be made to the stack.'
             )
         },
+        {
+            'name': 'skip-unchanged',
+            'required': False,
+            'action': 'store_true',
+            'help_text': (
+                'Compares the template, parameters, capabilities and tags '
+                'with the deployed stack before creating a change set, and '
+                'skips the deployment without creating a change set if none '
+                'of them changed. The stack is treated as unchanged in the '
+                'same way as an empty change set, see '
+                '``--fail-on-empty-changeset``.'
+            )
+        },
         {
             'name': TAGS_CMD,
             'action': 'store',
@@ -293,13 +306,23 @@ class DeployCommand(BasicCommand):
                            parsed_args.execute_changeset, parsed_args.role_arn,
                            parsed_args.notification_arns, s3_uploader,
                            tags,
-                           parsed_args.fail_on_empty_changeset)
+                           parsed_args.fail_on_empty_changeset,
+                           parsed_args.skip_unchanged)
 
     def deploy(self, deployer, stack_name, template_str,
                parameters, capabilities, execute_changeset, role_arn,
                notification_arns, s3_uploader, tags,
-               fail_on_empty_changeset=True):
+               fail_on_empty_changeset=True, skip_unchanged=False):
         try:
+            if skip_unchanged and deployer.is_stack_unchanged(
+                    stack_name=stack_name,
+                    cfn_template=template_str,
+                    parameter_values=parameters,
+                    capabilities=capabilities,
+                    role_arn=role_arn,
+                    notification_arns=notification_arns,
+                    tags=tags):
+                raise exceptions.ChangeEmptyError(stack_name=stack_name)
             result = deployer.create_and_wait_for_changeset(
                 stack_name=stack_name,
                 cfn_template=template_str,
@@ -0,0 +1,337 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+import collections
+import functools
+import logging
+import os
+import sys
+import threading
+
+from botocore.client import Config
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from awscli.customizations.cloudformation import exceptions
+from awscli.customizations.cloudformation.deploy import DeployCommand
+from awscli.customizations.cloudformation.deployer import Deployer
+from awscli.customizations.cloudformation.stack_manifest import \
+    load_manifest, get_stack_dependencies
+from awscli.customizations.s3uploader import S3Uploader
+from awscli.customizations.commands import BasicCommand
+from awscli.utils import wait_until
+
+LOG = logging.getLogger(__name__)
+
+DeployResult = collections.namedtuple("DeployResult", ["status", "message"])
+
+CREATED = "CREATED"
+UPDATED = "UPDATED"
+UNCHANGED = "UNCHANGED"
+CHANGESET_CREATED = "CHANGESET_CREATED"
+FAILED = "FAILED"
+SKIPPED = "SKIPPED"
+
+SUCCESS_STATUSES = [CREATED, UPDATED, UNCHANGED, CHANGESET_CREATED]
+
+
+class PrefixedWriter(object):
+    """
+    Writes complete lines to a shared file, prefixed with the name of the
+    stack they are about, so the output of concurrent deployments can be
+    told apart
+    """
+
+    def __init__(self, prefix, outfile, lock):
+        self._prefix = prefix
+        self._outfile = outfile
+        self._lock = lock
+        self._buffer = ""
+
+    def write(self, data):
+        self._buffer += data
+        lines = self._buffer.split("\n")
+        self._buffer = lines.pop()
+        lines = [line for line in lines if line]
+        if lines:
+            with self._lock:
+                for line in lines:
+                    self._outfile.write(
+                        "[{0}] {1}\n".format(self._prefix, line))
+                self._outfile.flush()
+
+    def flush(self):
+        pass
+
+
+class DeploymentScheduler(object):
+    """
+    Runs deployments concurrently, starting the deployment of each stack
+    once all of the stacks it depends on are deployed. Stacks that depend on
+    a stack that failed to deploy are skipped.
+    """
+
+    def __init__(self, max_concurrency):
+        self._max_concurrency = max_concurrency
+
+    def run(self, stack_names, dependencies, deploy_func):
+        """
+        :param stack_names: Names of the stacks in the order to start them
+        :param dependencies: Dictionary from each stack name to the set of
+            stack names it depends on
+        :param deploy_func: Function that deploys the stack with the given
+            name and returns a DeployResult
+        :return: Dictionary from each stack name to its DeployResult
+        """
+        results = {}
+        pending = list(stack_names)
+        running = {}
+        executor = ThreadPoolExecutor(max_workers=self._max_concurrency)
+        try:
+            while pending or running:
+                for stack_name in list(pending):
+                    depends_on = [results.get(name)
+                                  for name in dependencies[stack_name]]
+                    if any(result is not None and
+                           result.status not in SUCCESS_STATUSES
+                           for result in depends_on):
+                        pending.remove(stack_name)
+                        results[stack_name] = DeployResult(
+                            SKIPPED, "A stack it depends on was not deployed")
+                    elif all(result is not None for result in depends_on):
+                        pending.remove(stack_name)
+                        future = executor.submit(deploy_func, stack_name)
+                        running[future] = stack_name
+                if not running:
+                    break
+                wait_until(
+                    lambda: any(future.done() for future in running),
+                    functools.partial(
+                        wait, running, return_when=FIRST_COMPLETED))
+                for future in [f for f in running if f.done()]:
+                    results[running.pop(future)] = future.result()
+        except KeyboardInterrupt:
+            for future in running:
+                future.cancel()
+            raise
+        finally:
+            executor.shutdown(wait=False)
+        return results
+
+
+class DeployManyCommand(DeployCommand):
+
+    MSG_SUMMARY = "\nDeployment summary:\n"
+
+    NAME = 'deploy-many'
+    DESCRIPTION = BasicCommand.FROM_FILE("cloudformation",
+                                         "_deploy_many_description.rst")
+
+    ARG_TABLE = [
+        {
+            'name': 'manifest-file',
+            'required': True,
+            'help_text': (
+                'The path to the JSON or YAML manifest that lists the'
+                ' stacks to deploy.'
+            )
+        },
+        {
+            'name': 'max-concurrent-deployments',
+            'cli_type_name': 'integer',
+            'default': 4,
+            'help_text': (
+                'The maximum number of stacks that are deployed at the same'
+                ' time. The default is 4.'
+            )
+        },
+        {
+            'name': 's3-bucket',
+            'required': False,
+            'help_text': (
+                'The name of the S3 bucket where this command uploads the '
+                'CloudFormation templates. This is required the deployments '
+                'of templates sized greater than 51,200 bytes'
+            )
+        },
+        {
+            "name": "force-upload",
+            "action": "store_true",
+            "help_text": (
+                'Indicates whether to override existing files in the S3 bucket.'
+                ' Specify this flag to upload artifacts even if they '
+                ' match existing artifacts in the S3 bucket.'
+            )
+        },
+        {
+            'name': 's3-prefix',
+            'help_text': (
+                'A prefix name that the command adds to the'
+                ' artifacts\' name when it uploads them to the S3 bucket.'
+                ' The prefix name is a path name (folder name) for'
+                ' the S3 bucket.'
+            )
+        },
+        {
+            'name': 'kms-key-id',
+            'help_text': (
+                'The ID of an AWS KMS key that the command uses'
+                ' to encrypt artifacts that are at rest in the S3 bucket.'
+            )
+        },
+        {
+            'name': 'no-execute-changeset',
+            'action': 'store_false',
+            'dest': 'execute_changeset',
+            'required': False,
+            'help_text': (
+                'Indicates whether to execute the change sets. Specify this'
+                ' flag to create the change sets of the stacks without'
+                ' executing them. Stacks that depend on other stacks are'
+                ' still only processed after those stacks.'
+            )
+        },
+        {
+            'name': 'skip-unchanged',
+            'required': False,
+            'action': 'store_true',
+            'help_text': (
+                'Compares the template, parameters, capabilities and tags '
+                'of each stack with the deployed stack before creating a '
+                'change set, and skips the stack without creating a change '
+                'set if none of them changed.'
+            )
+        },
+    ]
+
+    def _run_main(self, parsed_args, parsed_globals):
+        manifest_path = parsed_args.manifest_file
+        stacks = load_manifest(manifest_path)
+        dependencies = get_stack_dependencies(stacks, manifest_path)
+
+        max_concurrency = parsed_args.max_concurrent_deployments
+        if max_concurrency < 1:
+            raise ValueError(
+                "--max-concurrent-deployments must be at least 1")
+
+        # All deployments share the clients, and so their connection pools
+        config = Config(max_pool_connections=max(10, max_concurrency * 2))
+        cloudformation_client = \
+            self._session.create_client(
+                    'cloudformation', region_name=parsed_globals.region,
+                    endpoint_url=parsed_globals.endpoint_url,
+                    verify=parsed_globals.verify_ssl,
+                    config=config)
+
+        s3_uploader = None
+        if parsed_args.s3_bucket:
+            s3_client = self._session.create_client(
+                "s3",
+                config=config.merge(Config(signature_version='s3v4')),
+                region_name=parsed_globals.region,
+                verify=parsed_globals.verify_ssl)
+            s3_uploader = S3Uploader(s3_client,
+                                     parsed_args.s3_bucket,
+                                     parsed_globals.region,
+                                     parsed_args.s3_prefix,
+                                     parsed_args.kms_key_id,
+                                     parsed_args.force_upload)
+
+        return self.deploy_many(
+            cloudformation_client, stacks, dependencies, max_concurrency,
+            s3_uploader, parsed_args.execute_changeset,
+            parsed_args.skip_unchanged)
+
+    def deploy_many(self, cloudformation_client, stacks, dependencies,
+                    max_concurrency, s3_uploader, execute_changeset,
+                    skip_unchanged, outfile=None):
+        outfile = outfile or sys.stdout
+        lock = threading.Lock()
+        stacks_by_name = dict((stack.stack_name, stack) for stack in stacks)
+
+        def deploy_func(stack_name):
+            writer = PrefixedWriter(stack_name, outfile, lock)
+            deployer = Deployer(cloudformation_client, outfile=writer)
+            try:
+                return self.deploy_stack(
+                    deployer, stacks_by_name[stack_name], s3_uploader,
+                    execute_changeset, skip_unchanged, writer)
+            except Exception as ex:
+                LOG.debug("Failed to deploy stack {0}".format(stack_name),
+                          exc_info=True)
+                writer.write("{0}\n".format(ex))
+                return DeployResult(
+                    FAILED, (str(ex).splitlines() or [type(ex).__name__])[0])
+
+        scheduler = DeploymentScheduler(max_concurrency)
+        results = scheduler.run(
+            [stack.stack_name for stack in stacks], dependencies, deploy_func)
+
+        outfile.write(self.MSG_SUMMARY)
+        failed = []
+        for stack in stacks:
+            result = results[stack.stack_name]
+            line = "{0}: {1}".format(stack.stack_name, result.status)
+            if result.message:
+                line += " ({0})".format(result.message)
+            outfile.write(line + "\n")
+            if result.status not in SUCCESS_STATUSES:
+                failed.append(stack.stack_name)
+        outfile.flush()
+
+        if failed:
+            raise exceptions.DeployManyFailedError(
+                stack_names=", ".join(failed))
+        return 0
+
+    def deploy_stack(self, deployer, stack, s3_uploader, execute_changeset,
+                     skip_unchanged, outfile):
+        """
+        Deploys a single stack of the manifest
+
+        :return: DeployResult of the stack
+        """
+        if os.path.getsize(stack.template_path) > 51200 and not s3_uploader:
+            raise exceptions.DeployBucketRequiredError()
+
+        parameters = self.merge_parameters(
+            stack.template_dict, stack.parameter_overrides)
+        tags = [{"Key": key, "Value": value}
+                for key, value in stack.tags.items()]
+        kwargs = {
+            'stack_name': stack.stack_name,
+            'cfn_template': stack.template_str,
+            'parameter_values': parameters,
+            'capabilities': stack.capabilities,
+            'role_arn': stack.role_arn,
+            'notification_arns': stack.notification_arns,
+            'tags': tags,
+        }
+
+        try:
+            if skip_unchanged and deployer.is_stack_unchanged(**kwargs):
+                raise exceptions.ChangeEmptyError(stack_name=stack.stack_name)
+            result = deployer.create_and_wait_for_changeset(
+                s3_uploader=s3_uploader, **kwargs)
+        except exceptions.ChangeEmptyError:
+            return DeployResult(UNCHANGED, None)
+
+        if not execute_changeset:
+            outfile.write(self.MSG_NO_EXECUTE_CHANGESET.format(
+                    changeset_id=result.changeset_id))
+            return DeployResult(CHANGESET_CREATED, result.changeset_id)
+
+        deployer.execute_changeset(result.changeset_id, stack.stack_name)
+        deployer.wait_for_execute(stack.stack_name, result.changeset_type)
+        if result.changeset_type == "CREATE":
+            return DeployResult(CREATED, None)
+        return DeployResult(UPDATED, None)
@@ -13,12 +13,17 @@
 
 import sys
 import time
+import json
+import hashlib
 import logging
 import botocore
 import collections
 
 from awscli.customizations.cloudformation import exceptions
 from awscli.customizations.cloudformation.artifact_exporter import mktempfile, parse_s3_url
+from awscli.customizations.cloudformation.yamlhelper import yaml_parse
+from awscli.customizations.cloudformation.stack_waiter import \
+    StackEventTailer, StackWaiter, ChangeSetWaiter
 
 from datetime import datetime
 
@@ -28,12 +33,30 @@ ChangeSetResult = collections.namedtuple(
                 "ChangeSetResult", ["changeset_id", "changeset_type"])
 
 
+# Stack statuses in which the deployed template and parameters are the ones
+# the last successful deployment left the stack with
+STABLE_STACK_STATUSES = [
+    "CREATE_COMPLETE",
+    "UPDATE_COMPLETE",
+    "UPDATE_ROLLBACK_COMPLETE",
+]
+
+# DescribeStacks masks the values of NoEcho parameters
+MASKED_PARAMETER_VALUE = "****"
+
+
 class Deployer(object):
 
     def __init__(self, cloudformation_client,
-                 changeset_prefix="awscli-cloudformation-package-deploy-"):
+                 changeset_prefix="awscli-cloudformation-package-deploy-",
+                 outfile=None):
         self._client = cloudformation_client
         self.changeset_prefix = changeset_prefix
+        # Progress is written to stdout unless another file is given
+        self._outfile = outfile
+        # ID of the last event of each stack before its changeset was
+        # executed, so only the events of the execution are waited for
+        self._last_event_ids = {}
 
     def has_stack(self, stack_name):
         """
@@ -71,6 +94,94 @@ class Deployer(object):
                 LOG.debug("Unable to get stack details.", exc_info=e)
                 raise e
 
+    def is_stack_unchanged(self, stack_name, cfn_template, parameter_values,
+                           capabilities, role_arn, notification_arns, tags):
+        """
+        Checks if deploying the template would leave the stack unchanged,
+        without creating a changeset. The normalized template, parameters,
+        capabilities and tags are compared with the deployed stack.
+
+        This check is conservative: whenever the deployed state cannot be
+        compared, for example because a parameter value is masked, the stack
+        is considered changed so a changeset is created as usual.
+
+        :param stack_name: Name or ID of stack
+        :param cfn_template: CloudFormation template string
+        :param parameter_values: Template parameters object
+        :param capabilities: Array of capabilities passed to CloudFormation
+        :param role_arn: ARN of the role passed to CloudFormation
+        :param notification_arns: Array of notification ARNs
+        :param tags: Array of tags passed to CloudFormation
+        :return: True if the stack is known to be unchanged. False otherwise
+        """
+        try:
+            resp = self._client.describe_stacks(StackName=stack_name)
+        except botocore.exceptions.ClientError as e:
+            LOG.debug("Unable to get stack details.", exc_info=e)
+            return False
+        if len(resp["Stacks"]) != 1:
+            return False
+        stack = resp["Stacks"][0]
+
+        if stack["StackStatus"] not in STABLE_STACK_STATUSES:
+            LOG.debug("Stack {0} is in status {1}".format(
+                stack_name, stack["StackStatus"]))
+            return False
+
+        if not self._are_parameters_unchanged(
+                stack.get("Parameters", []), parameter_values):
+            LOG.debug("Parameters of stack {0} changed".format(stack_name))
+            return False
+
+        if set(stack.get("Capabilities", [])) != set(capabilities or []) or \
+                _get_tag_set(stack.get("Tags", [])) != _get_tag_set(tags or []):
+            LOG.debug("Capabilities or tags of stack {0} changed".format(
+                stack_name))
+            return False
+
+        if role_arn is not None and stack.get("RoleARN") != role_arn:
+            return False
+        if notification_arns is not None and \
+                set(stack.get("NotificationARNs", [])) != \
+                set(notification_arns):
+            return False
+
+        resp = self._client.get_template(
+            StackName=stack_name, TemplateStage="Original")
+        deployed_template = resp["TemplateBody"]
+        if not isinstance(deployed_template, dict):
+            deployed_template = yaml_parse(deployed_template)
+        if _get_template_hash(deployed_template) != \
+                _get_template_hash(yaml_parse(cfn_template)):
+            LOG.debug("Template of stack {0} changed".format(stack_name))
+            return False
+
+        return True
+
+    def _are_parameters_unchanged(self, deployed_parameters,
+                                  parameter_values):
+        deployed_values = {}
+        for parameter in deployed_parameters:
+            # The resolved value of a parameter, such as an SSM parameter,
+            # may change without the parameter itself changing.
+            if "ResolvedValue" in parameter:
+                return False
+            deployed_values[parameter["ParameterKey"]] = \
+                parameter.get("ParameterValue")
+
+        keys = set()
+        for parameter in parameter_values:
+            key = parameter["ParameterKey"]
+            keys.add(key)
+            if key not in deployed_values:
+                return False
+            if parameter.get("UsePreviousValue", False):
+                continue
+            if deployed_values[key] == MASKED_PARAMETER_VALUE or \
+                    deployed_values[key] != parameter.get("ParameterValue"):
+                return False
+        return keys == set(deployed_values)
+
     def create_changeset(self, stack_name, cfn_template,
                          parameter_values, capabilities, role_arn,
                          notification_arns, s3_uploader, tags):
@@ -151,31 +262,23 @@ class Deployer(object):
         :param stack_name:   Stack name
         :return: Latest status of the create-change-set operation
         """
-        sys.stdout.write("\nWaiting for changeset to be created..\n")
-        sys.stdout.flush()
-
-        # Wait for changeset to be created
-        waiter = self._client.get_waiter("change_set_create_complete")
-        # Poll every 5 seconds. Changeset creation should be fast
-        waiter_config = {'Delay': 5}
-        try:
-            waiter.wait(ChangeSetName=changeset_id, StackName=stack_name,
-                        WaiterConfig=waiter_config)
-        except botocore.exceptions.WaiterError as ex:
-            LOG.debug("Create changeset waiter exception", exc_info=ex)
+        self._write("\nWaiting for changeset to be created..\n")
 
-            resp = ex.last_response
-            status = resp["Status"]
-            reason = resp["StatusReason"]
+        resp = ChangeSetWaiter(self._client).wait(changeset_id, stack_name)
+        status = resp["Status"]
+        reason = resp.get("StatusReason", "")
+        if status == "CREATE_COMPLETE":
+            return
 
-            if status == "FAILED" and \
-               "The submitted information didn't contain changes." in reason or \
-                            "No updates are to be performed" in reason:
-                    raise exceptions.ChangeEmptyError(stack_name=stack_name)
+        LOG.debug("Create changeset failed: {0}".format(resp))
+        if status == "FAILED" and \
+           "The submitted information didn't contain changes." in reason or \
+                        "No updates are to be performed" in reason:
+                raise exceptions.ChangeEmptyError(stack_name=stack_name)
 
-            raise RuntimeError("Failed to create the changeset: {0} "
-                               "Status: {1}. Reason: {2}"
-                               .format(ex, status, reason))
+        raise RuntimeError("Failed to create the changeset: "
+                           "Status: {0}. Reason: {1}"
+                           .format(status, reason))
 
     def execute_changeset(self, changeset_id, stack_name):
         """
@@ -185,38 +288,50 @@ class Deployer(object):
         :param stack_name: Name or ID of the stack
         :return: Response from execute-change-set call
         """
+        try:
+            self._last_event_ids[stack_name] = StackEventTailer(
+                self._client, stack_name).get_latest_event_id()
+        except botocore.exceptions.ClientError as ex:
+            LOG.debug("Unable to describe stack events", exc_info=ex)
+
         return self._client.execute_change_set(
                 ChangeSetName=changeset_id,
                 StackName=stack_name)
 
     def wait_for_execute(self, stack_name, changeset_type):
 
-        sys.stdout.write("Waiting for stack create/update to complete\n")
-        sys.stdout.flush()
+        self._write("Waiting for stack create/update to complete\n")
 
-        # Pick the right waiter
         if changeset_type == "CREATE":
-            waiter = self._client.get_waiter("stack_create_complete")
+            expected_status = "CREATE_COMPLETE"
         elif changeset_type == "UPDATE":
-            waiter = self._client.get_waiter("stack_update_complete")
+            expected_status = "UPDATE_COMPLETE"
         else:
             raise RuntimeError("Invalid changeset type {0}"
                                .format(changeset_type))
 
-        # Poll every 5 seconds. Optimizing for the case when the stack has only
-        # minimal changes, such the Code for Lambda Function
-        waiter_config = {
-            'Delay': 5,
-            'MaxAttempts': 720,
-        }
-
+        # Stream the stack events while waiting. Polling starts fast and
+        # slows down for long running updates.
+        waiter = StackWaiter(self._client, self._get_outfile())
         try:
-            waiter.wait(StackName=stack_name, WaiterConfig=waiter_config)
-        except botocore.exceptions.WaiterError as ex:
+            status = waiter.wait(
+                stack_name, self._last_event_ids.pop(stack_name, None))
+        except RuntimeError as ex:
             LOG.debug("Execute changeset waiter exception", exc_info=ex)
+            raise exceptions.DeployFailedError(stack_name=stack_name)
 
+        if status != expected_status:
+            LOG.debug("Stack operation ended with status {0}".format(status))
             raise exceptions.DeployFailedError(stack_name=stack_name)
 
+    def _get_outfile(self):
+        return self._outfile or sys.stdout
+
+    def _write(self, msg):
+        outfile = self._get_outfile()
+        outfile.write(msg)
+        outfile.flush()
+
     def create_and_wait_for_changeset(self, stack_name, cfn_template,
                                       parameter_values, capabilities, role_arn,
                                       notification_arns, s3_uploader, tags):
@@ -227,3 +342,16 @@ class Deployer(object):
         self.wait_for_changeset(result.changeset_id, stack_name)
 
         return result
+
+
+def _get_template_hash(template_dict):
+    """
+    Hashes the template independently of its format, key order and
+    whitespace
+    """
+    normalized = json.dumps(template_dict, sort_keys=True, default=str)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _get_tag_set(tags):
+    return set((tag["Key"], tag["Value"]) for tag in tags)
@@ -53,3 +53,11 @@ class DeployBucketRequiredError(CloudFormationCommandError):
          "via an S3 Bucket. Please add the --s3-bucket parameter to your "
          "command. The local template will be copied to that S3 bucket and "
          "then deployed.")
+
+
+class InvalidManifestError(CloudFormationCommandError):
+    fmt = "Invalid manifest file {manifest_path}: {reason}"
+
+
+class DeployManyFailedError(CloudFormationCommandError):
+    fmt = "Failed to deploy stacks: {stack_names}"
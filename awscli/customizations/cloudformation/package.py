@@ -20,6 +20,7 @@ import json
 from botocore.client import Config
 
 from awscli.customizations.cloudformation.artifact_exporter import Template
+from awscli.customizations.cloudformation.artifact_cache import ArtifactCache
 from awscli.customizations.cloudformation.yamlhelper import yaml_dump
 from awscli.customizations.cloudformation import exceptions
 from awscli.customizations.commands import BasicCommand
@@ -142,7 +143,9 @@ class PackageCommand(BasicCommand):
                                       parsed_globals.region,
                                       parsed_args.s3_prefix,
                                       parsed_args.kms_key_id,
-                                      parsed_args.force_upload)
+                                      parsed_args.force_upload,
+                                      list_existing_objects=True,
+                                      artifact_cache=ArtifactCache())
         # attach the given metadata to the artifacts to be uploaded
         self.s3_uploader.artifact_metadata = parsed_args.metadata
 
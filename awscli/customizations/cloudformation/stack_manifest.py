@@ -0,0 +1,256 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+import os
+import re
+import logging
+
+from awscli.compat import six
+from awscli.customizations.cloudformation import exceptions
+from awscli.customizations.cloudformation.yamlhelper import yaml_parse
+
+LOG = logging.getLogger(__name__)
+
+SUB_VARIABLE_REGEX = re.compile(r"\$\{([^}!]+)\}")
+
+STACK_KEYS = [
+    "StackName", "TemplateFile", "ParameterOverrides", "Tags",
+    "Capabilities", "RoleArn", "NotificationArns", "DependsOn",
+]
+
+
+class ManifestStack(object):
+    """
+    A stack to deploy, as described by an entry of the manifest file
+    """
+
+    def __init__(self, stack_name, template_path, template_str,
+                 parameter_overrides=None, tags=None, capabilities=None,
+                 role_arn=None, notification_arns=None, depends_on=None):
+        self.stack_name = stack_name
+        self.template_path = template_path
+        self.template_str = template_str
+        self.template_dict = yaml_parse(template_str)
+        self.parameter_overrides = parameter_overrides or {}
+        self.tags = tags or {}
+        self.capabilities = capabilities or []
+        self.role_arn = role_arn
+        self.notification_arns = notification_arns
+        self.depends_on = depends_on or []
+
+    def get_export_names(self):
+        """
+        :return: Names of the exports of the stack that can be determined
+            without deploying it
+        """
+        names = []
+        outputs = self.template_dict.get("Outputs", None)
+        if not isinstance(outputs, dict):
+            return names
+        for output in outputs.values():
+            if not isinstance(output, dict) or \
+                    not isinstance(output.get("Export"), dict):
+                continue
+            name = resolve_name(output["Export"].get("Name"), self.stack_name)
+            if name is not None:
+                names.append(name)
+        return names
+
+    def get_import_names(self):
+        """
+        :return: Names of the exports imported by the stack that can be
+            determined without deploying it
+        """
+        names = []
+        for value in _find_intrinsic_values(
+                self.template_dict, "Fn::ImportValue"):
+            name = resolve_name(value, self.stack_name)
+            if name is not None:
+                names.append(name)
+        return names
+
+
+def resolve_name(value, stack_name):
+    """
+    Resolves an export name that is either a string or a Fn::Sub whose only
+    variable is AWS::StackName
+
+    :return: The name or None if it depends on anything else
+    """
+    if isinstance(value, six.string_types):
+        return value
+    if not isinstance(value, dict) or list(value.keys()) != ["Fn::Sub"]:
+        return None
+    template = value["Fn::Sub"]
+    if isinstance(template, list) and len(template) == 2 and \
+            not template[1]:
+        template = template[0]
+    if not isinstance(template, six.string_types):
+        return None
+    for variable in SUB_VARIABLE_REGEX.findall(template):
+        if variable != "AWS::StackName":
+            return None
+    return template.replace("${AWS::StackName}", stack_name)
+
+
+def _find_intrinsic_values(value, intrinsic_name):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == intrinsic_name:
+                yield item
+            else:
+                for found in _find_intrinsic_values(item, intrinsic_name):
+                    yield found
+    elif isinstance(value, list):
+        for item in value:
+            for found in _find_intrinsic_values(item, intrinsic_name):
+                yield found
+
+
+def load_manifest(manifest_path):
+    """
+    Loads the stacks of a manifest file. Paths of templates are relative to
+    the directory of the manifest file.
+
+    :param manifest_path: Path to the JSON or YAML manifest file
+    :return: List of ManifestStack in the order of the manifest
+    """
+    def error(reason):
+        return exceptions.InvalidManifestError(
+            manifest_path=manifest_path, reason=reason)
+
+    if not os.path.isfile(manifest_path):
+        raise error("File does not exist")
+    with open(manifest_path, "r") as handle:
+        manifest = yaml_parse(handle.read())
+
+    if not isinstance(manifest, dict) or \
+            not isinstance(manifest.get("Stacks"), list) or \
+            not manifest["Stacks"]:
+        raise error("Stacks must be a non-empty list")
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    stacks = []
+    stack_names = set()
+    for entry in manifest["Stacks"]:
+        if not isinstance(entry, dict):
+            raise error("Each stack must be a mapping")
+        unknown_keys = sorted(set(entry) - set(STACK_KEYS))
+        if unknown_keys:
+            raise error("Unknown keys {0}".format(", ".join(unknown_keys)))
+        for key in ["StackName", "TemplateFile"]:
+            if not isinstance(entry.get(key), six.string_types):
+                raise error("Each stack must have a {0}".format(key))
+
+        stack_name = entry["StackName"]
+        if stack_name in stack_names:
+            raise error("Stack {0} is listed more than once".format(
+                stack_name))
+        stack_names.add(stack_name)
+
+        template_path = os.path.join(base_dir, entry["TemplateFile"])
+        if not os.path.isfile(template_path):
+            raise exceptions.InvalidTemplatePathError(
+                template_path=template_path)
+        with open(template_path, "r") as handle:
+            template_str = handle.read()
+
+        depends_on = entry.get("DependsOn", [])
+        if isinstance(depends_on, six.string_types):
+            depends_on = [depends_on]
+
+        stacks.append(ManifestStack(
+            stack_name, template_path, template_str,
+            parameter_overrides=_get_string_map(
+                entry, "ParameterOverrides", error),
+            tags=_get_string_map(entry, "Tags", error),
+            capabilities=entry.get("Capabilities"),
+            role_arn=entry.get("RoleArn"),
+            notification_arns=entry.get("NotificationArns"),
+            depends_on=depends_on))
+    return stacks
+
+
+def _get_string_map(entry, key, error):
+    value = entry.get(key, {})
+    if not isinstance(value, dict):
+        raise error("{0} of stack {1} must be a mapping".format(
+            key, entry["StackName"]))
+    result = {}
+    for name, item in value.items():
+        if isinstance(item, bool) or \
+                not isinstance(item, six.string_types + six.integer_types +
+                               (float,)):
+            raise error("{0} {1} of stack {2} must be a string".format(
+                key, name, entry["StackName"]))
+        result[name] = six.text_type(item)
+    return result
+
+
+def get_stack_dependencies(stacks, manifest_path):
+    """
+    Determines the stacks each stack depends on, from the explicit DependsOn
+    of the stack and from the exports of other stacks that it imports
+
+    :param stacks: List of ManifestStack
+    :param manifest_path: Path to the manifest, used in error messages
+    :return: Dictionary from each stack name to the set of stack names it
+        depends on
+    """
+    exporters = {}
+    for stack in stacks:
+        for name in stack.get_export_names():
+            exporters[name] = stack.stack_name
+
+    stack_names = set(stack.stack_name for stack in stacks)
+    dependencies = {}
+    for stack in stacks:
+        depends_on = set()
+        for name in stack.depends_on:
+            if name not in stack_names:
+                raise exceptions.InvalidManifestError(
+                    manifest_path=manifest_path,
+                    reason="Stack {0} depends on unknown stack {1}".format(
+                        stack.stack_name, name))
+            depends_on.add(name)
+        for name in stack.get_import_names():
+            # Imports of exports of stacks that are not in the manifest
+            # must already exist
+            exporter = exporters.get(name)
+            if exporter is not None and exporter != stack.stack_name:
+                LOG.debug("Stack {0} imports {1} from stack {2}".format(
+                    stack.stack_name, name, exporter))
+                depends_on.add(exporter)
+        dependencies[stack.stack_name] = depends_on
+
+    cycle = _find_stacks_in_cycles(dependencies)
+    if cycle:
+        raise exceptions.InvalidManifestError(
+            manifest_path=manifest_path,
+            reason="Stacks {0} depend on each other".format(
+                ", ".join(sorted(cycle))))
+    return dependencies
+
+
+def _find_stacks_in_cycles(dependencies):
+    remaining = dict(
+        (name, set(depends_on)) for name, depends_on in dependencies.items())
+    while True:
+        ready = [name for name, depends_on in remaining.items()
+                 if not depends_on]
+        if not ready:
+            return list(remaining)
+        for name in ready:
+            del remaining[name]
+        for depends_on in remaining.values():
+            depends_on.difference_update(ready)
@@ -0,0 +1,212 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+
+import logging
+import time
+
+import botocore
+
+LOG = logging.getLogger(__name__)
+
+PENDING_CHANGESET_STATUSES = ["CREATE_PENDING", "CREATE_IN_PROGRESS"]
+
+
+def is_terminal_status(status):
+    """
+    Checks if a stack status ends a stack operation, for example
+    UPDATE_COMPLETE or ROLLBACK_FAILED. Statuses such as
+    UPDATE_COMPLETE_CLEANUP_IN_PROGRESS are still in progress.
+    """
+    return status.endswith("_COMPLETE") or status.endswith("_FAILED")
+
+
+def format_stack_event(event):
+    line = "{0}  {1:<45} {2:<40} {3}".format(
+        event["Timestamp"].strftime("%Y-%m-%d %H:%M:%S"),
+        event.get("ResourceStatus", ""),
+        event.get("ResourceType", ""),
+        event.get("LogicalResourceId", ""))
+    if event.get("ResourceStatusReason"):
+        line += "  " + event["ResourceStatusReason"]
+    return line + "\n"
+
+
+class AdaptiveDelay(object):
+    """
+    Delay between polls that starts short, so quick operations complete
+    without waiting, and grows while nothing happens, so long running
+    operations are not polled needlessly often
+    """
+
+    def __init__(self, initial_delay=1, max_delay=5, multiplier=1.5):
+        self._initial_delay = initial_delay
+        self._max_delay = max_delay
+        self._multiplier = multiplier
+        self._delay = initial_delay
+
+    def next(self):
+        delay = self._delay
+        self._delay = min(self._max_delay, self._delay * self._multiplier)
+        return delay
+
+    def reset(self):
+        self._delay = self._initial_delay
+
+
+class StackEventTailer(object):
+    """
+    Incrementally fetches the events of a stack that happened after the
+    last seen event
+    """
+
+    def __init__(self, client, stack_name, last_event_id=None):
+        self._client = client
+        self._stack_name = stack_name
+        self.last_event_id = last_event_id
+
+    def get_latest_event_id(self):
+        resp = self._client.describe_stack_events(StackName=self._stack_name)
+        events = resp["StackEvents"]
+        if events:
+            return events[0]["EventId"]
+        return None
+
+    def poll(self):
+        """
+        :return: List of the new events, oldest first
+        """
+        new_events = []
+        kwargs = {"StackName": self._stack_name}
+        while True:
+            resp = self._client.describe_stack_events(**kwargs)
+            # Events are listed newest first
+            for event in resp["StackEvents"]:
+                if event["EventId"] == self.last_event_id:
+                    return self._add_new_events(new_events)
+                new_events.append(event)
+            if not resp.get("NextToken"):
+                return self._add_new_events(new_events)
+            kwargs["NextToken"] = resp["NextToken"]
+
+    def _add_new_events(self, new_events):
+        if new_events:
+            self.last_event_id = new_events[0]["EventId"]
+        new_events.reverse()
+        return new_events
+
+
+class StackWaiter(object):
+    """
+    Waits for a stack operation to complete by tailing the stack events.
+    Events are written to the output as they happen and the operation is
+    complete as soon as the event of a terminal stack status is seen.
+    """
+
+    def __init__(self, client, outfile, delay=None, timeout=3600,
+                 sleep=time.sleep, clock=time.time):
+        self._client = client
+        self._outfile = outfile
+        self._delay = delay or AdaptiveDelay()
+        self._timeout = timeout
+        self._sleep = sleep
+        self._clock = clock
+
+    def wait(self, stack_name, last_event_id=None):
+        """
+        Waits until the stack operation that started after the given event
+        completes
+
+        :param stack_name: Name or ID of the stack
+        :param last_event_id: ID of the last event before the operation
+            started
+        :return: Terminal status of the stack
+        :raises RuntimeError: If the operation does not complete in time
+        """
+        deadline = self._clock() + self._timeout
+        if last_event_id is None:
+            # Without knowing where the operation started, the events of
+            # earlier operations cannot be told apart from its events.
+            return self._wait_for_stack_status(stack_name, deadline)
+
+        tailer = StackEventTailer(self._client, stack_name, last_event_id)
+        while True:
+            try:
+                events = tailer.poll()
+            except botocore.exceptions.ClientError as ex:
+                LOG.debug("Unable to describe stack events", exc_info=ex)
+                return self._wait_for_stack_status(stack_name, deadline)
+            status = self._handle_events(events)
+            if status is not None:
+                return status
+            self._sleep_until_next_poll(events, deadline)
+
+    def _handle_events(self, events):
+        status = None
+        for event in events:
+            self._outfile.write(format_stack_event(event))
+            # Events of the stack itself, rather than of its resources,
+            # have the ID of the stack as the physical resource ID
+            if event.get("PhysicalResourceId") == event["StackId"] and \
+                    is_terminal_status(event["ResourceStatus"]):
+                status = event["ResourceStatus"]
+        self._outfile.flush()
+        return status
+
+    def _wait_for_stack_status(self, stack_name, deadline):
+        # Fall back to polling the stack status when the events cannot be
+        # used, for example because of a restrictive IAM policy.
+        while True:
+            resp = self._client.describe_stacks(StackName=stack_name)
+            status = resp["Stacks"][0]["StackStatus"]
+            if is_terminal_status(status):
+                return status
+            self._sleep_until_next_poll([], deadline)
+
+    def _sleep_until_next_poll(self, events, deadline):
+        if events:
+            self._delay.reset()
+        delay = self._delay.next()
+        if self._clock() + delay > deadline:
+            raise RuntimeError("Timed out waiting for the stack operation")
+        self._sleep(delay)
+
+
+class ChangeSetWaiter(object):
+    """
+    Waits for a changeset to be created by polling its status
+    """
+
+    def __init__(self, client, delay=None, timeout=600, sleep=time.sleep,
+                 clock=time.time):
+        self._client = client
+        self._delay = delay or AdaptiveDelay()
+        self._timeout = timeout
+        self._sleep = sleep
+        self._clock = clock
+
+    def wait(self, changeset_id, stack_name):
+        """
+        :return: Latest DescribeChangeSet response. Its status is
+            CREATE_COMPLETE if the changeset was created, or a different
+            status if creating the changeset failed or timed out.
+        """
+        deadline = self._clock() + self._timeout
+        while True:
+            resp = self._client.describe_change_set(
+                ChangeSetName=changeset_id, StackName=stack_name)
+            if resp["Status"] not in PENDING_CHANGESET_STATUSES:
+                return resp
+            delay = self._delay.next()
+            if self._clock() + delay > deadline:
+                return resp
+            self._sleep(delay)
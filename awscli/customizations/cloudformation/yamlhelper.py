@@ -16,6 +16,14 @@ from yaml.resolver import ScalarNode, SequenceNode
 
 from awscli.compat import six
 
+try:
+    # LibYAML based loader is much faster if available. Templates are
+    # still dumped by the pure Python dumper, whose output LibYAML does not
+    # always reproduce.
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+
 
 def intrinsics_multi_constructor(loader, tag_prefix, node):
     """
@@ -54,6 +62,16 @@ def intrinsics_multi_constructor(loader, tag_prefix, node):
     return {cfntag: value}
 
 
+class CfnYamlLoader(_SafeLoader):
+    """
+    Safe YAML loader that parses the short form of CloudFormation intrinsic
+    functions
+    """
+
+
+CfnYamlLoader.add_multi_constructor("!", intrinsics_multi_constructor)
+
+
 def yaml_dump(dict_to_dump):
     """
     Dumps the dictionary as a YAML document
@@ -71,6 +89,4 @@ def yaml_parse(yamlstr):
         # json parser.
         return json.loads(yamlstr)
     except ValueError:
-        yaml.SafeLoader.add_multi_constructor(
-            "!", intrinsics_multi_constructor)
-        return yaml.safe_load(yamlstr)
+        return yaml.load(yamlstr, Loader=CfnYamlLoader)
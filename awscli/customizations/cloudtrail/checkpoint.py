@@ -0,0 +1,118 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+# http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import hashlib
+import logging
+import os
+
+from botocore.credentials import JSONFileCache
+
+
+LOG = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = os.path.expanduser(
+    os.path.join('~', '.aws', 'cli', 'cloudtrail', 'checkpoints'))
+
+
+class ValidationCheckpoint(object):
+    """The progress of the incremental validation of a trail.
+
+    A checkpoint records the newest digest of the last validation in which
+    every digest and log file was valid. The next incremental validation
+    only validates the digests delivered after it, and verifies that they
+    link back to it.
+
+    Log files that were valid in a validation that did not succeed as a
+    whole are recorded with their hash values, so they do not need to be
+    downloaded again until the checkpoint moves past them.
+    """
+    def __init__(self, trail_arn, digest_bucket=None, digest_key=None,
+                 digest_signature=None, digest_end_time=None,
+                 validated_logs=None):
+        self.trail_arn = trail_arn
+        self.digest_bucket = digest_bucket
+        self.digest_key = digest_key
+        self.digest_signature = digest_signature
+        self.digest_end_time = digest_end_time
+        self.validated_logs = validated_logs or {}
+
+    @classmethod
+    def from_digest(cls, trail_arn, digest):
+        """Creates a checkpoint from a validated digest"""
+        return cls(trail_arn, digest_bucket=digest['digestS3Bucket'],
+                   digest_key=digest['digestS3Object'],
+                   digest_signature=digest['_signature'],
+                   digest_end_time=digest['digestEndTime'])
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['trailArn'],
+                   digest_bucket=data.get('digestS3Bucket'),
+                   digest_key=data.get('digestS3Object'),
+                   digest_signature=data.get('digestSignature'),
+                   digest_end_time=data.get('digestEndTime'),
+                   validated_logs=data.get('validatedLogs'))
+
+    def to_dict(self):
+        return {
+            'trailArn': self.trail_arn,
+            'digestS3Bucket': self.digest_bucket,
+            'digestS3Object': self.digest_key,
+            'digestSignature': self.digest_signature,
+            'digestEndTime': self.digest_end_time,
+            'validatedLogs': self.validated_logs,
+        }
+
+    @property
+    def has_digest(self):
+        return self.digest_key is not None
+
+    def is_digest(self, digest):
+        """Returns True if the digest is the one the checkpoint was made
+        from"""
+        return (self.has_digest and
+                digest['digestS3Bucket'] == self.digest_bucket and
+                digest['digestS3Object'] == self.digest_key)
+
+    def is_log_validated(self, log):
+        location = get_log_location(log)
+        return self.validated_logs.get(location) == log['hashValue']
+
+
+def get_log_location(log):
+    return 's3://%s/%s' % (log['s3Bucket'], log['s3Object'])
+
+
+class ValidationCheckpointStore(object):
+    """Stores a validation checkpoint per trail in a directory"""
+    def __init__(self, checkpoint_dir=CHECKPOINT_DIR, cache=None):
+        self._cache = cache
+        if self._cache is None:
+            self._cache = JSONFileCache(checkpoint_dir)
+
+    def load(self, trail_arn):
+        """Returns the ValidationCheckpoint of a trail, or None"""
+        try:
+            data = self._cache[self._get_key(trail_arn)]
+        except KeyError:
+            return None
+        if not isinstance(data, dict) or data.get('trailArn') != trail_arn:
+            LOG.debug('Ignoring invalid checkpoint of trail %s', trail_arn)
+            return None
+        return ValidationCheckpoint.from_dict(data)
+
+    def save(self, checkpoint):
+        self._cache[self._get_key(checkpoint.trail_arn)] = \
+            checkpoint.to_dict()
+
+    def _get_key(self, trail_arn):
+        return hashlib.sha256(trail_arn.encode('utf-8')).hexdigest()
@@ -12,28 +12,51 @@
 # language governing permissions and limitations under the License.
 import base64
 import binascii
+import bisect
+import functools
 import json
 import hashlib
 import logging
 import re
 import sys
+import threading
 import zlib
+from collections import deque
 from zlib import error as ZLibError
 from datetime import datetime, timedelta
 from dateutil import tz, parser
 
+from concurrent.futures import ThreadPoolExecutor, wait
+
 from pyasn1.error import PyAsn1Error
 import rsa
 
+from awscli.customizations.cloudtrail.checkpoint import \
+    ValidationCheckpoint, ValidationCheckpointStore, get_log_location
 from awscli.customizations.cloudtrail.utils import get_trail_by_arn, \
     get_account_id_from_arn
 from awscli.customizations.commands import BasicCommand
+from awscli.utils import wait_until
 from botocore.exceptions import ClientError
 
 
 LOG = logging.getLogger(__name__)
 DATE_FORMAT = '%Y%m%dT%H%M%SZ'
 DISPLAY_DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+# The number of log files that are downloaded and hashed at the same time.
+MAX_CONCURRENT_LOG_DOWNLOADS = 10
+# The number of log files and status messages that are queued to be
+# reported, in order, before the traversal of digests waits for them.
+MAX_PENDING_REPORTS = 100
+LOG_READ_CHUNK_SIZE = 1024 * 1024
+# The number of digests that are loaded and validated ahead of the digest
+# that is being traversed.
+DIGEST_PREFETCH_SIZE = 10
+
+LOG_VALID = 'valid'
+LOG_INVALID_HASH = 'invalid_hash'
+LOG_INVALID_FORMAT = 'invalid_format'
+LOG_NOT_FOUND = 'not_found'
 
 
 def format_date(date):
@@ -139,18 +162,21 @@ class S3ClientProvider(object):
     """Creates Amazon S3 clients and determines the region name of a client.
 
     This class will cache the location constraints of previously requested
-    buckets and cache previously created clients for the same region.
+    buckets and cache previously created clients for the same region. It
+    can be used from multiple threads.
     """
     def __init__(self, session, get_bucket_location_region='us-east-1'):
         self._session = session
         self._get_bucket_location_region = get_bucket_location_region
         self._client_cache = {}
         self._region_cache = {}
+        self._lock = threading.Lock()
 
     def get_client(self, bucket_name):
         """Creates an S3 client that can work with the given bucket name"""
-        region_name = self._get_bucket_region(bucket_name)
-        return self._create_client(region_name)
+        with self._lock:
+            region_name = self._get_bucket_region(bucket_name)
+            return self._create_client(region_name)
 
     def _get_bucket_region(self, bucket_name):
         """Returns the region of a bucket"""
@@ -327,6 +353,66 @@ class DigestProvider(object):
         return '^' + key + '$'
 
 
+class DigestPrefetcher(object):
+    """Loads digests on a pool of threads ahead of when they are needed.
+
+    The traverser follows the chain of digests backwards, and the previous
+    digest of a digest is almost always the digest listed before it in the
+    bucket. The listed digests that come next are therefore loaded while
+    the current digest is traversed. Loading a digest that turns out not to
+    be part of the chain only wastes a request; the checks of the chain are
+    still made by the traverser, in order.
+    """
+    def __init__(self, load_func, max_prefetch=DIGEST_PREFETCH_SIZE):
+        """
+        :param load_func: Function that is called with a bucket and key, and
+            loads and validates the digest.
+        :param max_prefetch: The maximum number of digests to load ahead.
+        """
+        self._load_func = load_func
+        self._max_prefetch = max_prefetch
+        self._executor = ThreadPoolExecutor(max_workers=max_prefetch)
+        self._futures = {}
+
+    def load(self, bucket, key, digests):
+        """Returns the result of the load function for a digest
+
+        Any exception raised by the load function is raised here.
+
+        :param digests: The sorted list of digest keys in the bucket. The
+            keys listed before the given key are loaded ahead.
+        """
+        future = self._futures.pop((bucket, key), None)
+        if future is None:
+            future = self._executor.submit(self._load_func, bucket, key)
+        self._prefetch(bucket, self._get_upcoming_keys(key, digests))
+        wait_until(future.done, functools.partial(wait, [future]))
+        return future.result()
+
+    def shutdown(self):
+        for future in self._futures.values():
+            future.cancel()
+        self._futures = {}
+        self._executor.shutdown(wait=False)
+
+    def _get_upcoming_keys(self, key, digests):
+        end = bisect.bisect_left(digests, key)
+        start = max(0, end - self._max_prefetch)
+        return list(reversed(digests[start:end]))
+
+    def _prefetch(self, bucket, keys):
+        upcoming = [(bucket, key) for key in keys]
+        # Digests that are no longer expected, for example after the chain
+        # moved to another bucket, are not loaded if they have not started.
+        for bucket_and_key in list(self._futures):
+            if bucket_and_key not in upcoming:
+                self._futures.pop(bucket_and_key).cancel()
+        for bucket_and_key in upcoming:
+            if bucket_and_key not in self._futures:
+                self._futures[bucket_and_key] = self._executor.submit(
+                    self._load_func, *bucket_and_key)
+
+
 class DigestTraverser(object):
     """Retrieves and validates digests within a date range."""
     # These keys are required to be present before validating the contents
@@ -385,10 +471,21 @@ class DigestTraverser(object):
         public_keys = self._load_public_keys(start_date, end_date)
         key, end_date = self._get_last_digest(digests)
         last_start_date = end_date
+        prefetcher = DigestPrefetcher(functools.partial(
+            self._load_and_validate_digest, public_keys))
+        try:
+            for digest in self._traverse_chain(
+                    prefetcher, digests, bucket, prefix, key, start_date,
+                    end_date, last_start_date):
+                yield digest
+        finally:
+            prefetcher.shutdown()
+
+    def _traverse_chain(self, prefetcher, digests, bucket, prefix, key,
+                        start_date, end_date, last_start_date):
         while key and start_date <= last_start_date:
             try:
-                digest, end_date = self._load_and_validate_digest(
-                    public_keys, bucket, key)
+                digest, end_date = prefetcher.load(bucket, key, digests)
                 last_start_date = normalize_date(
                     parse_date(digest['digestStartTime']))
                 previous_bucket = digest.get('previousDigestS3Bucket', None)
@@ -598,7 +695,7 @@ class CloudTrailValidateLogs(BasicCommand):
 
         Log files that have been downloaded to local disk cannot be validated
         with the AWS CLI. The CLI will download all log files each time this
-        command is executed.
+        command is executed, unless ``--incremental`` is specified.
 
     .. note::
 
@@ -611,10 +708,12 @@ class CloudTrailValidateLogs(BasicCommand):
     ARG_TABLE = [
         {'name': 'trail-arn', 'required': True, 'cli_type_name': 'string',
          'help_text': 'Specifies the ARN of the trail to be validated'},
-        {'name': 'start-time', 'required': True, 'cli_type_name': 'string',
+        {'name': 'start-time', 'cli_type_name': 'string',
          'help_text': ('Specifies that log files delivered on or after the '
                        'specified UTC timestamp value will be validated. '
-                       'Example: "2015-01-08T05:21:42Z".')},
+                       'Example: "2015-01-08T05:21:42Z". Required unless '
+                       '--incremental is specified and a previous '
+                       'incremental validation of the trail succeeded.')},
         {'name': 'end-time', 'cli_type_name': 'string',
          'help_text': ('Optionally specifies that log files delivered on or '
                        'before the specified UTC timestamp value will be '
@@ -631,7 +730,16 @@ class CloudTrailValidateLogs(BasicCommand):
                        'describe_trails.')},
         {'name': 'verbose', 'cli_type_name': 'boolean',
          'action': 'store_true',
-         'help_text': 'Display verbose log validation information'}
+         'help_text': 'Display verbose log validation information'},
+        {'name': 'incremental', 'cli_type_name': 'boolean',
+         'action': 'store_true',
+         'help_text': ('Only validates the digest files delivered after the '
+                       'newest digest file of the last incremental '
+                       'validation of the trail in which all digest and log '
+                       'files were valid, and verifies that they link back '
+                       'to that digest file. The --start-time is not used if '
+                       'there is such a validation. The progress of the '
+                       'validation is stored in ~/.aws/cli/cloudtrail.')}
     ]
 
     def __init__(self, session):
@@ -652,6 +760,13 @@ class CloudTrailValidateLogs(BasicCommand):
         self._is_last_status_double_space = True
         self._found_start_time = None
         self._found_end_time = None
+        self._pending_reports = deque()
+        self.incremental = False
+        self.checkpoint_store = None
+        self._checkpoint = None
+        self._newest_digest = None
+        self._oldest_digest = None
+        self._validated_logs = {}
 
     def _run_main(self, args, parsed_globals):
         self.handle_args(args)
@@ -666,12 +781,17 @@ class CloudTrailValidateLogs(BasicCommand):
         self.is_verbose = args.verbose
         self.s3_bucket = args.s3_bucket
         self.s3_prefix = args.s3_prefix
-        self.start_time = normalize_date(parse_date(args.start_time))
+        self.incremental = args.incremental
+        if args.start_time:
+            self.start_time = normalize_date(parse_date(args.start_time))
+        elif not self.incremental:
+            raise ValueError('--start-time is required unless --incremental '
+                             'is specified')
         if args.end_time:
             self.end_time = normalize_date(parse_date(args.end_time))
         else:
             self.end_time = normalize_date(datetime.utcnow())
-        if self.start_time > self.end_time:
+        if self.start_time is not None and self.start_time > self.end_time:
             raise ValueError(('Invalid time range specified: start-time must '
                               'occur before end-time'))
         # Found start time always defaults to the given start time. This value
@@ -692,30 +812,145 @@ class CloudTrailValidateLogs(BasicCommand):
             client_args['endpoint_url'] = parsed_globals.endpoint_url
         self.cloudtrail_client = self._session.create_client(
             'cloudtrail', **client_args)
+        if self.incremental:
+            self.checkpoint_store = ValidationCheckpointStore()
 
     def _call(self):
+        # Log files are downloaded and hashed concurrently, while the status
+        # of each digest and log file is still reported in the order in which
+        # the digests are traversed. Anything reported while traversing
+        # digests is therefore queued behind the log files that are still
+        # being validated.
+        if self.incremental:
+            self._load_checkpoint()
         traverser = create_digest_traverser(
             trail_arn=self.trail_arn, cloudtrail_client=self.cloudtrail_client,
             trail_source_region=self._source_region,
             s3_client_provider=self.s3_client_provider, bucket=self.s3_bucket,
-            prefix=self.s3_prefix, on_missing=self._on_missing_digest,
-            on_invalid=self._on_invalid_digest, on_gap=self._on_digest_gap)
+            prefix=self.s3_prefix,
+            on_missing=self._queue_report(self._on_missing_digest),
+            on_invalid=self._queue_report(self._on_invalid_digest),
+            on_gap=self._queue_report(self._on_digest_gap))
         self._write_startup_text()
-        digests = traverser.traverse(self.start_time, self.end_time)
-        for digest in digests:
-            # Only valid digests are yielded and only valid digests can adjust
-            # the found times that are reported in the CLI output summary.
-            self._track_found_times(digest)
-            self._valid_digests += 1
-            self._write_status(
-                'Digest file\ts3://%s/%s\tvalid'
-                % (digest['digestS3Bucket'], digest['digestS3Object']))
-            if not digest['logFiles']:
-                continue
-            for log in digest['logFiles']:
-                self._download_log(log)
+        executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_LOG_DOWNLOADS)
+        try:
+            digests = traverser.traverse(self.start_time, self.end_time)
+            for digest in digests:
+                if self._checkpoint and self._checkpoint.is_digest(digest):
+                    # This digest was validated by a previous run.
+                    break
+                if self._newest_digest is None:
+                    self._newest_digest = digest
+                self._oldest_digest = digest
+                # Only valid digests are yielded and only valid digests can
+                # adjust the found times that are reported in the CLI output
+                # summary.
+                self._track_found_times(digest)
+                self._queue_report(self._on_valid_digest)(digest)
+                for log in digest['logFiles'] or []:
+                    if self._checkpoint and \
+                            self._checkpoint.is_log_validated(log):
+                        self._queue_report(self._on_log_result)(
+                            log, LOG_VALID)
+                        continue
+                    future = executor.submit(self._download_log, log)
+                    self._pending_reports.append(
+                        (future, functools.partial(self._on_log_result, log)))
+                self._report_pending(MAX_PENDING_REPORTS)
+            self._report_pending(0)
+        finally:
+            for future, _ in self._pending_reports:
+                if future is not None:
+                    future.cancel()
+            executor.shutdown()
+        if self.incremental:
+            self._check_checkpoint_link()
+            self._save_checkpoint()
         self._write_summary_text()
 
+    def _load_checkpoint(self):
+        self._checkpoint = self.checkpoint_store.load(self.trail_arn)
+        if self._checkpoint is not None and self._checkpoint.has_digest:
+            # Digests are validated from right after the end of the digest
+            # of the checkpoint.
+            self.start_time = normalize_date(
+                parse_date(self._checkpoint.digest_end_time) +
+                timedelta(seconds=1))
+            self._found_start_time = self.start_time
+        elif self.start_time is None:
+            raise ValueError(
+                'There is no successful incremental validation of trail %s. '
+                'Specify --start-time to validate the trail from.'
+                % self.trail_arn)
+
+    def _check_checkpoint_link(self):
+        """Verifies that the oldest validated digest links back to the
+        digest of the checkpoint"""
+        checkpoint = self._checkpoint
+        digest = self._oldest_digest
+        if checkpoint is None or not checkpoint.has_digest or digest is None:
+            return
+        if self._invalid_digests:
+            # The digest chain was already reported to be broken.
+            return
+        if digest['previousDigestSignature'] is None:
+            # CloudTrail started a new chain of digests, for example because
+            # logging was stopped.
+            self._on_digest_gap(
+                next_end_date=parse_date(checkpoint.digest_end_time),
+                last_start_date=parse_date(digest['digestStartTime']))
+        elif (digest.get('previousDigestS3Bucket'),
+              digest.get('previousDigestS3Object'),
+              digest['previousDigestSignature']) != (
+                checkpoint.digest_bucket, checkpoint.digest_key,
+                checkpoint.digest_signature):
+            self._on_invalid_digest(
+                ('Digest file\ts3://%s/%s\tINVALID: does not link to the '
+                 'last validated digest file s3://%s/%s')
+                % (digest['digestS3Bucket'], digest['digestS3Object'],
+                   checkpoint.digest_bucket, checkpoint.digest_key))
+
+    def _save_checkpoint(self):
+        checkpoint = self._checkpoint
+        if checkpoint is None:
+            checkpoint = ValidationCheckpoint(self.trail_arn)
+        if not self._invalid_digests and not self._invalid_logs:
+            if self._newest_digest is None:
+                return
+            checkpoint = ValidationCheckpoint.from_digest(
+                self.trail_arn, self._newest_digest)
+        else:
+            # The checkpoint does not move, but the next validation does not
+            # need to download the log files that were valid again.
+            checkpoint.validated_logs.update(self._validated_logs)
+        try:
+            self.checkpoint_store.save(checkpoint)
+        except (OSError, IOError) as e:
+            self._write_status(
+                'Unable to save the validation checkpoint: %s' % e, True)
+
+    def _queue_report(self, report):
+        def queued_report(*args, **kwargs):
+            self._pending_reports.append(
+                (None, functools.partial(report, *args, **kwargs)))
+        return queued_report
+
+    def _report_pending(self, max_pending):
+        """Reports queued statuses, in order, until at most max_pending
+        are left in the queue"""
+        while self._pending_reports:
+            future, report = self._pending_reports[0]
+            if future is None:
+                self._pending_reports.popleft()
+                report()
+            elif future.done():
+                self._pending_reports.popleft()
+                report(future.result())
+            elif len(self._pending_reports) > max_pending:
+                wait_until(future.done, functools.partial(wait, [future]))
+            else:
+                break
+
     def _track_found_times(self, digest):
         # Track the earliest found start time, but do not use a date before
         # the user supplied start date.
@@ -729,7 +964,11 @@ class CloudTrailValidateLogs(BasicCommand):
             self._found_end_time = min(digest_end_time, self.end_time)
 
     def _download_log(self, log):
-        """ Download a log, decompress, and compare SHA256 checksums"""
+        """ Download a log, decompress, and compare SHA256 checksums
+
+        This is called from multiple threads at the same time, and returns
+        the result of the validation instead of reporting it.
+        """
         try:
             # Create a client that can work with this bucket.
             client = self.s3_client_provider.get_client(log['s3Bucket'])
@@ -737,7 +976,8 @@ class CloudTrailValidateLogs(BasicCommand):
                 Bucket=log['s3Bucket'], Key=log['s3Object'])
             gzip_inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
             rolling_hash = hashlib.sha256()
-            for chunk in iter(lambda: response['Body'].read(2048), b""):
+            for chunk in iter(
+                    lambda: response['Body'].read(LOG_READ_CHUNK_SIZE), b""):
                 data = gzip_inflater.decompress(chunk)
                 rolling_hash.update(data)
             remaining_data = gzip_inflater.flush()
@@ -745,18 +985,36 @@ class CloudTrailValidateLogs(BasicCommand):
                 rolling_hash.update(remaining_data)
             computed_hash = rolling_hash.hexdigest()
             if computed_hash != log['hashValue']:
-                self._on_log_invalid(log)
-            else:
-                self._valid_logs += 1
-                self._write_status(('Log file\ts3://%s/%s\tvalid'
-                                    % (log['s3Bucket'], log['s3Object'])))
+                return LOG_INVALID_HASH
+            return LOG_VALID
         except ClientError as e:
             if e.response['Error']['Code'] != 'NoSuchKey':
                 raise
-            self._on_missing_log(log)
+            return LOG_NOT_FOUND
         except Exception:
+            return LOG_INVALID_FORMAT
+
+    def _on_log_result(self, log, result):
+        if result == LOG_VALID:
+            self._valid_logs += 1
+            if self.incremental:
+                self._validated_logs[get_log_location(log)] = \
+                    log['hashValue']
+            self._write_status(('Log file\ts3://%s/%s\tvalid'
+                                % (log['s3Bucket'], log['s3Object'])))
+        elif result == LOG_INVALID_HASH:
+            self._on_log_invalid(log)
+        elif result == LOG_NOT_FOUND:
+            self._on_missing_log(log)
+        else:
             self._on_invalid_log_format(log)
 
+    def _on_valid_digest(self, digest):
+        self._valid_digests += 1
+        self._write_status(
+            'Digest file\ts3://%s/%s\tvalid'
+            % (digest['digestS3Bucket'], digest['digestS3Object']))
+
     def _write_status(self, message, is_error=False):
         if is_error:
             if self._is_last_status_double_space:
@@ -769,6 +1027,11 @@ class CloudTrailValidateLogs(BasicCommand):
             sys.stdout.write("%s\n" % message)
 
     def _write_startup_text(self):
+        if self._checkpoint is not None and self._checkpoint.has_digest:
+            sys.stdout.write(
+                'Resuming after the last validated digest file s3://%s/%s\n'
+                % (self._checkpoint.digest_bucket,
+                   self._checkpoint.digest_key))
         sys.stdout.write(
             'Validating log files for trail %s between %s and %s\n\n'
             % (self.trail_arn, format_display_date(self.start_time),
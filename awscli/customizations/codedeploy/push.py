@@ -11,23 +11,32 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 
+import base64
+import functools
+import hashlib
+import logging
 import os
 import sys
-import zipfile
-import tempfile
-import contextlib
 from datetime import datetime
 
-from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from awscli.compat import six
 from awscli.customizations.codedeploy.utils import validate_s3_location
 from awscli.customizations.commands import BasicCommand
+from awscli.customizations.zipbuilder import find_files
+from awscli.customizations.zipbuilder import make_zip_archive
 from awscli.compat import ZIP_COMPRESSION_MODE
+from awscli.utils import wait_until
 
 
+LOG = logging.getLogger(__name__)
+
 ONE_MB = 1 << 20
 MULTIPART_LIMIT = 6 * ONE_MB
+# The number of parts that are uploaded at the same time. Together with the
+# part being filled, this bounds the memory used to upload a revision.
+MAX_CONCURRENT_PARTS = 4
 
 
 class Push(BasicCommand):
@@ -136,22 +145,19 @@ class Push(BasicCommand):
             )
 
     def _push(self, params):
-        with self._compress(
-                params.source,
-                params.ignore_hidden_files
-        ) as bundle:
-            try:
-                upload_response = self._upload_to_s3(params, bundle)
-                params.eTag = upload_response['ETag'].replace('"', "")
-                if 'VersionId' in upload_response:
-                    params.version = upload_response['VersionId']
-            except Exception as e:
-                raise RuntimeError(
-                    'Failed to upload \'%s\' to \'%s\': %s' %
-                    (params.source,
-                     params.s3_location,
-                     str(e))
-                )
+        files = self._find_files(params.source, params.ignore_hidden_files)
+        try:
+            upload_response = self._upload_to_s3(params, files)
+            params.eTag = upload_response['ETag'].replace('"', "")
+            if 'VersionId' in upload_response:
+                params.version = upload_response['VersionId']
+        except Exception as e:
+            raise RuntimeError(
+                'Failed to upload \'%s\' to \'%s\': %s' %
+                (params.source,
+                 params.s3_location,
+                 str(e))
+            )
         self._register_revision(params)
 
         if 'version' in params:
@@ -179,94 +185,32 @@ class Push(BasicCommand):
             )
         )
 
-    @contextlib.contextmanager
-    def _compress(self, source, ignore_hidden_files=False):
+    def _find_files(self, source, ignore_hidden_files=False):
         source_path = os.path.abspath(source)
         appspec_path = os.path.sep.join([source_path, 'appspec.yml'])
-        with tempfile.TemporaryFile('w+b') as tf:
-            zf = zipfile.ZipFile(tf, 'w', allowZip64=True)
-            # Using 'try'/'finally' instead of 'with' statement since ZipFile
-            # does not have support context manager in Python 2.6.
-            try:
-                contains_appspec = False
-                for root, dirs, files in os.walk(source, topdown=True):
-                    if ignore_hidden_files:
-                        files = [fn for fn in files if not fn.startswith('.')]
-                        dirs[:] = [dn for dn in dirs if not dn.startswith('.')]
-                    for fn in files:
-                        filename = os.path.join(root, fn)
-                        filename = os.path.abspath(filename)
-                        arcname = filename[len(source_path) + 1:]
-                        if filename == appspec_path:
-                            contains_appspec = True
-                        zf.write(filename, arcname, ZIP_COMPRESSION_MODE)
-                if not contains_appspec:
-                    raise RuntimeError(
-                        '{0} was not found'.format(appspec_path)
-                    )
-            finally:
-                zf.close()
-            yield tf
-
-    def _upload_to_s3(self, params, bundle):
-        size_remaining = self._bundle_size(bundle)
-        if size_remaining < MULTIPART_LIMIT:
-            return self.s3.put_object(
-                Bucket=params.bucket,
-                Key=params.key,
-                Body=bundle
-            )
-        else:
-            return self._multipart_upload_to_s3(
-                params,
-                bundle,
-                size_remaining
+        files = find_files(source_path, ignore_hidden_files)
+        if not any(filename == appspec_path for filename, _ in files):
+            raise RuntimeError(
+                '{0} was not found'.format(appspec_path)
             )
+        return files
 
-    def _bundle_size(self, bundle):
-        bundle.seek(0, 2)
-        size = bundle.tell()
-        bundle.seek(0)
-        return size
+    def _compress(self, source, files, fileobj):
+        make_zip_archive(
+            fileobj, os.path.abspath(source), files,
+            compression=ZIP_COMPRESSION_MODE, stream=True)
 
-    def _multipart_upload_to_s3(self, params, bundle, size_remaining):
-        create_response = self.s3.create_multipart_upload(
-            Bucket=params.bucket,
-            Key=params.key
-        )
-        upload_id = create_response['UploadId']
+    def _upload_to_s3(self, params, files):
+        # The archive is uploaded while it is being written, and its
+        # members are written while they are compressed, so no part of it
+        # is written to a temporary file first.
+        writer = MultipartUploadWriter(self.s3, params.bucket, params.key)
         try:
-            part_num = 1
-            multipart_list = []
-            bundle.seek(0)
-            while size_remaining > 0:
-                data = bundle.read(MULTIPART_LIMIT)
-                upload_response = self.s3.upload_part(
-                    Bucket=params.bucket,
-                    Key=params.key,
-                    UploadId=upload_id,
-                    PartNumber=part_num,
-                    Body=six.BytesIO(data)
-                )
-                multipart_list.append({
-                    'PartNumber': part_num,
-                    'ETag': upload_response['ETag']
-                })
-                part_num += 1
-                size_remaining -= len(data)
-            return self.s3.complete_multipart_upload(
-                Bucket=params.bucket,
-                Key=params.key,
-                UploadId=upload_id,
-                MultipartUpload={'Parts': multipart_list}
-            )
-        except ClientError as e:
-            self.s3.abort_multipart_upload(
-                Bucket=params.bucket,
-                Key=params.key,
-                UploadId=upload_id
-            )
-            raise e
+            self._compress(params.source, files, writer)
+            return writer.close()
+        except (Exception, KeyboardInterrupt):
+            writer.abort()
+            raise
 
     def _register_revision(self, params):
         revision = {
@@ -285,3 +229,129 @@ class Push(BasicCommand):
             revision=revision,
             description=params.description
         )
+
+
+class MultipartUploadWriter(object):
+    """Uploads the data written to it to Amazon S3
+
+    The data is cut into parts of ``part_size`` bytes which are uploaded
+    concurrently as soon as they are complete, so the data never has to be
+    stored in full. Writing blocks while ``max_concurrency`` parts are
+    being uploaded. If less than one part is written, the data is uploaded
+    with a single PutObject request instead of a multipart upload.
+
+    The MD5 digest of each part is computed as it is cut, and is sent with
+    the part so that S3 checks the integrity of the part.
+    """
+
+    def __init__(self, client, bucket, key, part_size=MULTIPART_LIMIT,
+                 max_concurrency=MAX_CONCURRENT_PARTS):
+        self._client = client
+        self._bucket = bucket
+        self._key = key
+        self._part_size = part_size
+        self._max_concurrency = max_concurrency
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._executor = None
+        self._pending = set()
+        self._parts = []
+        self._part_digests = []
+
+    @property
+    def etag(self):
+        """The ETag that S3 computes for the uploaded data
+
+        S3 returns a different ETag for objects encrypted with a KMS key.
+        """
+        if self._upload_id is None:
+            return '"%s"' % hashlib.md5(self._buffer).hexdigest()
+        digest = hashlib.md5(b''.join(self._part_digests)).hexdigest()
+        return '"%s-%d"' % (digest, len(self._part_digests))
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self._part_size:
+            part = bytes(self._buffer[:self._part_size])
+            del self._buffer[:self._part_size]
+            self._upload_part(part)
+
+    def close(self):
+        """Completes the upload
+
+        :returns: The response of the PutObject or
+            CompleteMultipartUpload request.
+        """
+        if self._upload_id is None:
+            response = self._client.put_object(
+                Bucket=self._bucket,
+                Key=self._key,
+                Body=six.BytesIO(bytes(self._buffer))
+            )
+        else:
+            if self._buffer:
+                self._upload_part(bytes(self._buffer))
+            self._wait_for_parts(0)
+            self._executor.shutdown()
+            response = self._client.complete_multipart_upload(
+                Bucket=self._bucket,
+                Key=self._key,
+                UploadId=self._upload_id,
+                MultipartUpload={'Parts': sorted(
+                    self._parts, key=lambda part: part['PartNumber'])}
+            )
+        if response.get('ETag') != self.etag:
+            LOG.debug('ETag %s of %s differs from the computed ETag %s',
+                      response.get('ETag'), self._key, self.etag)
+        return response
+
+    def abort(self):
+        """Stops uploading parts and aborts the multipart upload"""
+        if self._upload_id is None:
+            return
+        for future in self._pending:
+            future.cancel()
+        # Parts that are still being uploaded would otherwise be stored
+        # after the upload is aborted.
+        self._executor.shutdown()
+        self._client.abort_multipart_upload(
+            Bucket=self._bucket,
+            Key=self._key,
+            UploadId=self._upload_id
+        )
+
+    def _upload_part(self, data):
+        if self._upload_id is None:
+            response = self._client.create_multipart_upload(
+                Bucket=self._bucket,
+                Key=self._key
+            )
+            self._upload_id = response['UploadId']
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._max_concurrency)
+        self._wait_for_parts(self._max_concurrency - 1)
+        digest = hashlib.md5(data).digest()
+        self._part_digests.append(digest)
+        self._pending.add(self._executor.submit(
+            self._do_upload_part, len(self._part_digests), data, digest))
+
+    def _do_upload_part(self, part_number, data, digest):
+        response = self._client.upload_part(
+            Bucket=self._bucket,
+            Key=self._key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=six.BytesIO(data),
+            ContentMD5=base64.b64encode(digest).decode('ascii')
+        )
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+    def _wait_for_parts(self, max_pending):
+        while len(self._pending) > max_pending:
+            wait_until(
+                lambda: any(future.done() for future in self._pending),
+                functools.partial(
+                    wait, self._pending, return_when=FIRST_COMPLETED))
+            for future in [f for f in self._pending if f.done()]:
+                self._pending.remove(future)
+                self._parts.append(future.result())
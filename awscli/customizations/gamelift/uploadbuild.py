@@ -11,7 +11,6 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 import threading
-import contextlib
 import os
 import tempfile
 import sys
@@ -21,6 +20,7 @@ from s3transfer import S3Transfer
 
 from awscli.customizations.commands import BasicCommand
 from awscli.customizations.s3.utils import human_readable_size
+from awscli.customizations.zipbuilder import make_zip_archive
 
 
 class UploadBuildCommand(BasicCommand):
@@ -108,16 +108,8 @@ class UploadBuildCommand(BasicCommand):
 
 
 def zip_directory(zipfile_name, source_root):
-    source_root = os.path.abspath(source_root)
     with open(zipfile_name, 'wb') as f:
-        zip_file = zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED, True)
-        with contextlib.closing(zip_file) as zf:
-            for root, dirs, files in os.walk(source_root):
-                for filename in files:
-                    full_path = os.path.join(root, filename)
-                    relative_path = os.path.relpath(
-                        full_path, source_root)
-                    zf.write(full_path, relative_path)
+        make_zip_archive(f, source_root, compression=zipfile.ZIP_DEFLATED)
 
 
 def validate_directory(source_root):
@@ -10,6 +10,7 @@
 # distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
+import atexit
 import os
 import sys
 import logging
@@ -19,14 +20,19 @@ from botocore.exceptions import ProfileNotFound
 
 from awscli.compat import sqlite3
 from awscli.customizations.commands import BasicCommand
+from awscli.customizations.history.commands import get_history_retention
 from awscli.customizations.history.constants import HISTORY_FILENAME_ENV_VAR
 from awscli.customizations.history.constants import DEFAULT_HISTORY_FILENAME
 from awscli.customizations.history.db import DatabaseConnection
 from awscli.customizations.history.db import DatabaseRecordWriter
+from awscli.customizations.history.db import AsyncRecordWriter
 from awscli.customizations.history.db import RecordBuilder
 from awscli.customizations.history.db import DatabaseHistoryHandler
 from awscli.customizations.history.show import ShowCommand
 from awscli.customizations.history.list import ListCommand
+from awscli.customizations.history.stats import StatsCommand
+from awscli.customizations.history.replay import ReplayCommand
+from awscli.customizations.history.prune import PruneCommand
 
 
 LOG = logging.getLogger(__name__)
@@ -53,7 +59,11 @@ def attach_history_handler(session, parsed_args, **kwargs):
             os.makedirs(os.path.dirname(history_filename))
 
         connection = DatabaseConnection(history_filename)
-        writer = DatabaseRecordWriter(connection)
+        writer = AsyncRecordWriter(DatabaseRecordWriter(
+            connection, **get_history_retention(session)))
+        # Records are written in the background, so the ones still queued
+        # are written when the CLI exits.
+        atexit.register(writer.close)
         record_builder = RecordBuilder()
         db_handler = DatabaseHistoryHandler(writer, record_builder)
 
@@ -94,11 +104,24 @@ class HistoryCommand(BasicCommand):
         'over time. To record the history of AWS CLI commands set '
         '``cli_history`` to ``enabled`` in the ``~/.aws/config`` file. '
         'This can be done by running:\n\n'
-        '``$ aws configure set cli_history enabled``'
+        '``$ aws configure set cli_history enabled``\n\n'
+        'By default the history is kept forever. To limit it, set '
+        '``cli_history_retention_days`` to the number of days to keep the '
+        'history of a command, or ``cli_history_max_size_mb`` to the '
+        'number of megabytes the history may take up, after which the '
+        'history of the oldest commands is deleted. Set '
+        '``cli_history_max_payload_size_kb`` to only keep a preview of '
+        'the events, such as large HTTP bodies, that take up more '
+        'kilobytes than that. The history is pruned at most once a day as '
+        'commands are recorded, and can be pruned at any time with '
+        '``aws history prune``.'
     )
     SUBCOMMANDS = [
         {'name': 'show', 'command_class': ShowCommand},
-        {'name': 'list', 'command_class': ListCommand}
+        {'name': 'list', 'command_class': ListCommand},
+        {'name': 'stats', 'command_class': StatsCommand},
+        {'name': 'replay', 'command_class': ReplayCommand},
+        {'name': 'prune', 'command_class': PruneCommand},
     ]
 
     def _run_main(self, parsed_args, parsed_globals):
@@ -11,6 +11,7 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 import os
+import sys
 
 from awscli.compat import is_windows
 from awscli.utils import is_a_tty
@@ -23,6 +24,36 @@ from awscli.customizations.history.constants import DEFAULT_HISTORY_FILENAME
 from awscli.customizations.history.db import DatabaseRecordReader
 
 
+# The config variables that limit the history that is retained, with the
+# DatabaseRecordWriter argument each sets and the unit of the value.
+RETENTION_CONFIG_VARS = [
+    ('cli_history_retention_days', 'max_age_days', 1),
+    ('cli_history_max_size_mb', 'max_size', 1024 * 1024),
+    ('cli_history_max_payload_size_kb', 'max_payload_size', 1024),
+]
+
+
+def get_history_retention(session):
+    """Returns the DatabaseRecordWriter arguments of the configured
+    retention"""
+    scoped_config = session.get_scoped_config()
+    retention = {}
+    for name, key, multiplier in RETENTION_CONFIG_VARS:
+        value = scoped_config.get(name)
+        if value is None:
+            continue
+        try:
+            value = int(value)
+            if value < 1:
+                raise ValueError(value)
+        except ValueError:
+            sys.stderr.write(
+                'Ignoring %s, it must be a positive integer.\n' % name)
+            continue
+        retention[key] = value * multiplier
+    return retention
+
+
 class HistorySubcommand(BasicCommand):
     def __init__(self, session, db_reader=None, output_stream_factory=None):
         super(HistorySubcommand, self).__init__(session)
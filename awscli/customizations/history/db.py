@@ -16,16 +16,76 @@ import json
 import datetime
 import threading
 import logging
+import math
+from collections import Mapping
 from collections import MutableMapping
 
 from botocore.history import BaseHistoryHandler
 
+from awscli.compat import six
 from awscli.compat import sqlite3
 from awscli.compat import binary_type
+from awscli.compat import queue
+
+try:
+    import zlib
+except ImportError:
+    zlib = None
 
 
 LOG = logging.getLogger(__name__)
 
+# The number of records that can be queued to be written before recording
+# a record blocks.
+MAX_QUEUED_RECORDS = 1000
+# The maximum number of records written in a single transaction.
+MAX_BATCH_SIZE = 100
+# Serialized payloads at least this many characters long are stored
+# compressed.
+COMPRESSION_MIN_SIZE = 1024
+# The suffix appended to strings of payloads that were cut short to keep the
+# payload under the maximum payload size.
+TRUNCATED_SUFFIX = '... [%s characters truncated]'
+# The number of commands whose records are deleted in each transaction when
+# the history is pruned to its maximum size.
+PRUNE_BATCH_SIZE = 100
+# How often, in seconds, the history is pruned while commands record it.
+PRUNE_INTERVAL = 24 * 60 * 60
+# The number of records read at a time when the API calls recorded before
+# they were summarized are backfilled.
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _backfill_api_calls(connection):
+    # Summarizes the API calls that were recorded before the api_calls
+    # table was added, reading their records in the order they were
+    # written.
+    summarized = set(
+        row[0] for row in connection.execute(
+            'SELECT request_id FROM api_calls'))
+    summarizer = APICallSummarizer()
+    last_rowid = 0
+    while True:
+        rows = connection.execute(
+            'SELECT rowid, id, request_id, event_type, timestamp, payload '
+            'FROM records WHERE rowid > ? AND request_id IS NOT NULL '
+            "AND event_type IN ('API_CALL', 'HTTP_REQUEST', "
+            "'HTTP_RESPONSE', 'PARSED_RESPONSE') "
+            'ORDER BY rowid LIMIT ?',
+            [last_rowid, BACKFILL_BATCH_SIZE]).fetchall()
+        if not rows:
+            return
+        last_rowid = rows[-1][0]
+        records = [
+            {'command_id': command_id, 'request_id': request_id,
+             'event_type': event_type, 'timestamp': timestamp,
+             'payload': decode_payload(payload)}
+            for _, command_id, request_id, event_type, timestamp, payload
+            in rows if request_id not in summarized
+        ]
+        for statement, parameters in summarizer.get_updates(records):
+            connection.execute(statement, parameters)
+
 
 class DatabaseConnection(object):
     _CREATE_TABLE = """
@@ -38,6 +98,104 @@ class DatabaseConnection(object):
           payload TEXT
         )"""
     _ENABLE_WAL = 'PRAGMA journal_mode=WAL'
+    # Only takes effect before the first table is created. Existing
+    # databases use it once they are rebuilt with ``history prune``.
+    _ENABLE_INCREMENTAL_VACUUM = 'PRAGMA auto_vacuum=INCREMENTAL'
+    _INCREMENTAL_VACUUM_MODE = 2
+    # Each migration upgrades the schema from the version before it, the
+    # version of the schema of a database is stored in its user_version.
+    # A step of a migration is either a statement or a function that is
+    # called with the connection.
+    _MIGRATIONS = [
+        (1, [
+            # Adds the indexes used to look up records and a summary of
+            # each command, which the commands that list the history read
+            # instead of the records. The summary is kept up to date by a
+            # trigger as records are written.
+            'CREATE INDEX IF NOT EXISTS records_id_timestamp '
+            'ON records(id, timestamp)',
+            'CREATE INDEX IF NOT EXISTS records_timestamp '
+            'ON records(timestamp)',
+            'CREATE INDEX IF NOT EXISTS records_event_type '
+            'ON records(event_type)',
+            """
+            CREATE TABLE IF NOT EXISTS commands (
+              id TEXT PRIMARY KEY,
+              timestamp INTEGER,
+              last_timestamp INTEGER,
+              args TEXT,
+              rc TEXT
+            )""",
+            'CREATE INDEX IF NOT EXISTS commands_timestamp '
+            'ON commands(timestamp)',
+            'CREATE INDEX IF NOT EXISTS commands_last_timestamp '
+            'ON commands(last_timestamp)',
+            """
+            INSERT OR REPLACE INTO commands(
+                id, timestamp, last_timestamp, args, rc)
+            SELECT id,
+                min(CASE WHEN event_type = 'CLI_ARGUMENTS'
+                    THEN timestamp END),
+                max(timestamp),
+                min(CASE WHEN event_type = 'CLI_ARGUMENTS'
+                    THEN payload END),
+                max(CASE WHEN event_type = 'CLI_RC' THEN payload END)
+            FROM records GROUP BY id""",
+            """
+            CREATE TRIGGER IF NOT EXISTS records_summarize_command
+            AFTER INSERT ON records
+            BEGIN
+              INSERT OR IGNORE INTO commands(id, last_timestamp)
+              VALUES (NEW.id, NEW.timestamp);
+              UPDATE commands SET
+                last_timestamp = max(last_timestamp, NEW.timestamp),
+                timestamp = CASE WHEN NEW.event_type = 'CLI_ARGUMENTS'
+                  AND args IS NULL THEN NEW.timestamp ELSE timestamp END,
+                args = CASE WHEN NEW.event_type = 'CLI_ARGUMENTS'
+                  AND args IS NULL THEN NEW.payload ELSE args END,
+                rc = CASE WHEN NEW.event_type = 'CLI_RC'
+                  THEN NEW.payload ELSE rc END
+              WHERE id = NEW.id;
+            END""",
+        ]),
+        (2, [
+            # Adds a summary of each API call, which is written with the
+            # records of its events. The statistics of the history are
+            # aggregated from it.
+            """
+            CREATE TABLE IF NOT EXISTS api_calls (
+              request_id TEXT PRIMARY KEY,
+              command_id TEXT,
+              service TEXT,
+              operation TEXT,
+              start_timestamp INTEGER,
+              end_timestamp INTEGER,
+              first_request_timestamp INTEGER,
+              last_response_timestamp INTEGER,
+              attempts INTEGER DEFAULT 0,
+              bytes_sent INTEGER DEFAULT 0,
+              bytes_received INTEGER DEFAULT 0,
+              status_code INTEGER
+            )""",
+            'CREATE INDEX IF NOT EXISTS api_calls_command_id '
+            'ON api_calls(command_id)',
+        ]),
+        (3, [
+            # Adds values about the history itself, like when it was last
+            # pruned.
+            """
+            CREATE TABLE IF NOT EXISTS history_metadata (
+              name TEXT PRIMARY KEY,
+              value INTEGER
+            )""",
+        ]),
+        (4, [
+            # Summarizes the API calls recorded before version 2, so their
+            # statistics are included as well.
+            _backfill_api_calls,
+        ]),
+    ]
+    SCHEMA_VERSION = _MIGRATIONS[-1][0]
 
     def __init__(self, db_filename):
         self._connection = sqlite3.connect(
@@ -50,13 +208,79 @@ class DatabaseConnection(object):
     def execute(self, query, *parameters):
         return self._connection.execute(query, *parameters)
 
+    def executemany(self, query, parameters):
+        return self._connection.executemany(query, parameters)
+
+    def get_size(self):
+        """Returns the number of bytes used by the data in the database
+
+        Unlike the size of the file, this does not include the pages that
+        were freed by deleting records but not yet vacuumed.
+        """
+        page_size = self._get_pragma('page_size')
+        page_count = self._get_pragma('page_count')
+        freelist_count = self._get_pragma('freelist_count')
+        return (page_count - freelist_count) * page_size
+
+    def _get_pragma(self, name):
+        return self.execute('PRAGMA %s' % name).fetchone()[0]
+
     def _ensure_database_setup(self):
+        self.execute(self._ENABLE_INCREMENTAL_VACUUM)
         self._create_record_table()
+        self._migrate()
         self._try_to_enable_wal()
 
     def _create_record_table(self):
         self.execute(self._CREATE_TABLE)
 
+    def _migrate(self):
+        if self._get_pragma('user_version') >= self.SCHEMA_VERSION:
+            return
+        # The migration is done in an immediate transaction so only one
+        # process migrates the database; the others wait and then see that
+        # it is already migrated.
+        self.execute('BEGIN IMMEDIATE')
+        try:
+            version = self._get_pragma('user_version')
+            for target_version, statements in self._MIGRATIONS:
+                if target_version > version:
+                    LOG.debug('Migrating history database to version %s',
+                              target_version)
+                    for statement in statements:
+                        if callable(statement):
+                            statement(self)
+                        else:
+                            self.execute(statement)
+            self.execute('PRAGMA user_version=%d' % self.SCHEMA_VERSION)
+        except Exception:
+            self.execute('ROLLBACK')
+            raise
+        self.execute('COMMIT')
+
+    def get_metadata(self, name):
+        row = self.execute(
+            'SELECT value FROM history_metadata WHERE name = ?',
+            [name]).fetchone()
+        if row is None:
+            return None
+        return row[0]
+
+    def set_metadata(self, name, value):
+        self.execute(
+            'INSERT OR REPLACE INTO history_metadata(name, value) '
+            'VALUES (?, ?)', [name, value])
+
+    def vacuum(self):
+        """Rebuilds the database to give back all of its free space
+
+        Databases created before auto_vacuum was set only vacuum the space
+        of pruned records incrementally after they have been rebuilt. This
+        can take a while for a large history, so it is only done when asked
+        to with ``history prune``.
+        """
+        self.execute('VACUUM')
+
     def _try_to_enable_wal(self):
         try:
             self.execute(self._ENABLE_WAL)
@@ -138,51 +362,371 @@ class DatabaseRecordWriter(object):
             id, request_id, source, event_type, timestamp, payload)
         VALUES (?,?,?,?,?,?) """
 
-    def __init__(self, connection):
+    _SELECT_EXPIRED_COMMANDS = (
+        'SELECT id FROM commands WHERE last_timestamp < ?')
+    _SELECT_OLDEST_COMMANDS = (
+        'SELECT id FROM commands ORDER BY last_timestamp LIMIT ?')
+
+    def __init__(self, connection, max_age_days=None, max_size=None,
+                 max_payload_size=None):
+        """
+        :type max_age_days: int
+        :param max_age_days: If set, the records of commands that were run
+            more days ago than this are deleted when records are pruned.
+
+        :type max_size: int
+        :param max_size: If set, the records of the oldest commands are
+            deleted when records are pruned until the data in the database
+            takes up no more bytes than this.
+
+        :type max_payload_size: int
+        :param max_payload_size: If set, the strings of payloads that are
+            serialized to more characters than this, such as large HTTP
+            bodies, are cut short so only a preview of them is stored.
+        """
         self._connection = connection
         self._lock = threading.Lock()
+        self._max_age_days = max_age_days
+        self._max_size = max_size
+        self._max_payload_size = max_payload_size
+        self._api_call_summarizer = APICallSummarizer()
 
     def close(self):
         self._connection.close()
 
+    def prune_records(self, min_interval=None):
+        """Deletes the records that are not retained and vacuums the space
+        they used
+
+        :type min_interval: int
+        :param min_interval: If set, the records are only pruned if they
+            were last pruned more seconds ago than this.
+        """
+        if self._max_age_days is None and self._max_size is None:
+            return
+        with self._lock:
+            now = int(time.time() * 1000)
+            last_pruned = self._connection.get_metadata('last_pruned')
+            if min_interval is not None and last_pruned is not None and \
+                    now - last_pruned < min_interval * 1000:
+                return
+            if self._max_age_days is not None:
+                cutoff = now - self._max_age_days * 24 * 60 * 60 * 1000
+                self._delete_commands(self._SELECT_EXPIRED_COMMANDS, cutoff)
+            if self._max_size is not None:
+                while self._connection.get_size() > self._max_size:
+                    deleted = self._delete_commands(
+                        self._SELECT_OLDEST_COMMANDS, PRUNE_BATCH_SIZE)
+                    if not deleted:
+                        break
+            # Each row returned frees a page, so all of them are fetched.
+            self._connection.execute('PRAGMA incremental_vacuum').fetchall()
+            self._connection.set_metadata('last_pruned', now)
+
+    def vacuum(self):
+        """Rebuilds the database to give back all of its free space"""
+        with self._lock:
+            self._connection.vacuum()
+
+    def _delete_commands(self, select_commands, parameter):
+        self._connection.execute('BEGIN IMMEDIATE')
+        try:
+            self._connection.execute(
+                'DELETE FROM records WHERE id IN (%s)' % select_commands,
+                [parameter])
+            self._connection.execute(
+                'DELETE FROM api_calls WHERE command_id IN (%s)' %
+                select_commands, [parameter])
+            deleted = self._connection.execute(
+                'DELETE FROM commands WHERE id IN (%s)' % select_commands,
+                [parameter]).rowcount
+        except Exception:
+            self._connection.execute('ROLLBACK')
+            raise
+        self._connection.execute('COMMIT')
+        LOG.debug('Pruned the history of %s commands', deleted)
+        return deleted
+
     def write_record(self, record):
-        db_record = self._create_db_record(record)
+        self.write_records([record])
+
+    def write_records(self, records):
+        """Writes records in a single transaction"""
+        db_records = [self._create_db_record(record) for record in records]
+        api_call_updates = self._api_call_summarizer.get_updates(records)
         with self._lock:
-            self._connection.execute(self._WRITE_RECORD, db_record)
+            self._connection.execute('BEGIN')
+            try:
+                self._connection.executemany(self._WRITE_RECORD, db_records)
+                for statement, parameters in api_call_updates:
+                    self._connection.execute(statement, parameters)
+            except Exception:
+                self._connection.execute('ROLLBACK')
+                raise
+            self._connection.execute('COMMIT')
 
     def _create_db_record(self, record):
         event_type = record['event_type']
         json_serialized_payload = json.dumps(record['payload'],
                                              cls=PayloadSerializer)
+        if self._max_payload_size is not None and \
+                len(json_serialized_payload) > self._max_payload_size:
+            json_serialized_payload = truncate_serialized_payload(
+                json_serialized_payload, self._max_payload_size)
         db_record = (
             record['command_id'],
             record.get('request_id'),
             record['source'],
             event_type,
             record['timestamp'],
-            json_serialized_payload
+            encode_payload(json_serialized_payload)
         )
         return db_record
 
 
+class APICallSummarizer(object):
+    """Creates the statements that update the summary of API calls
+
+    Each API call is summarized in a row of the api_calls table, which is
+    updated with each of the events recorded during the call.
+    """
+    _CREATE_API_CALL = (
+        'INSERT OR IGNORE INTO api_calls(request_id, command_id) '
+        'VALUES (?, ?)')
+    _UPDATES = {
+        'API_CALL': (
+            'UPDATE api_calls SET service = ?, operation = ?, '
+            'start_timestamp = ? WHERE request_id = ?'),
+        'HTTP_REQUEST': (
+            'UPDATE api_calls SET attempts = attempts + 1, '
+            'bytes_sent = bytes_sent + ?, '
+            'first_request_timestamp = '
+            'coalesce(first_request_timestamp, ?) WHERE request_id = ?'),
+        'HTTP_RESPONSE': (
+            'UPDATE api_calls SET status_code = ?, '
+            'bytes_received = bytes_received + ?, '
+            'last_response_timestamp = ? WHERE request_id = ?'),
+        'PARSED_RESPONSE': (
+            'UPDATE api_calls SET end_timestamp = ? WHERE request_id = ?'),
+    }
+
+    def get_updates(self, records):
+        """Returns the statements and their parameters for the records"""
+        updates = []
+        for record in records:
+            event_type = record['event_type']
+            request_id = record.get('request_id')
+            if request_id is None or event_type not in self._UPDATES or \
+                    not isinstance(record['payload'], Mapping):
+                continue
+            parameters = getattr(self, '_get_%s_parameters' % (
+                event_type.lower()))(record['payload'], record['timestamp'])
+            updates.append((self._CREATE_API_CALL,
+                            (request_id, record['command_id'])))
+            updates.append((self._UPDATES[event_type],
+                            tuple(parameters) + (request_id,)))
+        return updates
+
+    def _get_api_call_parameters(self, payload, timestamp):
+        return payload.get('service'), payload.get('operation'), timestamp
+
+    def _get_http_request_parameters(self, payload, timestamp):
+        return self._get_body_size(payload), timestamp
+
+    def _get_http_response_parameters(self, payload, timestamp):
+        return (payload.get('status_code'), self._get_body_size(payload),
+                timestamp)
+
+    def _get_parsed_response_parameters(self, payload, timestamp):
+        return (timestamp,)
+
+    def _get_body_size(self, payload):
+        body = payload.get('body')
+        if isinstance(body, (six.text_type, binary_type)):
+            return len(body)
+        # Streaming bodies are not read, so their size is only known from
+        # their headers.
+        for name, value in (payload.get('headers') or {}).items():
+            if name.lower() == 'content-length':
+                try:
+                    return int(value)
+                except ValueError:
+                    break
+        return 0
+
+
+def encode_payload(json_serialized_payload):
+    """Returns the value a serialized payload is stored as
+
+    Large payloads are stored as compressed blobs, the others as text so
+    that they can still be read by versions that do not compress them.
+    """
+    if zlib is None or len(json_serialized_payload) < COMPRESSION_MIN_SIZE:
+        return json_serialized_payload
+    return sqlite3.Binary(
+        zlib.compress(json_serialized_payload.encode('utf-8')))
+
+
+def decode_payload(value):
+    """Returns the payload of a value stored by encode_payload"""
+    if not isinstance(value, six.text_type):
+        value = zlib.decompress(bytes(value)).decode('utf-8')
+    return json.loads(value)
+
+
+def truncate_serialized_payload(json_serialized_payload, max_size):
+    """Cuts the longest strings of a serialized payload short
+
+    The strings are cut to the longest length that brings the serialized
+    payload to about max_size characters, and end with TRUNCATED_SUFFIX so
+    it is clear that only a preview of them was kept.
+    """
+    payload = json.loads(json_serialized_payload)
+    lengths = sorted(
+        (len(value) for value in _iter_strings(payload)), reverse=True)
+    excess = len(json_serialized_payload) - max_size
+    suffix_length = len(TRUNCATED_SUFFIX % len(json_serialized_payload))
+    # Find the length that the strings longer than it have to be cut to
+    # for the excess and the suffixes added to them to be removed.
+    max_length = 0
+    for i, length in enumerate(lengths):
+        next_length = lengths[i + 1] if i + 1 < len(lengths) else 0
+        removed = sum(lengths[:i + 1]) - (i + 1) * next_length
+        required = excess + (i + 1) * suffix_length
+        if removed >= required:
+            max_length = next_length + (removed - required) // (i + 1)
+            break
+    return json.dumps(_truncate_strings(payload, max_length))
+
+
+def _iter_strings(obj):
+    if isinstance(obj, six.string_types):
+        yield obj
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            for string in _iter_strings(value):
+                yield string
+    elif isinstance(obj, list):
+        for value in obj:
+            for string in _iter_strings(value):
+                yield string
+
+
+def _truncate_strings(obj, max_length):
+    if isinstance(obj, six.string_types):
+        if len(obj) > max_length:
+            obj = obj[:max_length] + TRUNCATED_SUFFIX % (len(obj) - max_length)
+        return obj
+    elif isinstance(obj, dict):
+        return dict((k, _truncate_strings(v, max_length))
+                    for k, v in obj.items())
+    elif isinstance(obj, list):
+        return [_truncate_strings(o, max_length) for o in obj]
+    return obj
+
+
+class AsyncRecordWriter(object):
+    """Writes records with a DatabaseRecordWriter on a background thread
+
+    Recording a record only queues it, so the thread that made the API call
+    does not wait for the payload to be serialized or for the database. The
+    queued records are serialized and written in batches, each in a single
+    transaction. Recording blocks if too many records are queued. The
+    records that are still queued are written when the writer is closed.
+    The records that are not retained are pruned before any are written,
+    at most once every ``PRUNE_INTERVAL`` seconds.
+    """
+    _STOP = object()
+
+    def __init__(self, writer, max_queued_records=MAX_QUEUED_RECORDS,
+                 max_batch_size=MAX_BATCH_SIZE):
+        self._writer = writer
+        self._queue = queue.Queue(max_queued_records)
+        self._max_batch_size = max_batch_size
+        self._close_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._write_queued_records, name='HistoryWriter')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write_record(self, record):
+        record = dict(record)
+        # The payload is serialized later, so it is copied in case the
+        # caller changes it after it is recorded. Only the containers are
+        # copied; strings and bytes, such as HTTP bodies, cannot change.
+        record['payload'] = _copy_containers(record['payload'])
+        self._queue.put(record)
+
+    def flush(self):
+        """Waits until the queued records are written"""
+        self._queue.join()
+
+    def close(self):
+        """Writes the queued records and closes the writer"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._writer.close()
+
+    def _write_queued_records(self):
+        self._prune_records()
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self._max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [record for record in batch if record is not self._STOP]
+            if records:
+                self._write_batch(records)
+            for _ in batch:
+                self._queue.task_done()
+            if len(records) != len(batch):
+                return
+
+    def _prune_records(self):
+        try:
+            self._writer.prune_records(min_interval=PRUNE_INTERVAL)
+        except Exception:
+            LOG.debug('Failed to prune history records', exc_info=True)
+
+    def _write_batch(self, records):
+        try:
+            self._writer.write_records(records)
+        except Exception:
+            # Failing to record history should never fail the command.
+            LOG.debug('Failed to write history records', exc_info=True)
+
+
+def _copy_containers(obj):
+    if isinstance(obj, MutableMapping):
+        return dict((k, _copy_containers(v)) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        return [_copy_containers(o) for o in obj]
+    return obj
+
+
 class DatabaseRecordReader(object):
     _ORDERING = 'ORDER BY timestamp'
     _GET_LAST_ID_RECORDS = """
         SELECT * FROM records
         WHERE id =
-        (SELECT id FROM records WHERE timestamp =
-        (SELECT max(timestamp) FROM records)) %s;""" % _ORDERING
+        (SELECT id FROM commands ORDER BY last_timestamp DESC LIMIT 1)
+        %s;""" % _ORDERING
     _GET_RECORDS_BY_ID = 'SELECT * from records where id = ? %s' % _ORDERING
     _GET_ALL_RECORDS = (
-        'SELECT a.id AS id_a, '
-        '    b.id AS id_b, '
-        '    a.timestamp as timestamp, '
-        '    a.payload AS args, '
-        '    b.payload AS rc '
-        'FROM records a, records b '
-        'where a.event_type == "CLI_ARGUMENTS" AND '
-        '    b.event_type = "CLI_RC" AND '
-        '    id_a == id_b '
+        'SELECT id AS id_a, '
+        '    id AS id_b, '
+        '    timestamp, '
+        '    args, '
+        '    rc '
+        'FROM commands '
+        'WHERE args IS NOT NULL AND rc IS NOT NULL '
         '%s DESC' % _ORDERING
     )
 
@@ -196,10 +740,9 @@ class DatabaseRecordReader(object):
     def _row_factory(self, cursor, row):
         d = {}
         for idx, col in enumerate(cursor.description):
-            val = row[idx]
-            if col[0] == 'payload':
-                val = json.loads(val)
-            d[col[0]] = val
+            d[col[0]] = row[idx]
+        if 'payload' in d:
+            return DatabaseRecord(d)
         return d
 
     def iter_latest_records(self):
@@ -218,6 +761,181 @@ class DatabaseRecordReader(object):
             yield row
 
 
+class DatabaseStatsReader(object):
+    """Aggregates statistics of the API calls of a range of commands
+
+    The statistics are aggregated by the database from the summaries of
+    the commands and API calls, so the records and their payloads are never
+    read.
+    """
+    _SELECT_COMMANDS = (
+        'SELECT id FROM commands WHERE timestamp >= ? AND timestamp < ? '
+        'ORDER BY timestamp DESC LIMIT ?')
+    _LATENCY = (
+        'coalesce(end_timestamp, last_response_timestamp) - start_timestamp')
+    _GET_OPERATION_TOTALS = (
+        'SELECT service, operation, '
+        '    count(*) AS calls, '
+        '    sum(max(attempts - 1, 0)) AS retries, '
+        '    sum(bytes_sent) AS bytes_sent, '
+        '    sum(bytes_received) AS bytes_received, '
+        '    count(%s) AS timed_calls '
+        'FROM api_calls '
+        'WHERE command_id IN (%s) AND service IS NOT NULL '
+        'GROUP BY service, operation '
+        'ORDER BY service, operation' % (_LATENCY, _SELECT_COMMANDS)
+    )
+    _GET_LATENCIES = (
+        'SELECT service, operation, %s AS latency '
+        'FROM api_calls '
+        'WHERE command_id IN (%s) AND service IS NOT NULL '
+        '    AND latency IS NOT NULL '
+        'ORDER BY service, operation, latency' % (_LATENCY, _SELECT_COMMANDS)
+    )
+    _GET_COMMAND_TOTALS = (
+        'SELECT count(*), coalesce(sum(last_timestamp - timestamp), 0) '
+        'FROM commands WHERE id IN (%s)' % _SELECT_COMMANDS
+    )
+    _GET_NETWORK_INTERVALS = (
+        'SELECT command_id, first_request_timestamp, '
+        '    last_response_timestamp '
+        'FROM api_calls '
+        'WHERE command_id IN (%s) '
+        '    AND first_request_timestamp IS NOT NULL '
+        '    AND last_response_timestamp IS NOT NULL '
+        'ORDER BY command_id, first_request_timestamp' % _SELECT_COMMANDS
+    )
+    PERCENTILES = [50, 90, 99]
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def close(self):
+        self._connection.close()
+
+    def get_command_stats(self, since=None, until=None, limit=None):
+        """Returns the totals of the commands in the range
+
+        :type since: int
+        :param since: The timestamp in milliseconds of the first command.
+
+        :type until: int
+        :param until: The timestamp in milliseconds before which the
+            commands were run.
+
+        :type limit: int
+        :param limit: The number of the most recent commands in the range.
+        """
+        parameters = self._get_range_parameters(since, until, limit)
+        count, total_time = self._connection.execute(
+            self._GET_COMMAND_TOTALS, parameters).fetchone()
+        network_time = self._get_network_time(parameters)
+        return {
+            'commands': count,
+            'total_time': total_time,
+            'network_time': network_time,
+            'cli_overhead': max(total_time - network_time, 0),
+        }
+
+    def iter_operation_stats(self, since=None, until=None, limit=None):
+        """Yields the statistics of each operation called in the range
+
+        The latency percentiles are picked out of the latencies as the
+        database streams them in order, so they are never all held in
+        memory.
+        """
+        parameters = self._get_range_parameters(since, until, limit)
+        totals = self._connection.execute(
+            self._GET_OPERATION_TOTALS, parameters).fetchall()
+        latencies = self._connection.execute(
+            self._GET_LATENCIES, parameters)
+        for service, operation, calls, retries, bytes_sent, \
+                bytes_received, timed_calls in totals:
+            stats = {
+                'service': service,
+                'operation': operation,
+                'calls': calls,
+                'retries': retries,
+                'bytes_sent': bytes_sent,
+                'bytes_received': bytes_received,
+            }
+            stats.update(self._get_percentiles(
+                self._take(latencies, timed_calls), timed_calls))
+            yield stats
+
+    def _get_network_time(self, parameters):
+        # The API calls of a command can be made concurrently, so the time
+        # a command spent on the network is the length of the union of the
+        # intervals of its calls rather than the sum of their lengths. The
+        # intervals are merged as the database streams them in order.
+        network_time = 0
+        command_id = start = end = None
+        for call_command_id, first_request, last_response in \
+                self._connection.execute(
+                    self._GET_NETWORK_INTERVALS, parameters):
+            if call_command_id == command_id and first_request <= end:
+                end = max(end, last_response)
+                continue
+            if command_id is not None:
+                network_time += end - start
+            command_id = call_command_id
+            start, end = first_request, last_response
+        if command_id is not None:
+            network_time += end - start
+        return network_time
+
+    def _get_range_parameters(self, since, until, limit):
+        if since is None:
+            since = 0
+        if until is None:
+            until = 2 ** 63 - 1
+        if limit is None:
+            # A negative limit has no upper bound.
+            limit = -1
+        return [since, until, limit]
+
+    def _take(self, cursor, count):
+        for _ in range(count):
+            yield cursor.fetchone()[2]
+
+    def _get_percentiles(self, latencies, count):
+        # The nearest-rank percentiles of the sorted latencies
+        ranks = {}
+        for percentile in self.PERCENTILES:
+            rank = max(int(math.ceil(count * percentile / 100.0)), 1)
+            ranks.setdefault(rank, []).append(percentile)
+        percentiles = dict(
+            ('p%s' % percentile, None) for percentile in self.PERCENTILES)
+        for rank, latency in enumerate(latencies, 1):
+            for percentile in ranks.get(rank, []):
+                percentiles['p%s' % percentile] = latency
+        return percentiles
+
+
+class DatabaseRecord(Mapping):
+    """A record read from the database
+
+    The payload is only decoded when it is first accessed, so records whose
+    payload is never looked at, such as those of events that are not
+    displayed, do not pay for decompressing and parsing it.
+    """
+    def __init__(self, row):
+        self._row = row
+        self._payload_decoded = False
+
+    def __getitem__(self, key):
+        if key == 'payload' and not self._payload_decoded:
+            self._row['payload'] = decode_payload(self._row['payload'])
+            self._payload_decoded = True
+        return self._row[key]
+
+    def __iter__(self):
+        return iter(self._row)
+
+    def __len__(self):
+        return len(self._row)
+
+
 class RecordBuilder(object):
     _REQUEST_LIFECYCLE_EVENTS = set(
         ['API_CALL', 'HTTP_REQUEST', 'HTTP_RESPONSE', 'PARSED_RESPONSE'])
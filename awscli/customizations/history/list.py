@@ -10,11 +10,11 @@
 # distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
-import json
 import datetime
 
 from awscli.compat import default_pager
 from awscli.customizations.history.commands import HistorySubcommand
+from awscli.customizations.history.db import decode_payload
 
 
 class ListCommand(HistorySubcommand):
@@ -96,7 +96,7 @@ class TextFormatter(object):
         return formatted
 
     def _format_args(self, args, arg_width):
-        json_value = json.loads(args)
+        json_value = decode_payload(args)
         formatted = ' '.join(json_value[:2])
         if len(formatted) >= arg_width:
             formatted = '%s...' % formatted[:arg_width-4]
@@ -0,0 +1,45 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+from awscli.customizations.history.commands import HistorySubcommand
+from awscli.customizations.history.commands import get_history_retention
+from awscli.customizations.history.db import DatabaseConnection
+from awscli.customizations.history.db import DatabaseRecordWriter
+
+
+class PruneCommand(HistorySubcommand):
+    NAME = 'prune'
+    DESCRIPTION = (
+        'Deletes the history of the commands that is not retained by the '
+        '``cli_history_retention_days`` and ``cli_history_max_size_mb`` '
+        'settings, then rebuilds the history database so that its file '
+        'gives back all of the space that is no longer used. History that '
+        'was recorded by versions of the CLI without these settings only '
+        'shrinks as it is pruned once it has been rebuilt by this command. '
+        'Rebuilding a large history can take a while.'
+    )
+
+    def __init__(self, session, db_writer=None):
+        super(PruneCommand, self).__init__(session)
+        self._db_writer = db_writer
+
+    def _run_main(self, parsed_args, parsed_globals):
+        if self._db_writer is None:
+            connection = DatabaseConnection(self._get_history_db_filename())
+            self._db_writer = DatabaseRecordWriter(
+                connection, **get_history_retention(self._session))
+        try:
+            self._db_writer.prune_records()
+            self._db_writer.vacuum()
+        finally:
+            self._db_writer.close()
+        return 0
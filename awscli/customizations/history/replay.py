@@ -0,0 +1,321 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import json
+import sys
+import threading
+import time
+
+from botocore.awsrequest import AWSResponse
+
+from awscli.compat import BytesIO
+from awscli.compat import StringIO
+from awscli.compat import six
+from awscli.customizations.history.commands import HistorySubcommand
+
+
+class ReplayError(Exception):
+    pass
+
+
+class RecordedResponses(object):
+    """Serves the recorded HTTP responses of a command in order
+
+    It is registered as the before-send handler of the session of the
+    replayed command, so no request is sent and each one is answered with
+    the next recorded response instead.
+    """
+    def __init__(self, responses):
+        self._responses = list(responses)
+        self._served = 0
+        self._lock = threading.Lock()
+
+    @property
+    def served(self):
+        return self._served
+
+    def __call__(self, request, **kwargs):
+        with self._lock:
+            if self._served >= len(self._responses):
+                raise ReplayError(
+                    'The replayed command sent more requests than the %s '
+                    'that were recorded.' % len(self._responses))
+            response = self._responses[self._served]
+            self._served += 1
+        body = response.get('body') or b''
+        if isinstance(body, six.text_type):
+            body = body.encode('utf-8')
+        return AWSResponse(request.url, response['status_code'],
+                           response.get('headers') or {},
+                           ReplayedBody(body))
+
+
+class ReplayedBody(object):
+    """The raw body of a replayed response"""
+    def __init__(self, content):
+        self._content = BytesIO(content)
+
+    def read(self, amt=None):
+        return self._content.read(amt)
+
+    def stream(self, **kwargs):
+        yield self._content.read()
+
+
+class PhaseTimer(object):
+    """Measures the wall time a command spends in each phase of running
+
+    The phases are delimited by the events the command emits for each API
+    call, so commands that make API calls from several threads at once
+    can spend more time in the API call phases than they take in total.
+    """
+    STARTUP = 'Startup and argument parsing'
+    REQUEST = 'Building and signing requests'
+    RESPONSE = 'Parsing responses'
+    OTHER = 'Formatting output and other'
+    PHASES = [STARTUP, REQUEST, RESPONSE, OTHER]
+
+    def __init__(self):
+        self._times = dict((phase, 0.0) for phase in self.PHASES)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._start_time = None
+        self._first_call_time = None
+
+    def register(self, event_emitter):
+        event_emitter.register(
+            'before-parameter-build', self._on_before_parameter_build)
+        event_emitter.register_first('before-send', self._on_before_send)
+        event_emitter.register_last('before-send', self._on_after_send)
+        event_emitter.register('after-call', self._on_after_call)
+
+    def start(self):
+        self._start_time = time.time()
+
+    def stop(self):
+        """Returns the seconds spent in each phase"""
+        total = time.time() - self._start_time
+        times = dict(self._times)
+        if self._first_call_time is None:
+            times[self.STARTUP] = total
+        else:
+            times[self.STARTUP] = self._first_call_time - self._start_time
+        times[self.OTHER] = max(total - sum(times.values()), 0.0)
+        return times
+
+    def _on_before_parameter_build(self, **kwargs):
+        now = time.time()
+        with self._lock:
+            if self._first_call_time is None:
+                self._first_call_time = now
+        self._local.last_time = now
+
+    def _on_before_send(self, **kwargs):
+        self._add_time(self.REQUEST)
+
+    def _on_after_send(self, **kwargs):
+        self._local.last_time = time.time()
+
+    def _on_after_call(self, **kwargs):
+        self._add_time(self.RESPONSE)
+
+    def _add_time(self, phase):
+        now = time.time()
+        last_time = getattr(self._local, 'last_time', None)
+        if last_time is not None:
+            with self._lock:
+                self._times[phase] += now - last_time
+        self._local.last_time = now
+
+
+class NullOutputStream(object):
+    """Discards the output of the replayed command"""
+    def write(self, data):
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+class ReplayCommand(HistorySubcommand):
+    NAME = 'replay'
+    DESCRIPTION = (
+        'Runs a previously run CLI command again with the same arguments, '
+        'answering its HTTP requests with the responses that were recorded '
+        'when it first ran instead of sending them to AWS, and shows the '
+        'wall time the command spent in each phase of running. Because '
+        'nothing is sent over the network, this measures the time spent '
+        'in the CLI itself, so recorded commands can be used as repeatable '
+        'performance tests. The output of the replayed command is '
+        'discarded. Commands that upload or download streams, and '
+        'commands whose records were truncated by '
+        '``cli_history_max_payload_size_kb`` cannot be replayed faithfully.'
+    )
+    ARG_TABLE = [
+        {'name': 'command_id', 'nargs': '?', 'default': 'latest',
+         'positional_arg': True,
+         'help_text': (
+             'The ID of the CLI command to replay. If this positional '
+             'argument is omitted, the last CLI command ran is replayed.')},
+        {'name': 'iterations', 'cli_type_name': 'integer', 'default': 1,
+         'help_text': (
+             'The number of times to replay the command. The time of each '
+             'phase is the mean of the iterations, shown next to the '
+             'fastest iteration. The default is 1.')},
+        {'name': 'format', 'choices': ['table', 'json'],
+         'default': 'table',
+         'help_text': (
+             'Specifies whether the times are shown as a table or as '
+             'JSON.')},
+    ]
+
+    def __init__(self, session, db_reader=None, output_stream_factory=None,
+                 driver_factory=None):
+        super(ReplayCommand, self).__init__(
+            session, db_reader, output_stream_factory)
+        self._driver_factory = driver_factory
+
+    def _run_main(self, parsed_args, parsed_globals):
+        if parsed_args.iterations < 1:
+            raise ValueError('--iterations must be at least 1')
+        self._connect_to_history_db()
+        try:
+            args, responses, recorded_rc = self._get_recorded_command(
+                parsed_args.command_id)
+        finally:
+            self._close_history_db()
+
+        results = [self._replay(args, responses)
+                   for _ in range(parsed_args.iterations)]
+        report = self._get_report(args, recorded_rc, len(responses), results)
+        with self._get_output_stream() as output_stream:
+            if parsed_args.format == 'json':
+                output_stream.write(
+                    (json.dumps(report, indent=4, sort_keys=True) +
+                     '\n').encode('utf-8'))
+            else:
+                output_stream.write(self._format_table(report).encode(
+                    'utf-8'))
+        return 0
+
+    def _get_recorded_command(self, command_id):
+        if command_id == 'latest':
+            records = self._db_reader.iter_latest_records()
+        else:
+            records = self._db_reader.iter_records(command_id)
+        args = None
+        responses = []
+        recorded_rc = None
+        for record in records:
+            event_type = record['event_type']
+            if event_type == 'CLI_ARGUMENTS' and args is None:
+                args = record['payload']
+            elif event_type == 'HTTP_RESPONSE':
+                responses.append(record['payload'])
+            elif event_type == 'CLI_RC':
+                recorded_rc = record['payload']
+        if args is None:
+            raise RuntimeError(
+                'Could not find the arguments of the command to replay. '
+                'Make sure the command ID is from the ``history list`` '
+                'command.')
+        if args and args[0] == 'history':
+            raise RuntimeError('History commands cannot be replayed.')
+        return args, responses, recorded_rc
+
+    def _replay(self, args, responses):
+        recorded_responses = RecordedResponses(responses)
+        timer = PhaseTimer()
+        stderr = StringIO()
+        timer.start()
+        driver = self._create_driver()
+        event_emitter = driver.session.get_component('event_emitter')
+        timer.register(event_emitter)
+        event_emitter.register('before-send', recorded_responses)
+        # Requests are never sent, but they are still signed, so there has
+        # to be credentials to sign them with.
+        driver.session.set_credentials('replay', 'replay')
+        original_stdout, original_stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = NullOutputStream(), stderr
+        try:
+            rc = driver.main(list(args))
+        finally:
+            sys.stdout, sys.stderr = original_stdout, original_stderr
+        return {
+            'rc': rc,
+            'error': stderr.getvalue().strip(),
+            'served_responses': recorded_responses.served,
+            'phases': timer.stop(),
+        }
+
+    def _create_driver(self):
+        if self._driver_factory is not None:
+            return self._driver_factory()
+        # These are imported here because the CLI driver imports this
+        # module while it registers the history commands.
+        from awscli.clidriver import create_clidriver
+        from awscli.customizations.history import attach_history_handler
+        driver = create_clidriver()
+        # The replayed command is not recorded in the history.
+        driver.session.unregister(
+            'session-initialized', attach_history_handler)
+        return driver
+
+    def _get_report(self, args, recorded_rc, recorded_responses, results):
+        phases = []
+        for phase in PhaseTimer.PHASES:
+            times = [result['phases'][phase] * 1000 for result in results]
+            phases.append({
+                'Phase': phase,
+                'MeanMs': round(sum(times) / len(times), 3),
+                'MinMs': round(min(times), 3),
+            })
+        totals = [sum(result['phases'].values()) * 1000
+                  for result in results]
+        last_result = results[-1]
+        return {
+            'Arguments': list(args),
+            'Iterations': len(results),
+            'RecordedReturnCode': recorded_rc,
+            'ReturnCode': last_result['rc'],
+            'Error': last_result['error'] or None,
+            'RecordedResponses': recorded_responses,
+            'ServedResponses': last_result['served_responses'],
+            'Phases': phases,
+            'TotalMeanMs': round(sum(totals) / len(totals), 3),
+            'TotalMinMs': round(min(totals), 3),
+        }
+
+    def _format_table(self, report):
+        lines = [
+            'Replayed: aws %s' % ' '.join(report['Arguments']),
+            'Iterations: %s' % report['Iterations'],
+            'Return code: %s (recorded: %s)' % (
+                report['ReturnCode'], report['RecordedReturnCode']),
+            'Responses served: %s of %s recorded' % (
+                report['ServedResponses'], report['RecordedResponses']),
+        ]
+        if report['ReturnCode'] != report['RecordedReturnCode'] and \
+                report['Error']:
+            lines.append('Error: %s' % report['Error'])
+        lines.append('')
+        width = max(len(phase) for phase in PhaseTimer.PHASES + ['Total'])
+        lines.append('%s  %12s  %12s' % (
+            'Phase'.ljust(width), 'Mean (ms)', 'Min (ms)'))
+        for phase in report['Phases']:
+            lines.append('%s  %12.3f  %12.3f' % (
+                phase['Phase'].ljust(width), phase['MeanMs'],
+                phase['MinMs']))
+        lines.append('%s  %12.3f  %12.3f' % (
+            'Total'.ljust(width), report['TotalMeanMs'],
+            report['TotalMinMs']))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,177 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import datetime
+import json
+
+from botocore.utils import parse_timestamp
+from dateutil.tz import tzutc
+
+from awscli.customizations.history.commands import HistorySubcommand
+from awscli.customizations.history.db import DatabaseConnection
+from awscli.customizations.history.db import DatabaseStatsReader
+
+
+class StatsCommand(HistorySubcommand):
+    NAME = 'stats'
+    DESCRIPTION = (
+        'Shows statistics of the API calls made by previously run '
+        'commands. For each operation called it shows the number of calls '
+        'and retries, the 50th, 90th and 99th percentiles of the latency '
+        'of the calls in milliseconds and the number of bytes sent and '
+        'received. It also shows how much of the time the commands took '
+        'was spent waiting for the network, and how much in the CLI. '
+        'The time spent on the network by API calls that overlap is only '
+        'counted once.'
+    )
+    ARG_TABLE = [
+        {'name': 'last', 'cli_type_name': 'integer',
+         'help_text': (
+             'Only includes the given number of most recently ran '
+             'commands.')},
+        {'name': 'since',
+         'help_text': (
+             'Only includes the commands ran at or after this time. The '
+             'time can be in any format accepted by the CLI for '
+             'timestamps, such as ``2018-11-20T08:00:00Z``.')},
+        {'name': 'until',
+         'help_text': (
+             'Only includes the commands ran before this time.')},
+        {'name': 'format', 'choices': ['table', 'json'],
+         'default': 'table',
+         'help_text': (
+             'Specifies whether the statistics are shown as a table or as '
+             'JSON.')},
+    ]
+
+    def _connect_to_history_db(self):
+        if self._db_reader is None:
+            connection = DatabaseConnection(self._get_history_db_filename())
+            self._db_reader = DatabaseStatsReader(connection)
+
+    def _run_main(self, parsed_args, parsed_globals):
+        if parsed_args.last is not None and parsed_args.last < 1:
+            raise ValueError('--last must be at least 1')
+        stats_range = {
+            'since': self._get_timestamp(parsed_args.since),
+            'until': self._get_timestamp(parsed_args.until),
+            'limit': parsed_args.last,
+        }
+        self._connect_to_history_db()
+        try:
+            command_stats = self._db_reader.get_command_stats(**stats_range)
+            if not command_stats['commands']:
+                raise RuntimeError(
+                    'No commands were found in the selected range of your '
+                    'history.')
+            operation_stats = list(
+                self._db_reader.iter_operation_stats(**stats_range))
+            with self._get_output_stream() as output_stream:
+                if parsed_args.format == 'json':
+                    formatter = JSONStatsFormatter(output_stream)
+                else:
+                    formatter = TableStatsFormatter(output_stream)
+                formatter(command_stats, operation_stats)
+        finally:
+            self._close_history_db()
+        return 0
+
+    def _get_timestamp(self, value):
+        if value is None:
+            return None
+        parsed = parse_timestamp(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=tzutc())
+        epoch = datetime.datetime(1970, 1, 1, tzinfo=tzutc())
+        return int((parsed - epoch).total_seconds() * 1000)
+
+
+class TableStatsFormatter(object):
+    _COLUMNS = [
+        ('Service', 'service'),
+        ('Operation', 'operation'),
+        ('Calls', 'calls'),
+        ('Retries', 'retries'),
+        ('p50 (ms)', 'p50'),
+        ('p90 (ms)', 'p90'),
+        ('p99 (ms)', 'p99'),
+        ('Sent (bytes)', 'bytes_sent'),
+        ('Received (bytes)', 'bytes_received'),
+    ]
+    _COMMAND_ROWS = [
+        ('Commands', 'commands', ''),
+        ('Total time', 'total_time', ' ms'),
+        ('Network time', 'network_time', ' ms'),
+        ('CLI overhead', 'cli_overhead', ' ms'),
+    ]
+
+    def __init__(self, output_stream):
+        self._output_stream = output_stream
+
+    def __call__(self, command_stats, operation_stats):
+        for title, key, unit in self._COMMAND_ROWS:
+            self._write('{0:<14}{1}{2}\n'.format(
+                title + ':', command_stats[key], unit))
+        if not operation_stats:
+            return
+        rows = [[title for title, _ in self._COLUMNS]]
+        for stats in operation_stats:
+            rows.append([self._format_value(stats[key])
+                         for _, key in self._COLUMNS])
+        widths = [max(len(row[i]) for row in rows)
+                  for i in range(len(self._COLUMNS))]
+        self._write('\n')
+        for row in rows:
+            self._write('  '.join(
+                value.ljust(width) if i < 2 else value.rjust(width)
+                for i, (value, width) in enumerate(zip(row, widths))
+            ).rstrip() + '\n')
+
+    def _format_value(self, value):
+        if value is None:
+            return '-'
+        return str(value)
+
+    def _write(self, content):
+        self._output_stream.write(content.encode('utf-8'))
+
+
+class JSONStatsFormatter(object):
+    def __init__(self, output_stream):
+        self._output_stream = output_stream
+
+    def __call__(self, command_stats, operation_stats):
+        stats = {
+            'Commands': {
+                'Count': command_stats['commands'],
+                'TotalTimeMs': command_stats['total_time'],
+                'NetworkTimeMs': command_stats['network_time'],
+                'CliOverheadMs': command_stats['cli_overhead'],
+            },
+            'Operations': [
+                {
+                    'Service': stats['service'],
+                    'Operation': stats['operation'],
+                    'Calls': stats['calls'],
+                    'Retries': stats['retries'],
+                    'LatencyP50Ms': stats['p50'],
+                    'LatencyP90Ms': stats['p90'],
+                    'LatencyP99Ms': stats['p99'],
+                    'BytesSent': stats['bytes_sent'],
+                    'BytesReceived': stats['bytes_received'],
+                }
+                for stats in operation_stats
+            ],
+        }
+        self._output_stream.write(
+            (json.dumps(stats, indent=4, sort_keys=True) + '\n').encode(
+                'utf-8'))
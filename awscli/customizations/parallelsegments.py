@@ -0,0 +1,175 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""This module adds a ``--parallel-segments`` argument to segmented reads.
+
+Operations that can be paginated and that accept a ``Segment`` and a
+``TotalSegments`` parameter, such as ``dynamodb scan``, read a partition of
+their results per segment. With ``--parallel-segments N``, the N segments
+are paginated concurrently, each by its own thread, and their pages are
+merged into a single paginated response as they arrive. At most
+``MAX_PARALLEL_SEGMENTS`` segments can be read this way.
+
+"""
+import logging
+
+from botocore import xform_name
+
+from awscli.argprocess import unpack_cli_arg
+from awscli.clidriver import CLIOperationCaller
+from awscli.customizations.arguments import StatefulArgument
+from awscli.customizations.paginate import get_paginator_config
+from awscli.utils import PrefetchingPageIterator
+
+
+logger = logging.getLogger(__name__)
+
+
+# Each segment is read by a thread of its own.
+MAX_PARALLEL_SEGMENTS = 100
+
+PARALLEL_SEGMENTS_HELP = (
+    '<p>Splits the read into the given number of segments, from 1 to %s, '
+    'and reads all of them at the same time, each with its own series of '
+    'API calls. The pages of the segments are written as they arrive, so '
+    'the results of different segments are interleaved. This can not be '
+    'used along with <code>--segment</code>, <code>--total-segments</code>, '
+    '<code>--starting-token</code> or <code>--max-items</code>.</p>'
+    % MAX_PARALLEL_SEGMENTS
+)
+
+SEGMENT_PARAMETERS = ['Segment', 'TotalSegments']
+
+
+def register_parallel_segments(event_handlers):
+    event_handlers.register(
+        'building-argument-table', add_parallel_segments_argument)
+
+
+def add_parallel_segments_argument(argument_table, operation_model,
+                                   session, **kwargs):
+    input_shape = operation_model.input_shape
+    if input_shape is None or \
+            not all(name in input_shape.members
+                    for name in SEGMENT_PARAMETERS):
+        return
+    paginator_config = get_paginator_config(
+        session, operation_model.service_model.service_name,
+        operation_model.name)
+    if paginator_config is None:
+        return
+    argument = ParallelSegmentsArgument(session, operation_model)
+    argument.add_to_arg_table(argument_table)
+
+
+class ParallelSegmentsArgument(StatefulArgument):
+    def __init__(self, session, operation_model):
+        super(ParallelSegmentsArgument, self).__init__(
+            'parallel-segments', cli_type_name='integer',
+            help_text=PARALLEL_SEGMENTS_HELP)
+        self._session = session
+        self._operation_model = operation_model
+        self._session.register(
+            'calling-command.*', self.invoke_parallel_segments)
+
+    def add_to_params(self, parameters, value):
+        if value is not None:
+            value = unpack_cli_arg(self, value)
+        super(ParallelSegmentsArgument, self).add_to_params(parameters, value)
+
+    def invoke_parallel_segments(self, call_parameters, parsed_args,
+                                 parsed_globals, **kwargs):
+        total_segments = self.value
+        if total_segments is None:
+            return None
+        self._validate(total_segments, call_parameters, parsed_globals)
+        logger.debug('Reading %s segments in parallel', total_segments)
+        return ParallelSegmentsCaller(self._session, total_segments).invoke(
+            self._operation_model.service_model.service_name,
+            self._operation_model.name, call_parameters, parsed_globals)
+
+    def _validate(self, total_segments, call_parameters, parsed_globals):
+        if not 1 <= total_segments <= MAX_PARALLEL_SEGMENTS:
+            raise ValueError(
+                '--parallel-segments must be from 1 to %s' %
+                MAX_PARALLEL_SEGMENTS)
+        if not parsed_globals.paginate:
+            raise ValueError(
+                'Cannot specify --parallel-segments when pagination is '
+                'turned off')
+        used = ['--' + xform_name(name, '-') for name in SEGMENT_PARAMETERS
+                if name in call_parameters]
+        pagination_config = call_parameters.get('PaginationConfig', {})
+        if 'StartingToken' in pagination_config:
+            used.append('--starting-token')
+        if 'MaxItems' in pagination_config:
+            used.append('--max-items')
+        if used:
+            raise ValueError(
+                'Cannot specify --parallel-segments along with: %s' %
+                ', '.join(used))
+
+
+class ParallelSegmentsCaller(CLIOperationCaller):
+    """Paginates each segment of a segmented read concurrently"""
+    def __init__(self, session, total_segments):
+        super(ParallelSegmentsCaller, self).__init__(session)
+        self._total_segments = total_segments
+
+    def _make_client_call(self, client, operation_name, parameters,
+                          parsed_globals):
+        paginator = client.get_paginator(xform_name(operation_name))
+        page_iterators = []
+        for segment in range(self._total_segments):
+            segment_parameters = dict(parameters)
+            segment_parameters['Segment'] = segment
+            segment_parameters['TotalSegments'] = self._total_segments
+            page_iterators.append(paginator.paginate(**segment_parameters))
+        # Every segment needs at least one page requested ahead for them
+        # to be read at the same time.
+        depth = max(self._get_prefetch_depth(), 1)
+        return SegmentedPageIterator(page_iterators, depth)
+
+
+class SegmentedPageIterator(PrefetchingPageIterator):
+    """Merges the pages of the page iterators of several segments
+
+    The pages of each segment are retrieved by a background thread of
+    their own and are yielded in the order they arrive in.
+    """
+    def __init__(self, page_iterators, depth):
+        super(SegmentedPageIterator, self).__init__(page_iterators[0], depth)
+        self._page_iterators = page_iterators
+
+    @property
+    def resume_token(self):
+        # The segments can not be resumed together, which is why
+        # --max-items can not be used with them.
+        return None
+
+    @resume_token.setter
+    def resume_token(self, value):
+        raise ValueError('The pages of segments can not be resumed')
+
+    @property
+    def non_aggregate_part(self):
+        # Like a page iterator keeps the non aggregate keys of its first
+        # page, the first value of the segments that have one is kept.
+        non_aggregate_part = {}
+        for page_iterator in self._page_iterators:
+            for key, value in page_iterator.non_aggregate_part.items():
+                if non_aggregate_part.get(key) is None:
+                    non_aggregate_part[key] = value
+        return non_aggregate_part
+
+    def __iter__(self):
+        return self._iter_pages(self._page_iterators)
@@ -64,15 +64,16 @@ class FileInfo(object):
         """Determines if a file info object is glacier compatible
 
         Operations will fail if the S3 object has a storage class of GLACIER
-        and it involves copying from S3 to S3, downloading from S3, or moving
-        where S3 is the source (the delete will actually succeed, but we do
-        not want fail to transfer the file and then successfully delete it).
+        and it involves copying from S3 to S3, downloading from S3, setting
+        the attributes of the object, or moving where S3 is the source (the
+        delete will actually succeed, but we do not want fail to transfer the
+        file and then successfully delete it).
 
         :returns: True if the FileInfo's operation will not fail because the
             operation is on a glacier object. False if it will fail.
         """
         if self._is_glacier_object(self.associated_response_data):
-            if self.operation_name in ['copy', 'download']:
+            if self.operation_name in ['copy', 'download', 'set-attributes']:
                 return False
             elif self.operation_name == 'move':
                 if self.src_type == 's3':
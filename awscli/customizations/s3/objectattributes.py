@@ -0,0 +1,226 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import logging
+from collections import deque
+
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+
+from awscli.customizations.s3.utils import RequestParamsMapper
+from awscli.customizations.s3.utils import find_bucket_key, create_warning
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Attributes of an object that are returned when listing objects.
+LISTED_ATTRIBUTES = ['StorageClass']
+
+# Attributes of an object that are only returned by HeadObject. They need
+# to be explicitly carried over when an object is rewritten with a
+# ``REPLACE`` metadata directive or with a multipart copy. The ACL and the
+# tags of an object are not carried over: the ACL is reset to private
+# unless one is given, and the tags are dropped by multipart copies.
+HEAD_OBJECT_ATTRIBUTES = [
+    'ContentType', 'CacheControl', 'ContentDisposition', 'ContentEncoding',
+    'ContentLanguage', 'Expires', 'WebsiteRedirectLocation', 'Metadata',
+    'ServerSideEncryption', 'SSEKMSKeyId'
+]
+
+# Attributes that cannot be compared against the current state of an
+# object. An object is always rewritten if any of these are requested.
+UNVERIFIABLE_ATTRIBUTES = [
+    'ACL', 'GrantRead', 'GrantFullControl', 'GrantReadACP', 'GrantWriteACP',
+    'Expires'
+]
+
+# The value S3 uses for an attribute when the attribute is not returned.
+ATTRIBUTE_DEFAULTS = {
+    'StorageClass': 'STANDARD',
+    'Metadata': {},
+}
+
+_NON_ATTRIBUTE_PARAMS = ['MetadataDirective', 'RequestPayer']
+
+
+def get_target_attributes(cli_params):
+    """Gets the object attributes requested by the CLI parameters
+
+    :type cli_params: dict
+    :param cli_params: The CLI parameters of the command
+
+    :returns: A dictionary of CopyObject request parameters that describe
+        the desired state of the objects.
+    """
+    target_attributes = {}
+    RequestParamsMapper.map_copy_object_params(target_attributes, cli_params)
+    for name in _NON_ATTRIBUTE_PARAMS:
+        target_attributes.pop(name, None)
+    return target_attributes
+
+
+def has_head_object_data(response_data):
+    """Determines if the response data came from a HeadObject call"""
+    # HeadObject always returns user metadata, even if it is empty, while
+    # the entries of a ListObjects response never include it.
+    return bool(response_data) and 'Metadata' in response_data
+
+
+def needs_head_object(response_data, target_attributes):
+    """Determines if HeadObject is needed to process the object
+
+    HeadObject is not needed if the object's data already came from a
+    HeadObject call or if its listing data shows that the object already
+    has all of the target attributes, in which case it will be skipped.
+    """
+    if has_head_object_data(response_data):
+        return False
+    for name in target_attributes:
+        if name not in LISTED_ATTRIBUTES:
+            return True
+    return not matches_target_attributes(response_data, target_attributes)
+
+
+def matches_target_attributes(response_data, target_attributes):
+    """Determines if an object already has all of the target attributes
+
+    :type response_data: dict
+    :param response_data: The ListObjects or HeadObject data of the object
+
+    :type target_attributes: dict
+    :param target_attributes: The attributes as returned by
+        ``get_target_attributes()``
+
+    :returns: True if every attribute could be verified and matches the
+        current value of the object. False, otherwise.
+    """
+    if response_data is None:
+        response_data = {}
+    for name, value in target_attributes.items():
+        if name in UNVERIFIABLE_ATTRIBUTES:
+            return False
+        if name not in LISTED_ATTRIBUTES and \
+                not has_head_object_data(response_data):
+            return False
+        current_value = response_data.get(name, ATTRIBUTE_DEFAULTS.get(name))
+        if current_value != value:
+            return False
+    return True
+
+
+def carry_over_attributes(request_params, response_data):
+    """Carries over existing attributes that are not being changed
+
+    Copying an object resets any attribute that is not provided in the
+    request. This fills ``request_params`` with the existing attributes of
+    the object, which must include HeadObject data, so only the requested
+    attributes are changed when the object is rewritten.
+    """
+    if not has_head_object_data(response_data):
+        return
+    for name in LISTED_ATTRIBUTES + HEAD_OBJECT_ATTRIBUTES:
+        if name == 'SSEKMSKeyId' and 'ServerSideEncryption' in request_params:
+            # The key id only applies to the existing encryption type so it
+            # is dropped if the encryption type is being set.
+            continue
+        if name not in request_params and response_data.get(name):
+            request_params[name] = response_data[name]
+    request_params['MetadataDirective'] = 'REPLACE'
+
+
+class ObjectAttributesProvider(object):
+    MAX_PENDING_MULTIPLIER = 10
+
+    def __init__(self, client, cli_params, result_queue,
+                 max_concurrency=10):
+        """Provides the current attributes of S3 objects
+
+        This retrieves the attributes of the objects that may need to be
+        rewritten with HeadObject. The HeadObject calls are made concurrently
+        ahead of the objects being yielded and the objects are yielded in the
+        order they were provided.
+
+        :type client: botocore.client.Client
+        :param client: The client to use for the HeadObject calls
+
+        :type cli_params: dict
+        :param cli_params: The CLI parameters of the command
+
+        :type result_queue: queue.Queue
+        :param result_queue: The queue to place warnings on for objects whose
+            attributes could not be retrieved
+
+        :type max_concurrency: int
+        :param max_concurrency: The maximum number of concurrent HeadObject
+            calls
+        """
+        self._client = client
+        self._cli_params = cli_params
+        self._result_queue = result_queue
+        self._max_concurrency = max_concurrency
+        self._max_pending = max_concurrency * self.MAX_PENDING_MULTIPLIER
+        self._target_attributes = get_target_attributes(cli_params)
+        self._head_object_params = {}
+        RequestParamsMapper.map_head_object_params(
+            self._head_object_params, cli_params)
+
+    def call(self, files):
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=self._max_concurrency)
+        try:
+            for fileinfo in files:
+                future = None
+                if self._should_head_object(fileinfo):
+                    future = executor.submit(self._head_object, fileinfo)
+                pending.append((fileinfo, future))
+                if len(pending) >= self._max_pending:
+                    for fileinfo in self._get_next_completed(pending):
+                        yield fileinfo
+            while pending:
+                for fileinfo in self._get_next_completed(pending):
+                    yield fileinfo
+        finally:
+            executor.shutdown()
+
+    def _should_head_object(self, fileinfo):
+        if not self._cli_params.get('force_glacier_transfer') and \
+                not fileinfo.is_glacier_compatible():
+            # The object will be skipped with a warning when it is submitted.
+            return False
+        return needs_head_object(
+            fileinfo.associated_response_data, self._target_attributes)
+
+    def _head_object(self, fileinfo):
+        bucket, key = find_bucket_key(fileinfo.src)
+        params = {'Bucket': bucket, 'Key': key}
+        params.update(self._head_object_params)
+        return self._client.head_object(**params)
+
+    def _get_next_completed(self, pending):
+        fileinfo, future = pending.popleft()
+        if future is None:
+            yield fileinfo
+            return
+        try:
+            response = future.result()
+        except ClientError as e:
+            LOGGER.debug(
+                'Failed to retrieve attributes of s3://%s', fileinfo.src,
+                exc_info=True)
+            self._result_queue.put(create_warning(
+                's3://' + fileinfo.src,
+                'Unable to retrieve the attributes of the object: %s' % e))
+            return
+        response_data = dict(fileinfo.associated_response_data or {})
+        response_data.update(response)
+        fileinfo.associated_response_data = response_data
+        yield fileinfo
@@ -0,0 +1,274 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import logging
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+from awscli.customizations.s3.results import SuccessResult
+from awscli.customizations.s3.results import FailureResult
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Storage classes whose objects must be restored before they can be read.
+ARCHIVE_STORAGE_CLASSES = ['GLACIER', 'DEEP_ARCHIVE']
+
+
+def is_restore_ongoing(response_data):
+    """Determines if a restore of an object is still in progress
+
+    :type response_data: dict
+    :param response_data: The HeadObject response for the object
+
+    :returns: True if the ``Restore`` field of the object shows that the
+        restore has not completed yet. False, otherwise.
+    """
+    return 'ongoing-request="true"' in response_data.get('Restore', '')
+
+
+class ThrottlingBackoff(object):
+    THROTTLING_ERROR_CODES = [
+        'SlowDown', 'Throttling', 'ThrottlingException', 'RequestThrottled',
+        'RequestLimitExceeded', 'TooManyRequestsException',
+        'ServiceUnavailable'
+    ]
+
+    def __init__(self, max_attempts=8, base_delay=1, max_delay=60,
+                 sleep=None, rand=None):
+        """Retries calls that fail because requests are being throttled
+
+        The delay before a retry grows exponentially with full jitter. The
+        delay is shared across all of the threads using the backoff so that
+        once any request is throttled all requests slow down instead of
+        continuing to be throttled on their own.
+
+        :param max_attempts: The maximum number of attempts of a call,
+            including the initial attempt.
+        :param base_delay: The delay in seconds of the first retry
+        :param max_delay: The maximum delay in seconds between retries
+        """
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._sleep = sleep
+        if self._sleep is None:
+            self._sleep = time.sleep
+        self._rand = rand
+        if self._rand is None:
+            self._rand = random.random
+        self._throttled_until = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, func, **kwargs):
+        attempt = 0
+        while True:
+            self._wait_if_throttled()
+            try:
+                return func(**kwargs)
+            except ClientError as e:
+                attempt += 1
+                if not self._is_throttling_error(e) or \
+                        attempt >= self._max_attempts:
+                    raise
+                delay = self._get_delay(attempt)
+                LOGGER.debug(
+                    'Request was throttled, retrying in %.2f seconds '
+                    '(attempt %s of %s).', delay, attempt + 1,
+                    self._max_attempts)
+                self._record_throttled(delay)
+
+    def _is_throttling_error(self, e):
+        if e.response.get('Error', {}).get('Code') in \
+                self.THROTTLING_ERROR_CODES:
+            return True
+        status_code = e.response.get(
+            'ResponseMetadata', {}).get('HTTPStatusCode')
+        return status_code == 503
+
+    def _get_delay(self, attempt):
+        max_delay = min(
+            self._max_delay, self._base_delay * (2 ** (attempt - 1)))
+        return max_delay * self._rand()
+
+    def _record_throttled(self, delay):
+        with self._lock:
+            self._throttled_until = max(
+                self._throttled_until, time.time() + delay)
+
+    def _wait_if_throttled(self):
+        with self._lock:
+            remaining = self._throttled_until - time.time()
+        if remaining > 0:
+            self._sleep(remaining)
+
+
+class RestoreManager(object):
+    def __init__(self, client, max_concurrency=10, max_queue_size=1000,
+                 backoff=None):
+        """Makes concurrent requests for restoring archived objects
+
+        :type client: botocore.client.Client
+        :param client: The client to make the requests with
+
+        :type max_concurrency: int
+        :param max_concurrency: The maximum number of concurrent requests
+
+        :type max_queue_size: int
+        :param max_queue_size: The maximum number of requests that can be
+            submitted and not completed yet. Submitting a request blocks
+            until the number of outstanding requests is below this size.
+
+        :type backoff: ThrottlingBackoff
+        :param backoff: The backoff to use to retry throttled requests
+        """
+        self._client = client
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._semaphore = threading.BoundedSemaphore(
+            max(max_queue_size, max_concurrency))
+        self._backoff = backoff
+        if self._backoff is None:
+            self._backoff = ThrottlingBackoff()
+        self._cancelled = threading.Event()
+
+    def restore_object(self, bucket, key, extra_args=None):
+        """Submits a RestoreObject request
+
+        :returns: A future of the RestoreObject response
+        """
+        return self._submit(
+            self._client.restore_object, bucket, key, extra_args)
+
+    def head_object(self, bucket, key, extra_args=None):
+        """Submits a HeadObject request
+
+        :returns: A future of the HeadObject response
+        """
+        return self._submit(self._client.head_object, bucket, key, extra_args)
+
+    def _submit(self, method, bucket, key, extra_args):
+        kwargs = {'Bucket': bucket, 'Key': key}
+        if extra_args:
+            kwargs.update(extra_args)
+        self._semaphore.acquire()
+        future = self._executor.submit(self._make_request, method, kwargs)
+        future.add_done_callback(self._release)
+        return future
+
+    def _make_request(self, method, kwargs):
+        if self._cancelled.is_set():
+            raise CancelledError()
+        return self._backoff(method, **kwargs)
+
+    def _release(self, future):
+        self._semaphore.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, *args):
+        if exc_type:
+            # Requests that have not started yet are cancelled so
+            # the executor can shutdown as soon as possible.
+            self._cancelled.set()
+        self._executor.shutdown()
+
+
+class RestoreWaiter(object):
+    def __init__(self, client, result_queue, head_object_args=None,
+                 max_concurrency=10, batch_size=1000, min_delay=30,
+                 max_delay=900, sleep=None):
+        """Waits for objects to be restored
+
+        The restore status of the objects is polled with HeadObject.
+        Each poll checks the objects that are still being restored in
+        batches of concurrent requests and the delay between polls grows
+        until ``max_delay`` as restores can take hours to complete.
+
+        :type client: botocore.client.Client
+        :param client: The client to make the HeadObject requests with
+
+        :type result_queue: queue.Queue
+        :param result_queue: The result queue to place the results of the
+            restores on once they complete
+
+        :type head_object_args: dict
+        :param head_object_args: Extra parameters for the HeadObject requests
+        """
+        self._client = client
+        self._result_queue = result_queue
+        self._head_object_args = head_object_args
+        self._max_concurrency = max_concurrency
+        self._batch_size = batch_size
+        self._min_delay = min_delay
+        self._max_delay = max_delay
+        self._sleep = sleep
+        if self._sleep is None:
+            self._sleep = time.sleep
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def add(self, bucket, key, result_kwargs):
+        """Adds an object whose restore should be waited on
+
+        :param result_kwargs: The keyword arguments to use when creating the
+            result of the restore
+        """
+        with self._lock:
+            self._pending.append((bucket, key, result_kwargs))
+
+    def wait(self):
+        """Waits until all of the added objects are restored"""
+        delay = self._min_delay
+        with RestoreManager(self._client, self._max_concurrency,
+                            self._batch_size) as restore_manager:
+            while self._pending:
+                self._sleep(delay)
+                self._poll(restore_manager)
+                delay = min(delay * 2, self._max_delay)
+
+    def _poll(self, restore_manager):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        still_pending = []
+        for i in range(0, len(pending), self._batch_size):
+            batch = pending[i:i + self._batch_size]
+            futures = [
+                restore_manager.head_object(
+                    bucket, key, self._head_object_args)
+                for bucket, key, _ in batch
+            ]
+            for item, future in zip(batch, futures):
+                if not self._is_done(item, future):
+                    still_pending.append(item)
+        LOGGER.debug(
+            '%s of %s objects are still being restored.',
+            len(still_pending), len(pending))
+        with self._lock:
+            self._pending.extend(still_pending)
+
+    def _is_done(self, item, future):
+        result_kwargs = item[2]
+        try:
+            response = future.result()
+        except Exception as e:
+            self._result_queue.put(
+                FailureResult(exception=e, **result_kwargs))
+            return True
+        if is_restore_ongoing(response):
+            return False
+        self._result_queue.put(SuccessResult(**result_kwargs))
+        return True
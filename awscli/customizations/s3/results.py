@@ -184,6 +184,15 @@ class CopyResultSubscriber(BaseResultSubscriber):
         return src, dest
 
 
+class SetAttributesResultSubscriber(BaseResultSubscriber):
+    TRANSFER_TYPE = 'set-attributes'
+
+    def _get_src_dest(self, future):
+        call_args = future.meta.call_args
+        src = 's3://' + call_args.bucket + '/' + call_args.key
+        return src, None
+
+
 class DeleteResultSubscriber(BaseResultSubscriber):
     TRANSFER_TYPE = 'delete'
 
@@ -14,7 +14,7 @@ from awscli.customizations import utils
 from awscli.customizations.commands import BasicCommand
 from awscli.customizations.s3.subcommands import ListCommand, WebsiteCommand, \
     CpCommand, MvCommand, RmCommand, SyncCommand, MbCommand, RbCommand, \
-    PresignCommand
+    PresignCommand, SetAttributesCommand, RestoreCommand
 from awscli.customizations.s3.syncstrategy.register import \
     register_sync_strategies
 
@@ -61,6 +61,8 @@ class S3(BasicCommand):
         {'name': 'mb', 'command_class': MbCommand},
         {'name': 'rb', 'command_class': RbCommand},
         {'name': 'presign', 'command_class': PresignCommand},
+        {'name': 'set-attributes', 'command_class': SetAttributesCommand},
+        {'name': 'restore', 'command_class': RestoreCommand},
     ]
 
     def _run_main(self, parsed_args, parsed_globals):
@@ -13,20 +13,24 @@
 import logging
 import os
 
+from botocore.exceptions import ClientError
+from concurrent.futures import CancelledError
 from s3transfer.manager import TransferManager
 
 from awscli.customizations.s3.utils import (
     human_readable_size, MAX_UPLOAD_SIZE, find_bucket_key, relative_path,
-    create_warning, NonSeekableStream)
+    create_warning, NonSeekableStream, MAX_SINGLE_COPY_SIZE)
 from awscli.customizations.s3.transferconfig import \
     create_transfer_config_from_runtime_config
 from awscli.customizations.s3.results import UploadResultSubscriber
 from awscli.customizations.s3.results import DownloadResultSubscriber
 from awscli.customizations.s3.results import CopyResultSubscriber
+from awscli.customizations.s3.results import SetAttributesResultSubscriber
 from awscli.customizations.s3.results import UploadStreamResultSubscriber
 from awscli.customizations.s3.results import DownloadStreamResultSubscriber
 from awscli.customizations.s3.results import DeleteResultSubscriber
 from awscli.customizations.s3.results import QueuedResult
+from awscli.customizations.s3.results import CtrlCResult
 from awscli.customizations.s3.results import SuccessResult
 from awscli.customizations.s3.results import FailureResult
 from awscli.customizations.s3.results import DryRunResult
@@ -46,6 +50,13 @@ from awscli.customizations.s3.utils import DirectoryCreatorSubscriber
 from awscli.customizations.s3.utils import DeleteSourceFileSubscriber
 from awscli.customizations.s3.utils import DeleteSourceObjectSubscriber
 from awscli.customizations.s3.utils import DeleteCopySourceObjectSubscriber
+from awscli.customizations.s3.objectattributes import get_target_attributes
+from awscli.customizations.s3.objectattributes import \
+    matches_target_attributes
+from awscli.customizations.s3.objectattributes import carry_over_attributes
+from awscli.customizations.s3.restore import RestoreManager
+from awscli.customizations.s3.restore import RestoreWaiter
+from awscli.customizations.s3.restore import ARCHIVE_STORAGE_CLASSES
 from awscli.compat import get_binary_stdin
 
 
@@ -93,17 +104,21 @@ class S3TransferHandlerFactory(object):
             transfer_config.multipart_threshold,
             transfer_config.multipart_chunksize
         )
+        command_result_recorder = self._create_command_result_recorder(
+            result_queue)
+
+        return S3TransferHandler(
+            transfer_manager, self._cli_params, command_result_recorder)
+
+    def _create_command_result_recorder(self, result_queue):
         result_recorder = ResultRecorder()
         result_processor_handlers = [result_recorder]
         self._add_result_printer(result_recorder, result_processor_handlers)
         result_processor = ResultProcessor(
             result_queue, result_processor_handlers)
-        command_result_recorder = CommandResultRecorder(
+        return CommandResultRecorder(
             result_queue, result_recorder, result_processor)
 
-        return S3TransferHandler(
-            transfer_manager, self._cli_params, command_result_recorder)
-
     def _add_result_printer(self, result_recorder, result_processor_handlers):
         if self._cli_params.get('quiet'):
             return
@@ -118,6 +133,36 @@ class S3TransferHandlerFactory(object):
         result_processor_handlers.append(result_printer)
 
 
+class S3RestoreHandlerFactory(S3TransferHandlerFactory):
+    def __call__(self, client, result_queue):
+        """Creates a S3RestoreHandler instance
+
+        :type client: botocore.client.Client
+        :param client: The client to power the S3RestoreHandler
+
+        :type result_queue: queue.Queue
+        :param result_queue: The result queue to be used to process results
+            for the S3RestoreHandler
+
+        :returns: A S3RestoreHandler instance
+        """
+        max_concurrency = self._runtime_config['max_concurrent_requests']
+        restore_manager = RestoreManager(
+            client, max_concurrency, self._runtime_config['max_queue_size'])
+        restore_waiter = None
+        if self._cli_params.get('wait'):
+            head_object_args = {}
+            RequestParamsMapper.map_head_object_params(
+                head_object_args, self._cli_params)
+            restore_waiter = RestoreWaiter(
+                client, result_queue, head_object_args, max_concurrency)
+        command_result_recorder = self._create_command_result_recorder(
+            result_queue)
+        return S3RestoreHandler(
+            restore_manager, self._cli_params, command_result_recorder,
+            restore_waiter)
+
+
 class S3TransferHandler(object):
     def __init__(self, transfer_manager, cli_params, result_command_recorder):
         """Backend for performing S3 transfers
@@ -146,12 +191,16 @@ class S3TransferHandler(object):
             self._transfer_manager, self._result_command_recorder.result_queue,
             cli_params
         )
-        self._submitters = [
+        self._submitters = self._create_submitters(submitter_args)
+
+    def _create_submitters(self, submitter_args):
+        return [
             UploadStreamRequestSubmitter(*submitter_args),
             DownloadStreamRequestSubmitter(*submitter_args),
             UploadRequestSubmitter(*submitter_args),
             DownloadRequestSubmitter(*submitter_args),
             CopyRequestSubmitter(*submitter_args),
+            SetAttributesRequestSubmitter(*submitter_args),
             DeleteRequestSubmitter(*submitter_args),
             LocalDeleteRequestSubmitter(*submitter_args)
         ]
@@ -169,15 +218,57 @@ class S3TransferHandler(object):
         """
         with self._result_command_recorder:
             with self._transfer_manager:
-                total_submissions = 0
-                for fileinfo in fileinfos:
-                    for submitter in self._submitters:
-                        if submitter.can_submit(fileinfo):
-                            if submitter.submit(fileinfo):
-                                total_submissions += 1
-                            break
-                self._result_command_recorder.notify_total_submissions(
-                    total_submissions)
+                self._submit_fileinfos(fileinfos)
+        return self._result_command_recorder.get_command_result()
+
+    def _submit_fileinfos(self, fileinfos):
+        total_submissions = 0
+        for fileinfo in fileinfos:
+            for submitter in self._submitters:
+                if submitter.can_submit(fileinfo):
+                    if submitter.submit(fileinfo):
+                        total_submissions += 1
+                    break
+        self._result_command_recorder.notify_total_submissions(
+            total_submissions)
+
+
+class S3RestoreHandler(S3TransferHandler):
+    def __init__(self, restore_manager, cli_params, result_command_recorder,
+                 restore_waiter=None):
+        """Backend for restoring archived S3 objects
+
+        :type restore_manager: RestoreManager
+        :param restore_manager: Restore manager to use for the requests
+
+        :type cli_params: dict
+        :param cli_params: The parameters passed to the CLI command in the
+            form of a dictionary
+
+        :type result_command_recorder: ResultCommandRecorder
+        :param result_command_recorder: The result command recorder to be
+            used to get the final result of the restores
+
+        :type restore_waiter: RestoreWaiter
+        :param restore_waiter: If provided, the restores are only reported
+            as complete once the waiter sees that the objects are restored.
+        """
+        self._restore_waiter = restore_waiter
+        super(S3RestoreHandler, self).__init__(
+            restore_manager, cli_params, result_command_recorder)
+
+    def _create_submitters(self, submitter_args):
+        return [
+            RestoreRequestSubmitter(
+                *submitter_args, restore_waiter=self._restore_waiter)
+        ]
+
+    def call(self, fileinfos):
+        with self._result_command_recorder:
+            with self._transfer_manager:
+                self._submit_fileinfos(fileinfos)
+            if self._restore_waiter is not None:
+                self._restore_waiter.wait()
         return self._result_command_recorder.get_command_result()
 
 
@@ -456,6 +547,125 @@ class CopyRequestSubmitter(BaseTransferRequestSubmitter):
         return src, dest
 
 
+class SetAttributesRequestSubmitter(CopyRequestSubmitter):
+    RESULT_SUBSCRIBER_CLASS = SetAttributesResultSubscriber
+
+    def can_submit(self, fileinfo):
+        return fileinfo.operation_name == 'set-attributes'
+
+    def _add_additional_subscribers(self, subscribers, fileinfo):
+        subscribers.append(ProvideSizeSubscriber(fileinfo.size))
+
+    def _submit_transfer_request(self, fileinfo, extra_args, subscribers):
+        # The object is copied onto itself so any attribute that is not
+        # being set needs to be provided to keep its current value.
+        carry_over_attributes(extra_args, fileinfo.associated_response_data)
+        if fileinfo.size is not None and \
+                fileinfo.size >= MAX_SINGLE_COPY_SIZE:
+            self._result_queue.put(create_warning(
+                self._format_s3_path(fileinfo.src),
+                'The tags of the object are not kept, as objects larger '
+                'than 5 GB are rewritten with a multipart copy.'))
+        return super(SetAttributesRequestSubmitter,
+                     self)._submit_transfer_request(
+                         fileinfo, extra_args, subscribers)
+
+    def _get_warning_handlers(self):
+        return [self._warn_glacier, self._skip_if_unchanged]
+
+    def _skip_if_unchanged(self, fileinfo):
+        target_attributes = get_target_attributes(self._cli_params)
+        if matches_target_attributes(
+                fileinfo.associated_response_data, target_attributes):
+            LOGGER.debug(
+                'Object s3://%s already has the requested attributes. Not '
+                'performing %s on object.',
+                fileinfo.src, fileinfo.operation_name)
+            return True
+        return False
+
+    def _format_src_dest(self, fileinfo):
+        return self._format_s3_path(fileinfo.src), None
+
+
+class RestoreRequestSubmitter(BaseTransferRequestSubmitter):
+    REQUEST_MAPPER_METHOD = RequestParamsMapper.map_restore_object_params
+    RESULT_SUBSCRIBER_CLASS = None
+
+    def __init__(self, transfer_manager, result_queue, cli_params,
+                 restore_waiter=None):
+        super(RestoreRequestSubmitter, self).__init__(
+            transfer_manager, result_queue, cli_params)
+        self._restore_waiter = restore_waiter
+
+    def can_submit(self, fileinfo):
+        return fileinfo.operation_name == 'restore'
+
+    def _submit_transfer_request(self, fileinfo, extra_args, subscribers):
+        # Like local deletes, restores are not supported by s3transfer so
+        # the requests are made through the restore manager and results
+        # are placed directly on the result queue.
+        bucket, key = find_bucket_key(fileinfo.src)
+        src, dest = self._format_src_dest(fileinfo)
+        result_kwargs = {
+            'transfer_type': 'restore',
+            'src': src,
+            'dest': dest
+        }
+        self._result_queue.put(QueuedResult(
+            total_transfer_size=0, **result_kwargs))
+        future = self._transfer_manager.restore_object(
+            bucket, key, extra_args)
+        future.add_done_callback(
+            lambda f: self._on_restore_done(f, bucket, key, result_kwargs))
+        return future
+
+    def _on_restore_done(self, future, bucket, key, result_kwargs):
+        try:
+            future.result()
+        except CancelledError as e:
+            self._result_queue.put(CtrlCResult(exception=e))
+            return
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'RestoreAlreadyInProgress':
+                self._result_queue.put(
+                    FailureResult(exception=e, **result_kwargs))
+                return
+        except Exception as e:
+            self._result_queue.put(FailureResult(exception=e, **result_kwargs))
+            return
+        if self._restore_waiter is not None:
+            self._restore_waiter.add(bucket, key, result_kwargs)
+        else:
+            self._result_queue.put(SuccessResult(**result_kwargs))
+
+    def _get_warning_handlers(self):
+        return [self._warn_if_not_archived]
+
+    def _warn_if_not_archived(self, fileinfo):
+        response_data = fileinfo.associated_response_data or {}
+        if response_data.get('StorageClass') in ARCHIVE_STORAGE_CLASSES:
+            return False
+        LOGGER.debug(
+            'Object s3://%s is not archived. Not performing %s on object.',
+            fileinfo.src, fileinfo.operation_name)
+        # Objects that are not archived are expected when restoring a
+        # prefix so they are only warned about if they were explicitly
+        # provided.
+        if not self._cli_params.get('dir_op'):
+            warning = create_warning(
+                's3://' + fileinfo.src,
+                'Object is not of an archived storage class (%s). Only '
+                'archived objects can be restored.' % (
+                    ' or '.join(ARCHIVE_STORAGE_CLASSES))
+            )
+            self._result_queue.put(warning)
+        return True
+
+    def _format_src_dest(self, fileinfo):
+        return self._format_s3_path(fileinfo.src), None
+
+
 class UploadStreamRequestSubmitter(UploadRequestSubmitter):
     RESULT_SUBSCRIBER_CLASS = UploadStreamResultSubscriber
 
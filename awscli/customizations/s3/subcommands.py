@@ -27,10 +27,13 @@ from awscli.customizations.s3.fileformat import FileFormat
 from awscli.customizations.s3.filegenerator import FileGenerator
 from awscli.customizations.s3.fileinfo import FileInfo
 from awscli.customizations.s3.filters import create_filter
+from awscli.customizations.s3.objectattributes import ObjectAttributesProvider
+from awscli.customizations.s3.objectattributes import get_target_attributes
 from awscli.customizations.s3.s3handler import S3TransferHandlerFactory
+from awscli.customizations.s3.s3handler import S3RestoreHandlerFactory
 from awscli.customizations.s3.utils import find_bucket_key, AppendFilter, \
     find_dest_path_comp_key, human_readable_size, \
-    RequestParamsMapper, split_s3_bucket_key
+    RequestParamsMapper, split_s3_bucket_key, MAX_SINGLE_COPY_SIZE
 from awscli.customizations.utils import uni_print
 from awscli.customizations.s3.syncstrategy.base import MissingFileSync, \
     SizeAndLastModifiedSync, NeverSync
@@ -428,6 +431,46 @@ REQUEST_PAYER = {
     )
 }
 
+SET_ATTRIBUTES_METADATA = {
+    'name': 'metadata', 'cli_type_name': 'map',
+    'schema': {
+        'type': 'map',
+        'key': {'type': 'string'},
+        'value': {'type': 'string'}
+    },
+    'help_text': (
+        "A map of metadata to store with the objects in S3. The provided map "
+        "replaces all of the existing user metadata of each object."
+    )
+}
+
+
+RESTORE_DAYS = {
+    'name': 'days', 'cli_type_name': 'integer', 'required': True,
+    'help_text': (
+        "The number of days that the restored copies of the objects "
+        "remain available.")
+}
+
+
+RESTORE_TIER = {
+    'name': 'tier', 'choices': ['Expedited', 'Standard', 'Bulk'],
+    'help_text': (
+        "The retrieval tier to use when restoring the objects. Valid "
+        "values are ``Expedited``, ``Standard`` and ``Bulk``. If this "
+        "parameter is not specified, ``Standard`` is used.")
+}
+
+
+WAIT_FOR_RESTORE = {
+    'name': 'wait', 'action': 'store_true',
+    'help_text': (
+        "Waits until all of the objects are restored before exiting. A "
+        "restore is only displayed as completed once the restored copy "
+        "of the object is available.")
+}
+
+
 TRANSFER_ARGS = [DRYRUN, QUIET, INCLUDE, EXCLUDE, ACL,
                  FOLLOW_SYMLINKS, NO_FOLLOW_SYMLINKS, NO_GUESS_MIME_TYPE,
                  SSE, SSE_C, SSE_C_KEY, SSE_KMS_KEY_ID, SSE_C_COPY_SOURCE,
@@ -689,8 +732,7 @@ class S3TransferCommand(S3Command):
         cmd_params.add_page_size(parsed_args)
         cmd_params.add_paths(parsed_args.paths)
 
-        runtime_config = transferconfig.RuntimeConfig().build_config(
-            **self._session.get_scoped_config().get('s3', {}))
+        runtime_config = self._build_runtime_config()
         cmd = CommandArchitecture(self._session, self.NAME,
                                   cmd_params.parameters,
                                   runtime_config)
@@ -698,6 +740,10 @@ class S3TransferCommand(S3Command):
         cmd.create_instructions()
         return cmd.run()
 
+    def _build_runtime_config(self):
+        return transferconfig.RuntimeConfig().build_config(
+            **self._session.get_scoped_config().get('s3', {}))
+
     def _build_call_parameters(self, args, command_params):
         """
         This takes all of the commands in the name space and puts them
@@ -762,6 +808,75 @@ class SyncCommand(S3TransferCommand):
                 [METADATA, METADATA_DIRECTIVE]
 
 
+class SetAttributesCommand(S3TransferCommand):
+    NAME = 'set-attributes'
+    DESCRIPTION = (
+        "Sets the storage class, metadata, or other attributes of existing "
+        "S3 objects by copying each object onto itself. The storage class, "
+        "metadata, content headers, website redirect location and "
+        "encryption that are not specified keep their current values. The "
+        "ACL of each object that is rewritten is reset to private unless "
+        "``--acl`` or ``--grants`` is specified. Objects that already have "
+        "all of the specified attributes are skipped, so rerunning the "
+        "command only lists the objects that were already updated. Objects "
+        "larger than 5 GB are rewritten using a multipart copy, which does "
+        "not keep the tags of the object; a warning is shown for each of "
+        "them."
+    )
+    USAGE = "<S3Uri>"
+    ARG_TABLE = [{'name': 'paths', 'nargs': 1, 'positional_arg': True,
+                  'synopsis': USAGE}, DRYRUN, QUIET, RECURSIVE, INCLUDE,
+                 EXCLUDE, ACL, GRANTS, SSE, SSE_KMS_KEY_ID, STORAGE_CLASS,
+                 WEBSITE_REDIRECT, CONTENT_TYPE, CACHE_CONTROL,
+                 CONTENT_DISPOSITION, CONTENT_ENCODING, CONTENT_LANGUAGE,
+                 EXPIRES, SET_ATTRIBUTES_METADATA, ONLY_SHOW_ERRORS,
+                 NO_PROGRESS, PAGE_SIZE, IGNORE_GLACIER_WARNINGS,
+                 FORCE_GLACIER_TRANSFER, REQUEST_PAYER]
+    # Rewriting an object is a server side copy so many more requests can
+    # be in flight than for transfers that move data through the CLI.
+    DEFAULT_MAX_CONCURRENT_REQUESTS = 50
+
+    def _run_main(self, parsed_args, parsed_globals):
+        if not get_target_attributes(vars(parsed_args)):
+            raise ValueError(
+                "At least one attribute to set must be specified.")
+        if not (parsed_args.acl or parsed_args.grants or
+                parsed_args.quiet or parsed_args.only_show_errors):
+            uni_print(
+                "warning: The ACL of the objects that are rewritten is "
+                "reset to private. Specify --acl or --grants to set it.\n",
+                sys.stderr)
+        return super(SetAttributesCommand, self)._run_main(
+            parsed_args, parsed_globals)
+
+    def _build_runtime_config(self):
+        s3_config = dict(self._session.get_scoped_config().get('s3', {}))
+        s3_config.setdefault(
+            'max_concurrent_requests', self.DEFAULT_MAX_CONCURRENT_REQUESTS)
+        runtime_config = transferconfig.RuntimeConfig().build_config(
+            **s3_config)
+        # A single CopyObject request rewrites the object in place so
+        # multipart copies are only used when an object is too large to
+        # be copied with a single request.
+        runtime_config['multipart_threshold'] = MAX_SINGLE_COPY_SIZE
+        return runtime_config
+
+
+class RestoreCommand(S3TransferCommand):
+    NAME = 'restore'
+    DESCRIPTION = (
+        "Restores archived S3 objects of storage class GLACIER. Objects "
+        "that are not archived are skipped. Restore requests are made "
+        "concurrently and are retried with backoff if they are throttled."
+    )
+    USAGE = "<S3Uri>"
+    ARG_TABLE = [{'name': 'paths', 'nargs': 1, 'positional_arg': True,
+                  'synopsis': USAGE}, RESTORE_DAYS, RESTORE_TIER,
+                 WAIT_FOR_RESTORE, DRYRUN, QUIET, RECURSIVE, INCLUDE,
+                 EXCLUDE, ONLY_SHOW_ERRORS, NO_PROGRESS, PAGE_SIZE,
+                 REQUEST_PAYER]
+
+
 class MbCommand(S3Command):
     NAME = 'mb'
     DESCRIPTION = "Creates an S3 bucket."
@@ -905,6 +1020,8 @@ class CommandArchitecture(object):
             if self.cmd == 'sync':
                 self.instructions.append('comparator')
             self.instructions.append('file_info_builder')
+            if self.cmd == 'set-attributes':
+                self.instructions.append('object_attributes_provider')
         self.instructions.append('s3_handler')
 
     def needs_filegenerator(self):
@@ -973,6 +1090,12 @@ class CommandArchitecture(object):
         }
         result_queue = queue.Queue()
         operation_name = cmd_translation[paths_type]
+        if self.cmd == 'set-attributes':
+            # The objects are rewritten in place by copying them onto
+            # themselves.
+            operation_name = 'set-attributes'
+        elif self.cmd == 'restore':
+            operation_name = 'restore'
 
         fgen_kwargs = {
             'client': self._source_client, 'operation_name': operation_name,
@@ -1012,7 +1135,10 @@ class CommandArchitecture(object):
         file_info_builder = FileInfoBuilder(
             self._client, self._source_client, self.parameters)
 
-        s3_transfer_handler = S3TransferHandlerFactory(
+        handler_factory_cls = S3TransferHandlerFactory
+        if self.cmd == 'restore':
+            handler_factory_cls = S3RestoreHandlerFactory
+        s3_transfer_handler = handler_factory_cls(
             self.parameters, self._runtime_config)(
                 self._client, result_queue)
 
@@ -1049,6 +1175,23 @@ class CommandArchitecture(object):
                             'filters': [create_filter(self.parameters)],
                             'file_info_builder': [file_info_builder],
                             's3_handler': [s3_transfer_handler]}
+        elif self.cmd == 'restore':
+            command_dict = {'setup': [files],
+                            'file_generator': [file_generator],
+                            'filters': [create_filter(self.parameters)],
+                            'file_info_builder': [file_info_builder],
+                            's3_handler': [s3_transfer_handler]}
+        elif self.cmd == 'set-attributes':
+            object_attributes_provider = ObjectAttributesProvider(
+                self._source_client, self.parameters, result_queue,
+                self._runtime_config['max_concurrent_requests'])
+            command_dict = {'setup': [files],
+                            'file_generator': [file_generator],
+                            'filters': [create_filter(self.parameters)],
+                            'file_info_builder': [file_info_builder],
+                            'object_attributes_provider': [
+                                object_attributes_provider],
+                            's3_handler': [s3_transfer_handler]}
 
         files = command_dict['setup']
         while self.instructions:
@@ -1226,7 +1369,8 @@ class CommandParameters(object):
         template_type = {'s3s3': ['cp', 'sync', 'mv'],
                          's3local': ['cp', 'sync', 'mv'],
                          'locals3': ['cp', 'sync', 'mv'],
-                         's3': ['mb', 'rb', 'rm'],
+                         's3': ['mb', 'rb', 'rm', 'set-attributes',
+                                'restore'],
                          'local': [], 'locallocal': []}
         paths_type = ''
         usage = "usage: aws s3 %s %s" % (self.cmd,
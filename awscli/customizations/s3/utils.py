@@ -32,6 +32,8 @@ EPOCH_TIME = datetime(1970, 1, 1, tzinfo=tzutc())
 # Maximum object size allowed in S3.
 # See: http://docs.aws.amazon.com/AmazonS3/latest/dev/qfacts.html
 MAX_UPLOAD_SIZE = 5 * (1024 ** 4)
+# Maximum object size that can be copied with a single CopyObject request.
+MAX_SINGLE_COPY_SIZE = 5 * (1024 ** 3)
 SIZE_SUFFIX = {
     'kb': 1024,
     'mb': 1024 ** 2,
@@ -479,6 +481,16 @@ class RequestParamsMapper(object):
     def map_delete_object_params(cls, request_params, cli_params):
         cls._set_request_payer_param(request_params, cli_params)
 
+    @classmethod
+    def map_restore_object_params(cls, request_params, cli_params):
+        """Map CLI params to RestoreObject request params"""
+        restore_request = {'Days': cli_params['days']}
+        if cli_params.get('tier'):
+            restore_request['GlacierJobParameters'] = {
+                'Tier': cli_params['tier']}
+        request_params['RestoreRequest'] = restore_request
+        cls._set_request_payer_param(request_params, cli_params)
+
     @classmethod
     def map_list_objects_v2_params(cls, request_params, cli_params):
         cls._set_request_payer_param(request_params, cli_params)
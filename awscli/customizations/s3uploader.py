@@ -44,6 +44,11 @@ class S3Uploader(object):
     does not already use versioning, this class will turn on versioning.
     """
 
+    # The maximum number of keys to list when checking which objects
+    # already exist in the bucket. Objects that are not found in the listing
+    # of a larger prefix are checked individually.
+    MAX_LISTED_KEYS = 10000
+
     @property
     def artifact_metadata(self):
         """
@@ -63,7 +68,9 @@ class S3Uploader(object):
                  prefix=None,
                  kms_key_id=None,
                  force_upload=False,
-                 transfer_manager=None):
+                 transfer_manager=None,
+                 list_existing_objects=False,
+                 artifact_cache=None):
         self.bucket_name = bucket_name
         self.prefix = prefix
         self.kms_key_id = kms_key_id or None
@@ -77,6 +84,17 @@ class S3Uploader(object):
 
         self._artifact_metadata = None
 
+        # If enabled, the objects that already exist under the prefix are
+        # listed once instead of checking each uploaded file individually.
+        self.list_existing_objects = list_existing_objects
+        self._existing_keys = None
+        self._is_listing_complete = False
+        self._existing_keys_lock = threading.Lock()
+
+        # Cache of previously uploaded folders. See
+        # awscli.customizations.cloudformation.artifact_cache.ArtifactCache
+        self.artifact_cache = artifact_cache
+
     def upload(self, file_name, remote_path):
         """
         Uploads given file to S3
@@ -117,6 +135,7 @@ class S3Uploader(object):
                                                   additional_args,
                                                   [print_progress_callback])
             future.result()
+            self._add_existing_key(remote_path)
 
             return self.make_url(remote_path)
 
@@ -155,6 +174,13 @@ class S3Uploader(object):
         :return: True, if file exists. False, otherwise
         """
 
+        if self.list_existing_objects:
+            existing_keys, is_complete = self._get_existing_keys()
+            if remote_path in existing_keys:
+                return True
+            if is_complete:
+                return False
+
         try:
             # Find the object that matches this ETag
             self.s3.head_object(
@@ -165,6 +191,50 @@ class S3Uploader(object):
             # this information.
             return False
 
+    def _get_existing_keys(self):
+        with self._existing_keys_lock:
+            if self._existing_keys is None:
+                self._existing_keys, self._is_listing_complete = \
+                    self._list_existing_keys()
+            return self._existing_keys, self._is_listing_complete
+
+    def _add_existing_key(self, remote_path):
+        with self._existing_keys_lock:
+            if self._existing_keys is not None:
+                self._existing_keys.add(remote_path)
+
+    def _list_existing_keys(self):
+        """
+        List the keys directly under the prefix that files are uploaded to
+
+        :return: Tuple of the set of listed keys and whether the listing
+            includes every key under the prefix
+        """
+        list_prefix = ""
+        if self.prefix:
+            list_prefix = self.prefix + "/"
+        keys = set()
+        try:
+            paginator = self.s3.get_paginator("list_objects_v2")
+            pages = paginator.paginate(
+                Bucket=self.bucket_name, Prefix=list_prefix, Delimiter="/")
+            for page in pages:
+                for obj in page.get("Contents", []):
+                    keys.add(obj["Key"])
+                if len(keys) >= self.MAX_LISTED_KEYS:
+                    LOG.debug("More than {0} objects exist under {1}. "
+                              "Checking for remaining files individually"
+                              .format(self.MAX_LISTED_KEYS,
+                                      self.make_url(list_prefix)))
+                    return keys, False
+        except botocore.exceptions.ClientError:
+            # We may not have permission to list the bucket. Fall back
+            # to checking for each file individually.
+            LOG.debug("Unable to list objects under {0}".format(
+                self.make_url(list_prefix)), exc_info=True)
+            return keys, False
+        return keys, True
+
     def make_url(self, obj_path):
         return "s3://{0}/{1}".format(
             self.bucket_name, obj_path)
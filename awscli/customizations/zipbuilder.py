@@ -0,0 +1,530 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+"""
+Builds zip archives of directories.
+
+The members of an archive are compressed in parallel by worker threads,
+as zlib releases the GIL while compressing, and are written to the archive
+in order as they complete. The archives are deterministic: the members are
+sorted and their timestamps and permissions are normalized so the same
+directory contents always produce the same bytes, regardless of when or
+where the archive was built.
+
+Archives that are streamed, such as into an upload, are written without
+spooling any member to disk: each member is written while it is being
+compressed, and its CRC and sizes follow its data in a data descriptor.
+
+"""
+import binascii
+import logging
+import multiprocessing
+import os
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import zipfile
+from collections import deque
+
+from concurrent.futures import ThreadPoolExecutor
+
+from awscli.compat import six
+from awscli.compat import queue
+from awscli.compat import ZIP_COMPRESSION_MODE
+
+try:
+    import zlib
+except ImportError:
+    zlib = None
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+# The size of the chunks that files are read and compressed in.
+READ_CHUNK_SIZE = 1024 * 1024
+# The amount of compressed data of a member that is kept in memory before
+# it is spooled to disk while waiting to be written to the archive.
+MAX_IN_MEMORY_SIZE = 1024 * 1024
+# The number of compressed chunks of a streamed member that are kept in
+# memory before compressing it waits for them to be written.
+MAX_STREAMED_CHUNKS = 2
+
+# Every member has a timestamp of 1980-01-01 00:00:00, the earliest time
+# representable in a zip archive, in MS-DOS date and time format.
+FIXED_DOS_DATE = (0 << 9) | (1 << 5) | 1
+FIXED_DOS_TIME = 0
+FILE_MODE = 0o644
+EXECUTABLE_FILE_MODE = 0o755
+
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP64_COUNT_LIMIT = 0xFFFF
+_VERSION_DEFAULT = 20
+_VERSION_ZIP64 = 45
+# Members are marked as created on unix so that their permissions, which
+# are stored in the upper bits of the external attributes, are honored.
+_CREATE_SYSTEM_UNIX = 3
+_FLAG_DATA_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_ZIP64_EXTRA_ID = 0x0001
+# How often a thread that waits for a streamed member checks whether it
+# should stop waiting.
+_POLL_INTERVAL = 0.1
+
+_LOCAL_FILE_HEADER = struct.Struct('<4sHHHHHLLLHH')
+_CENTRAL_DIRECTORY_HEADER = struct.Struct('<4sHHHHHHLLLHHHHHLL')
+_END_OF_CENTRAL_DIRECTORY = struct.Struct('<4sHHHHLLH')
+_ZIP64_END_OF_CENTRAL_DIRECTORY = struct.Struct('<4sQHHLLQQQQ')
+_ZIP64_END_OF_CENTRAL_DIRECTORY_LOCATOR = struct.Struct('<4sLQL')
+_DATA_DESCRIPTOR = struct.Struct('<4sLLL')
+_ZIP64_DATA_DESCRIPTOR = struct.Struct('<4sLQQ')
+
+
+def get_default_max_workers():
+    try:
+        cpu_count = multiprocessing.cpu_count()
+    except NotImplementedError:
+        cpu_count = 1
+    return max(1, min(DEFAULT_MAX_WORKERS, cpu_count))
+
+
+def find_files(source_root, ignore_hidden_files=False):
+    """Finds the files to add to an archive of a directory
+
+    :type source_root: str
+    :param source_root: The directory to archive
+
+    :type ignore_hidden_files: bool
+    :param ignore_hidden_files: If True, files and directories whose name
+        starts with a ``.`` are not included.
+
+    :returns: A list of ``(full_path, arcname)`` tuples sorted by arcname.
+        The arcnames are relative to ``source_root`` and always use ``/``
+        as the separator.
+    """
+    source_root = os.path.abspath(source_root)
+    files = []
+    for root, dirs, filenames in os.walk(source_root):
+        if ignore_hidden_files:
+            filenames = [fn for fn in filenames if not fn.startswith('.')]
+            dirs[:] = [dn for dn in dirs if not dn.startswith('.')]
+        for filename in filenames:
+            full_path = os.path.join(root, filename)
+            arcname = os.path.relpath(full_path, source_root)
+            files.append((full_path, arcname.replace(os.sep, '/')))
+    return sorted(files, key=lambda f: f[1])
+
+
+def make_zip_archive(fileobj, source_root, files=None,
+                     compression=ZIP_COMPRESSION_MODE, max_workers=None,
+                     stream=False):
+    """Writes a deterministic zip archive of a directory
+
+    :param fileobj: The binary file-like object to write the archive to.
+        The archive is written from the current position. Streams that
+        can not tell their position, like a multipart upload, have to be
+        empty.
+
+    :type source_root: str
+    :param source_root: The directory to archive
+
+    :type files: list
+    :param files: The ``(full_path, arcname)`` tuples of the files to add
+        to the archive. By default, all of the files under ``source_root``
+        are added as returned by ``find_files()``.
+
+    :param compression: Either ``zipfile.ZIP_DEFLATED`` or
+        ``zipfile.ZIP_STORED``
+
+    :type max_workers: int
+    :param max_workers: The maximum number of threads to compress members
+        with. Defaults to the number of CPUs, up to 8.
+
+    :type stream: bool
+    :param stream: If True, each member is written while it is compressed
+        instead of once it is complete, and is followed by a data
+        descriptor with its CRC and sizes. No member is spooled to disk,
+        which suits writing the archive into a stream such as an upload.
+    """
+    if files is None:
+        files = find_files(source_root)
+    if max_workers is None:
+        max_workers = get_default_max_workers()
+    writer = ZipArchiveWriter(fileobj)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    # The futures of the members being compressed, along with the members
+    # themselves when they are streamed.
+    pending = deque()
+    try:
+        for full_path, arcname in files:
+            if stream:
+                member = StreamedMember(full_path, arcname, compression)
+                pending.append((executor.submit(member.compress), member))
+            else:
+                pending.append((executor.submit(
+                    compress_member, full_path, arcname, compression), None))
+            # Limit the number of compressed members waiting to be written
+            # so a slow member does not cause the rest of the directory to
+            # pile up on disk or in memory.
+            if len(pending) > max_workers * 2:
+                _write_pending_member(writer, pending.popleft())
+        while pending:
+            _write_pending_member(writer, pending.popleft())
+        writer.close()
+    finally:
+        for future, member in pending:
+            future.cancel()
+            if member is not None:
+                member.close()
+        executor.shutdown()
+        for future, member in pending:
+            if member is None and not future.cancelled() and \
+                    future.exception() is None:
+                future.result().close()
+
+
+def _write_pending_member(writer, pending_member):
+    future, member = pending_member
+    if member is None:
+        writer.write_member(future.result())
+    else:
+        # Members are compressed in the order they are submitted in, so
+        # the compression of this member has started, and it is written
+        # as it goes.
+        writer.write_streamed_member(member)
+
+
+def compress_member(full_path, arcname, compression=ZIP_COMPRESSION_MODE):
+    """Compresses a file into a member that can be written to an archive
+
+    :returns: A ``CompressedMember`` whose data must be released with
+        ``close()`` once it is no longer needed.
+    """
+    compressor = _get_compressor(compression)
+    data = tempfile.SpooledTemporaryFile(max_size=MAX_IN_MEMORY_SIZE)
+    crc = 0
+    file_size = 0
+    try:
+        with open(full_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+                crc = _crc32(chunk, crc)
+                file_size += len(chunk)
+                if compressor is not None:
+                    chunk = compressor.compress(chunk)
+                data.write(chunk)
+        if compressor is not None:
+            data.write(compressor.flush())
+        mode = os.stat(full_path).st_mode
+    except Exception:
+        data.close()
+        raise
+    compress_size = data.tell()
+    data.seek(0)
+    return CompressedMember(
+        arcname=arcname, data=data, crc=crc, file_size=file_size,
+        compress_size=compress_size, compression=compression,
+        mode=_normalize_mode(mode))
+
+
+def _get_compressor(compression):
+    if compression == zipfile.ZIP_DEFLATED:
+        return zlib.compressobj(
+            zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    elif compression == zipfile.ZIP_STORED:
+        return None
+    raise ValueError('Unsupported compression type: %s' % compression)
+
+
+def _crc32(data, crc):
+    if zlib is not None:
+        return zlib.crc32(data, crc) & 0xFFFFFFFF
+    return binascii.crc32(data, crc) & 0xFFFFFFFF
+
+
+def _normalize_mode(mode):
+    if mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH):
+        return EXECUTABLE_FILE_MODE
+    return FILE_MODE
+
+
+class CompressedMember(object):
+    def __init__(self, arcname, data, crc, file_size, compress_size,
+                 compression, mode):
+        self.arcname = arcname
+        self.data = data
+        self.crc = crc
+        self.file_size = file_size
+        self.compress_size = compress_size
+        self.compression = compression
+        self.mode = mode
+
+    def close(self):
+        self.data.close()
+
+
+class StreamedMember(object):
+    """A member that is written by one thread while another compresses it
+
+    The compressed chunks are handed over through a small queue, so
+    compressing waits for the chunks before it to be written instead of
+    keeping the data of the member. The CRC and sizes of the member are
+    known once its last chunk has been handed over.
+    """
+    _END = object()
+
+    def __init__(self, full_path, arcname, compression=ZIP_COMPRESSION_MODE):
+        self.full_path = full_path
+        self.arcname = arcname
+        self.compression = compression
+        file_stat = os.stat(full_path)
+        self.mode = _normalize_mode(file_stat.st_mode)
+        # Whether the member needs zip64 extensions has to be decided
+        # before its data is written, from the size of the file before it
+        # is read.
+        self.expected_size = file_stat.st_size
+        self.crc = 0
+        self.file_size = 0
+        self.compress_size = 0
+        self._chunks = queue.Queue(MAX_STREAMED_CHUNKS)
+        self._closed = threading.Event()
+
+    def compress(self):
+        """Compresses the file, handing over its chunks as they are
+        compressed"""
+        try:
+            for chunk in self._iter_compressed_chunks():
+                if not self._put(chunk):
+                    return
+            item = self._END
+        except Exception:
+            item = sys.exc_info()
+        self._put(item)
+
+    def iter_chunks(self):
+        """Yields the compressed chunks of the member as they are handed
+        over
+
+        The errors of compressing the member are raised.
+        """
+        while True:
+            item = self._get()
+            if item is self._END:
+                return
+            elif isinstance(item, tuple):
+                six.reraise(*item)
+            yield item
+
+    def close(self):
+        """Stops compressing the member if it is not written anymore"""
+        self._closed.set()
+
+    def _iter_compressed_chunks(self):
+        compressor = _get_compressor(self.compression)
+        with open(self.full_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+                self.crc = _crc32(chunk, self.crc)
+                self.file_size += len(chunk)
+                if compressor is not None:
+                    chunk = compressor.compress(chunk)
+                if chunk:
+                    self.compress_size += len(chunk)
+                    yield chunk
+        if compressor is not None:
+            chunk = compressor.flush()
+            self.compress_size += len(chunk)
+            yield chunk
+
+    def _put(self, item):
+        # Returns False if the member was closed before the item could be
+        # handed over.
+        while not self._closed.is_set():
+            try:
+                self._chunks.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self):
+        # Waiting with a timeout allows the wait to be interrupted with
+        # Ctrl-C.
+        while True:
+            try:
+                return self._chunks.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                pass
+
+
+class ZipArchiveWriter(object):
+    def __init__(self, fileobj):
+        """Writes already compressed members to a zip archive
+
+        ``zipfile.ZipFile`` can only compress members itself, one at a
+        time, so the archive format is written directly. Zip64 extensions
+        are used only for members and archives that need them.
+
+        The archive is written from the current position of ``fileobj``,
+        or from its start if it can not tell its position.
+        """
+        self._fileobj = fileobj
+        self._offset = self._get_position(fileobj)
+        self._central_directory = []
+
+    def _get_position(self, fileobj):
+        # The offsets in the archive are from the start of the file, so
+        # they include whatever the file already holds.
+        try:
+            return fileobj.tell()
+        except (AttributeError, IOError, OSError):
+            return 0
+
+    def write_member(self, member):
+        try:
+            self._write_member(member)
+        finally:
+            member.close()
+
+    def write_streamed_member(self, member):
+        """Writes a ``StreamedMember`` while it is being compressed
+
+        Its CRC and sizes are not known when its local header is written,
+        so they are written after its data in a data descriptor.
+        """
+        try:
+            self._write_streamed_member(member)
+        finally:
+            member.close()
+
+    def _write_member(self, member):
+        filename, flags = self._encode_filename(member.arcname)
+        zip64 = (member.file_size >= _ZIP64_LIMIT or
+                 member.compress_size >= _ZIP64_LIMIT)
+        self._central_directory.append(
+            (member, filename, flags, self._offset))
+        self._write_local_header(
+            member, filename, flags, zip64, member.crc, member.file_size,
+            member.compress_size)
+        while True:
+            chunk = member.data.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            self._write(chunk)
+
+    def _write_streamed_member(self, member):
+        filename, flags = self._encode_filename(member.arcname)
+        flags |= _FLAG_DATA_DESCRIPTOR
+        # Like zipfile, zip64 extensions are used if the compressed data
+        # could be too large without them.
+        zip64 = member.expected_size * 1.05 > _ZIP64_LIMIT
+        offset = self._offset
+        self._write_local_header(member, filename, flags, zip64, 0, 0, 0)
+        for chunk in member.iter_chunks():
+            self._write(chunk)
+        if zip64:
+            descriptor = _ZIP64_DATA_DESCRIPTOR
+        elif (member.file_size >= _ZIP64_LIMIT or
+                member.compress_size >= _ZIP64_LIMIT):
+            raise zipfile.LargeZipFile(
+                '%s grew too large to be archived without zip64 '
+                'extensions while it was read' % member.arcname)
+        else:
+            descriptor = _DATA_DESCRIPTOR
+        self._write(descriptor.pack(
+            b'PK\x07\x08', member.crc, member.compress_size,
+            member.file_size))
+        self._central_directory.append((member, filename, flags, offset))
+
+    def _write_local_header(self, member, filename, flags, zip64, crc,
+                            file_size, compress_size):
+        extra = b''
+        if zip64:
+            # The local header must contain both sizes when either one
+            # does not fit in the header.
+            extra = struct.pack(
+                '<HHQQ', _ZIP64_EXTRA_ID, 16, file_size, compress_size)
+            file_size = compress_size = _ZIP64_LIMIT
+        version = _VERSION_ZIP64 if zip64 else _VERSION_DEFAULT
+        header = _LOCAL_FILE_HEADER.pack(
+            b'PK\x03\x04', version, flags, member.compression,
+            FIXED_DOS_TIME, FIXED_DOS_DATE, crc, compress_size,
+            file_size, len(filename), len(extra))
+        self._write(header + filename + extra)
+
+    def close(self):
+        """Writes the central directory, completing the archive"""
+        central_directory_offset = self._offset
+        for member, filename, flags, offset in self._central_directory:
+            self._write_central_directory_header(
+                member, filename, flags, offset)
+        central_directory_size = self._offset - central_directory_offset
+        self._write_end_of_central_directory(
+            len(self._central_directory), central_directory_size,
+            central_directory_offset)
+
+    def _write_central_directory_header(self, member, filename, flags,
+                                        offset):
+        extra_values = []
+        file_size = member.file_size
+        compress_size = member.compress_size
+        if file_size >= _ZIP64_LIMIT:
+            extra_values.append(file_size)
+            file_size = _ZIP64_LIMIT
+        if compress_size >= _ZIP64_LIMIT:
+            extra_values.append(compress_size)
+            compress_size = _ZIP64_LIMIT
+        if offset >= _ZIP64_LIMIT:
+            extra_values.append(offset)
+            offset = _ZIP64_LIMIT
+        extra = b''
+        version = _VERSION_DEFAULT
+        if extra_values:
+            extra = struct.pack(
+                '<HH' + 'Q' * len(extra_values), _ZIP64_EXTRA_ID,
+                8 * len(extra_values), *extra_values)
+            version = _VERSION_ZIP64
+        external_attr = (stat.S_IFREG | member.mode) << 16
+        header = _CENTRAL_DIRECTORY_HEADER.pack(
+            b'PK\x01\x02', (_CREATE_SYSTEM_UNIX << 8) | version, version,
+            flags, member.compression, FIXED_DOS_TIME, FIXED_DOS_DATE,
+            member.crc, compress_size, file_size, len(filename), len(extra),
+            0, 0, 0, external_attr, offset)
+        self._write(header + filename + extra)
+
+    def _write_end_of_central_directory(self, count, size, offset):
+        if (count > _ZIP64_COUNT_LIMIT or size >= _ZIP64_LIMIT or
+                offset >= _ZIP64_LIMIT):
+            zip64_end_offset = self._offset
+            self._write(_ZIP64_END_OF_CENTRAL_DIRECTORY.pack(
+                b'PK\x06\x06', _ZIP64_END_OF_CENTRAL_DIRECTORY.size - 12,
+                _VERSION_ZIP64, _VERSION_ZIP64, 0, 0, count, count, size,
+                offset))
+            self._write(_ZIP64_END_OF_CENTRAL_DIRECTORY_LOCATOR.pack(
+                b'PK\x06\x07', 0, zip64_end_offset, 1))
+            count = min(count, _ZIP64_COUNT_LIMIT)
+            size = min(size, _ZIP64_LIMIT)
+            offset = min(offset, _ZIP64_LIMIT)
+        self._write(_END_OF_CENTRAL_DIRECTORY.pack(
+            b'PK\x05\x06', 0, 0, count, count, size, offset, 0))
+
+    def _encode_filename(self, arcname):
+        if isinstance(arcname, six.text_type):
+            try:
+                return arcname.encode('ascii'), 0
+            except UnicodeEncodeError:
+                return arcname.encode('utf-8'), _FLAG_UTF8
+        return arcname, 0
+
+    def _write(self, data):
+        self._fileobj.write(data)
+        self._offset += len(data)
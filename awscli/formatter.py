@@ -10,9 +10,16 @@
 # distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
+import itertools
 import logging
 
 from botocore.compat import json
+from botocore.compat import OrderedDict
+try:
+    from json.encoder import c_make_encoder
+except ImportError:
+    c_make_encoder = None
+from json.encoder import encode_basestring
 
 from botocore.utils import set_value_from_jmespath
 from botocore.paginate import PageIterator
@@ -20,6 +27,7 @@ from botocore.paginate import PageIterator
 from awscli.table import MultiTable, Styler, ColorizedStyler
 from awscli import text
 from awscli import compat
+from awscli.compat import six
 from awscli.utils import json_encoder
 
 
@@ -85,6 +93,37 @@ class FullyBufferedFormatter(Formatter):
 
 
 class JSONFormatter(FullyBufferedFormatter):
+    # The number of characters of encoded JSON that are buffered before
+    # they are written to the stream.
+    CHUNK_SIZE = 1024 * 1024
+
+    def __call__(self, command_name, response, stream=None):
+        if is_response_paginated(response):
+            if stream is None:
+                stream = self._get_default_stream()
+            writer = StreamingJSONWriter(stream)
+            query = self._args.query
+            if query is None:
+                result_keys = get_streamable_result_keys(response)
+                if result_keys is not None:
+                    self._stream_response(
+                        stream, writer.write, response, result_keys)
+                    return
+            elif is_streamable_query(query, response):
+                self._stream_response(
+                    stream, writer.write_query_result, response, query)
+                return
+        super(JSONFormatter, self).__call__(command_name, response, stream)
+
+    def _stream_response(self, stream, write, *args):
+        try:
+            write(*args)
+        except IOError:
+            # If the reading end of our stdout stream has closed the file
+            # we can just exit.
+            pass
+        finally:
+            self._flush_stream(stream)
 
     def _format_response(self, command_name, response, stream):
         # For operations that have no response body (e.g. s3 put-object)
@@ -92,9 +131,355 @@ class JSONFormatter(FullyBufferedFormatter):
         # that out to the user but other "falsey" values like an empty
         # dictionary should be printed.
         if response != {}:
-            json.dump(response, stream, indent=4, default=json_encoder,
-                    ensure_ascii=False)
-            stream.write('\n')
+            chunks = []
+            size = 0
+            for chunk in IndentedJSONEncoder().iterencode(response):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= self.CHUNK_SIZE:
+                    stream.write(''.join(chunks))
+                    chunks = []
+                    size = 0
+            chunks.append('\n')
+            stream.write(''.join(chunks))
+
+
+def get_streamable_result_keys(response):
+    """Returns the names of the result keys of a paginated response
+
+    None is returned if the full result of the response can not be written
+    as its pages arrive, which is the case when a result key is not a
+    top level key of the response.
+    """
+    names = []
+    for result_key in response.result_keys or []:
+        if result_key.parsed['type'] != 'field':
+            return None
+        names.append(result_key.parsed['value'])
+    return names or None
+
+
+# The types of the JMESPath expressions that are applied to each element
+# of the list they are given independently of the other elements.
+_DISTRIBUTIVE_EXPRESSION_TYPES = ['projection', 'filter_projection', 'flatten']
+
+
+def is_streamable_query(query, response):
+    """Returns True if a query can be evaluated on each page of a response
+
+    Querying the full result of a paginated response gives the same result
+    as concatenating the results of querying each of its pages when the
+    query is a chain of projections, filters and flattens of a result key,
+    such as ``Reservations[].Instances[].InstanceId`` or
+    ``Contents[?Size > `0`].Key``. Queries that look at the list as a
+    whole, such as ``length(Contents)``, ``sort_by(...)`` or
+    ``Contents[0]``, need the full result.
+    """
+    result_keys = get_streamable_result_keys(response)
+    node = query.parsed
+    if result_keys is None or \
+            node['type'] not in _DISTRIBUTIVE_EXPRESSION_TYPES:
+        return False
+    while node['type'] in _DISTRIBUTIVE_EXPRESSION_TYPES:
+        node = node['children'][0]
+    return node['type'] == 'field' and node['value'] in result_keys
+
+
+def iter_page_query_results(query, response):
+    """Yields the result of a streamable query of each page of a response
+
+    Pages without the queried result key are skipped.
+    """
+    for page in response:
+        result = query.search(page)
+        if result is not None:
+            yield result
+
+
+def join_query_results(results):
+    """Concatenates the results of a streamable query of several pages
+
+    None is returned if there are no results, like when no page has the
+    queried result key.
+    """
+    joined = None
+    for result in results:
+        if joined is None:
+            joined = []
+        joined.extend(result)
+    return joined
+
+
+class StreamingJSONWriter(object):
+    """Writes the full result of a paginated response as its pages arrive
+
+    The output is the same as that of dumping ``build_full_result()`` with
+    ``JSONFormatter``, but the items of the first result key of the full
+    result are written as soon as their page arrives instead of after the
+    last page, so they do not all have to be held in memory. The other
+    result keys are usually small, like counts or common prefixes, and are
+    written after the last page, followed by the non aggregate keys and the
+    resume token.
+    """
+    _INDENT = 4
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._encoder = IndentedJSONEncoder()
+        default_encoder = json.JSONEncoder(indent=self._INDENT)
+        self._item_separator = default_encoder.item_separator
+        self._key_separator = default_encoder.key_separator
+        self._has_members = False
+        # What is written for a page is buffered and written to the stream
+        # at once when the page has been written.
+        self._buffer = []
+
+    def write(self, response, result_keys):
+        streamed_key = None
+        streamed_items = 0
+        buffered = OrderedDict()
+        for page in response:
+            for name in result_keys:
+                value = page.get(name)
+                if value is None:
+                    continue
+                if streamed_key is None and not buffered and \
+                        isinstance(value, list):
+                    streamed_key = name
+                if name == streamed_key:
+                    if isinstance(value, list):
+                        for item in value:
+                            if streamed_items == 0:
+                                self._start_member(name)
+                            self._write_list_item(item, streamed_items, 1)
+                            streamed_items += 1
+                elif name not in buffered:
+                    buffered[name] = value
+                elif isinstance(value, list):
+                    buffered[name].extend(value)
+                elif isinstance(value, (int, float, six.string_types)):
+                    buffered[name] += value
+            self._flush_buffer()
+        if streamed_items:
+            self._write('\n%s]' % (' ' * self._INDENT))
+        elif streamed_key is not None:
+            self._write_member(streamed_key, [])
+        for key, value in response.non_aggregate_part.items():
+            buffered[key] = value
+        if response.resume_token is not None:
+            buffered['NextToken'] = response.resume_token
+        for key, value in buffered.items():
+            self._write_member(key, value)
+        # Like JSONFormatter, nothing is written for an empty result.
+        if self._has_members:
+            self._write('\n}\n')
+        self._flush_buffer()
+
+    def write_query_result(self, response, query):
+        """Writes the result of a streamable query of a paginated response
+
+        The items of the result are written as their page arrives. See
+        ``is_streamable_query``.
+        """
+        has_result = False
+        items = 0
+        for result in iter_page_query_results(query, response):
+            has_result = True
+            for item in result:
+                self._write_list_item(item, items, 0)
+                items += 1
+            self._flush_buffer()
+        if items:
+            self._write('\n]\n')
+        elif has_result:
+            self._write('[]\n')
+        else:
+            self._write('null\n')
+        self._flush_buffer()
+
+    def _write_list_item(self, item, index, list_level):
+        if index == 0:
+            self._write('[')
+        else:
+            self._write(self._item_separator)
+        self._write('\n%s%s' % (' ' * (self._INDENT * (list_level + 1)),
+                                self._encoder.encode(item, list_level + 1)))
+
+    def _write_member(self, key, value):
+        self._start_member(key)
+        self._write(self._encoder.encode(value, 1))
+
+    def _start_member(self, key):
+        if self._has_members:
+            self._write(self._item_separator)
+        else:
+            self._write('{')
+            self._has_members = True
+        self._write('\n%s%s%s' % (
+            ' ' * self._INDENT, self._encoder.encode(key),
+            self._key_separator))
+
+    def _write(self, text):
+        self._buffer.append(text)
+
+    def _flush_buffer(self):
+        if self._buffer:
+            self._stream.write(''.join(self._buffer))
+            self._buffer = []
+
+
+class IndentedJSONEncoder(object):
+    """Encodes values the same way as ``json.dumps`` with an indent of 4
+
+    ``json`` can only use its C encoder when it does not indent, and falls
+    back to a pure Python encoder that yields every separator and scalar
+    separately otherwise. Lists and dicts whose values are all scalars,
+    which make up most of the nodes of a response, are instead encoded by
+    the C encoder with an item separator that includes the indentation of
+    their items, so only the containers above them are walked in Python.
+    """
+    INDENT = 4
+
+    def __init__(self):
+        # The separators json.dumps indents with, which are not the same in
+        # every version of Python.
+        default_encoder = json.JSONEncoder(indent=self.INDENT)
+        self._item_separator = default_encoder.item_separator
+        self._key_separator = default_encoder.key_separator
+        # The newline and indentation of each level, and the encoders of
+        # the scalar members of the containers of each level.
+        self._indents = ['\n']
+        self._encoders = []
+        self._add_levels(0)
+
+    def encode(self, value, level=0):
+        """Returns the encoding of a value nested in the given level
+
+        The lines after the first are indented as if the value was nested
+        in ``level`` containers.
+        """
+        if isinstance(value, dict):
+            return self._encode_dict(value, level)
+        elif isinstance(value, (list, tuple)):
+            return self._encode_list(value, level)
+        return ''.join(self._encoders[0](value, 0))
+
+    def iterencode(self, value):
+        """Yields the encoding of a value in pieces
+
+        The members of a dict and the items of a list, including those of
+        the lists in the members of a dict, are yielded separately so that
+        a large value does not have to be encoded into a single string.
+        """
+        if isinstance(value, dict) and value:
+            separator = '{'
+            for key, member in value.items():
+                yield '%s%s%s%s' % (separator, self._indents[1],
+                                    encode_basestring(key),
+                                    self._key_separator)
+                for chunk in self._iterencode_list(member, 1):
+                    yield chunk
+                separator = self._item_separator
+            yield '\n}'
+        else:
+            for chunk in self._iterencode_list(value, 0):
+                yield chunk
+
+    def _iterencode_list(self, value, level):
+        if not isinstance(value, (list, tuple)) or not value:
+            yield self.encode(value, level)
+            return
+        if len(self._encoders) <= level + 1:
+            self._add_levels(level + 1)
+        separator = '['
+        for item in value:
+            yield separator + self._indents[level + 1] + self.encode(
+                item, level + 1)
+            separator = self._item_separator
+        yield self._indents[level] + ']'
+
+    def _encode_dict(self, value, level):
+        if not value:
+            return '{}'
+        if len(self._encoders) <= level + 1:
+            self._add_levels(level + 1)
+        for member in value.values():
+            if isinstance(member, _CONTAINER_TYPES):
+                break
+        else:
+            return '{%s%s%s}' % (
+                self._indents[level + 1],
+                ''.join(self._encoders[level](value, 0))[1:-1],
+                self._indents[level])
+        # The runs of scalar members between the containers are encoded
+        # together.
+        members = []
+        scalars = None
+        for key, member in value.items():
+            if isinstance(member, _CONTAINER_TYPES):
+                if scalars:
+                    members.append(
+                        ''.join(self._encoders[level](scalars, 0))[1:-1])
+                    scalars = None
+                members.append('%s%s%s' % (encode_basestring(key),
+                                           self._key_separator,
+                                           self.encode(member, level + 1)))
+            else:
+                if scalars is None:
+                    scalars = OrderedDict()
+                scalars[key] = member
+        if scalars:
+            members.append(''.join(self._encoders[level](scalars, 0))[1:-1])
+        indent = self._indents[level + 1]
+        return '{%s%s%s}' % (indent,
+                             (self._item_separator + indent).join(members),
+                             self._indents[level])
+
+    def _encode_list(self, value, level):
+        if not value:
+            return '[]'
+        if len(self._encoders) <= level + 1:
+            self._add_levels(level + 1)
+        indent = self._indents[level + 1]
+        for item in value:
+            if isinstance(item, _CONTAINER_TYPES):
+                break
+        else:
+            return '[%s%s%s]' % (
+                indent, ''.join(self._encoders[level](value, 0))[1:-1],
+                self._indents[level])
+        items = [self.encode(item, level + 1) for item in value]
+        return '[%s%s%s]' % (indent,
+                             (self._item_separator + indent).join(items),
+                             self._indents[level])
+
+    def _add_levels(self, level):
+        while len(self._encoders) <= level:
+            self._indents.append(
+                '\n' + ' ' * (self.INDENT * len(self._indents)))
+            item_separator = self._item_separator + self._indents[-1]
+            if c_make_encoder is not None:
+                encoder = c_make_encoder(
+                    {}, json_encoder, encode_basestring, None,
+                    self._key_separator, item_separator, False, False, True)
+            else:
+                encoder = _PythonFlatEncoder(
+                    item_separator, self._key_separator)
+            self._encoders.append(encoder)
+
+
+_CONTAINER_TYPES = (dict, list, tuple)
+
+
+class _PythonFlatEncoder(object):
+    # Used instead of the C encoder where it is not available.
+    def __init__(self, item_separator, key_separator):
+        self._encoder = json.JSONEncoder(
+            separators=(item_separator, key_separator), default=json_encoder,
+            ensure_ascii=False)
+
+    def __call__(self, value, level):
+        return [self._encoder.encode(value)]
 
 
 class TableFormatter(FullyBufferedFormatter):
@@ -105,8 +490,14 @@ class TableFormatter(FullyBufferedFormatter):
     using the output definition from the model.
 
     """
+    # The number of items of a paginated response that are formatted like
+    # any other response. The table of a larger response is streamed, see
+    # _stream_paginated_response.
+    WINDOW_SIZE = 1000
+
     def __init__(self, args, table=None):
         super(TableFormatter, self).__init__(args)
+        self._continued_layout = None
         if args.color == 'auto':
             self.table = MultiTable(initial_section=False,
                                     column_separator='|')
@@ -121,6 +512,128 @@ class TableFormatter(FullyBufferedFormatter):
         else:
             raise ValueError("Unknown color option: %s" % args.color)
 
+    def __call__(self, command_name, response, stream=None):
+        if is_response_paginated(response):
+            query = self._args.query
+            if query is None:
+                streamable = get_streamable_result_keys(response) is not None
+            else:
+                streamable = is_streamable_query(query, response)
+            if streamable:
+                if stream is None:
+                    stream = self._get_default_stream()
+                try:
+                    self._format_paginated_response(
+                        command_name, response, stream)
+                except IOError:
+                    # If the reading end of our stdout stream has closed the
+                    # file we can just exit.
+                    pass
+                finally:
+                    self._flush_stream(stream)
+                return
+        super(TableFormatter, self).__call__(command_name, response, stream)
+
+    def _format_paginated_response(self, command_name, response, stream):
+        query = self._args.query
+        if query is None:
+            pages = iter(response)
+        else:
+            pages = iter_page_query_results(query, response)
+        window = []
+        num_items = 0
+        for page in pages:
+            window.append(page)
+            num_items += self._count_items(response, page)
+            if num_items > self.WINDOW_SIZE:
+                break
+        else:
+            if query is None:
+                response_data = RetrievedPages(
+                    response, window).build_full_result()
+            else:
+                response_data = join_query_results(window)
+            self._format_response(command_name, response_data, stream)
+            return
+        self._stream_paginated_response(
+            command_name, response, itertools.chain(window, pages), stream)
+
+    def _count_items(self, response, page):
+        if self._args.query is not None:
+            return len(page)
+        return sum(len(page[name])
+                   for name in get_streamable_result_keys(response)
+                   if isinstance(page.get(name), list))
+
+    def _stream_paginated_response(self, command_name, response, pages,
+                                   stream):
+        """Renders the table of a large paginated response page by page
+
+        The rows of the lists of each page are added to the table as the
+        page arrives, continuing the table of the previous page when they
+        have the same headers. The window of the first pages, which have
+        more than ``WINDOW_SIZE`` items, fixes the width of the table, and
+        each row after it is rendered as soon as it is added.
+
+        Without a query, the table has a section per list result key, and
+        the other result keys, the non aggregate keys and the resume token
+        are in a last section, because they are only known after the last
+        page.
+        """
+        query = self._args.query
+        self._continued_layout = None
+        if query is None:
+            result_keys = get_streamable_result_keys(response)
+            self.table.new_section(command_name)
+        aggregates = OrderedDict()
+        num_items = 0
+        streaming = False
+        for page in pages:
+            if query is not None:
+                self._build_page_table(command_name, page, 0)
+                num_items += len(page)
+            else:
+                for name in result_keys:
+                    value = page.get(name)
+                    if isinstance(value, list):
+                        self._build_page_table(name, value, 1)
+                        num_items += len(value)
+                    elif value is None:
+                        continue
+                    elif name not in aggregates:
+                        aggregates[name] = value
+                    elif isinstance(value, (int, float, six.string_types)):
+                        aggregates[name] += value
+            if not streaming and num_items > self.WINDOW_SIZE:
+                self.table.start_streaming(stream)
+                streaming = True
+        if query is None:
+            aggregates.update(response.non_aggregate_part)
+            if response.resume_token is not None:
+                aggregates['NextToken'] = response.resume_token
+            self._build_table(command_name, aggregates)
+        self.table.render(stream)
+
+    def _build_page_table(self, title, current, indent_level):
+        if not current:
+            return
+        headers = more = None
+        if isinstance(current[0], dict):
+            headers, more = self._group_scalar_keys_from_list(current)
+        layout = (title, indent_level, headers)
+        if layout != self._continued_layout:
+            self.table.new_section(title, indent_level=indent_level)
+            if headers is not None:
+                self.table.add_row_header(headers)
+        if headers is None:
+            self._add_rows_from_list(current)
+        else:
+            self._add_rows_from_list_of_dicts(
+                current, headers, more, indent_level, title)
+        # The table of a list of dicts with lists or dicts in them has a
+        # section per dict, so the next page starts a new section anyway.
+        self._continued_layout = None if more else layout
+
     def _format_response(self, command_name, response, stream):
         if self._build_table(command_name, response):
             try:
@@ -140,13 +653,7 @@ class TableFormatter(FullyBufferedFormatter):
             if isinstance(current[0], dict):
                 self._build_sub_table_from_list(current, indent_level, title)
             else:
-                for item in current:
-                    if self._scalar_type(item):
-                        self.table.add_row([item])
-                    elif all(self._scalar_type(el) for el in item):
-                        self.table.add_row(item)
-                    else:
-                        self._build_table(title=None, current=item)
+                self._add_rows_from_list(current)
         if isinstance(current, dict):
             # Render a single row section with keys as header
             # and the row as the values, unless the value
@@ -169,9 +676,23 @@ class TableFormatter(FullyBufferedFormatter):
             self._build_table(remaining, current[remaining],
                               indent_level=indent_level + 1)
 
+    def _add_rows_from_list(self, current):
+        for item in current:
+            if self._scalar_type(item):
+                self.table.add_row([item])
+            elif all(self._scalar_type(el) for el in item):
+                self.table.add_row(item)
+            else:
+                self._build_table(title=None, current=item)
+
     def _build_sub_table_from_list(self, current, indent_level, title):
         headers, more = self._group_scalar_keys_from_list(current)
         self.table.add_row_header(headers)
+        self._add_rows_from_list_of_dicts(
+            current, headers, more, indent_level, title)
+
+    def _add_rows_from_list_of_dicts(self, current, headers, more,
+                                     indent_level, title):
         first = True
         for element in current:
             if not first and more:
@@ -223,6 +744,35 @@ class TableFormatter(FullyBufferedFormatter):
         return headers, more
 
 
+class RetrievedPages(object):
+    """The pages of a paginated response that were already retrieved
+
+    It builds the full result of the pages the same way the paginated
+    response does, without retrieving them again.
+    """
+    build_full_result = six.get_unbound_function(
+        PageIterator.build_full_result)
+
+    def __init__(self, response, pages):
+        self._response = response
+        self._pages = pages
+
+    def __iter__(self):
+        return iter(self._pages)
+
+    @property
+    def result_keys(self):
+        return self._response.result_keys
+
+    @property
+    def non_aggregate_part(self):
+        return self._response.non_aggregate_part
+
+    @property
+    def resume_token(self):
+        return self._response.resume_token
+
+
 class TextFormatter(Formatter):
 
     def __call__(self, command_name, response, stream=None):
@@ -262,6 +812,147 @@ class TextFormatter(Formatter):
         text.format_text(response, stream)
 
 
+class StreamingRecordFormatter(Formatter):
+    """Writes a response as a sequence of records as its pages arrive
+
+    The records of a paginated response are the elements of the lists of
+    its result keys on each page, or of the results of querying each page
+    if the query can be evaluated page by page. See
+    ``is_streamable_query``. Result keys that are not lists, like counts,
+    are aggregates of the pages and are not records.
+
+    Any other response, and paginated responses with a query that needs
+    their full result, are queried as a whole. The records are then the
+    elements of the result if it is a list, otherwise the result itself.
+    """
+    def __call__(self, command_name, response, stream=None):
+        if stream is None:
+            stream = self._get_default_stream()
+        try:
+            for records in self._iter_record_batches(response):
+                self._write_records(records, stream)
+            if is_response_paginated(response) and \
+                    self._args.query is None and response.resume_token:
+                self._write_resume_token(response.resume_token, stream)
+        except IOError:
+            # If the reading end of our stdout stream has closed the file
+            # we can just exit.
+            pass
+        finally:
+            self._flush_stream(stream)
+
+    def _iter_record_batches(self, response):
+        query = self._args.query
+        if is_response_paginated(response):
+            if query is None:
+                for page in response:
+                    records = []
+                    for result_key in response.result_keys:
+                        data = result_key.search(page)
+                        if isinstance(data, list):
+                            records.extend(data)
+                    yield records
+                return
+            elif is_streamable_query(query, response):
+                for result in iter_page_query_results(query, response):
+                    yield result
+                return
+            response_data = response.build_full_result()
+        else:
+            response_data = response
+        self._remove_request_id(response_data)
+        if query is not None:
+            response_data = query.search(response_data)
+        if isinstance(response_data, list):
+            yield response_data
+        elif response_data is not None and response_data != {}:
+            yield [response_data]
+
+    def _write_records(self, records, stream):
+        raise NotImplementedError('_write_records')
+
+    def _write_resume_token(self, resume_token, stream):
+        pass
+
+
+class JSONLinesFormatter(StreamingRecordFormatter):
+    """Writes each record as JSON on a line of its own
+
+    The resume token of a paginated response that was truncated with
+    ``--max-items`` is written as a last record with a ``NextToken`` key.
+    """
+    def _write_records(self, records, stream):
+        stream.write(''.join(
+            [self._dumps(record) + '\n' for record in records]))
+
+    def _write_resume_token(self, resume_token, stream):
+        stream.write(self._dumps({'NextToken': resume_token}) + '\n')
+
+    def _dumps(self, record):
+        return json.dumps(record, separators=(',', ':'),
+                          default=json_encoder, ensure_ascii=False)
+
+
+class CSVFormatter(StreamingRecordFormatter):
+    """Writes each record as a row of comma separated values
+
+    If the records are objects, the columns are the keys of the objects of
+    the first page that has records, in the order they first appear, and
+    are written as a header row. Keys that are not in the first page are
+    not written. The columns can be given explicitly with a query that
+    selects them, such as ``Contents[].{Key: Key, Size: Size}``. Values
+    that are lists or objects are written as JSON, and booleans as
+    ``true`` and ``false``.
+
+    The resume token of a paginated response that was truncated with
+    ``--max-items`` is not a row, and is written to stderr instead as
+    ``NextToken: <token>``.
+    """
+    def __init__(self, args):
+        super(CSVFormatter, self).__init__(args)
+        self._columns = None
+
+    def _write_records(self, records, stream):
+        if self._columns is None and records:
+            self._columns = []
+            for record in records:
+                if isinstance(record, dict):
+                    for key in record:
+                        if key not in self._columns:
+                            self._columns.append(key)
+            if self._columns:
+                self._write_row(self._columns, stream)
+        for record in records:
+            if isinstance(record, dict):
+                self._write_row(
+                    [record.get(column) for column in self._columns], stream)
+            elif isinstance(record, list):
+                self._write_row(record, stream)
+            else:
+                self._write_row([record], stream)
+
+    def _write_resume_token(self, resume_token, stream):
+        stderr = compat.get_stderr_text_writer()
+        stderr.write('NextToken: %s\n' % resume_token)
+        stderr.flush()
+
+    def _write_row(self, values, stream):
+        stream.write(','.join(self._format_value(value) for value in values))
+        stream.write('\n')
+
+    def _format_value(self, value):
+        if value is None:
+            return ''
+        elif isinstance(value, (bool, list, dict)):
+            value = json.dumps(value, separators=(',', ':'),
+                               default=json_encoder, ensure_ascii=False)
+        else:
+            value = six.text_type(json_encoder(value))
+        if any(char in value for char in ',"\r\n'):
+            value = '"%s"' % value.replace('"', '""')
+        return value
+
+
 def get_formatter(format_type, args):
     if format_type == 'json':
         return JSONFormatter(args)
@@ -269,4 +960,8 @@ def get_formatter(format_type, args):
         return TextFormatter(args)
     elif format_type == 'table':
         return TableFormatter(args)
+    elif format_type == 'jsonl':
+        return JSONLinesFormatter(args)
+    elif format_type == 'csv':
+        return CSVFormatter(args)
     raise ValueError("Unknown output type: %s" % format_type)
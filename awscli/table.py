@@ -28,8 +28,14 @@ def get_text_length(text):
     # * F(Fullwidth)
     # * W(Wide)
     text = six.text_type(text)
-    return sum(2 if unicodedata.east_asian_width(char) in 'WFA' else 1
-               for char in text)
+    try:
+        # Every ASCII character is a single column wide, and most text is
+        # ASCII, so this spares looking up the width of each character.
+        text.encode('ascii')
+    except UnicodeEncodeError:
+        return sum(2 if unicodedata.east_asian_width(char) in 'WFA' else 1
+                   for char in text)
+    return len(text)
 
 
 def determine_terminal_width(default_width=80):
@@ -48,6 +54,23 @@ def determine_terminal_width(default_width=80):
         return width
 
 
+def wrap_text(text, width):
+    """Splits text into lines that are at most width characters wide"""
+    lines = []
+    current = []
+    current_length = 0
+    for char in six.text_type(text):
+        char_length = get_text_length(char)
+        if current and current_length + char_length > width:
+            lines.append(''.join(current))
+            current = []
+            current_length = 0
+        current.append(char)
+        current_length += char_length
+    lines.append(''.join(current))
+    return lines
+
+
 def center_text(text, length=80, left_edge='|', right_edge='|',
                 text_length=None):
     """Center text with specified edge chars.
@@ -200,6 +223,14 @@ class MultiTable(object):
         self._column_separator = column_separator
         if terminal_width is None:
             self._terminal_width = determine_terminal_width()
+        self._column_widths = {}
+        self._streamed_column_widths = {}
+        # The state of streamed rendering, see start_streaming().
+        self._stream = None
+        self._max_width = None
+        self._convert_to_vertical = False
+        self._section_stream = None
+        self._section_widths = None
 
     def add_title(self, title):
         self._current_section.add_title(title)
@@ -209,14 +240,54 @@ class MultiTable(object):
 
     def add_row(self, row_elements):
         self._current_section.add_row(row_elements)
+        if self._stream is not None:
+            self._stream_rows()
 
     def new_section(self, title, indent_level=0):
+        if self._stream is not None:
+            self._finish_section()
         self._current_section = Section()
-        self._sections.append(self._current_section)
+        if self._stream is None:
+            self._sections.append(self._current_section)
         self._current_section.add_title(title)
         self._current_section.indent_level = indent_level
 
+    def start_streaming(self, stream):
+        """Renders the sections added so far, and then the rest as added
+
+        The width of the table is fixed from the sections added so far, and
+        so is whether single row sections are rendered vertically. Sections
+        added afterwards reuse the column widths of a section added so far
+        that has the same headers, otherwise their columns are scaled from
+        their first rows. Elements that no longer fit in their column are
+        wrapped onto more lines.
+
+        Each row is written when it is added, except that if single row
+        sections are rendered vertically, the first row of a section with
+        headers is only written when the section has a second row or is
+        finished. ``render`` finishes the last section.
+        """
+        current = self._current_section
+        finished = self._sections[:-1]
+        max_width = self._calculate_max_width()
+        self._convert_to_vertical = bool(
+            self._determine_conversion_needed(max_width))
+        if self._convert_to_vertical:
+            convert_to_vertical_table(finished)
+            self._sections = finished + [current]
+            max_width = self._calculate_max_width()
+        stream.write('-' * max_width + '\n')
+        for section in finished:
+            self._render_section(section, max_width, stream)
+        self._sections = []
+        self._max_width = max_width
+        self._stream = stream
+        self._stream_rows()
+
     def render(self, stream):
+        if self._stream is not None:
+            self._finish_section()
+            return
         max_width = self._calculate_max_width()
         should_convert_table = self._determine_conversion_needed(max_width)
         if should_convert_table:
@@ -238,14 +309,85 @@ class MultiTable(object):
                         for s in self._sections)
         return max_width
 
+    def _stream_rows(self):
+        section = self._current_section
+        if self._section_stream is None:
+            if not section.rows:
+                return
+            if self._convert_to_vertical and section.headers and \
+                    len(section.rows) < 2:
+                return
+            self._section_stream = self._get_section_stream(section)
+            max_width = self._max_width - (section.indent_level * 2)
+            self._section_widths = self._get_column_widths(
+                section, max_width)
+            self._render_title(section, max_width, self._section_stream)
+            self._render_column_titles(
+                section, self._section_widths, self._section_stream)
+            self._write_line_break(
+                self._section_stream, self._section_widths)
+        for row in section.rows:
+            self._render_row(row, self._section_widths, self._section_stream)
+        # Rendered rows are not kept, so memory use does not grow with the
+        # number of rows.
+        del section.rows[:]
+
+    def _finish_section(self):
+        section = self._current_section
+        if self._section_stream is None:
+            sections = [section]
+            if self._convert_to_vertical:
+                convert_to_vertical_table(sections)
+            self._render_section(sections[0], self._max_width, self._stream)
+        elif self._section_widths:
+            self._write_line_break(self._section_stream, self._section_widths)
+        self._section_stream = None
+        self._section_widths = None
+
+    def _get_section_stream(self, section):
+        return IndentedStream(self._stream, section.indent_level,
+                              self._styler.style_indentation_char('|'),
+                              self._styler.style_indentation_char('|'))
+
+    def _get_column_widths(self, section, max_width):
+        if not section.headers:
+            return section.calculate_column_widths(padding=4,
+                                                   max_width=max_width)
+        key = (section.indent_level, tuple(section.headers))
+        if self._stream is None:
+            # Before streaming every section has columns as wide as its own
+            # elements need, and the widest elements of the sections with
+            # the same headers are remembered.
+            remembered = self._column_widths.get(key)
+            if remembered is not None:
+                self._column_widths[key] = [
+                    max(widths) for widths in
+                    zip(remembered, section.max_widths)]
+            else:
+                self._column_widths[key] = section.max_widths
+            return section.calculate_column_widths(padding=4,
+                                                   max_width=max_width)
+        # While streaming, the sections with the same headers line up with
+        # the first of them, whose columns are wide enough for the widest
+        # elements of the sections before streaming.
+        widths = self._streamed_column_widths.get(key)
+        if widths is None:
+            if key in self._column_widths:
+                section.update_max_widths(self._column_widths[key])
+            widths = section.calculate_column_widths(padding=4,
+                                                     max_width=max_width)
+            self._streamed_column_widths[key] = widths
+        return widths
+
     def _render_section(self, section, max_width, stream):
         stream = IndentedStream(stream, section.indent_level,
                                 self._styler.style_indentation_char('|'),
                                 self._styler.style_indentation_char('|'))
         max_width -= (section.indent_level * 2)
+        widths = self._get_column_widths(section, max_width)
         self._render_title(section, max_width, stream)
-        self._render_column_titles(section, max_width, stream)
-        self._render_rows(section, max_width, stream)
+        self._render_column_titles(section, widths, stream)
+        self._render_rows(section, widths, stream)
 
     def _render_title(self, section, max_width, stream):
         # The title consists of:
@@ -258,13 +400,9 @@ class MultiTable(object):
             if not section.headers and not section.rows:
                 stream.write('+%s+' % ('-' * (max_width - 2)) + '\n')
 
-    def _render_column_titles(self, section, max_width, stream):
+    def _render_column_titles(self, section, widths, stream):
         if not section.headers:
             return
-        # In order to render the column titles we need to know
-        # the width of each of the columns.
-        widths = section.calculate_column_widths(padding=4,
-                                                 max_width=max_width)
         # TODO: Built a list instead of +=, it's more efficient.
         current = ''
         length_so_far = 0
@@ -299,21 +437,28 @@ class MultiTable(object):
         parts.append('\n')
         stream.write(''.join(parts))
 
-    def _render_rows(self, section, max_width, stream):
+    def _render_rows(self, section, widths, stream):
         if not section.rows:
             return
-        widths = section.calculate_column_widths(padding=4,
-                                                 max_width=max_width)
         if not widths:
             return
         self._write_line_break(stream, widths)
         for row in section.rows:
+            self._render_row(row, widths, stream)
+        self._write_line_break(stream, widths)
+
+    def _render_row(self, row, widths, stream):
+        lengths = [get_text_length(element) for element in row]
+        lines = [(row, lengths)]
+        if self._stream is not None and self._needs_wrapping(widths, lengths):
+            lines = self._wrap_row(row, widths)
+        for line, lengths in lines:
             # TODO: Built the string in a list then join instead of using +=,
             # it's more efficient.
             current = ''
             length_so_far = 0
             first = True
-            for width, element in zip(widths, row):
+            for width, element, length in zip(widths, line, lengths):
                 if first:
                     left_edge = '|'
                     first = False
@@ -323,10 +468,37 @@ class MultiTable(object):
                 current += align_left(text=stylized, length=width,
                                       left_edge=left_edge,
                                       right_edge=self._column_separator,
-                                      text_length=get_text_length(element))
+                                      text_length=length)
                 length_so_far += width
             stream.write(current + '\n')
-        self._write_line_break(stream, widths)
+
+    def _get_room(self, widths):
+        # The room for the elements of a column is its width less the edges
+        # and a space on each side.
+        rooms = [width - len(self._column_separator) - 3 for width in widths]
+        if rooms:
+            rooms[0] -= 1
+        return rooms
+
+    def _needs_wrapping(self, widths, lengths):
+        return any(0 < room < length for room, length in
+                   zip(self._get_room(widths), lengths))
+
+    def _wrap_row(self, row, widths):
+        # Wraps the elements of a row that do not fit in their column onto
+        # as many lines as the longest of them needs.
+        cells = []
+        for room, element in zip(self._get_room(widths), row):
+            if room > 0 and get_text_length(element) > room:
+                cells.append(wrap_text(element, room))
+            else:
+                cells.append([element])
+        num_lines = max(len(cell) for cell in cells)
+        lines = []
+        for i in range(num_lines):
+            line = [cell[i] if i < len(cell) else '' for cell in cells]
+            lines.append((line, [get_text_length(el) for el in line]))
+        return lines
 
 
 class Section(object):
@@ -392,6 +564,18 @@ class Section(object):
             self._num_cols = len(headers)
         self.headers = self._format_headers(headers)
 
+    @property
+    def max_widths(self):
+        return list(self._max_widths)
+
+    def update_max_widths(self, max_widths):
+        """Widens the columns to at least the given widths"""
+        if not self._max_widths:
+            self._max_widths = list(max_widths)
+        else:
+            self._max_widths = [max(widths) for widths in
+                                zip(self._max_widths, max_widths)]
+
     def _format_headers(self, headers):
         return headers
 
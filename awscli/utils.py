@@ -17,8 +17,12 @@ import contextlib
 import os
 import sys
 import subprocess
+import threading
+
+from botocore.paginate import PageIterator
 
 from awscli.compat import six
+from awscli.compat import queue
 from awscli.compat import get_binary_stdout
 from awscli.compat import get_popen_kwargs_for_pager_cmd
 
@@ -193,3 +197,123 @@ def write_exception(ex, outfile):
     outfile.write("\n")
     outfile.write(six.text_type(ex))
     outfile.write("\n")
+
+
+def wait_until(predicate, wait, timeout=0.1):
+    """Waits until ``predicate()`` is true
+
+    :param wait: Called with ``timeout`` to block until something that may
+        make the predicate true happens, such as ``Condition.wait`` or a
+        ``functools.partial`` of ``concurrent.futures.wait``.
+
+    The wait is repeated with a timeout rather than made without one, as
+    a wait without a timeout can not be interrupted with Ctrl-C on
+    python 2.
+    """
+    while not predicate():
+        wait(timeout)
+
+
+class PrefetchingPageIterator(PageIterator):
+    """Retrieves the pages of a paginated response in a background thread
+
+    Up to ``depth`` pages are requested ahead of the page that is being
+    consumed, so that the next pages are retrieved while the current one
+    is formatted and written instead of after it. The pages are still
+    yielded in order. The wrapped page iterator still does the paginating,
+    so the truncation of ``--max-items`` and the resume token are the same
+    as without prefetching.
+    """
+    # How often a blocked background thread checks whether the pages are
+    # still being consumed, and how often the consuming thread wakes up
+    # while it waits for a page.
+    _POLL_INTERVAL = 0.1
+
+    def __init__(self, page_iterator, depth):
+        self._page_iterator = page_iterator
+        self._depth = depth
+
+    @property
+    def result_keys(self):
+        return self._page_iterator.result_keys
+
+    @property
+    def resume_token(self):
+        return self._page_iterator.resume_token
+
+    @resume_token.setter
+    def resume_token(self, value):
+        self._page_iterator.resume_token = value
+
+    @property
+    def non_aggregate_part(self):
+        return self._page_iterator.non_aggregate_part
+
+    def __iter__(self):
+        return self._iter_pages([self._page_iterator])
+
+    def _iter_pages(self, page_iterators):
+        # The pages of several page iterators are retrieved by a thread
+        # each, and are yielded in the order they arrive in.
+        pages = queue.Queue()
+        stopped = threading.Event()
+        all_slots = []
+        for page_iterator in page_iterators:
+            # A slot is taken before a page is requested and given back
+            # when the page is consumed, which bounds the pages requested
+            # ahead.
+            slots = queue.Queue()
+            for _ in range(self._depth):
+                slots.put(None)
+            all_slots.append(slots)
+            thread = threading.Thread(
+                target=self._retrieve_pages,
+                args=(page_iterator, pages, slots, stopped))
+            thread.daemon = True
+            thread.start()
+        try:
+            remaining = len(page_iterators)
+            while remaining:
+                page, exc_info, slots = self._get_page(pages)
+                if exc_info is not None:
+                    six.reraise(*exc_info)
+                if page is None:
+                    remaining -= 1
+                    continue
+                slots.put(None)
+                yield page
+        finally:
+            # The background threads stop if the pages stop being consumed
+            # before the last one, such as when the output pipe is closed.
+            stopped.set()
+
+    def _get_page(self, pages):
+        # A get without a timeout can not be interrupted with Ctrl-C on
+        # python 2.
+        while True:
+            try:
+                return pages.get(timeout=self._POLL_INTERVAL)
+            except queue.Empty:
+                pass
+
+    def _retrieve_pages(self, page_iterator, pages, slots, stopped):
+        page_iterator = iter(page_iterator)
+        while self._take_slot(slots, stopped):
+            try:
+                page = next(page_iterator)
+            except StopIteration:
+                pages.put((None, None, slots))
+                return
+            except Exception:
+                pages.put((None, sys.exc_info(), slots))
+                return
+            pages.put((page, None, slots))
+
+    def _take_slot(self, slots, stopped):
+        while not stopped.is_set():
+            try:
+                slots.get(timeout=self._POLL_INTERVAL)
+                return True
+            except queue.Empty:
+                pass
+        return False
@@ -236,6 +236,10 @@ class TestCloudTrailCommand(BaseCloudTrailCommandTest):
         self.assertIn(
             'Log file\ts3://1/key1\tINVALID: hash value doesn\'t match', stderr)
 
+    # The mocked responses are returned in the order they are requested, so
+    # the log files must be downloaded one at a time.
+    @patch('awscli.customizations.cloudtrail.validation'
+           '.MAX_CONCURRENT_LOG_DOWNLOADS', 1)
     def test_validates_valid_log_files(self):
         key_provider, digest_provider, validator = create_scenario(
             ['gap', 'link', 'link'],
@@ -0,0 +1,95 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import json
+
+from awscli.customizations.parallelsegments import MAX_PARALLEL_SEGMENTS
+from awscli.testutils import BaseAWSCommandParamsTest
+
+
+class TestParallelSegments(BaseAWSCommandParamsTest):
+    prefix = 'dynamodb scan --table-name mytable '
+
+    def setUp(self):
+        super(TestParallelSegments, self).setUp()
+        # Each segment is read in a single page, but which segment gets
+        # which response depends on the order the threads make their
+        # calls in.
+        self.parsed_responses = [
+            {'Items': [{'id': {'S': str(i)}}], 'Count': 1,
+             'ScannedCount': 2}
+            for i in range(3)
+        ]
+
+    def test_reads_segments_in_parallel(self):
+        stdout, _, _ = self.assert_params_for_cmd(
+            self.prefix + '--parallel-segments 3')
+        segments = sorted(
+            (params['Segment'], params['TotalSegments'])
+            for _, params in self.operations_called)
+        self.assertEqual(segments, [(0, 3), (1, 3), (2, 3)])
+        output = json.loads(stdout)
+        self.assertEqual(
+            sorted(item['id']['S'] for item in output['Items']),
+            ['0', '1', '2'])
+        self.assertEqual(output['Count'], 3)
+        self.assertEqual(output['ScannedCount'], 6)
+
+    def test_query_of_segments(self):
+        stdout, _, _ = self.assert_params_for_cmd(
+            self.prefix + '--parallel-segments 3 --query Items[].id.S')
+        self.assertEqual(sorted(json.loads(stdout)), ['0', '1', '2'])
+
+    def test_page_size_applies_to_each_segment(self):
+        self.assert_params_for_cmd(
+            self.prefix + '--parallel-segments 3 --page-size 10')
+        self.assertEqual(
+            [params['Limit'] for _, params in self.operations_called],
+            [10, 10, 10])
+
+    def test_cannot_be_used_with_segment(self):
+        _, stderr, _ = self.assert_params_for_cmd(
+            self.prefix + '--parallel-segments 3 --segment 1 '
+            '--total-segments 3', expected_rc=255)
+        self.assertIn('--segment, --total-segments', stderr)
+        self.assertEqual(self.operations_called, [])
+
+    def test_cannot_be_used_with_max_items(self):
+        _, stderr, _ = self.assert_params_for_cmd(
+            self.prefix + '--parallel-segments 3 --max-items 1',
+            expected_rc=255)
+        self.assertIn('--max-items', stderr)
+
+    def test_cannot_read_more_than_max_segments(self):
+        _, stderr, _ = self.assert_params_for_cmd(
+            self.prefix + '--parallel-segments %d' %
+            (MAX_PARALLEL_SEGMENTS + 1), expected_rc=255)
+        self.assertIn(
+            'must be from 1 to %d' % MAX_PARALLEL_SEGMENTS, stderr)
+        self.assertEqual(self.operations_called, [])
+
+    def test_cannot_read_less_than_one_segment(self):
+        _, stderr, _ = self.assert_params_for_cmd(
+            self.prefix + '--parallel-segments 0', expected_rc=255)
+        self.assertIn('--parallel-segments must be from 1', stderr)
+
+    def test_cannot_be_used_without_pagination(self):
+        _, stderr, _ = self.assert_params_for_cmd(
+            self.prefix + '--parallel-segments 3 --no-paginate',
+            expected_rc=255)
+        self.assertIn('--parallel-segments', stderr)
+
+    def test_not_added_to_operations_without_segments(self):
+        _, stderr, _ = self.assert_params_for_cmd(
+            'dynamodb query --table-name mytable --parallel-segments 3',
+            expected_rc=255)
+        self.assertIn('Unknown options: --parallel-segments', stderr)
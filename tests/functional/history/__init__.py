@@ -67,6 +67,14 @@ class BaseHistoryCommandParamsTest(BaseAWSCommandParamsTest):
         patch_history_recorder.start()
         self.addCleanup(patch_history_recorder.stop)
 
+    def run_cmd(self, cmd, expected_rc=0):
+        # History records are written in the background, so the records of
+        # the previous commands are written before the history is read.
+        for handler in self.history_recorder._handlers:
+            handler._writer.flush()
+        return super(BaseHistoryCommandParamsTest, self).run_cmd(
+            cmd, expected_rc)
+
     def _cleanup_db_connections(self):
         # Reaching into private data to close out the database connection.
         # Windows won't let us delete the tempdir until these connections are
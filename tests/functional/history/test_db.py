@@ -10,17 +10,23 @@
 # distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
+import base64
+import os
 import threading
 import json
 import re
+import time
 
 from awscli.compat import queue
 from awscli.customizations.history.db import DatabaseConnection
 from awscli.customizations.history.db import RecordBuilder
 from awscli.customizations.history.db import DatabaseRecordWriter
 from awscli.customizations.history.db import DatabaseRecordReader
+from awscli.customizations.history.db import AsyncRecordWriter
 from awscli.customizations.history.db import DatabaseHistoryHandler
-from awscli.testutils import unittest
+from awscli.customizations.history.db import DatabaseStatsReader
+from awscli.customizations.history.db import decode_payload
+from awscli.testutils import unittest, mock, FileCreator
 from awscli.compat import sqlite3
 from tests import CaseInsensitiveDict
 
@@ -187,6 +193,370 @@ class TestDatabaseRecordWriter(BaseDatabaseTest):
         num_records = cursor.fetchone()
         self.assertEqual(num_records[0], records_to_write)
 
+    def test_can_write_records_in_one_transaction(self):
+        writer = DatabaseRecordWriter(connection=self.connection)
+        writer.write_records([
+            {'command_id': 'command', 'source': 'TEST', 'event_type': 'foo',
+             'payload': i, 'timestamp': 1234}
+            for i in range(5)
+        ])
+        cursor = self.connection.execute("SELECT payload FROM records")
+        self.assertEqual([row[0] for row in cursor], ['0', '1', '2', '3', '4'])
+
+
+@unittest.skipIf(sqlite3 is None,
+                 "sqlite3 not supported in this python")
+class TestDatabaseMigration(unittest.TestCase):
+    def setUp(self):
+        self.files = FileCreator()
+        self.addCleanup(self.files.remove_all)
+        self.db_filename = self.files.full_path('history.db')
+
+    def test_migrates_unversioned_database(self):
+        legacy = sqlite3.connect(self.db_filename)
+        legacy.execute(DatabaseConnection._CREATE_TABLE)
+        legacy.executemany(
+            'INSERT INTO records VALUES (?, NULL, ?, ?, ?, ?)', [
+                ('a', 'CLI', 'CLI_ARGUMENTS', 1, '["s3", "ls"]'),
+                ('a', 'CLI', 'CLI_RC', 2, '0'),
+                ('b', 'CLI', 'CLI_ARGUMENTS', 3, '["ec2", "foo"]'),
+            ])
+        legacy.commit()
+        legacy.close()
+
+        connection = DatabaseConnection(self.db_filename)
+        self.addCleanup(connection.close)
+        rows = connection.execute(
+            'SELECT * FROM commands ORDER BY id').fetchall()
+        self.assertEqual(rows, [
+            ('a', 1, 2, '["s3", "ls"]', '0'),
+            ('b', 3, 3, '["ec2", "foo"]', None),
+        ])
+
+    def test_backfills_api_calls(self):
+        legacy = sqlite3.connect(self.db_filename)
+        legacy.execute(DatabaseConnection._CREATE_TABLE)
+        legacy.executemany(
+            'INSERT INTO records VALUES (?, ?, ?, ?, ?, ?)', [
+                ('a', None, 'CLI', 'CLI_ARGUMENTS', 1, '["ec2"]'),
+                ('a', 'r', 'BOTOCORE', 'API_CALL', 2,
+                 '{"service": "ec2", "operation": "DescribeRegions"}'),
+                ('a', 'r', 'BOTOCORE', 'HTTP_REQUEST', 3,
+                 '{"body": "abc", "headers": {}}'),
+                ('a', 'r', 'BOTOCORE', 'HTTP_RESPONSE', 9,
+                 '{"status_code": 200, "body": "abcde", "headers": {}}'),
+                ('a', 'r', 'BOTOCORE', 'PARSED_RESPONSE', 10, '{}'),
+                ('a', None, 'CLI', 'CLI_RC', 11, '0'),
+            ])
+        legacy.commit()
+        legacy.close()
+
+        connection = DatabaseConnection(self.db_filename)
+        self.addCleanup(connection.close)
+        rows = connection.execute(
+            'SELECT request_id, command_id, service, operation, '
+            'start_timestamp, end_timestamp, first_request_timestamp, '
+            'last_response_timestamp, attempts, bytes_sent, bytes_received, '
+            'status_code FROM api_calls').fetchall()
+        self.assertEqual(rows, [
+            ('r', 'a', 'ec2', 'DescribeRegions', 2, 10, 3, 9, 1, 3, 5, 200),
+        ])
+
+    def test_does_not_backfill_summarized_api_calls(self):
+        legacy = sqlite3.connect(self.db_filename)
+        legacy.execute(DatabaseConnection._CREATE_TABLE)
+        legacy.execute(
+            "INSERT INTO records VALUES ('a', 'r', 'BOTOCORE', "
+            "'HTTP_REQUEST', 3, '{\"body\": \"abc\", \"headers\": {}}')")
+        legacy.execute(
+            'CREATE TABLE api_calls (request_id TEXT PRIMARY KEY, '
+            'command_id TEXT, attempts INTEGER)')
+        legacy.execute("INSERT INTO api_calls VALUES ('r', 'a', 1)")
+        legacy.execute('PRAGMA user_version=3')
+        legacy.commit()
+        legacy.close()
+
+        connection = DatabaseConnection(self.db_filename)
+        self.addCleanup(connection.close)
+        self.assertEqual(
+            connection.execute('SELECT attempts FROM api_calls').fetchall(),
+            [(1,)])
+
+    def test_enables_incremental_vacuum_when_vacuumed(self):
+        legacy = sqlite3.connect(self.db_filename)
+        legacy.execute(DatabaseConnection._CREATE_TABLE)
+        legacy.commit()
+        legacy.close()
+
+        connection = DatabaseConnection(self.db_filename)
+        self.addCleanup(connection.close)
+        # The database is neither rebuilt when it is connected to nor when
+        # it is pruned.
+        writer = DatabaseRecordWriter(connection, max_age_days=1)
+        writer.prune_records()
+        self.assertEqual(
+            connection.execute('PRAGMA auto_vacuum').fetchone()[0], 0)
+        writer.vacuum()
+        self.assertEqual(
+            connection.execute('PRAGMA auto_vacuum').fetchone()[0], 2)
+
+
+@unittest.skipIf(sqlite3 is None,
+                 "sqlite3 not supported in this python")
+class TestCommandSummary(BaseDatabaseTest):
+    def test_summary_is_updated_on_write(self):
+        writer = DatabaseRecordWriter(self.connection)
+        writer.write_records([
+            {'command_id': 'a', 'source': 'CLI', 'timestamp': 5,
+             'event_type': 'CLI_ARGUMENTS', 'payload': ['s3', 'ls']},
+            {'command_id': 'a', 'source': 'BOTOCORE', 'timestamp': 6,
+             'event_type': 'API_CALL', 'payload': {}},
+            {'command_id': 'a', 'source': 'CLI', 'timestamp': 7,
+             'event_type': 'CLI_RC', 'payload': 0},
+        ])
+        row = self.connection.execute('SELECT * FROM commands').fetchone()
+        self.assertEqual(tuple(row), ('a', 5, 7, '["s3", "ls"]', '0'))
+
+        reader = DatabaseRecordReader(self.connection)
+        self.assertEqual(list(reader.iter_all_records()), [{
+            'id_a': 'a', 'id_b': 'a', 'timestamp': 5,
+            'args': '["s3", "ls"]', 'rc': '0'}])
+
+
+@unittest.skipIf(sqlite3 is None,
+                 "sqlite3 not supported in this python")
+class TestPayloadStorage(BaseDatabaseTest):
+    def _write_record(self, writer, payload, event_type='HTTP_RESPONSE'):
+        writer.write_record({
+            'command_id': 'command', 'source': 'BOTOCORE',
+            'event_type': event_type, 'payload': payload, 'timestamp': 1
+        })
+
+    def test_large_payloads_are_stored_compressed(self):
+        writer = DatabaseRecordWriter(self.connection)
+        payload = {'status_code': 200, 'body': '<xml>' * 10000}
+        self._write_record(writer, payload)
+        stored = self.connection.execute(
+            'SELECT payload FROM records').fetchone()[0]
+        self.assertIsInstance(stored, bytes)
+        self.assertLess(len(stored), 1000)
+
+        reader = DatabaseRecordReader(self.connection)
+        records = list(reader.iter_records('command'))
+        self.assertEqual(records[0]['payload'], payload)
+
+    def test_large_arguments_are_listed(self):
+        writer = DatabaseRecordWriter(self.connection)
+        args = ['s3', 'cp'] + ['--include=%s' % i for i in range(500)]
+        self._write_record(writer, args, 'CLI_ARGUMENTS')
+        self._write_record(writer, 0, 'CLI_RC')
+        reader = DatabaseRecordReader(self.connection)
+        record = list(reader.iter_all_records())[0]
+        self.assertEqual(decode_payload(record['args']), args)
+
+    def test_payloads_over_max_payload_size_are_truncated(self):
+        writer = DatabaseRecordWriter(
+            self.connection, max_payload_size=2048)
+        self._write_record(
+            writer, {'status_code': 200, 'body': 'a' * 100000})
+        reader = DatabaseRecordReader(self.connection)
+        payload = list(reader.iter_records('command'))[0]['payload']
+        self.assertEqual(payload['status_code'], 200)
+        self.assertTrue(payload['body'].startswith('a' * 1000))
+        self.assertTrue(payload['body'].endswith('characters truncated]'))
+        self.assertLess(len(payload['body']), 2048)
+
+
+@unittest.skipIf(sqlite3 is None,
+                 "sqlite3 not supported in this python")
+class TestDatabaseStatsReader(BaseDatabaseTest):
+    def setUp(self):
+        super(TestDatabaseStatsReader, self).setUp()
+        self.writer = DatabaseRecordWriter(self.connection)
+        self.reader = DatabaseStatsReader(self.connection)
+        self.records = []
+
+    def _record(self, command_id, event_type, timestamp, payload,
+                request_id=None):
+        record = {'command_id': command_id, 'source': 'TEST',
+                  'event_type': event_type, 'payload': payload,
+                  'timestamp': timestamp}
+        if request_id is not None:
+            record['request_id'] = request_id
+        self.records.append(record)
+
+    def _record_command(self, command_id, start, end):
+        self._record(command_id, 'CLI_ARGUMENTS', start, ['ec2'])
+        self._record(command_id, 'CLI_RC', end, 0)
+
+    def _record_api_call(self, command_id, request_id, start, latency,
+                         operation='DescribeRegions', attempts=1):
+        self._record(command_id, 'API_CALL', start,
+                     {'service': 'ec2', 'operation': operation},
+                     request_id)
+        for _ in range(attempts):
+            self._record(command_id, 'HTTP_REQUEST', start + 1,
+                         {'body': 'abc', 'headers': {}}, request_id)
+            self._record(command_id, 'HTTP_RESPONSE', start + latency - 1,
+                         {'status_code': 200, 'body': None,
+                          'headers': {'Content-Length': '10'}},
+                         request_id)
+        self._record(command_id, 'PARSED_RESPONSE', start + latency, {},
+                     request_id)
+
+    def test_operation_stats(self):
+        self._record_command('a', 0, 1000)
+        for i in range(1, 101):
+            self._record_api_call('a', 'request-%s' % i, i, i * 2)
+        self._record_api_call('a', 'retried', 500, 50,
+                              operation='RunInstances', attempts=3)
+        self.writer.write_records(self.records)
+
+        stats = list(self.reader.iter_operation_stats())
+        self.assertEqual(stats, [
+            {'service': 'ec2', 'operation': 'DescribeRegions',
+             'calls': 100, 'retries': 0, 'bytes_sent': 300,
+             'bytes_received': 1000, 'p50': 100, 'p90': 180, 'p99': 198},
+            {'service': 'ec2', 'operation': 'RunInstances',
+             'calls': 1, 'retries': 2, 'bytes_sent': 9,
+             'bytes_received': 30, 'p50': 50, 'p90': 50, 'p99': 50},
+        ])
+
+    def test_command_stats(self):
+        self._record_command('a', 0, 1000)
+        self._record_api_call('a', 'request-a', 100, 300)
+        self._record_command('b', 2000, 2500)
+        self.writer.write_records(self.records)
+
+        self.assertEqual(self.reader.get_command_stats(), {
+            'commands': 2, 'total_time': 1500, 'network_time': 298,
+            'cli_overhead': 1202})
+
+    def test_network_time_of_concurrent_api_calls(self):
+        self._record_command('a', 0, 1000)
+        self._record_api_call('a', 'request-1', 100, 300)
+        self._record_api_call('a', 'request-2', 200, 300)
+        self._record_api_call('a', 'request-3', 150, 50)
+        self._record_api_call('a', 'request-4', 700, 100)
+        self.writer.write_records(self.records)
+
+        # The calls overlap from 101 to 499, then the last one takes 98.
+        self.assertEqual(self.reader.get_command_stats(), {
+            'commands': 1, 'total_time': 1000, 'network_time': 496,
+            'cli_overhead': 504})
+
+    def test_stats_of_range_of_commands(self):
+        self._record_command('a', 0, 1000)
+        self._record_api_call('a', 'request-a', 100, 300)
+        self._record_command('b', 2000, 2500)
+        self._record_api_call('b', 'request-b', 2100, 10, 'RunInstances')
+        self._record_command('c', 3000, 3500)
+        self.writer.write_records(self.records)
+
+        self.assertEqual(
+            self.reader.get_command_stats(limit=2)['commands'], 2)
+        self.assertEqual(
+            self.reader.get_command_stats(since=1000, until=3000),
+            {'commands': 1, 'total_time': 500, 'network_time': 8,
+             'cli_overhead': 492})
+        stats = list(self.reader.iter_operation_stats(until=2000))
+        self.assertEqual([s['operation'] for s in stats],
+                         ['DescribeRegions'])
+
+
+@unittest.skipIf(sqlite3 is None,
+                 "sqlite3 not supported in this python")
+class TestRecordPruning(BaseDatabaseTest):
+    def _write_command(self, writer, command_id, timestamp, size=0):
+        # Random arguments, so they take up about as much space compressed.
+        args = base64.b64encode(os.urandom(size)).decode('ascii')
+        writer.write_records([
+            {'command_id': command_id, 'source': 'CLI',
+             'event_type': 'CLI_ARGUMENTS', 'payload': [args],
+             'timestamp': timestamp},
+            {'command_id': command_id, 'source': 'CLI',
+             'event_type': 'CLI_RC', 'payload': 0, 'timestamp': timestamp},
+        ])
+
+    def _get_command_ids(self, table='commands'):
+        return sorted(set(row[0] for row in self.connection.execute(
+            'SELECT id FROM %s' % table)))
+
+    def test_prunes_commands_older_than_max_age(self):
+        writer = DatabaseRecordWriter(self.connection, max_age_days=1)
+        now = int(time.time() * 1000)
+        self._write_command(writer, 'old', now - 2 * 24 * 60 * 60 * 1000)
+        self._write_command(writer, 'new', now)
+        writer.prune_records()
+        self.assertEqual(self._get_command_ids(), ['new'])
+        self.assertEqual(self._get_command_ids('records'), ['new'])
+
+    @mock.patch('awscli.customizations.history.db.PRUNE_BATCH_SIZE', 1)
+    def test_prunes_oldest_commands_over_max_size(self):
+        writer = DatabaseRecordWriter(self.connection, max_size=160 * 1024)
+        for i in range(10):
+            self._write_command(writer, 'command-%s' % i, i, size=16 * 1024)
+        writer.prune_records()
+        self.assertLessEqual(self.connection.get_size(), 160 * 1024)
+        command_ids = self._get_command_ids()
+        self.assertIn('command-9', command_ids)
+        self.assertNotIn('command-0', command_ids)
+
+    def test_does_not_prune_again_within_min_interval(self):
+        writer = DatabaseRecordWriter(self.connection, max_age_days=1)
+        writer.prune_records(min_interval=60)
+        now = int(time.time() * 1000)
+        self._write_command(writer, 'old', now - 2 * 24 * 60 * 60 * 1000)
+        writer.prune_records(min_interval=60)
+        self.assertEqual(self._get_command_ids(), ['old'])
+        writer.prune_records()
+        self.assertEqual(self._get_command_ids(), [])
+
+    def test_prunes_after_min_interval(self):
+        writer = DatabaseRecordWriter(self.connection, max_age_days=1)
+        self.connection.set_metadata('last_pruned', 0)
+        now = int(time.time() * 1000)
+        self._write_command(writer, 'old', now - 2 * 24 * 60 * 60 * 1000)
+        writer.prune_records(min_interval=60)
+        self.assertEqual(self._get_command_ids(), [])
+        self.assertGreaterEqual(
+            self.connection.get_metadata('last_pruned'), now)
+
+    def test_does_not_prune_without_retention(self):
+        writer = DatabaseRecordWriter(self.connection)
+        self._write_command(writer, 'old', 0)
+        writer.prune_records()
+        self.assertEqual(self._get_command_ids(), ['old'])
+
+
+class TestAsyncRecordWriter(unittest.TestCase):
+    def setUp(self):
+        self.files = FileCreator()
+        self.addCleanup(self.files.remove_all)
+        self.db_filename = self.files.full_path('history.db')
+
+    def test_writes_all_records_when_closed(self):
+        writer = AsyncRecordWriter(
+            DatabaseRecordWriter(DatabaseConnection(self.db_filename)),
+            max_queued_records=10, max_batch_size=3)
+        payload = {'foo': ['bar']}
+        for i in range(40):
+            writer.write_record({
+                'command_id': 'command', 'source': 'TEST',
+                'event_type': 'foo', 'payload': payload, 'timestamp': i
+            })
+        # The payload is copied when it is recorded.
+        payload['foo'].append('baz')
+        writer.close()
+
+        connection = DatabaseConnection(self.db_filename)
+        self.addCleanup(connection.close)
+        reader = DatabaseRecordReader(connection)
+        records = list(reader.iter_records('command'))
+        self.assertEqual(len(records), 40)
+        self.assertEqual([r['timestamp'] for r in records], list(range(40)))
+        self.assertEqual(records[0]['payload'], {'foo': ['bar']})
+
 
 @unittest.skipIf(sqlite3 is None,
                  "sqlite3 not supported in this python")
@@ -0,0 +1,47 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import time
+
+from awscli.customizations.history.db import DatabaseConnection
+from awscli.customizations.history.db import DatabaseRecordWriter
+from awscli.testutils import create_clidriver
+from tests.functional.history import BaseHistoryCommandParamsTest
+
+
+class TestPruneCommand(BaseHistoryCommandParamsTest):
+    def setUp(self):
+        super(TestPruneCommand, self).setUp()
+        self.files.create_file(
+            'config', '[default]\n'
+            'cli_history = enabled\n'
+            'cli_history_retention_days = 1\n')
+        self.driver = create_clidriver()
+        self.connection = DatabaseConnection(
+            self.environ['AWS_CLI_HISTORY_FILE'])
+        self.addCleanup(self.connection.close)
+
+    def write_command(self, command_id, timestamp):
+        DatabaseRecordWriter(self.connection).write_records([
+            {'command_id': command_id, 'source': 'CLI',
+             'event_type': 'CLI_ARGUMENTS', 'payload': ['s3', 'ls'],
+             'timestamp': timestamp},
+        ])
+
+    def test_prunes_and_rebuilds_history(self):
+        now = int(time.time() * 1000)
+        self.write_command('old', now - 2 * 24 * 60 * 60 * 1000)
+        self.write_command('new', now)
+        self.run_cmd('history prune', expected_rc=0)
+        self.assertEqual(
+            self.connection.execute('SELECT id FROM commands').fetchall(),
+            [('new',)])
@@ -0,0 +1,33 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import json
+
+from tests.functional.history import BaseHistoryCommandParamsTest
+
+
+class TestReplayCommand(BaseHistoryCommandParamsTest):
+    def test_replay_latest(self):
+        self.parsed_responses = [{"Regions": []}, {"Regions": []}]
+        _, _, rc = self.run_cmd('ec2 describe-regions', expected_rc=0)
+        self.history_recorder.record('CLI_RC', rc, 'CLI')
+        self.run_cmd('history replay --format json', expected_rc=0)
+        report = json.loads(self.binary_stdout.getvalue().decode('utf-8'))
+        self.assertEqual(report['Arguments'], ['ec2', 'describe-regions'])
+        self.assertEqual(report['ReturnCode'], 0)
+        self.assertEqual(report['RecordedReturnCode'], 0)
+
+    def test_replay_unknown_command(self):
+        self.parsed_responses = [{"Regions": []}]
+        self.run_cmd('ec2 describe-regions', expected_rc=0)
+        _, err, _ = self.run_cmd('history replay unknown', expected_rc=255)
+        self.assertIn('Could not find the arguments', err)
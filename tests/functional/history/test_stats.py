@@ -0,0 +1,67 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import json
+
+from tests.functional.history import BaseHistoryCommandParamsTest
+
+
+class TestStatsCommand(BaseHistoryCommandParamsTest):
+    def record_api_call(self, body=''):
+        # The API calls are recorded by botocore's own history recorder,
+        # which is not the one the tests patch, so they are recorded here.
+        self.history_recorder.record('API_CALL', {
+            'service': 'ec2', 'operation': 'DescribeRegions', 'params': {}
+        }, 'BOTOCORE')
+        self.history_recorder.record('HTTP_REQUEST', {
+            'method': 'POST', 'headers': {}, 'url': 'https://ec2',
+            'body': body, 'streaming': False
+        }, 'BOTOCORE')
+        self.history_recorder.record('HTTP_RESPONSE', {
+            'status_code': 200, 'headers': {}, 'body': b'<xml/>',
+            'streaming': False
+        }, 'BOTOCORE')
+        self.history_recorder.record('PARSED_RESPONSE', {}, 'BOTOCORE')
+
+    def test_stats_of_api_calls(self):
+        self.parsed_responses = [{"Regions": []}]
+        self.run_cmd('ec2 describe-regions', expected_rc=0)
+        self.record_api_call('Action=DescribeRegions')
+        self.record_api_call('Action=DescribeRegions')
+        self.run_cmd('history stats --format json', expected_rc=0)
+        stats = json.loads(self.binary_stdout.getvalue().decode('utf-8'))
+        self.assertEqual(stats['Commands']['Count'], 1)
+        self.assertEqual(len(stats['Operations']), 1)
+        operation = stats['Operations'][0]
+        self.assertEqual(operation['Service'], 'ec2')
+        self.assertEqual(operation['Operation'], 'DescribeRegions')
+        self.assertEqual(operation['Calls'], 2)
+        self.assertEqual(operation['Retries'], 0)
+        self.assertEqual(operation['BytesSent'], 44)
+        self.assertEqual(operation['BytesReceived'], 12)
+        self.assertIsNotNone(operation['LatencyP99Ms'])
+
+    def test_stats_table(self):
+        self.parsed_responses = [{"Regions": []}]
+        self.run_cmd('ec2 describe-regions', expected_rc=0)
+        self.record_api_call()
+        self.run_cmd('history stats', expected_rc=0)
+        output = self.binary_stdout.getvalue()
+        self.assertIn(b'Commands:', output)
+        self.assertIn(b'DescribeRegions', output)
+
+    def test_stats_without_commands_in_range(self):
+        self.parsed_responses = [{"Regions": []}]
+        self.run_cmd('ec2 describe-regions', expected_rc=0)
+        _, err, _ = self.run_cmd(
+            'history stats --until 2000-01-01T00:00:00Z', expected_rc=255)
+        self.assertIn('No commands were found', err)
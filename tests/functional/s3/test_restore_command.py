@@ -0,0 +1,139 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import mock
+
+from tests.functional.s3 import BaseS3TransferCommandTest
+
+
+class TestRestoreCommand(BaseS3TransferCommandTest):
+    prefix = 's3 restore'
+
+    def setUp(self):
+        super(TestRestoreCommand, self).setUp()
+        self.sleep_patch = mock.patch('time.sleep')
+        self.sleep_patch.start()
+
+    def tearDown(self):
+        super(TestRestoreCommand, self).tearDown()
+        self.sleep_patch.stop()
+
+    def test_restore_single_object(self):
+        cmdline = '%s s3://bucket/key.txt --days 7' % self.prefix
+        self.parsed_responses = [
+            {'ContentLength': '100', 'LastModified': '00:00:00Z',
+             'StorageClass': 'GLACIER'},
+            {},
+        ]
+        stdout, _, _ = self.run_cmd(cmdline, expected_rc=0)
+        self.assert_operations_called(
+            [
+                ('HeadObject', {'Bucket': 'bucket', 'Key': 'key.txt'}),
+                ('RestoreObject', {
+                    'Bucket': 'bucket',
+                    'Key': 'key.txt',
+                    'RestoreRequest': {'Days': 7},
+                })
+            ]
+        )
+        self.assertIn('restore: s3://bucket/key.txt', stdout)
+
+    def test_restore_with_tier_and_request_payer(self):
+        cmdline = (
+            '%s s3://bucket/key.txt --days 1 --tier Bulk --request-payer' %
+            self.prefix)
+        self.parsed_responses = [
+            {'ContentLength': '100', 'LastModified': '00:00:00Z',
+             'StorageClass': 'GLACIER'},
+            {},
+        ]
+        self.run_cmd(cmdline, expected_rc=0)
+        self.assertEqual(
+            self.operations_called[1][1],
+            {
+                'Bucket': 'bucket',
+                'Key': 'key.txt',
+                'RestoreRequest': {
+                    'Days': 1,
+                    'GlacierJobParameters': {'Tier': 'Bulk'}
+                },
+                'RequestPayer': 'requester',
+            }
+        )
+
+    def test_recursive_restore_skips_objects_not_archived(self):
+        cmdline = '%s s3://bucket/ --recursive --days 7' % self.prefix
+        self.parsed_responses = [
+            {
+                'Contents': [
+                    {'Key': 'foo.txt', 'LastModified': '00:00:00Z',
+                     'Size': 100, 'StorageClass': 'GLACIER'},
+                    {'Key': 'bar.txt', 'LastModified': '00:00:00Z',
+                     'Size': 100, 'StorageClass': 'STANDARD'},
+                ],
+                'CommonPrefixes': []
+            },
+            {},
+        ]
+        stdout, stderr, _ = self.run_cmd(cmdline, expected_rc=0)
+        self.assert_operations_called(
+            [
+                ('ListObjectsV2', {
+                    'Bucket': 'bucket', 'Prefix': '', 'EncodingType': 'url'}),
+                ('RestoreObject', {
+                    'Bucket': 'bucket',
+                    'Key': 'foo.txt',
+                    'RestoreRequest': {'Days': 7},
+                })
+            ]
+        )
+        self.assertIn('restore: s3://bucket/foo.txt', stdout)
+        self.assertNotIn('bar.txt', stdout + stderr)
+
+    def test_warns_for_single_object_not_archived(self):
+        cmdline = '%s s3://bucket/key.txt --days 7' % self.prefix
+        self.parsed_responses = [
+            {'ContentLength': '100', 'LastModified': '00:00:00Z'},
+        ]
+        _, stderr, _ = self.run_cmd(cmdline, expected_rc=2)
+        self.assertEqual(len(self.operations_called), 1)
+        self.assertIn('Only archived objects can be restored', stderr)
+
+    def test_wait_for_restore(self):
+        cmdline = '%s s3://bucket/key.txt --days 7 --wait' % self.prefix
+        self.parsed_responses = [
+            {'ContentLength': '100', 'LastModified': '00:00:00Z',
+             'StorageClass': 'GLACIER'},
+            {},
+            {'ContentLength': '100', 'LastModified': '00:00:00Z',
+             'StorageClass': 'GLACIER',
+             'Restore': 'ongoing-request="true"'},
+            {'ContentLength': '100', 'LastModified': '00:00:00Z',
+             'StorageClass': 'GLACIER',
+             'Restore': 'ongoing-request="false", expiry-date="..."'},
+        ]
+        stdout, _, _ = self.run_cmd(cmdline, expected_rc=0)
+        self.assertEqual(
+            [op[0].name for op in self.operations_called],
+            ['HeadObject', 'RestoreObject', 'HeadObject', 'HeadObject']
+        )
+        self.assertIn('restore: s3://bucket/key.txt', stdout)
+
+    def test_dryrun(self):
+        cmdline = '%s s3://bucket/key.txt --days 7 --dryrun' % self.prefix
+        self.parsed_responses = [
+            {'ContentLength': '100', 'LastModified': '00:00:00Z',
+             'StorageClass': 'GLACIER'},
+        ]
+        stdout, _, _ = self.run_cmd(cmdline, expected_rc=0)
+        self.assertEqual(len(self.operations_called), 1)
+        self.assertIn('(dryrun) restore: s3://bucket/key.txt', stdout)
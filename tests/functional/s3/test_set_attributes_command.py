@@ -0,0 +1,198 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+from tests.functional.s3 import BaseS3TransferCommandTest
+
+
+class TestSetAttributesCommand(BaseS3TransferCommandTest):
+    prefix = 's3 set-attributes'
+
+    def test_set_storage_class(self):
+        cmdline = '%s s3://bucket/key.txt --storage-class STANDARD_IA' % (
+            self.prefix)
+        self.parsed_responses = [
+            {'ContentLength': '100', 'LastModified': '00:00:00Z',
+             'ContentType': 'text/plain', 'Metadata': {'foo': 'bar'}},
+            {},
+        ]
+        stdout, _, _ = self.run_cmd(cmdline, expected_rc=0)
+        self.assert_operations_called(
+            [
+                ('HeadObject', {'Bucket': 'bucket', 'Key': 'key.txt'}),
+                ('CopyObject', {
+                    'Bucket': 'bucket',
+                    'Key': 'key.txt',
+                    'CopySource': 'bucket/key.txt',
+                    'StorageClass': 'STANDARD_IA',
+                    'ContentType': 'text/plain',
+                    'Metadata': {'foo': 'bar'},
+                    'MetadataDirective': 'REPLACE',
+                })
+            ]
+        )
+        self.assertIn('set-attributes: s3://bucket/key.txt', stdout)
+
+    def test_skips_object_with_matching_attributes(self):
+        cmdline = '%s s3://bucket/key.txt --storage-class STANDARD_IA' % (
+            self.prefix)
+        self.parsed_responses = [
+            {'ContentLength': '100', 'LastModified': '00:00:00Z',
+             'StorageClass': 'STANDARD_IA', 'Metadata': {}},
+        ]
+        stdout, _, _ = self.run_cmd(cmdline, expected_rc=0)
+        self.assertEqual(len(self.operations_called), 1)
+        self.assertEqual(self.operations_called[0][0].name, 'HeadObject')
+        self.assertEqual(stdout, '')
+
+    def test_recursive_rerun_only_lists_objects(self):
+        cmdline = (
+            '%s s3://bucket/ --recursive --storage-class STANDARD_IA' %
+            self.prefix)
+        self.parsed_responses = [
+            {
+                'Contents': [
+                    {'Key': 'foo.txt', 'LastModified': '00:00:00Z',
+                     'Size': 100, 'StorageClass': 'STANDARD_IA'},
+                    {'Key': 'bar.txt', 'LastModified': '00:00:00Z',
+                     'Size': 100, 'StorageClass': 'STANDARD_IA'},
+                ],
+                'CommonPrefixes': []
+            },
+        ]
+        self.run_cmd(cmdline, expected_rc=0)
+        self.assertEqual(len(self.operations_called), 1)
+        self.assertEqual(self.operations_called[0][0].name, 'ListObjectsV2')
+
+    def test_recursive_set_storage_class(self):
+        cmdline = (
+            '%s s3://bucket/ --recursive --storage-class STANDARD_IA' %
+            self.prefix)
+        self.parsed_responses = [
+            {
+                'Contents': [
+                    {'Key': 'foo.txt', 'LastModified': '00:00:00Z',
+                     'Size': 100, 'StorageClass': 'STANDARD'},
+                    {'Key': 'bar.txt', 'LastModified': '00:00:00Z',
+                     'Size': 100, 'StorageClass': 'STANDARD_IA'},
+                ],
+                'CommonPrefixes': []
+            },
+            {'ContentLength': '100', 'LastModified': '00:00:00Z',
+             'Metadata': {}},
+            {},
+        ]
+        stdout, _, _ = self.run_cmd(cmdline, expected_rc=0)
+        self.assert_operations_called(
+            [
+                ('ListObjectsV2', {
+                    'Bucket': 'bucket', 'Prefix': '', 'EncodingType': 'url'}),
+                ('HeadObject', {'Bucket': 'bucket', 'Key': 'foo.txt'}),
+                ('CopyObject', {
+                    'Bucket': 'bucket',
+                    'Key': 'foo.txt',
+                    'CopySource': 'bucket/foo.txt',
+                    'StorageClass': 'STANDARD_IA',
+                    'MetadataDirective': 'REPLACE',
+                })
+            ]
+        )
+        self.assertIn('set-attributes: s3://bucket/foo.txt', stdout)
+        self.assertNotIn('bar.txt', stdout)
+
+    def test_set_metadata_keeps_other_attributes(self):
+        cmdline = '%s s3://bucket/key.txt --metadata foo=baz' % self.prefix
+        self.parsed_responses = [
+            {'ContentLength': '100', 'LastModified': '00:00:00Z',
+             'StorageClass': 'STANDARD_IA', 'CacheControl': 'no-cache',
+             'Metadata': {'foo': 'bar'}},
+            {},
+        ]
+        self.run_cmd(cmdline, expected_rc=0)
+        self.assertEqual(self.operations_called[1][0].name, 'CopyObject')
+        self.assertEqual(
+            self.operations_called[1][1],
+            {
+                'Bucket': 'bucket',
+                'Key': 'key.txt',
+                'CopySource': 'bucket/key.txt',
+                'StorageClass': 'STANDARD_IA',
+                'CacheControl': 'no-cache',
+                'Metadata': {'foo': 'baz'},
+                'MetadataDirective': 'REPLACE',
+            }
+        )
+
+    def test_dryrun(self):
+        cmdline = (
+            '%s s3://bucket/key.txt --storage-class STANDARD_IA --dryrun' %
+            self.prefix)
+        self.parsed_responses = [
+            {'ContentLength': '100', 'LastModified': '00:00:00Z',
+             'Metadata': {}},
+        ]
+        stdout, _, _ = self.run_cmd(cmdline, expected_rc=0)
+        self.assertEqual(len(self.operations_called), 1)
+        self.assertIn('(dryrun) set-attributes: s3://bucket/key.txt', stdout)
+
+    def test_skips_glacier_objects(self):
+        cmdline = (
+            '%s s3://bucket/ --recursive --storage-class STANDARD_IA' %
+            self.prefix)
+        self.parsed_responses = [
+            {
+                'Contents': [
+                    {'Key': 'foo.txt', 'LastModified': '00:00:00Z',
+                     'Size': 100, 'StorageClass': 'GLACIER'},
+                ],
+                'CommonPrefixes': []
+            },
+        ]
+        _, stderr, _ = self.run_cmd(cmdline, expected_rc=2)
+        self.assertEqual(len(self.operations_called), 1)
+        self.assertIn('GLACIER', stderr)
+
+    def test_warns_that_acl_is_reset(self):
+        cmdline = '%s s3://bucket/key.txt --storage-class STANDARD_IA' % (
+            self.prefix)
+        self.parsed_responses = [
+            {'ContentLength': '100', 'LastModified': '00:00:00Z',
+             'Metadata': {}},
+            {},
+        ]
+        _, stderr, _ = self.run_cmd(cmdline, expected_rc=0)
+        self.assertIn('reset to private', stderr)
+
+    def test_does_not_warn_about_acl_when_acl_is_given(self):
+        cmdline = (
+            '%s s3://bucket/key.txt --storage-class STANDARD_IA '
+            '--acl bucket-owner-full-control' % self.prefix)
+        self.parsed_responses = [
+            {'ContentLength': '100', 'LastModified': '00:00:00Z',
+             'Metadata': {}},
+            {},
+        ]
+        _, stderr, _ = self.run_cmd(cmdline, expected_rc=0)
+        self.assertNotIn('reset to private', stderr)
+        self.assertEqual(
+            self.operations_called[1][1]['ACL'],
+            'bucket-owner-full-control')
+
+    def test_requires_an_attribute(self):
+        cmdline = '%s s3://bucket/key.txt' % self.prefix
+        _, stderr, _ = self.run_cmd(cmdline, expected_rc=255)
+        self.assertIn('At least one attribute', stderr)
+        self.assertEqual(len(self.operations_called), 0)
+
+    def test_rejects_local_path(self):
+        cmdline = '%s foo.txt --storage-class STANDARD_IA' % self.prefix
+        _, stderr, _ = self.run_cmd(cmdline, expected_rc=255)
+        self.assertIn('Invalid argument type', stderr)
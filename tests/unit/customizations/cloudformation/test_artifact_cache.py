@@ -0,0 +1,107 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import os
+import shutil
+import time
+
+from mock import patch, Mock
+
+from awscli.testutils import unittest, FileCreator
+from awscli.customizations.cloudformation.artifact_cache import \
+    ArtifactCache
+
+
+class TestArtifactCache(unittest.TestCase):
+
+    def setUp(self):
+        self.file_creator = FileCreator()
+        self.folder = os.path.join(self.file_creator.rootdir, "folder")
+        self.file_creator.create_file(
+            os.path.join("folder", "index.js"), "contents")
+        self.file_creator.create_file(
+            os.path.join("folder", "lib", "util.js"), "more contents")
+        self.cache_dir = os.path.join(self.file_creator.rootdir, "cache")
+        self.artifact_cache = ArtifactCache(self.cache_dir)
+        self.url = "s3://bucket/prefix/abc"
+
+    def tearDown(self):
+        self.file_creator.remove_all()
+
+    def store(self, folder=None, bucket="bucket", prefix="prefix"):
+        entry = self.artifact_cache.lookup(
+            folder or self.folder, bucket, prefix)
+        entry.store(self.url)
+
+    def lookup(self, folder=None, bucket="bucket", prefix="prefix"):
+        return self.artifact_cache.lookup(
+            folder or self.folder, bucket, prefix).url
+
+    def test_miss(self):
+        self.assertIsNone(self.lookup())
+
+    def test_hit(self):
+        self.store()
+        self.assertEqual(self.lookup(), self.url)
+
+    def test_hit_with_new_cache_instance(self):
+        self.store()
+        self.artifact_cache = ArtifactCache(self.cache_dir)
+        self.assertEqual(self.lookup(), self.url)
+
+    def test_stat_hit_does_not_read_files(self):
+        self.store()
+        with patch.object(self.artifact_cache, "get_content_key") as mock:
+            self.assertEqual(self.lookup(), self.url)
+            self.assertFalse(mock.called)
+
+    def test_hit_on_contents_when_modification_time_changes(self):
+        self.store()
+        path = os.path.join(self.folder, "index.js")
+        os.utime(path, (time.time() - 3600, time.time() - 3600))
+        self.assertEqual(self.lookup(), self.url)
+        # The new modification time is now cached as well.
+        with patch.object(self.artifact_cache, "get_content_key") as mock:
+            self.assertEqual(self.lookup(), self.url)
+            self.assertFalse(mock.called)
+
+    def test_hit_on_contents_of_copied_folder(self):
+        self.store()
+        copied_folder = os.path.join(self.file_creator.rootdir, "copy")
+        shutil.copytree(self.folder, copied_folder)
+        self.assertEqual(self.lookup(copied_folder), self.url)
+
+    def test_miss_when_contents_change(self):
+        self.store()
+        self.file_creator.create_file(
+            os.path.join("folder", "index.js"), "new contents!")
+        self.assertIsNone(self.lookup())
+
+    def test_miss_when_file_added(self):
+        self.store()
+        self.file_creator.create_file(
+            os.path.join("folder", "new.js"), "")
+        self.assertIsNone(self.lookup())
+
+    def test_miss_for_different_location(self):
+        self.store()
+        self.assertIsNone(self.lookup(bucket="other-bucket"))
+        self.assertIsNone(self.lookup(prefix="other-prefix"))
+        self.assertIsNone(self.lookup(prefix=None))
+
+    def test_ignores_cache_write_errors(self):
+        cache = Mock()
+        cache.__getitem__ = Mock(side_effect=KeyError)
+        cache.__setitem__ = Mock(side_effect=IOError)
+        self.artifact_cache = ArtifactCache(cache=cache)
+        self.store()
+        self.assertIsNone(self.lookup())
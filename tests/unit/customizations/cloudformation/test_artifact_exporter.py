@@ -1,9 +1,11 @@
+import copy
 import mock
 import botocore.session
 import tempfile
 import os
 import string
 import random
+import threading
 import zipfile
 
 from nose.tools import assert_true, assert_false, assert_equal
@@ -14,12 +16,14 @@ from awscli.testutils import unittest, FileCreator
 from awscli.customizations.cloudformation import exceptions
 from awscli.customizations.cloudformation.artifact_exporter \
     import is_s3_url, parse_s3_url, is_local_file, is_local_folder, \
-    upload_local_artifacts, zip_folder, make_abs_path, make_zip, \
-    Template, Resource, ResourceWithS3UrlDict, ServerlessApiResource, \
+    upload_local_artifacts, zip_folder, zip_and_upload, make_abs_path, \
+    make_zip, Template, Resource, ResourceWithS3UrlDict, ServerlessApiResource, \
     ServerlessFunctionResource, GraphQLSchemaResource, \
     LambdaFunctionResource, ApiGatewayRestApiResource, \
     ElasticBeanstalkApplicationVersion, CloudFormationStackResource, \
-    copy_to_temp_dir, include_transform_export_handler, GLOBAL_EXPORT_DICT
+    copy_to_temp_dir, include_transform_export_handler, GLOBAL_EXPORT_DICT, \
+    ExportJobGraph, TemplateParseCache, template_parse_cache, parse_template
+from awscli.customizations.cloudformation.yamlhelper import yaml_parse
 
 
 def test_is_s3_url():
@@ -360,6 +364,77 @@ class TestArtifactExporter(unittest.TestCase):
 
         make_zip_mock.assert_called_once_with(mock.ANY, dirname)
 
+    @patch("awscli.customizations.cloudformation.artifact_exporter.zip_folder")
+    def test_zip_and_upload_without_artifact_cache(self, zip_folder_mock):
+        zip_folder_mock.return_value.__enter__.return_value = "name.zip"
+        self.s3_uploader_mock.artifact_cache = None
+        self.s3_uploader_mock.upload_with_dedup.return_value = "s3://foo/bar"
+
+        self.assertEqual(
+            zip_and_upload("/path/to/folder", self.s3_uploader_mock),
+            "s3://foo/bar")
+        self.s3_uploader_mock.upload_with_dedup.assert_called_once_with(
+            "name.zip")
+
+    @patch("awscli.customizations.cloudformation.artifact_exporter.zip_folder")
+    def test_zip_and_upload_artifact_cache_hit(self, zip_folder_mock):
+        self.s3_uploader_mock.force_upload = False
+        self.s3_uploader_mock.bucket_name = "foo"
+        self.s3_uploader_mock.prefix = "prefix"
+        self.s3_uploader_mock.file_exists.return_value = True
+        cache_entry = self.s3_uploader_mock.artifact_cache.lookup.return_value
+        cache_entry.url = "s3://foo/prefix/bar"
+
+        self.assertEqual(
+            zip_and_upload("/path/to/folder", self.s3_uploader_mock),
+            "s3://foo/prefix/bar")
+        self.s3_uploader_mock.artifact_cache.lookup.assert_called_once_with(
+            "/path/to/folder", "foo", "prefix")
+        self.s3_uploader_mock.file_exists.assert_called_once_with(
+            "prefix/bar")
+        zip_folder_mock.assert_not_called()
+        self.s3_uploader_mock.upload_with_dedup.assert_not_called()
+
+    @patch("awscli.customizations.cloudformation.artifact_exporter.zip_folder")
+    def test_zip_and_upload_artifact_cache_miss(self, zip_folder_mock):
+        zip_folder_mock.return_value.__enter__.return_value = "name.zip"
+        self.s3_uploader_mock.force_upload = False
+        self.s3_uploader_mock.upload_with_dedup.return_value = "s3://foo/bar"
+        cache_entry = self.s3_uploader_mock.artifact_cache.lookup.return_value
+        cache_entry.url = None
+
+        self.assertEqual(
+            zip_and_upload("/path/to/folder", self.s3_uploader_mock),
+            "s3://foo/bar")
+        self.s3_uploader_mock.upload_with_dedup.assert_called_once_with(
+            "name.zip")
+        cache_entry.store.assert_called_once_with("s3://foo/bar")
+
+    @patch("awscli.customizations.cloudformation.artifact_exporter.zip_folder")
+    def test_zip_and_upload_cached_object_was_deleted(self, zip_folder_mock):
+        zip_folder_mock.return_value.__enter__.return_value = "name.zip"
+        self.s3_uploader_mock.force_upload = False
+        self.s3_uploader_mock.file_exists.return_value = False
+        self.s3_uploader_mock.upload_with_dedup.return_value = "s3://foo/baz"
+        cache_entry = self.s3_uploader_mock.artifact_cache.lookup.return_value
+        cache_entry.url = "s3://foo/bar"
+
+        self.assertEqual(
+            zip_and_upload("/path/to/folder", self.s3_uploader_mock),
+            "s3://foo/baz")
+        cache_entry.store.assert_called_once_with("s3://foo/baz")
+
+    @patch("awscli.customizations.cloudformation.artifact_exporter.zip_folder")
+    def test_zip_and_upload_force_upload_skips_cache(self, zip_folder_mock):
+        zip_folder_mock.return_value.__enter__.return_value = "name.zip"
+        self.s3_uploader_mock.force_upload = True
+        self.s3_uploader_mock.upload_with_dedup.return_value = "s3://foo/bar"
+
+        zip_and_upload("/path/to/folder", self.s3_uploader_mock)
+        self.s3_uploader_mock.artifact_cache.lookup.assert_not_called()
+        self.s3_uploader_mock.upload_with_dedup.assert_called_once_with(
+            "name.zip")
+
     @patch("awscli.customizations.cloudformation.artifact_exporter.upload_local_artifacts")
     def test_resource(self, upload_local_artifacts_mock):
         # Property value is a path to file
@@ -858,6 +933,108 @@ class TestArtifactExporter(unittest.TestCase):
         self.assertEquals(handler_output, {"Name": "AWS::OtherTransform", "Parameters": {"Location": "foo.yaml"}})
 
 
+    def test_template_export_nested_stacks(self):
+        file_creator = FileCreator()
+        self.addCleanup(file_creator.remove_all)
+        function_template = (
+            "Resources:\n"
+            "  Function:\n"
+            "    Type: AWS::Lambda::Function\n"
+            "    Properties:\n"
+            "      Code: {0}\n")
+        file_creator.create_file(os.path.join("one", "index.js"), "one")
+        file_creator.create_file(os.path.join("two", "index.js"), "two")
+        file_creator.create_file(
+            "child-one.yaml", function_template.format("one"))
+        file_creator.create_file(
+            "child-two.yaml", function_template.format("two"))
+        template_path = file_creator.create_file(
+            "parent.yaml",
+            "Resources:\n"
+            "  StackOne:\n"
+            "    Type: AWS::CloudFormation::Stack\n"
+            "    Properties:\n"
+            "      TemplateURL: child-one.yaml\n"
+            "  StackTwo:\n"
+            "    Type: AWS::CloudFormation::Stack\n"
+            "    Properties:\n"
+            "      TemplateURL: child-two.yaml\n")
+
+        uploaded_templates = []
+        lock = threading.Lock()
+
+        def upload_with_dedup(filename, extension=None):
+            with lock:
+                if extension == "template":
+                    with open(filename) as f:
+                        uploaded_templates.append(f.read())
+                    return "s3://bucket/template%d" % len(uploaded_templates)
+                with zipfile.ZipFile(filename) as zf:
+                    return "s3://bucket/" + zf.read("index.js").decode("utf-8")
+
+        self.s3_uploader_mock.artifact_cache = None
+        self.s3_uploader_mock.upload_with_dedup.side_effect = \
+            upload_with_dedup
+        self.s3_uploader_mock.to_path_style_s3_url.side_effect = \
+            lambda key, version=None: "https://s3.amazonaws.com/bucket/" + key
+
+        exported_template = Template(
+            template_path, os.getcwd(), self.s3_uploader_mock).export()
+
+        self.assertEqual(
+            sorted(yaml_parse(template)["Resources"]["Function"]
+                   ["Properties"]["Code"]["S3Key"]
+                   for template in uploaded_templates),
+            ["one", "two"])
+        resources = exported_template["Resources"]
+        self.assertEqual(
+            sorted([resources["StackOne"]["Properties"]["TemplateURL"],
+                    resources["StackTwo"]["Properties"]["TemplateURL"]]),
+            ["https://s3.amazonaws.com/bucket/template1",
+             "https://s3.amazonaws.com/bucket/template2"])
+
+    @patch("awscli.customizations.cloudformation.artifact_exporter.yaml_parse")
+    def test_template_export_parses_nested_template_once(
+            self, yaml_parse_mock):
+        file_creator = FileCreator()
+        self.addCleanup(file_creator.remove_all)
+        file_creator.create_file("child.yaml", "child")
+        template_path = file_creator.create_file("parent.yaml", "parent")
+        stack = {"Type": "AWS::CloudFormation::Stack",
+                 "Properties": {"TemplateURL": "child.yaml"}}
+        templates = {
+            "parent": {"Resources": {"StackOne": stack, "StackTwo": stack}},
+            "child": {"Resources": {}},
+        }
+        yaml_parse_mock.side_effect = lambda template_str: \
+            copy.deepcopy(templates[template_str])
+        self.s3_uploader_mock.upload_with_dedup.return_value = \
+            "s3://bucket/template"
+        self.s3_uploader_mock.to_path_style_s3_url.return_value = \
+            "https://s3.amazonaws.com/bucket/template"
+
+        Template(template_path, os.getcwd(), self.s3_uploader_mock).export()
+
+        self.assertEqual(yaml_parse_mock.call_args_list,
+                         [mock.call("parent"), mock.call("child")])
+        self.assertEqual(
+            self.s3_uploader_mock.upload_with_dedup.call_count, 2)
+
+    def test_template_export_nested_stack_fails(self):
+        file_creator = FileCreator()
+        self.addCleanup(file_creator.remove_all)
+        template_path = file_creator.create_file(
+            "parent.yaml",
+            "Resources:\n"
+            "  Stack:\n"
+            "    Type: AWS::CloudFormation::Stack\n"
+            "    Properties:\n"
+            "      TemplateURL: missing.yaml\n")
+
+        with self.assertRaises(exceptions.ExportFailedError):
+            Template(template_path, os.getcwd(), self.s3_uploader_mock).export()
+        self.s3_uploader_mock.upload_with_dedup.assert_not_called()
+
     def test_template_export_path_be_folder(self):
 
         template_path = "/path/foo"
@@ -938,3 +1115,79 @@ class TestArtifactExporter(unittest.TestCase):
             Timeout: 20
             Runtime: nodejs4.3
         """
+
+
+class TestExportJobGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.job_graph = ExportJobGraph(max_workers=4)
+        self.completed = []
+        self.lock = threading.Lock()
+
+    def add_job(self, name, dependencies=None, error=None):
+        def job():
+            if error is not None:
+                raise error
+            with self.lock:
+                self.completed.append(name)
+        return self.job_graph.add_job(job, dependencies)
+
+    def test_runs_all_jobs(self):
+        for i in range(10):
+            self.add_job(i)
+        self.job_graph.run()
+        self.assertEqual(sorted(self.completed), list(range(10)))
+
+    def test_runs_jobs_after_dependencies(self):
+        first = self.add_job("first")
+        second = self.add_job("second")
+        third = self.add_job("third", [first, second])
+        self.add_job("fourth", [third])
+        self.job_graph.run()
+        self.assertEqual(sorted(self.completed[:2]), ["first", "second"])
+        self.assertEqual(self.completed[2:], ["third", "fourth"])
+
+    def test_no_jobs(self):
+        self.job_graph.run()
+        self.assertEqual(self.completed, [])
+
+    def test_raises_error_of_first_failed_job(self):
+        first_error = ValueError("first")
+        failed = self.add_job("failed", error=first_error)
+        self.add_job("other", error=ValueError("second"))
+        self.add_job("dependent", [failed])
+        with self.assertRaises(ValueError) as context:
+            self.job_graph.run()
+        self.assertIs(context.exception, first_error)
+        self.assertNotIn("dependent", self.completed)
+
+
+class TestTemplateParseCache(unittest.TestCase):
+
+    def test_parses_same_template_once(self):
+        cache = TemplateParseCache()
+        first = cache.parse("Resources:\n  Key: !Ref Value\n")
+        with patch("awscli.customizations.cloudformation."
+                   "artifact_exporter.yaml_parse") as yaml_parse_mock:
+            second = cache.parse("Resources:\n  Key: !Ref Value\n")
+            self.assertFalse(yaml_parse_mock.called)
+        self.assertEqual(first, {"Resources": {"Key": {"Ref": "Value"}}})
+        self.assertEqual(first, second)
+
+    def test_returns_copies(self):
+        cache = TemplateParseCache()
+        first = cache.parse("Resources: {}")
+        first["Resources"]["Key"] = "Value"
+        self.assertEqual(cache.parse("Resources: {}"), {"Resources": {}})
+
+    def test_parse_template_uses_active_cache(self):
+        with patch("awscli.customizations.cloudformation."
+                   "artifact_exporter.yaml_parse") as yaml_parse_mock:
+            yaml_parse_mock.return_value = {}
+            with template_parse_cache():
+                parse_template("template")
+                with template_parse_cache():
+                    parse_template("template")
+            self.assertEqual(yaml_parse_mock.call_count, 1)
+            parse_template("template")
+            self.assertEqual(yaml_parse_mock.call_count, 2)
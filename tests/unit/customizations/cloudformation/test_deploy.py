@@ -58,6 +58,7 @@ class TestDeployCommand(unittest.TestCase):
                                     role_arn=None,
                                     notification_arns=[],
                                     fail_on_empty_changeset=True,
+                                    skip_unchanged=False,
                                     s3_bucket=None,
                                     s3_prefix="some prefix",
                                     kms_key_id="some kms key id",
@@ -121,7 +122,8 @@ class TestDeployCommand(unittest.TestCase):
                     [],
                     None,
                     fake_tags,
-                    True
+                    True,
+                    False
                 )
 
                 self.deploy_command.parse_key_value_arg.assert_has_calls([
@@ -207,7 +209,8 @@ class TestDeployCommand(unittest.TestCase):
                 [],
                 s3UploaderObject,
                 [{"Key": "tagkey1", "Value": "tagvalue1"}],
-                True
+                True,
+                False
             )
 
             s3UploaderMock.assert_called_once_with(mock.ANY,
@@ -366,6 +369,47 @@ class TestDeployCommand(unittest.TestCase):
             fail_on_empty_changeset=False
         )
 
+    def test_deploy_skips_unchanged_stack(self):
+        stack_name = "stack_name"
+        parameters = ["a", "b"]
+        template = "cloudformation template"
+        capabilities = ["foo", "bar"]
+        self.deployer.is_stack_unchanged = Mock(return_value=True)
+
+        rc = self.deploy_command.deploy(
+            self.deployer, stack_name, template, parameters, capabilities,
+            True, None, None, s3_uploader=None, tags=[],
+            fail_on_empty_changeset=False, skip_unchanged=True)
+
+        self.assertEqual(rc, 0)
+        self.deployer.is_stack_unchanged.assert_called_once_with(
+            stack_name=stack_name, cfn_template=template,
+            parameter_values=parameters, capabilities=capabilities,
+            role_arn=None, notification_arns=None, tags=[])
+        self.deployer.create_and_wait_for_changeset.assert_not_called()
+        self.deployer.execute_changeset.assert_not_called()
+
+    def test_deploy_skip_unchanged_raises_exception(self):
+        self.deployer.is_stack_unchanged = Mock(return_value=True)
+        with self.assertRaises(exceptions.ChangeEmptyError):
+            self.deploy_command.deploy(
+                self.deployer, "stack_name", "template", [], [],
+                True, None, None, s3_uploader=None, tags=[],
+                skip_unchanged=True)
+        self.deployer.create_and_wait_for_changeset.assert_not_called()
+
+    def test_deploy_skip_unchanged_deploys_changed_stack(self):
+        self.deployer.is_stack_unchanged = Mock(return_value=False)
+        self.deployer.create_and_wait_for_changeset.return_value = \
+            ChangeSetResult("changeset", "UPDATE")
+        rc = self.deploy_command.deploy(
+            self.deployer, "stack_name", "template", [], [],
+            True, None, None, s3_uploader=None, tags=[],
+            skip_unchanged=True)
+        self.assertEqual(rc, 0)
+        self.deployer.execute_changeset.assert_called_once_with(
+            "changeset", "stack_name")
+
     def test_parse_key_value_arg_success(self):
         """
         Tests that we can parse parameter arguments provided in proper format
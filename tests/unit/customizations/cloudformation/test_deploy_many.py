@@ -0,0 +1,290 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import collections
+import threading
+
+import mock
+
+from awscli.compat import six
+from awscli.testutils import unittest, FileCreator
+from awscli.customizations.cloudformation import exceptions
+from awscli.customizations.cloudformation.deploy_many import \
+    DeployManyCommand, DeploymentScheduler, PrefixedWriter, DeployResult
+from awscli.customizations.cloudformation.stack_manifest import ManifestStack
+
+
+ChangeSetResult = collections.namedtuple(
+    "ChangeSetResult", ["changeset_id", "changeset_type"])
+
+
+class TestPrefixedWriter(unittest.TestCase):
+    def test_writes_prefixed_lines(self):
+        outfile = six.StringIO()
+        writer = PrefixedWriter("stack", outfile, threading.Lock())
+        writer.write("first line\nsecond ")
+        self.assertEqual(outfile.getvalue(), "[stack] first line\n")
+        writer.write("line\n\n")
+        self.assertEqual(outfile.getvalue(),
+                         "[stack] first line\n[stack] second line\n")
+
+
+class TestDeploymentScheduler(unittest.TestCase):
+    def setUp(self):
+        self.deployed = []
+        self.lock = threading.Lock()
+        self.failing = set()
+
+    def deploy_func(self, stack_name):
+        with self.lock:
+            self.deployed.append(stack_name)
+        if stack_name in self.failing:
+            return DeployResult("FAILED", "error")
+        return DeployResult("UPDATED", None)
+
+    def run_scheduler(self, dependencies, max_concurrency=4):
+        scheduler = DeploymentScheduler(max_concurrency)
+        return scheduler.run(
+            sorted(dependencies), dependencies, self.deploy_func)
+
+    def test_deploys_after_dependencies(self):
+        dependencies = {
+            "a": set(),
+            "b": set(["a"]),
+            "c": set(["a"]),
+            "d": set(["b", "c"]),
+        }
+        results = self.run_scheduler(dependencies)
+        self.assertEqual(
+            dict((name, result.status) for name, result in results.items()),
+            {"a": "UPDATED", "b": "UPDATED", "c": "UPDATED",
+             "d": "UPDATED"})
+        self.assertEqual(self.deployed[0], "a")
+        self.assertEqual(sorted(self.deployed[1:3]), ["b", "c"])
+        self.assertEqual(self.deployed[3], "d")
+
+    def test_deploys_independent_stacks_concurrently(self):
+        barrier = threading.Event()
+        started = []
+
+        def deploy_func(stack_name):
+            started.append(stack_name)
+            if len(started) == 3:
+                barrier.set()
+            # Only completes if all stacks are deployed at the same time
+            self.assertTrue(barrier.wait(5))
+            return DeployResult("UPDATED", None)
+
+        scheduler = DeploymentScheduler(3)
+        results = scheduler.run(
+            ["a", "b", "c"], {"a": set(), "b": set(), "c": set()},
+            deploy_func)
+        self.assertEqual(len(results), 3)
+
+    def test_skips_dependents_of_failed_stacks(self):
+        self.failing.add("a")
+        dependencies = {
+            "a": set(),
+            "b": set(["a"]),
+            "c": set(["b"]),
+            "d": set(),
+        }
+        results = self.run_scheduler(dependencies)
+        self.assertEqual(results["a"].status, "FAILED")
+        self.assertEqual(results["b"].status, "SKIPPED")
+        self.assertEqual(results["c"].status, "SKIPPED")
+        self.assertEqual(results["d"].status, "UPDATED")
+        self.assertEqual(sorted(self.deployed), ["a", "d"])
+
+
+class TestDeployManyCommand(unittest.TestCase):
+    def setUp(self):
+        self.session = mock.Mock()
+        self.command = DeployManyCommand(self.session)
+        self.file_creator = FileCreator()
+        self.template_path = self.file_creator.create_file(
+            "template.yaml",
+            "Parameters:\n"
+            "  Name: {Type: String}\n"
+            "Resources: {}\n")
+        self.client = mock.Mock()
+        self.outfile = six.StringIO()
+        self.deployers = {}
+        patcher = mock.patch(
+            "awscli.customizations.cloudformation.deploy_many.Deployer")
+        self.deployer_class = patcher.start()
+        self.deployer_class.side_effect = self.make_deployer
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.file_creator.remove_all()
+
+    def make_deployer(self, client, outfile):
+        deployer = mock.Mock()
+        deployer.create_and_wait_for_changeset.return_value = \
+            ChangeSetResult("changeset", "UPDATE")
+        deployer.is_stack_unchanged.return_value = False
+        return deployer
+
+    def make_stack(self, stack_name, **kwargs):
+        with open(self.template_path) as f:
+            template_str = f.read()
+        return ManifestStack(stack_name, self.template_path, template_str,
+                             **kwargs)
+
+    def deploy_many(self, stacks, dependencies=None, execute_changeset=True,
+                    skip_unchanged=False):
+        if dependencies is None:
+            dependencies = dict(
+                (stack.stack_name, set()) for stack in stacks)
+        return self.command.deploy_many(
+            self.client, stacks, dependencies, 2, None, execute_changeset,
+            skip_unchanged, outfile=self.outfile)
+
+    def test_deploy_many(self):
+        stack = self.make_stack(
+            "stack", parameter_overrides={"Name": "value"},
+            tags={"Team": "backend"}, capabilities=["CAPABILITY_IAM"])
+        deployer = self.make_deployer(None, None)
+        self.deployer_class.side_effect = None
+        self.deployer_class.return_value = deployer
+
+        self.assertEqual(self.deploy_many([stack]), 0)
+
+        self.deployer_class.assert_called_once_with(
+            self.client, outfile=mock.ANY)
+        deployer.create_and_wait_for_changeset.assert_called_once_with(
+            stack_name="stack",
+            cfn_template=stack.template_str,
+            parameter_values=[
+                {"ParameterKey": "Name", "ParameterValue": "value"}],
+            capabilities=["CAPABILITY_IAM"],
+            role_arn=None,
+            notification_arns=None,
+            s3_uploader=None,
+            tags=[{"Key": "Team", "Value": "backend"}])
+        deployer.execute_changeset.assert_called_once_with(
+            "changeset", "stack")
+        deployer.wait_for_execute.assert_called_once_with("stack", "UPDATE")
+        deployer.is_stack_unchanged.assert_not_called()
+        self.assertIn("stack: UPDATED\n", self.outfile.getvalue())
+
+    def test_deploy_many_unchanged(self):
+        deployer = self.make_deployer(None, None)
+        deployer.create_and_wait_for_changeset.side_effect = \
+            exceptions.ChangeEmptyError(stack_name="stack")
+        self.deployer_class.side_effect = None
+        self.deployer_class.return_value = deployer
+
+        self.assertEqual(self.deploy_many([self.make_stack("stack")]), 0)
+        deployer.execute_changeset.assert_not_called()
+        self.assertIn("stack: UNCHANGED\n", self.outfile.getvalue())
+
+    def test_deploy_many_skip_unchanged(self):
+        deployer = self.make_deployer(None, None)
+        deployer.is_stack_unchanged.return_value = True
+        self.deployer_class.side_effect = None
+        self.deployer_class.return_value = deployer
+
+        self.deploy_many([self.make_stack("stack")], skip_unchanged=True)
+        deployer.create_and_wait_for_changeset.assert_not_called()
+        self.assertIn("stack: UNCHANGED\n", self.outfile.getvalue())
+
+    def test_deploy_many_no_execute_changeset(self):
+        deployer = self.make_deployer(None, None)
+        self.deployer_class.side_effect = None
+        self.deployer_class.return_value = deployer
+
+        self.deploy_many([self.make_stack("stack")], execute_changeset=False)
+        deployer.execute_changeset.assert_not_called()
+        self.assertIn("[stack] Changeset created successfully.",
+                      self.outfile.getvalue())
+        self.assertIn("stack: CHANGESET_CREATED (changeset)\n",
+                      self.outfile.getvalue())
+
+    def test_deploy_many_failure(self):
+        deployer = self.make_deployer(None, None)
+        deployer.wait_for_execute.side_effect = \
+            exceptions.DeployFailedError(stack_name="first")
+        deployers = [deployer, self.make_deployer(None, None)]
+        self.deployer_class.side_effect = \
+            lambda client, outfile: deployers.pop(0)
+        stacks = [self.make_stack("first"), self.make_stack("second")]
+
+        with self.assertRaises(exceptions.DeployManyFailedError) as context:
+            self.deploy_many(stacks, {"first": set(),
+                                      "second": set(["first"])})
+        self.assertIn("first, second", str(context.exception))
+        output = self.outfile.getvalue()
+        self.assertIn("[first] Failed to create/update the stack.", output)
+        self.assertIn("first: FAILED", output)
+        self.assertIn("second: SKIPPED", output)
+
+    def test_deploy_many_failure_without_message(self):
+        deployer = self.make_deployer(None, None)
+        deployer.wait_for_execute.side_effect = KeyError()
+        deployers = [deployer, self.make_deployer(None, None)]
+        self.deployer_class.side_effect = \
+            lambda client, outfile: deployers.pop(0)
+        stacks = [self.make_stack("first"), self.make_stack("other")]
+
+        with self.assertRaises(exceptions.DeployManyFailedError):
+            self.deploy_many(stacks)
+        output = self.outfile.getvalue()
+        self.assertIn("first: FAILED (KeyError)\n", output)
+        self.assertIn("other: UPDATED\n", output)
+
+    def test_large_template_requires_bucket(self):
+        self.file_creator.create_file(
+            "template.yaml", "Resources: {}\n" + "#" * 51200)
+        with self.assertRaises(exceptions.DeployManyFailedError):
+            self.deploy_many([self.make_stack("stack")])
+        self.assertIn("stack: FAILED (Templates with a size greater",
+                      self.outfile.getvalue())
+
+    def test_run_main(self):
+        self.file_creator.create_file(
+            "manifest.yaml",
+            "Stacks:\n"
+            "  - {StackName: first, TemplateFile: template.yaml}\n"
+            "  - StackName: second\n"
+            "    TemplateFile: template.yaml\n"
+            "    DependsOn: [first]\n")
+        parsed_args = mock.Mock(
+            manifest_file=self.file_creator.full_path("manifest.yaml"),
+            max_concurrent_deployments=3, s3_bucket=None,
+            execute_changeset=True, skip_unchanged=False)
+        parsed_globals = mock.Mock(
+            region="us-east-1", endpoint_url=None, verify_ssl=None)
+        self.command.deploy_many = mock.Mock(return_value=0)
+
+        self.assertEqual(
+            self.command._run_main(parsed_args, parsed_globals), 0)
+
+        self.session.create_client.assert_called_once_with(
+            "cloudformation", region_name="us-east-1", endpoint_url=None,
+            verify=None, config=mock.ANY)
+        args = self.command.deploy_many.call_args[0]
+        self.assertEqual(
+            [stack.stack_name for stack in args[1]], ["first", "second"])
+        self.assertEqual(args[2], {"first": set(), "second": set(["first"])})
+        self.assertEqual(args[3], 3)
+
+    def test_run_main_invalid_concurrency(self):
+        self.file_creator.create_file(
+            "manifest.yaml",
+            "Stacks:\n  - {StackName: first, TemplateFile: template.yaml}\n")
+        parsed_args = mock.Mock(
+            manifest_file=self.file_creator.full_path("manifest.yaml"),
+            max_concurrent_deployments=0)
+        with self.assertRaises(ValueError):
+            self.command._run_main(parsed_args, mock.Mock())
@@ -1,3 +1,4 @@
+import datetime
 import mock
 import botocore.session
 
@@ -266,14 +267,36 @@ class TestDeployer(unittest.TestCase):
             "StackName": stack_name
         }
 
+        self.stub_client.add_response(
+            "describe_stack_events",
+            {"StackEvents": [make_event_obj("event2"),
+                             make_event_obj("event1")]},
+            {"StackName": stack_name})
         self.stub_client.add_response("execute_change_set", {}, expected_params)
         with self.stub_client:
             self.deployer.execute_changeset(changeset_id, stack_name)
+        self.assertEqual(self.deployer._last_event_ids[stack_name], "event2")
+
+    def test_execute_changeset_cannot_describe_events(self):
+        stack_name = "stack_name"
+        changeset_id = "changeset_id"
+
+        self.stub_client.add_client_error(
+            "describe_stack_events", "AccessDenied", "Access denied")
+        self.stub_client.add_response(
+            "execute_change_set", {},
+            {"ChangeSetName": changeset_id, "StackName": stack_name})
+        with self.stub_client:
+            self.deployer.execute_changeset(changeset_id, stack_name)
+        self.assertNotIn(stack_name, self.deployer._last_event_ids)
 
     def test_execute_changeset_exception(self):
         stack_name = "stack_name"
         changeset_id = "changeset_id"
 
+        self.stub_client.add_response(
+            "describe_stack_events", {"StackEvents": []},
+            {"StackName": stack_name})
         self.stub_client.add_client_error(
                 'execute_change_set', "Somethign is wrong", "Service is bad")
         with self.stub_client:
@@ -328,122 +351,206 @@ class TestDeployer(unittest.TestCase):
                     stack_name, template, parameters, capabilities, role_arn,
                     notification_arns, s3_uploader, tags)
 
-    def test_wait_for_changeset_no_changes(self):
-        stack_name = "stack_name"
-        changeset_id = "changeset-id"
-
+    def wait_for_changeset(self, response):
         mock_client = Mock()
+        mock_client.describe_change_set.return_value = response
         mock_deployer = Deployer(mock_client)
-        mock_waiter = Mock()
-        mock_client.get_waiter.return_value = mock_waiter
-
-        response = {
-            "Status": "FAILED",
-            "StatusReason": "The submitted information didn't contain changes."
-        }
+        mock_deployer.wait_for_changeset("changeset-id", "stack_name")
+        mock_client.describe_change_set.assert_called_with(
+            ChangeSetName="changeset-id", StackName="stack_name")
 
-        waiter_error = botocore.exceptions.WaiterError(name="name",
-                                                       reason="reason",
-                                                       last_response=response)
-        mock_waiter.wait.side_effect = waiter_error
+    def test_wait_for_changeset_successful(self):
+        self.wait_for_changeset({"Status": "CREATE_COMPLETE"})
 
+    def test_wait_for_changeset_no_changes(self):
         with self.assertRaises(exceptions.ChangeEmptyError):
-            mock_deployer.wait_for_changeset(changeset_id, stack_name)
-
-        waiter_config = {'Delay': 5}
-        mock_waiter.wait.assert_called_once_with(ChangeSetName=changeset_id,
-                                                 StackName=stack_name,
-                                                 WaiterConfig=waiter_config)
-
-        mock_client.get_waiter.assert_called_once_with(
-                "change_set_create_complete")
+            self.wait_for_changeset({
+                "Status": "FAILED",
+                "StatusReason":
+                    "The submitted information didn't contain changes."
+            })
 
     def test_wait_for_changeset_no_changes_with_another_error_msg(self):
-        stack_name = "stack_name"
-        changeset_id = "changeset-id"
-
-        mock_client = Mock()
-        mock_deployer = Deployer(mock_client)
-        mock_waiter = Mock()
-        mock_client.get_waiter.return_value = mock_waiter
-
-        response = {
-            "Status": "FAILED",
-            "StatusReason": "No updates are to be performed"
-        }
-
-        waiter_error = botocore.exceptions.WaiterError(name="name",
-                                                       reason="reason",
-                                                       last_response=response)
-        mock_waiter.wait.side_effect = waiter_error
-
         with self.assertRaises(exceptions.ChangeEmptyError):
-            mock_deployer.wait_for_changeset(changeset_id, stack_name)
-
-        waiter_config = {'Delay': 5}
-        mock_waiter.wait.assert_called_once_with(ChangeSetName=changeset_id,
-                                                 StackName=stack_name,
-                                                 WaiterConfig=waiter_config)
-
-        mock_client.get_waiter.assert_called_once_with(
-                "change_set_create_complete")
+            self.wait_for_changeset({
+                "Status": "FAILED",
+                "StatusReason": "No updates are to be performed"
+            })
 
     def test_wait_for_changeset_failed_to_create_changeset(self):
-        stack_name = "stack_name"
-        changeset_id = "changeset-id"
-
-        mock_client = Mock()
-        mock_deployer = Deployer(mock_client)
-        mock_waiter = Mock()
-        mock_client.get_waiter.return_value = mock_waiter
-
-        response = {
-            "Status": "FAILED",
-            "StatusReason": "some reason"
-        }
-
-        waiter_error = botocore.exceptions.WaiterError(name="name",
-                                                       reason="reason",
-                                                       last_response=response)
-        mock_waiter.wait.side_effect = waiter_error
-
         with self.assertRaises(RuntimeError):
-            mock_deployer.wait_for_changeset(changeset_id, stack_name)
-
-        waiter_config = {'Delay': 5}
-        mock_waiter.wait.assert_called_once_with(ChangeSetName=changeset_id,
-                                                 StackName=stack_name,
-                                                 WaiterConfig=waiter_config)
-
-        mock_client.get_waiter.assert_called_once_with(
-                "change_set_create_complete")
-
-    def test_wait_for_execute_no_changes(self):
-        stack_name = "stack_name"
-        changeset_type = "CREATE"
+            self.wait_for_changeset({
+                "Status": "FAILED",
+                "StatusReason": "some reason"
+            })
 
+    def wait_for_execute(self, changeset_type, stack_status,
+                         last_event_id="event1"):
         mock_client = Mock()
+        mock_client.describe_stack_events.return_value = {
+            "StackEvents": [
+                make_event_obj("event2", status=stack_status, stack=True),
+                make_event_obj("event1", status="UPDATE_COMPLETE",
+                               stack=True),
+            ]
+        }
+        mock_client.describe_stacks.return_value = {
+            "Stacks": [make_stack_obj("stack_name", stack_status)]
+        }
         mock_deployer = Deployer(mock_client)
-        mock_waiter = Mock()
-        mock_client.get_waiter.return_value = mock_waiter
-
-        waiter_error = botocore.exceptions.WaiterError(name="name",
-                                                       reason="reason",
-                                                       last_response={})
-        mock_waiter.wait.side_effect = waiter_error
-
+        if last_event_id is not None:
+            mock_deployer._last_event_ids["stack_name"] = last_event_id
+        mock_deployer.wait_for_execute("stack_name", changeset_type)
+        return mock_client
+
+    @patch("sys.stdout")
+    def test_wait_for_execute_successful(self, stdout_mock):
+        mock_client = self.wait_for_execute("CREATE", "CREATE_COMPLETE")
+        mock_client.describe_stack_events.assert_called_once_with(
+            StackName="stack_name")
+        output = "".join(
+            call[0][0] for call in stdout_mock.write.call_args_list)
+        self.assertIn("CREATE_COMPLETE", output)
+        self.assertNotIn("UPDATE_COMPLETE", output)
+
+    @patch("sys.stdout")
+    def test_wait_for_execute_no_changes(self, stdout_mock):
         with self.assertRaises(exceptions.DeployFailedError):
-            mock_deployer.wait_for_execute(stack_name, changeset_type)
+            self.wait_for_execute("CREATE", "ROLLBACK_COMPLETE")
 
-        waiter_config = {
-            'Delay': 5,
-            'MaxAttempts': 720,
-        }
-        mock_waiter.wait.assert_called_once_with(StackName=stack_name,
-                                                 WaiterConfig=waiter_config)
+    @patch("sys.stdout")
+    def test_wait_for_execute_update_rolled_back(self, stdout_mock):
+        with self.assertRaises(exceptions.DeployFailedError):
+            self.wait_for_execute("UPDATE", "UPDATE_ROLLBACK_COMPLETE")
+
+    @patch("sys.stdout")
+    def test_wait_for_execute_without_last_event(self, stdout_mock):
+        mock_client = self.wait_for_execute(
+            "UPDATE", "UPDATE_COMPLETE", last_event_id=None)
+        mock_client.describe_stacks.assert_called_once_with(
+            StackName="stack_name")
+        mock_client.describe_stack_events.assert_not_called()
+
+    @patch("sys.stdout")
+    def test_wait_for_execute_invalid_changeset_type(self, stdout_mock):
+        with self.assertRaises(RuntimeError):
+            self.wait_for_execute("DELETE", "DELETE_COMPLETE")
+
+    def stub_deployed_stack(self, stack, template_body=None):
+        self.stub_client.add_response(
+            'describe_stacks', {"Stacks": [stack]},
+            {"StackName": stack["StackName"]})
+        if template_body is not None:
+            self.stub_client.add_response(
+                'get_template', {"TemplateBody": template_body},
+                {"StackName": stack["StackName"],
+                 "TemplateStage": "Original"})
+
+    def make_deployed_stack(self, **kwargs):
+        stack = make_stack_obj("stack_name", kwargs.pop("status",
+                                                        "UPDATE_COMPLETE"))
+        stack["Parameters"] = [
+            {"ParameterKey": "Key1", "ParameterValue": "Value1"},
+            {"ParameterKey": "Key2", "ParameterValue": "Value2"},
+        ]
+        stack["Capabilities"] = ["CAPABILITY_IAM"]
+        stack["Tags"] = [{"Key": "key1", "Value": "val1"}]
+        stack.update(kwargs)
+        return stack
+
+    def is_stack_unchanged(self, template=None, parameters=None,
+                           capabilities=None, tags=None, role_arn=None,
+                           notification_arns=None):
+        if template is None:
+            template = (
+                "Parameters:\n"
+                "  Key1: {Type: String}\n"
+                "  Key2: {Type: String}\n"
+                "Resources:\n"
+                "  Topic: {Type: 'AWS::SNS::Topic'}\n")
+        if parameters is None:
+            parameters = [
+                {"ParameterKey": "Key1", "ParameterValue": "Value1"},
+                {"ParameterKey": "Key2", "UsePreviousValue": True},
+            ]
+        if capabilities is None:
+            capabilities = ["CAPABILITY_IAM"]
+        if tags is None:
+            tags = [{"Key": "key1", "Value": "val1"}]
+        with self.stub_client:
+            return self.deployer.is_stack_unchanged(
+                "stack_name", template, parameters, capabilities, role_arn,
+                notification_arns, tags)
+
+    def deployed_template_body(self):
+        return ('{"Resources": {"Topic": {"Type": "AWS::SNS::Topic"}}, '
+                '"Parameters": {"Key2": {"Type": "String"}, '
+                '"Key1": {"Type": "String"}}}')
+
+    def test_is_stack_unchanged(self):
+        self.stub_deployed_stack(
+            self.make_deployed_stack(), self.deployed_template_body())
+        self.assertTrue(self.is_stack_unchanged())
+        self.stub_client.assert_no_pending_responses()
+
+    def test_is_stack_unchanged_template_changed(self):
+        self.stub_deployed_stack(
+            self.make_deployed_stack(),
+            self.deployed_template_body().replace("SNS::Topic", "SQS::Queue"))
+        self.assertFalse(self.is_stack_unchanged())
+
+    def test_is_stack_unchanged_parameter_changed(self):
+        self.stub_deployed_stack(self.make_deployed_stack())
+        self.assertFalse(self.is_stack_unchanged(parameters=[
+            {"ParameterKey": "Key1", "ParameterValue": "NewValue"},
+            {"ParameterKey": "Key2", "UsePreviousValue": True},
+        ]))
 
-        mock_client.get_waiter.assert_called_once_with(
-                "stack_create_complete")
+    def test_is_stack_unchanged_new_parameter(self):
+        self.stub_deployed_stack(self.make_deployed_stack())
+        self.assertFalse(self.is_stack_unchanged(parameters=[
+            {"ParameterKey": "Key1", "ParameterValue": "Value1"},
+            {"ParameterKey": "Key2", "UsePreviousValue": True},
+            {"ParameterKey": "Key3", "UsePreviousValue": True},
+        ]))
+
+    def test_is_stack_unchanged_masked_parameter(self):
+        stack = self.make_deployed_stack()
+        stack["Parameters"][0]["ParameterValue"] = "****"
+        self.stub_deployed_stack(stack)
+        self.assertFalse(self.is_stack_unchanged())
+
+    def test_is_stack_unchanged_resolved_parameter(self):
+        stack = self.make_deployed_stack()
+        stack["Parameters"][1]["ResolvedValue"] = "resolved"
+        self.stub_deployed_stack(stack)
+        self.assertFalse(self.is_stack_unchanged())
+
+    def test_is_stack_unchanged_tags_changed(self):
+        self.stub_deployed_stack(self.make_deployed_stack())
+        self.assertFalse(self.is_stack_unchanged(tags=[]))
+
+    def test_is_stack_unchanged_capabilities_changed(self):
+        self.stub_deployed_stack(self.make_deployed_stack())
+        self.assertFalse(self.is_stack_unchanged(
+            capabilities=["CAPABILITY_NAMED_IAM"]))
+
+    def test_is_stack_unchanged_role_arn_changed(self):
+        self.stub_deployed_stack(self.make_deployed_stack(
+            RoleARN="arn:aws:iam::1234567890:role/old"))
+        self.assertFalse(self.is_stack_unchanged(
+            role_arn="arn:aws:iam::1234567890:role/new"))
+
+    def test_is_stack_unchanged_stack_in_progress(self):
+        self.stub_deployed_stack(
+            self.make_deployed_stack(status="UPDATE_IN_PROGRESS"))
+        self.assertFalse(self.is_stack_unchanged())
+
+    def test_is_stack_unchanged_no_stack(self):
+        self.stub_client.add_client_error(
+            'describe_stacks', service_error_code='ValidationError',
+            service_message='Stack with id stack_name does not exist')
+        self.assertFalse(self.is_stack_unchanged())
 
 
 def make_stack_obj(stack_name, status="CREATE_COMPLETE"):
@@ -453,3 +560,18 @@ def make_stack_obj(stack_name, status="CREATE_COMPLETE"):
         "CreationTime": "2013-08-23T01:02:15.422Z",
         "StackStatus": status
     }
+
+
+def make_event_obj(event_id, status="CREATE_IN_PROGRESS", stack=False):
+    stack_id = "arn:aws:cloudformation:us-east-1:123456789012:stack/stack_name"
+    return {
+        "EventId": event_id,
+        "StackId": stack_id,
+        "StackName": "stack_name",
+        "LogicalResourceId": "stack_name" if stack else "Resource",
+        "PhysicalResourceId": stack_id if stack else "resource",
+        "ResourceType": "AWS::CloudFormation::Stack" if stack else
+                        "AWS::SNS::Topic",
+        "Timestamp": datetime.datetime(2018, 1, 1),
+        "ResourceStatus": status,
+    }
@@ -0,0 +1,213 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import json
+import os
+
+from awscli.testutils import unittest, FileCreator
+from awscli.customizations.cloudformation import exceptions
+from awscli.customizations.cloudformation.stack_manifest import \
+    ManifestStack, resolve_name, load_manifest, get_stack_dependencies
+
+
+def make_stack(stack_name, template_dict=None, depends_on=None):
+    return ManifestStack(stack_name, stack_name + ".json",
+                         json.dumps(template_dict or {}),
+                         depends_on=depends_on)
+
+
+def make_exporting_stack(stack_name, export_name):
+    return make_stack(stack_name, {
+        "Outputs": {
+            "Output": {"Value": "value", "Export": {"Name": export_name}}
+        }
+    })
+
+
+def make_importing_stack(stack_name, import_name, depends_on=None):
+    return make_stack(stack_name, {
+        "Resources": {
+            "Queue": {
+                "Type": "AWS::SQS::Queue",
+                "Properties": {
+                    "QueueName": {"Fn::Join": [
+                        "-", [{"Fn::ImportValue": import_name}, "queue"]]}
+                }
+            }
+        }
+    }, depends_on)
+
+
+class TestResolveName(unittest.TestCase):
+    def test_string(self):
+        self.assertEqual(resolve_name("name", "stack"), "name")
+
+    def test_sub_stack_name(self):
+        self.assertEqual(
+            resolve_name({"Fn::Sub": "${AWS::StackName}-VpcId"}, "stack"),
+            "stack-VpcId")
+        self.assertEqual(
+            resolve_name({"Fn::Sub": ["${AWS::StackName}-VpcId", {}]},
+                         "stack"),
+            "stack-VpcId")
+
+    def test_unresolvable(self):
+        self.assertIsNone(
+            resolve_name({"Fn::Sub": "${Environment}-VpcId"}, "stack"))
+        self.assertIsNone(
+            resolve_name({"Fn::Sub": ["${Env}-VpcId", {"Env": "a"}]}, "s"))
+        self.assertIsNone(resolve_name({"Ref": "Parameter"}, "stack"))
+        self.assertIsNone(resolve_name(None, "stack"))
+
+
+class TestManifestStack(unittest.TestCase):
+    def test_get_export_names(self):
+        stack = make_stack("network", {
+            "Outputs": {
+                "Vpc": {"Value": "vpc",
+                        "Export": {"Name": {
+                            "Fn::Sub": "${AWS::StackName}-VpcId"}}},
+                "Subnet": {"Value": "subnet",
+                           "Export": {"Name": "SubnetId"}},
+                "NotExported": {"Value": "value"},
+                "Unresolvable": {"Value": "value",
+                                 "Export": {"Name": {"Ref": "Name"}}},
+            }
+        })
+        self.assertEqual(sorted(stack.get_export_names()),
+                         ["SubnetId", "network-VpcId"])
+
+    def test_get_export_names_without_outputs(self):
+        self.assertEqual(make_stack("stack").get_export_names(), [])
+
+    def test_get_import_names(self):
+        stack = make_importing_stack("queue", "SubnetId")
+        self.assertEqual(stack.get_import_names(), ["SubnetId"])
+
+
+class TestGetStackDependencies(unittest.TestCase):
+    def test_explicit_dependencies(self):
+        stacks = [make_stack("a"), make_stack("b", depends_on=["a"])]
+        self.assertEqual(get_stack_dependencies(stacks, "manifest"),
+                         {"a": set(), "b": set(["a"])})
+
+    def test_dependencies_inferred_from_imports(self):
+        stacks = [
+            make_importing_stack("app", "network-VpcId"),
+            make_exporting_stack(
+                "network", {"Fn::Sub": "${AWS::StackName}-VpcId"}),
+            make_importing_stack("external", "ExportOfAnotherStack"),
+        ]
+        self.assertEqual(
+            get_stack_dependencies(stacks, "manifest"),
+            {"app": set(["network"]), "network": set(),
+             "external": set()})
+
+    def test_unknown_dependency(self):
+        stacks = [make_stack("a", depends_on=["missing"])]
+        with self.assertRaises(exceptions.InvalidManifestError):
+            get_stack_dependencies(stacks, "manifest")
+
+    def test_cycle(self):
+        stacks = [
+            make_stack("a", depends_on=["c"]),
+            make_stack("b", depends_on=["a"]),
+            make_stack("c", depends_on=["b"]),
+            make_stack("d"),
+        ]
+        with self.assertRaises(exceptions.InvalidManifestError) as context:
+            get_stack_dependencies(stacks, "manifest")
+        self.assertIn("a, b, c", str(context.exception))
+
+
+class TestLoadManifest(unittest.TestCase):
+    def setUp(self):
+        self.file_creator = FileCreator()
+        self.file_creator.create_file("network.yaml", "Resources: {}\n")
+
+    def tearDown(self):
+        self.file_creator.remove_all()
+
+    def load(self, contents):
+        manifest_path = self.file_creator.create_file(
+            "manifest.yaml", contents)
+        return load_manifest(manifest_path)
+
+    def test_load(self):
+        stacks = self.load(
+            "Stacks:\n"
+            "  - StackName: network\n"
+            "    TemplateFile: network.yaml\n"
+            "    ParameterOverrides:\n"
+            "      Name: value\n"
+            "      Port: 80\n"
+            "    Tags:\n"
+            "      Team: backend\n"
+            "    Capabilities: [CAPABILITY_IAM]\n"
+            "    DependsOn: other\n"
+            "  - StackName: other\n"
+            "    TemplateFile: network.yaml\n")
+        self.assertEqual([stack.stack_name for stack in stacks],
+                         ["network", "other"])
+        stack = stacks[0]
+        self.assertEqual(
+            stack.template_path,
+            os.path.join(self.file_creator.rootdir, "network.yaml"))
+        self.assertEqual(stack.template_str, "Resources: {}\n")
+        self.assertEqual(stack.template_dict, {"Resources": {}})
+        self.assertEqual(stack.parameter_overrides,
+                         {"Name": "value", "Port": "80"})
+        self.assertEqual(stack.tags, {"Team": "backend"})
+        self.assertEqual(stack.capabilities, ["CAPABILITY_IAM"])
+        self.assertEqual(stack.depends_on, ["other"])
+        self.assertEqual(stacks[1].depends_on, [])
+
+    def test_missing_manifest(self):
+        with self.assertRaises(exceptions.InvalidManifestError):
+            load_manifest(os.path.join(self.file_creator.rootdir, "missing"))
+
+    def assert_invalid(self, contents):
+        with self.assertRaises(exceptions.InvalidManifestError):
+            self.load(contents)
+
+    def test_no_stacks(self):
+        self.assert_invalid("Stacks: []\n")
+        self.assert_invalid("Other: value\n")
+
+    def test_missing_template_file(self):
+        self.assert_invalid("Stacks:\n  - StackName: network\n")
+
+    def test_unknown_key(self):
+        self.assert_invalid(
+            "Stacks:\n"
+            "  - StackName: network\n"
+            "    TemplateFile: network.yaml\n"
+            "    Parameters: {}\n")
+
+    def test_duplicate_stack_name(self):
+        self.assert_invalid(
+            "Stacks:\n"
+            "  - {StackName: network, TemplateFile: network.yaml}\n"
+            "  - {StackName: network, TemplateFile: network.yaml}\n")
+
+    def test_invalid_parameter_value(self):
+        self.assert_invalid(
+            "Stacks:\n"
+            "  - StackName: network\n"
+            "    TemplateFile: network.yaml\n"
+            "    ParameterOverrides: {Enabled: true}\n")
+
+    def test_template_does_not_exist(self):
+        with self.assertRaises(exceptions.InvalidTemplatePathError):
+            self.load(
+                "Stacks:\n"
+                "  - {StackName: network, TemplateFile: missing.yaml}\n")
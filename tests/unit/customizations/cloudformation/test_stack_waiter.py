@@ -0,0 +1,232 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import datetime
+
+import mock
+from botocore.exceptions import ClientError
+
+from awscli.compat import six
+from awscli.testutils import unittest
+from awscli.customizations.cloudformation.stack_waiter import \
+    is_terminal_status, format_stack_event, AdaptiveDelay, \
+    StackEventTailer, StackWaiter, ChangeSetWaiter
+
+
+STACK_ID = "arn:aws:cloudformation:us-east-1:123456789012:stack/stack"
+
+
+def make_event(event_id, status="CREATE_IN_PROGRESS", stack=False,
+               reason=None):
+    event = {
+        "EventId": event_id,
+        "StackId": STACK_ID,
+        "StackName": "stack",
+        "LogicalResourceId": "stack" if stack else "Topic",
+        "PhysicalResourceId": STACK_ID if stack else "topic",
+        "ResourceType": "AWS::CloudFormation::Stack" if stack else
+                        "AWS::SNS::Topic",
+        "Timestamp": datetime.datetime(2018, 1, 1, 12, 30, 15),
+        "ResourceStatus": status,
+    }
+    if reason:
+        event["ResourceStatusReason"] = reason
+    return event
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+class TestStackStatus(unittest.TestCase):
+    def test_is_terminal_status(self):
+        for status in ["CREATE_COMPLETE", "UPDATE_COMPLETE",
+                       "UPDATE_ROLLBACK_COMPLETE", "ROLLBACK_FAILED",
+                       "CREATE_FAILED", "DELETE_COMPLETE"]:
+            self.assertTrue(is_terminal_status(status), status)
+        for status in ["CREATE_IN_PROGRESS",
+                       "UPDATE_COMPLETE_CLEANUP_IN_PROGRESS",
+                       "UPDATE_ROLLBACK_COMPLETE_CLEANUP_IN_PROGRESS",
+                       "REVIEW_IN_PROGRESS"]:
+            self.assertFalse(is_terminal_status(status), status)
+
+    def test_format_stack_event(self):
+        line = format_stack_event(
+            make_event("1", "CREATE_FAILED", reason="Access denied"))
+        self.assertTrue(line.startswith("2018-01-01 12:30:15  CREATE_FAILED"))
+        self.assertIn("AWS::SNS::Topic", line)
+        self.assertTrue(line.endswith("Topic  Access denied\n"))
+
+
+class TestAdaptiveDelay(unittest.TestCase):
+    def test_grows_until_max_delay(self):
+        delay = AdaptiveDelay(initial_delay=1, max_delay=3, multiplier=2)
+        self.assertEqual([delay.next() for _ in range(4)], [1, 2, 3, 3])
+
+    def test_reset(self):
+        delay = AdaptiveDelay(initial_delay=1, max_delay=3, multiplier=2)
+        delay.next()
+        delay.next()
+        delay.reset()
+        self.assertEqual(delay.next(), 1)
+
+
+class TestStackEventTailer(unittest.TestCase):
+    def setUp(self):
+        self.client = mock.Mock()
+
+    def test_get_latest_event_id(self):
+        self.client.describe_stack_events.return_value = {
+            "StackEvents": [make_event("2"), make_event("1")]}
+        tailer = StackEventTailer(self.client, "stack")
+        self.assertEqual(tailer.get_latest_event_id(), "2")
+
+    def test_get_latest_event_id_no_events(self):
+        self.client.describe_stack_events.return_value = {"StackEvents": []}
+        tailer = StackEventTailer(self.client, "stack")
+        self.assertIsNone(tailer.get_latest_event_id())
+
+    def test_returns_new_events_oldest_first(self):
+        self.client.describe_stack_events.side_effect = [
+            {"StackEvents": [make_event("3"), make_event("2"),
+                             make_event("1")]},
+            {"StackEvents": [make_event("4"), make_event("3")]},
+            {"StackEvents": [make_event("4"), make_event("3")]},
+        ]
+        tailer = StackEventTailer(self.client, "stack", "1")
+        self.assertEqual(
+            [event["EventId"] for event in tailer.poll()], ["2", "3"])
+        self.assertEqual(
+            [event["EventId"] for event in tailer.poll()], ["4"])
+        self.assertEqual(tailer.poll(), [])
+        self.assertEqual(tailer.last_event_id, "4")
+
+    def test_follows_pages_until_last_seen_event(self):
+        self.client.describe_stack_events.side_effect = [
+            {"StackEvents": [make_event("3")], "NextToken": "token"},
+            {"StackEvents": [make_event("2"), make_event("1")],
+             "NextToken": "token2"},
+        ]
+        tailer = StackEventTailer(self.client, "stack", "1")
+        self.assertEqual(
+            [event["EventId"] for event in tailer.poll()], ["2", "3"])
+        self.client.describe_stack_events.assert_called_with(
+            StackName="stack", NextToken="token")
+        self.assertEqual(self.client.describe_stack_events.call_count, 2)
+
+
+class TestStackWaiter(unittest.TestCase):
+    def setUp(self):
+        self.client = mock.Mock()
+        self.outfile = six.StringIO()
+        self.clock = FakeClock()
+        self.waiter = StackWaiter(
+            self.client, self.outfile,
+            delay=AdaptiveDelay(initial_delay=1, max_delay=4, multiplier=2),
+            timeout=20, sleep=self.clock.sleep, clock=self.clock.time)
+
+    def test_waits_for_terminal_stack_event(self):
+        self.client.describe_stack_events.side_effect = [
+            {"StackEvents": [make_event("1")]},
+            {"StackEvents": [make_event("1")]},
+            {"StackEvents": [make_event("1")]},
+            {"StackEvents": [make_event("2", "CREATE_COMPLETE"),
+                             make_event("1")]},
+            {"StackEvents": [
+                make_event("3", "UPDATE_COMPLETE", stack=True),
+                make_event("2", "CREATE_COMPLETE")]},
+        ]
+        status = self.waiter.wait("stack", "0")
+        self.assertEqual(status, "UPDATE_COMPLETE")
+        # The delay is reset when there are new events
+        self.assertEqual(self.clock.sleeps, [1, 2, 4, 1])
+        lines = self.outfile.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn("CREATE_IN_PROGRESS", lines[0])
+        self.assertIn("UPDATE_COMPLETE", lines[2])
+
+    def test_ignores_terminal_events_of_resources(self):
+        self.client.describe_stack_events.side_effect = [
+            {"StackEvents": [make_event("1", "CREATE_COMPLETE")]},
+            {"StackEvents": [make_event("2", "CREATE_COMPLETE", stack=True),
+                             make_event("1", "CREATE_COMPLETE")]},
+        ]
+        self.assertEqual(self.waiter.wait("stack", "0"), "CREATE_COMPLETE")
+        self.assertEqual(self.client.describe_stack_events.call_count, 2)
+
+    def test_times_out(self):
+        self.client.describe_stack_events.return_value = {"StackEvents": []}
+        with self.assertRaises(RuntimeError):
+            self.waiter.wait("stack", "0")
+        self.assertLessEqual(self.clock.now, 20)
+
+    def test_polls_stack_status_without_last_event(self):
+        self.client.describe_stacks.side_effect = [
+            {"Stacks": [{"StackStatus": "UPDATE_IN_PROGRESS"}]},
+            {"Stacks": [{"StackStatus": "UPDATE_ROLLBACK_COMPLETE"}]},
+        ]
+        self.assertEqual(
+            self.waiter.wait("stack"), "UPDATE_ROLLBACK_COMPLETE")
+        self.assertFalse(self.client.describe_stack_events.called)
+
+    def test_polls_stack_status_if_events_cannot_be_read(self):
+        self.client.describe_stack_events.side_effect = ClientError(
+            {"Error": {"Code": "AccessDenied", "Message": "Access denied"}},
+            "DescribeStackEvents")
+        self.client.describe_stacks.return_value = {
+            "Stacks": [{"StackStatus": "CREATE_COMPLETE"}]}
+        self.assertEqual(self.waiter.wait("stack", "0"), "CREATE_COMPLETE")
+
+
+class TestChangeSetWaiter(unittest.TestCase):
+    def setUp(self):
+        self.client = mock.Mock()
+        self.clock = FakeClock()
+        self.waiter = ChangeSetWaiter(
+            self.client,
+            delay=AdaptiveDelay(initial_delay=1, max_delay=4, multiplier=2),
+            timeout=10, sleep=self.clock.sleep, clock=self.clock.time)
+
+    def test_waits_until_created(self):
+        self.client.describe_change_set.side_effect = [
+            {"Status": "CREATE_PENDING"},
+            {"Status": "CREATE_IN_PROGRESS"},
+            {"Status": "CREATE_COMPLETE"},
+        ]
+        resp = self.waiter.wait("changeset", "stack")
+        self.assertEqual(resp["Status"], "CREATE_COMPLETE")
+        self.assertEqual(self.clock.sleeps, [1, 2])
+        self.client.describe_change_set.assert_called_with(
+            ChangeSetName="changeset", StackName="stack")
+
+    def test_returns_failed_status(self):
+        self.client.describe_change_set.return_value = {
+            "Status": "FAILED", "StatusReason": "reason"}
+        resp = self.waiter.wait("changeset", "stack")
+        self.assertEqual(resp["Status"], "FAILED")
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_returns_pending_status_on_timeout(self):
+        self.client.describe_change_set.return_value = {
+            "Status": "CREATE_IN_PROGRESS"}
+        resp = self.waiter.wait("changeset", "stack")
+        self.assertEqual(resp["Status"], "CREATE_IN_PROGRESS")
+        self.assertLessEqual(self.clock.now, 10)
@@ -12,11 +12,14 @@
 # language governing permissions and limitations under the License.
 import mock
 import tempfile
+import yaml
 from mock import patch, Mock, MagicMock
 
 from awscli.testutils import unittest
 from awscli.customizations.cloudformation.deployer import Deployer
 from awscli.customizations.cloudformation.yamlhelper import yaml_parse, yaml_dump
+from awscli.customizations.cloudformation.yamlhelper import \
+    intrinsics_multi_constructor
 
 
 class TestYaml(unittest.TestCase):
@@ -93,3 +96,39 @@ class TestYaml(unittest.TestCase):
         output = yaml_parse(template)
         self.assertEqual(output, {'foo': 'bar'})
 
+
+    def test_does_not_change_global_safe_loader(self):
+        yaml_parse(self.yaml_with_tags)
+        with self.assertRaises(yaml.constructor.ConstructorError):
+            yaml.safe_load("Key: !Ref Something")
+
+    def test_parse_matches_pure_python_loader(self):
+        class PythonLoader(yaml.SafeLoader):
+            pass
+        PythonLoader.add_multi_constructor("!", intrinsics_multi_constructor)
+
+        template = yaml_dump({
+            "Resources": {
+                "Function%d" % i: {
+                    "Type": "AWS::Lambda::Function",
+                    "Properties": {
+                        "Timeout": i,
+                        "Description": "line1\nline2 %d: 'quoted'" % i,
+                        "Enabled": i % 2 == 0,
+                        "Version": "2010-09-09",
+                    }
+                } for i in range(20)
+            }
+        }) + "Outputs:\n  Arn: !GetAtt Function1.Arn\n"
+        self.assertEqual(yaml_parse(template),
+                         yaml.load(template, Loader=PythonLoader))
+
+    def test_dump_sorts_keys(self):
+        self.assertEqual(yaml_dump({"b": 1, "a": {"d": [1], "c": "x"}}),
+                         "a:\n  c: x\n  d:\n  - 1\nb: 1\n")
+
+    def test_dump_uses_pure_python_dumper(self):
+        value = {"Description": "word " * 40, "Quoted": "a\nb 'c'" * 20}
+        self.assertEqual(
+            yaml_dump(value),
+            yaml.dump(value, Dumper=yaml.SafeDumper, default_flow_style=False))
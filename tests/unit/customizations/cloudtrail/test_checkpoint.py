@@ -0,0 +1,48 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+from awscli.testutils import unittest, FileCreator
+from awscli.customizations.cloudtrail.checkpoint import \
+    ValidationCheckpoint, ValidationCheckpointStore
+
+
+TEST_TRAIL_ARN = 'arn:aws:cloudtrail:us-east-1:123456789012:trail/foo'
+
+
+class TestValidationCheckpointStore(unittest.TestCase):
+    def setUp(self):
+        self.file_creator = FileCreator()
+        self.addCleanup(self.file_creator.remove_all)
+        self.store = ValidationCheckpointStore(self.file_creator.rootdir)
+
+    def test_saves_and_loads_checkpoints(self):
+        self.assertIsNone(self.store.load(TEST_TRAIL_ARN))
+        self.store.save(ValidationCheckpoint(
+            TEST_TRAIL_ARN, digest_bucket='bucket', digest_key='key',
+            digest_signature='signature',
+            digest_end_time='2015-08-16T23:00:00Z',
+            validated_logs={'s3://bucket/log': 'hash'}))
+        checkpoint = self.store.load(TEST_TRAIL_ARN)
+        self.assertEqual(checkpoint.digest_key, 'key')
+        self.assertEqual(checkpoint.digest_signature, 'signature')
+        self.assertTrue(checkpoint.is_log_validated(
+            {'s3Bucket': 'bucket', 's3Object': 'log', 'hashValue': 'hash'}))
+        self.assertFalse(checkpoint.is_log_validated(
+            {'s3Bucket': 'bucket', 's3Object': 'log', 'hashValue': 'other'}))
+        self.assertIsNone(self.store.load(TEST_TRAIL_ARN + '2'))
+
+    def test_ignores_invalid_checkpoints(self):
+        key = self.store._get_key(TEST_TRAIL_ARN)
+        self.file_creator.create_file(key + '.json', '{"trailArn": "other"}')
+        self.assertIsNone(self.store.load(TEST_TRAIL_ARN))
+        self.file_creator.create_file(key + '.json', '{')
+        self.assertIsNone(self.store.load(TEST_TRAIL_ARN))
@@ -15,11 +15,14 @@ import base64
 import hashlib
 import json
 import gzip
+import sys
+import threading
+import time
 from datetime import datetime, timedelta
 from dateutil import parser, tz
 
 import rsa
-from mock import Mock, call
+from mock import Mock, call, patch
 from argparse import Namespace
 
 from awscli.compat import six
@@ -29,7 +32,10 @@ from awscli.customizations.cloudtrail.validation import DigestError, \
     DigestTraverser, create_digest_traverser, PublicKeyProvider, \
     Sha256RSADigestValidator, DATE_FORMAT, CloudTrailValidateLogs, \
     parse_date, assert_cloudtrail_arn_is_valid, DigestSignatureError, \
-    InvalidDigestFormat, S3ClientProvider
+    InvalidDigestFormat, S3ClientProvider, LOG_VALID, LOG_INVALID_HASH, \
+    DigestPrefetcher
+from awscli.customizations.cloudtrail.checkpoint import \
+    ValidationCheckpointStore
 from botocore.exceptions import ClientError
 from awscli.testutils import unittest
 
@@ -458,6 +464,55 @@ class TestDigestProvider(BaseAWSCommandParamsTest):
         self.assertEqual(json_str.encode(), result[1])
 
 
+class TestDigestPrefetcher(unittest.TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.loaded = []
+        self.prefetcher = DigestPrefetcher(self.load, max_prefetch=2)
+        self.addCleanup(self.prefetcher.shutdown)
+
+    def load(self, bucket, key):
+        with self.lock:
+            self.loaded.append((bucket, key))
+        if key == 'missing':
+            raise ClientError(
+                {'Error': {'Code': 'NoSuchKey', 'Message': 'foo'}},
+                'GetObject')
+        return bucket + '/' + key
+
+    def test_loads_keys_listed_before_key_ahead(self):
+        digests = ['a', 'b', 'c', 'd']
+        self.assertEqual(self.prefetcher.load('1', 'd', digests), '1/d')
+        for _ in range(500):
+            if len(self.loaded) == 3:
+                break
+            time.sleep(0.01)
+        self.assertEqual(
+            sorted(self.loaded), [('1', 'b'), ('1', 'c'), ('1', 'd')])
+
+    def test_does_not_load_prefetched_keys_again(self):
+        digests = ['a', 'b', 'c']
+        for key in ['c', 'b', 'a']:
+            self.assertEqual(self.prefetcher.load('1', key, digests),
+                             '1/' + key)
+        self.assertEqual(sorted(self.loaded),
+                         [('1', 'a'), ('1', 'b'), ('1', 'c')])
+
+    def test_loads_key_that_is_not_listed(self):
+        self.assertEqual(self.prefetcher.load('2', 'b', ['a', 'c']), '2/b')
+        self.assertEqual(self.prefetcher.load('2', 'a', ['a', 'c']), '2/a')
+
+    def test_raises_errors_of_key(self):
+        digests = ['missing', 'z']
+        with self.assertRaises(ClientError):
+            self.prefetcher.load('1', 'missing', digests)
+        # An error of a key that is loaded ahead is only raised once the
+        # key itself is loaded.
+        self.assertEqual(self.prefetcher.load('1', 'z', digests), '1/z')
+        with self.assertRaises(ClientError):
+            self.prefetcher.load('1', 'missing', digests)
+
+
 class TestDigestTraverser(unittest.TestCase):
     def test_initializes_with_default_validator(self):
         provider = Mock()
@@ -760,7 +815,7 @@ class TestCloudTrailCommand(BaseAWSCommandParamsTest):
         session = Mock()
         command = CloudTrailValidateLogs(session)
         start_date = START_DATE.strftime(DATE_FORMAT)
-        args = Namespace(trail_arn='abc', verbose=True,
+        args = Namespace(trail_arn='abc', verbose=True, incremental=False,
                          start_time=start_date, s3_bucket='bucket',
                          s3_prefix='prefix', end_time=None)
         command.handle_args(args)
@@ -773,6 +828,216 @@ class TestCloudTrailCommand(BaseAWSCommandParamsTest):
         self.assertGreater(command.end_time, command.start_time)
 
 
+    @patch('awscli.customizations.cloudtrail.validation'
+           '.create_digest_traverser')
+    @patch('sys.stderr', new_callable=six.StringIO)
+    @patch('sys.stdout', new_callable=six.StringIO)
+    def test_reports_logs_in_order(self, stdout, stderr, create_traverser):
+        logs = [{'s3Bucket': '1', 's3Object': 'key%d' % i} for i in range(4)]
+
+        def make_digest(key, digest_logs):
+            return {'digestS3Bucket': '1', 'digestS3Object': key,
+                    'digestStartTime': '2015-08-16T22:00:00Z',
+                    'digestEndTime': '2015-08-16T23:00:00Z',
+                    'logFiles': digest_logs}
+
+        def traverse(start_date, end_date):
+            yield make_digest('digest1', logs[:2])
+            self.on_gap(next_end_date=START_DATE, last_start_date=END_DATE)
+            yield make_digest('digest2', logs[2:])
+
+        def mock_create(on_gap, **kwargs):
+            traverser = Mock()
+            traverser.traverse.side_effect = traverse
+            self.on_gap = on_gap
+            return traverser
+
+        create_traverser.side_effect = mock_create
+        first_log_started = threading.Event()
+        last_log_done = threading.Event()
+
+        def download_log(log):
+            # The first log file completes after all of the others.
+            if log is logs[0]:
+                first_log_started.set()
+                self.assertTrue(last_log_done.wait(5))
+                return LOG_INVALID_HASH
+            self.assertTrue(first_log_started.wait(5))
+            if log is logs[3]:
+                last_log_done.set()
+            return LOG_VALID
+
+        command = CloudTrailValidateLogs(Mock())
+        command.handle_args(Namespace(
+            trail_arn=TEST_TRAIL_ARN, verbose=True, incremental=False,
+            start_time=START_DATE.strftime(DATE_FORMAT), s3_bucket=None,
+            s3_prefix=None, end_time=None))
+        command._download_log = download_log
+        command._call()
+
+        lines = [line for line in stdout.getvalue().splitlines()
+                 if line.startswith(('Digest file', 'Log file'))]
+        self.assertEqual(lines, [
+            'Digest file\ts3://1/digest1\tvalid',
+            'Log file\ts3://1/key1\tvalid',
+            'Digest file\ts3://1/digest2\tvalid',
+            'Log file\ts3://1/key2\tvalid',
+            'Log file\ts3://1/key3\tvalid',
+        ])
+        errors = stderr.getvalue()
+        self.assertIn('s3://1/key0', errors)
+        self.assertLess(errors.index('s3://1/key0'),
+                        errors.index('No log files were delivered'))
+        self.assertIn('3/4 log files valid', stdout.getvalue())
+
+class TestIncrementalValidation(unittest.TestCase):
+    def setUp(self):
+        self.checkpoints = {}
+        self.checkpoint_store = ValidationCheckpointStore(
+            cache=self.checkpoints)
+        self.invalid_logs = set()
+        self.downloaded = []
+        patcher = patch('awscli.customizations.cloudtrail.validation'
+                        '.create_digest_traverser')
+        self.create_traverser = patcher.start()
+        self.addCleanup(patcher.stop)
+        for stream in ['sys.stdout', 'sys.stderr']:
+            patcher = patch(stream, new_callable=six.StringIO)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_digest(self, hour, previous=None, logs=None):
+        """Creates the digest delivered at the given hour after START_DATE
+
+        :param previous: The digest that the digest links to, if any.
+        """
+        start = START_DATE + timedelta(hours=hour - 1)
+        end = START_DATE + timedelta(hours=hour)
+        digest = {
+            'digestS3Bucket': '1', 'digestS3Object': 'digest%d' % hour,
+            'digestStartTime': start.strftime(DATE_FORMAT),
+            'digestEndTime': end.strftime(DATE_FORMAT),
+            '_signature': 'signature%d' % hour,
+            'previousDigestSignature': None,
+            'logFiles': [{'s3Bucket': '1', 's3Object': name,
+                          'hashValue': 'hash-' + name}
+                         for name in logs or []],
+        }
+        if previous is not None:
+            digest['previousDigestS3Bucket'] = previous['digestS3Bucket']
+            digest['previousDigestS3Object'] = previous['digestS3Object']
+            digest['previousDigestSignature'] = previous['_signature']
+        return digest
+
+    def download_log(self, log):
+        self.downloaded.append(log['s3Object'])
+        if log['s3Object'] in self.invalid_logs:
+            return LOG_INVALID_HASH
+        return LOG_VALID
+
+    def validate(self, digests, start_time=START_DATE):
+        """Runs an incremental validation that yields the digests, newest
+        first, and returns the start time it validated from"""
+        traverser = Mock()
+        traverser.traverse.return_value = iter(digests)
+        self.create_traverser.return_value = traverser
+        self.downloaded = []
+        command = CloudTrailValidateLogs(Mock())
+        command.handle_args(Namespace(
+            trail_arn=TEST_TRAIL_ARN, verbose=True, incremental=True,
+            start_time=start_time and start_time.strftime(DATE_FORMAT),
+            s3_bucket=None, s3_prefix=None, end_time=None))
+        command.checkpoint_store = self.checkpoint_store
+        command._download_log = self.download_log
+        command._call()
+        self.command = command
+        return traverser.traverse.call_args[0][0]
+
+    def get_checkpoint(self):
+        return self.checkpoint_store.load(TEST_TRAIL_ARN)
+
+    def test_saves_newest_digest_as_checkpoint(self):
+        first = self.make_digest(1, logs=['log1'])
+        second = self.make_digest(2, first, logs=['log2'])
+        self.validate([second, first])
+        checkpoint = self.get_checkpoint()
+        self.assertEqual(checkpoint.digest_key, 'digest2')
+        self.assertEqual(checkpoint.digest_signature, 'signature2')
+        self.assertEqual(checkpoint.validated_logs, {})
+
+    def test_validates_from_checkpoint(self):
+        first = self.make_digest(1)
+        self.validate([first])
+        second = self.make_digest(2, first, logs=['log2'])
+        start_time = self.validate([second], start_time=None)
+        self.assertEqual(
+            start_time,
+            START_DATE.replace(tzinfo=tz.tzutc()) +
+            timedelta(hours=1, seconds=1))
+        self.assertEqual(self.command._invalid_digests, 0)
+        self.assertEqual(self.downloaded, ['log2'])
+        self.assertEqual(self.get_checkpoint().digest_key, 'digest2')
+
+    def test_stops_at_checkpoint_digest(self):
+        first = self.make_digest(1, logs=['log1'])
+        self.validate([first])
+        second = self.make_digest(2, first)
+        self.validate([second, first], start_time=None)
+        self.assertEqual(self.command._valid_digests, 1)
+        self.assertEqual(self.downloaded, [])
+
+    def test_fails_when_chain_does_not_link_to_checkpoint(self):
+        first = self.make_digest(1)
+        self.validate([first])
+        replaced = self.make_digest(1)
+        replaced['_signature'] = 'other'
+        second = self.make_digest(2, replaced)
+        self.validate([second], start_time=None)
+        self.assertEqual(self.command._invalid_digests, 1)
+        self.assertIn('does not link to the last validated digest file '
+                      's3://1/digest1', sys.stderr.getvalue())
+        self.assertEqual(self.get_checkpoint().digest_key, 'digest1')
+
+    def test_reports_gap_after_checkpoint(self):
+        first = self.make_digest(1)
+        self.validate([first])
+        self.validate([self.make_digest(3)], start_time=None)
+        self.assertEqual(self.command._invalid_digests, 0)
+        self.assertIn('No log files were delivered', sys.stderr.getvalue())
+        self.assertEqual(self.get_checkpoint().digest_key, 'digest3')
+
+    def test_does_not_download_valid_logs_again_after_failure(self):
+        first = self.make_digest(1)
+        self.validate([first])
+        second = self.make_digest(2, first, logs=['log1', 'log2'])
+        self.invalid_logs.add('log2')
+        self.validate([second], start_time=None)
+        checkpoint = self.get_checkpoint()
+        self.assertEqual(checkpoint.digest_key, 'digest1')
+        self.assertEqual(checkpoint.validated_logs,
+                         {'s3://1/log1': 'hash-log1'})
+
+        self.invalid_logs.clear()
+        self.validate([second], start_time=None)
+        self.assertEqual(self.downloaded, ['log2'])
+        self.assertEqual(self.command._valid_logs, 2)
+        checkpoint = self.get_checkpoint()
+        self.assertEqual(checkpoint.digest_key, 'digest2')
+        self.assertEqual(checkpoint.validated_logs, {})
+
+    def test_requires_start_time_without_checkpoint(self):
+        with self.assertRaises(ValueError):
+            self.validate([], start_time=None)
+
+    def test_requires_start_time_when_not_incremental(self):
+        command = CloudTrailValidateLogs(Mock())
+        with self.assertRaises(ValueError):
+            command.handle_args(Namespace(
+                trail_arn=TEST_TRAIL_ARN, verbose=True, incremental=False,
+                start_time=None, s3_bucket=None, s3_prefix=None,
+                end_time=None))
+
+
 class TestS3ClientProvider(BaseAWSCommandParamsTest):
     def test_creates_clients_for_buckets_in_us_east_1(self):
         session = Mock()
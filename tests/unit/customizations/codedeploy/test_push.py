@@ -11,6 +11,10 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 
+import base64
+import hashlib
+import zipfile
+
 import awscli
 
 from argparse import Namespace
@@ -18,9 +22,9 @@ from mock import MagicMock, patch, ANY, call
 from six import StringIO
 from botocore.exceptions import ClientError
 
-from awscli.customizations.codedeploy.push import Push
-from awscli.testutils import unittest
-from awscli.compat import ZIP_COMPRESSION_MODE
+from awscli.customizations.codedeploy.push import Push, MultipartUploadWriter
+from awscli.testutils import unittest, FileCreator
+from awscli.compat import six, ZIP_COMPRESSION_MODE
 
 
 class TestPush(unittest.TestCase):
@@ -67,17 +71,7 @@ class TestPush(unittest.TestCase):
             }
         }
 
-        self.bundle_mock = MagicMock()
-        self.bundle_mock.tell.return_value = (5 << 20)
-        self.bundle_mock.read.return_value = b'a' * (5 << 20)
-        self.bundle_mock.__enter__.return_value = self.bundle_mock
-        self.bundle_mock.__exit__.return_value = None
-
-        self.zipfile_mock = MagicMock()
-        self.zipfile_mock.write.return_value = None
-        self.zipfile_mock.close.return_value = None
-        self.zipfile_mock.__enter__.return_value = self.zipfile_mock
-        self.zipfile_mock.__exit__.return_value = None
+        self.files = [(self.appspec_path, self.appspec)]
 
         self.session = MagicMock()
 
@@ -149,7 +143,7 @@ class TestPush(unittest.TestCase):
     def test_push_throws_on_upload_to_s3_error(self):
         self.args.bucket = self.bucket
         self.args.key = self.key
-        self.push._compress = MagicMock(return_value=self.bundle_mock)
+        self.push._find_files = MagicMock(return_value=self.files)
         self.push._upload_to_s3 = MagicMock()
         self.push._upload_to_s3.side_effect = RuntimeError()
         with self.assertRaises(RuntimeError):
@@ -158,7 +152,7 @@ class TestPush(unittest.TestCase):
     def test_push_strips_quotes_from_etag(self):
         self.args.bucket = self.bucket
         self.args.key = self.key
-        self.push._compress = MagicMock(return_value=self.bundle_mock)
+        self.push._find_files = MagicMock(return_value=self.files)
         self.push._upload_to_s3 = MagicMock(return_value=self.upload_response)
         self.push._register_revision = MagicMock()
         self.push._push(self.args)
@@ -169,7 +163,7 @@ class TestPush(unittest.TestCase):
     def test_push_output_message(self, stdout_mock):
         self.args.bucket = self.bucket
         self.args.key = self.key
-        self.push._compress = MagicMock(return_value=self.bundle_mock)
+        self.push._find_files = MagicMock(return_value=self.files)
         self.push._upload_to_s3 = MagicMock(return_value=self.upload_response)
         self.push._register_revision = MagicMock()
         self.push._push(self.args)
@@ -195,55 +189,51 @@ class TestPush(unittest.TestCase):
         )
         self.assertEquals(expected_output, output)
 
-    @patch('zipfile.ZipFile')
-    @patch('tempfile.TemporaryFile')
-    @patch('os.path')
-    @patch('os.walk')
-    def test_compress_throws_when_no_appspec(self, walk, path, tf, zf):
-        walk.return_value = [(self.source, [], ['noappspec.yml'])]
-        noappsec_path = self.source + '/noappspec.yml'
-        path.join.return_value = noappsec_path
-        path.sep = '/'
-        path.abspath.side_effect = [self.source, noappsec_path]
-        tf.return_value = self.bundle_mock
-        zf.return_value = self.zipfile_mock
+    def test_find_files_throws_when_no_appspec(self):
+        file_creator = FileCreator()
+        self.addCleanup(file_creator.remove_all)
+        file_creator.create_file('noappspec.yml', 'contents')
         with self.assertRaises(RuntimeError):
-            with self.push._compress(
-                    self.args.source,
-                    self.args.ignore_hidden_files):
-                pass
-
-    @patch('zipfile.ZipFile')
-    @patch('tempfile.TemporaryFile')
-    @patch('os.path')
-    @patch('os.walk')
-    def test_compress_writes_to_zip_file(self, walk, path, tf, zf):
-        walk.return_value = [(self.source, [], [self.appspec])]
-        path.join.return_value = self.appspec_path
-        path.sep = '/'
-        path.abspath.side_effect = [self.source, self.appspec_path]
-        tf.return_value = self.bundle_mock
-        zf.return_value = self.zipfile_mock
-        with self.push._compress(
-                self.args.source,
-                self.args.ignore_hidden_files):
-            zf.assert_called_with(ANY, 'w', allowZip64=True)
-            zf().write.assert_called_with(
-                '/tmp/appspec.yml',
-                self.appspec,
-                ZIP_COMPRESSION_MODE
-            )
+            self.push._find_files(
+                file_creator.rootdir, self.args.ignore_hidden_files)
+
+    def test_compress_writes_zip_archive(self):
+        file_creator = FileCreator()
+        self.addCleanup(file_creator.remove_all)
+        file_creator.create_file(self.appspec, 'contents')
+        file_creator.create_file('scripts/start.sh', 'contents')
+        file_creator.create_file('.hidden', 'contents')
+        files = self.push._find_files(
+            file_creator.rootdir, ignore_hidden_files=True)
+        bundle = six.BytesIO()
+        self.push._compress(file_creator.rootdir, files, bundle)
+        bundle.seek(0)
+        zf = zipfile.ZipFile(bundle)
+        self.assertEqual(
+            zf.namelist(), [self.appspec, 'scripts/start.sh'])
+        self.assertEqual(
+            zf.getinfo(self.appspec).compress_type, ZIP_COMPRESSION_MODE)
+        self.assertEqual(zf.read(self.appspec), b'contents')
+
+    def compress_with(self, data):
+        def compress(source, files, fileobj):
+            fileobj.write(data)
+        self.push._compress = MagicMock(side_effect=compress)
 
     def test_upload_to_s3_with_put_object(self):
         self.args.bucket = self.bucket
         self.args.key = self.key
-        response = self.push._upload_to_s3(self.args, self.bundle_mock)
+        self.compress_with(b'a' * (5 << 20))
+        response = self.push._upload_to_s3(self.args, self.files)
         self.assertDictEqual(self.upload_response, response)
+        self.push._compress.assert_called_with(self.source, self.files, ANY)
         self.push.s3.put_object.assert_called_with(
             Bucket=self.bucket,
             Key=self.key,
-            Body=self.bundle_mock
+            Body=ANY
         )
+        body = self.push.s3.put_object.call_args[1]['Body']
+        self.assertEqual(body.read(), b'a' * (5 << 20))
         self.assertFalse(self.push.s3.create_multipart_upload.called)
         self.assertFalse(self.push.s3.upload_part.called)
         self.assertFalse(self.push.s3.complete_multipart_upload.called)
@@ -252,9 +242,8 @@ class TestPush(unittest.TestCase):
     def test_upload_to_s3_with_multipart_upload(self):
         self.args.bucket = self.bucket
         self.args.key = self.key
-        self.bundle_mock.tell.return_value = (6 << 20)
-        self.bundle_mock.read.return_value = b'a' * (6 << 20)
-        response = self.push._upload_to_s3(self.args, self.bundle_mock)
+        self.compress_with(b'a' * (6 << 20))
+        response = self.push._upload_to_s3(self.args, self.files)
         self.assertDictEqual(self.upload_response, response)
         self.assertFalse(self.push.s3.put_object.called)
         self.push.s3.create_multipart_upload.assert_called_with(
@@ -266,7 +255,8 @@ class TestPush(unittest.TestCase):
             Key=self.key,
             UploadId=self.upload_id,
             PartNumber=1,
-            Body=ANY
+            Body=ANY,
+            ContentMD5=ANY
         )
         self.push.s3.complete_multipart_upload.assert_called_with(
             Bucket=self.bucket,
@@ -279,14 +269,13 @@ class TestPush(unittest.TestCase):
     def test_upload_to_s3_with_multipart_upload_aborted_on_error(self):
         self.args.bucket = self.bucket
         self.args.key = self.key
-        self.bundle_mock.tell.return_value = (6 << 20)
-        self.bundle_mock.read.return_value = b'a' * (6 << 20)
+        self.compress_with(b'a' * (6 << 20))
         self.push.s3.upload_part.side_effect = ClientError(
             {'Error': {'Code': 'Error', 'Message': 'Error'}},
             'UploadPart'
         )
         with self.assertRaises(ClientError):
-            self.push._upload_to_s3(self.args, self.bundle_mock)
+            self.push._upload_to_s3(self.args, self.files)
         self.assertFalse(self.push.s3.put_object.called)
         self.push.s3.create_multipart_upload.assert_called_with(
             Bucket=self.bucket,
@@ -300,6 +289,24 @@ class TestPush(unittest.TestCase):
             UploadId=self.upload_id
         )
 
+    def test_upload_to_s3_aborted_when_compress_fails(self):
+        self.args.bucket = self.bucket
+        self.args.key = self.key
+
+        def compress(source, files, fileobj):
+            fileobj.write(b'a' * (6 << 20))
+            raise IOError('Failed to read file')
+
+        self.push._compress = MagicMock(side_effect=compress)
+        with self.assertRaises(IOError):
+            self.push._upload_to_s3(self.args, self.files)
+        self.assertFalse(self.push.s3.complete_multipart_upload.called)
+        self.push.s3.abort_multipart_upload.assert_called_with(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id
+        )
+
     def test_register_revision(self):
         self.args.bucket = self.bucket
         self.args.key = self.key
@@ -313,5 +320,69 @@ class TestPush(unittest.TestCase):
         )
 
 
+class TestMultipartUploadWriter(unittest.TestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.create_multipart_upload.return_value = {
+            'UploadId': 'upload_id'}
+        self.client.upload_part.side_effect = self.upload_part
+        self.client.complete_multipart_upload.return_value = {'ETag': 'etag'}
+        self.parts = {}
+
+    def upload_part(self, **kwargs):
+        data = kwargs['Body'].read()
+        self.parts[kwargs['PartNumber']] = data
+        digest = hashlib.md5(data).digest()
+        self.assertEqual(
+            kwargs['ContentMD5'], base64.b64encode(digest).decode('ascii'))
+        return {'ETag': '"%s"' % hashlib.md5(data).hexdigest()}
+
+    def test_cuts_data_into_parts(self):
+        writer = MultipartUploadWriter(
+            self.client, 'bucket', 'key', part_size=4, max_concurrency=2)
+        for data in [b'ab', b'cdefghij', b'', b'klmnop', b'q']:
+            writer.write(data)
+        writer.close()
+        self.assertEqual(
+            self.parts,
+            {1: b'abcd', 2: b'efgh', 3: b'ijkl', 4: b'mnop', 5: b'q'})
+        parts = self.client.complete_multipart_upload.call_args[1][
+            'MultipartUpload']['Parts']
+        self.assertEqual([part['PartNumber'] for part in parts],
+                         [1, 2, 3, 4, 5])
+        self.assertEqual(parts[0]['ETag'],
+                         '"%s"' % hashlib.md5(b'abcd').hexdigest())
+
+    def test_computes_multipart_etag(self):
+        writer = MultipartUploadWriter(
+            self.client, 'bucket', 'key', part_size=4)
+        writer.write(b'abcdefgh')
+        writer.close()
+        expected = hashlib.md5(
+            hashlib.md5(b'abcd').digest() +
+            hashlib.md5(b'efgh').digest()).hexdigest()
+        self.assertEqual(writer.etag, '"%s-2"' % expected)
+        self.assertEqual(self.parts, {1: b'abcd', 2: b'efgh'})
+
+    def test_uses_put_object_for_less_than_one_part(self):
+        self.client.put_object.return_value = {'ETag': 'etag'}
+        writer = MultipartUploadWriter(
+            self.client, 'bucket', 'key', part_size=4)
+        writer.write(b'abc')
+        self.assertEqual(writer.close(), {'ETag': 'etag'})
+        self.assertFalse(self.client.create_multipart_upload.called)
+        self.assertEqual(
+            self.client.put_object.call_args[1]['Body'].read(), b'abc')
+        self.assertEqual(
+            writer.etag, '"%s"' % hashlib.md5(b'abc').hexdigest())
+
+    def test_abort_without_parts(self):
+        writer = MultipartUploadWriter(
+            self.client, 'bucket', 'key', part_size=4)
+        writer.write(b'abc')
+        writer.abort()
+        self.assertFalse(self.client.abort_multipart_upload.called)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -10,3 +10,9 @@
 # distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
+
+
+def set_schema_version(mock_connect, version):
+    """Makes a mocked sqlite3.connect return a database of a schema version"""
+    mock_connect.return_value.execute.return_value.fetchone.return_value = (
+        version,)
@@ -26,8 +26,15 @@ from awscli.customizations.history.db import DatabaseRecordWriter
 from awscli.customizations.history.db import DatabaseRecordReader
 from awscli.customizations.history.db import PayloadSerializer
 from awscli.customizations.history.db import RecordBuilder
+from awscli.customizations.history.db import AsyncRecordWriter
+from awscli.customizations.history.db import DatabaseRecord
+from awscli.customizations.history.db import encode_payload
+from awscli.customizations.history.db import decode_payload
+from awscli.customizations.history.db import truncate_serialized_payload
+from awscli.customizations.history.db import PRUNE_INTERVAL
 from awscli.testutils import unittest, FileCreator
 from tests import CaseInsensitiveDict
+from tests.unit.customizations.history import set_schema_version
 
 
 class FakeDatabaseConnection(object):
@@ -50,6 +57,7 @@ class TestGetHistoryDBFilename(unittest.TestCase):
 class TestDatabaseConnection(unittest.TestCase):
     @mock.patch('awscli.compat.sqlite3.connect')
     def test_can_connect_to_argument_file(self, mock_connect):
+        set_schema_version(mock_connect, DatabaseConnection.SCHEMA_VERSION)
         expected_location = os.path.expanduser(os.path.join(
             '~', 'foo', 'bar', 'baz.db'))
         DatabaseConnection(expected_location)
@@ -58,6 +66,7 @@ class TestDatabaseConnection(unittest.TestCase):
 
     @mock.patch('awscli.compat.sqlite3.connect')
     def test_does_try_to_enable_wal(self, mock_connect):
+        set_schema_version(mock_connect, DatabaseConnection.SCHEMA_VERSION)
         conn = DatabaseConnection(':memory:')
         conn._connection.execute.assert_any_call('PRAGMA journal_mode=WAL')
 
@@ -75,10 +84,34 @@ class TestDatabaseConnection(unittest.TestCase):
         ]
         self.assertEqual(expected_schema, schema)
 
+    def test_does_migrate_to_latest_schema(self):
+        db = DatabaseConnection(":memory:")
+        version = db.execute('PRAGMA user_version').fetchone()[0]
+        self.assertEqual(version, DatabaseConnection.SCHEMA_VERSION)
+        indexes = [row[1] for row in db.execute(
+            'PRAGMA index_list(records)').fetchall()]
+        self.assertIn('records_id_timestamp', indexes)
+        self.assertIn('records_timestamp', indexes)
+        self.assertIn('records_event_type', indexes)
+        cursor = db.execute('PRAGMA table_info(commands)')
+        self.assertEqual(
+            [col[1] for col in cursor.fetchall()],
+            ['id', 'timestamp', 'last_timestamp', 'args', 'rc'])
+
+    def test_does_not_migrate_migrated_schema(self):
+        with mock.patch('awscli.compat.sqlite3.connect') as mock_connect:
+            set_schema_version(
+                mock_connect, DatabaseConnection.SCHEMA_VERSION)
+            DatabaseConnection(':memory:')
+        executed = [c[0][0] for c in
+                    mock_connect.return_value.execute.call_args_list]
+        self.assertNotIn('BEGIN IMMEDIATE', executed)
+
     @mock.patch('awscli.compat.sqlite3.connect')
     def test_can_close(self, mock_connect):
         connection = mock.Mock()
         mock_connect.return_value = connection
+        set_schema_version(mock_connect, DatabaseConnection.SCHEMA_VERSION)
         conn = DatabaseConnection(':memory:')
         conn.close()
         self.assertTrue(connection.close.called)
@@ -406,6 +439,83 @@ class TestDatabaseRecordWriter(BaseDatabaseRecordWriterTester):
         )
 
 
+class TestAsyncRecordWriter(unittest.TestCase):
+    def setUp(self):
+        self.writer = mock.Mock()
+        self.batches = []
+        self.writer.write_records.side_effect = self.batches.append
+
+    def make_record(self, payload):
+        return {'command_id': 'command', 'event_type': 'FOO',
+                'payload': payload, 'source': 'TEST', 'timestamp': 1234}
+
+    def test_writes_queued_records_in_batches_on_close(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def write_records(records):
+            started.set()
+            release.wait(5)
+            self.batches.append(records)
+
+        self.writer.write_records.side_effect = write_records
+        async_writer = AsyncRecordWriter(self.writer, max_batch_size=2)
+        async_writer.write_record(self.make_record(0))
+        self.assertTrue(started.wait(5))
+        # The writer thread is busy, so these records are queued.
+        for i in range(1, 5):
+            async_writer.write_record(self.make_record(i))
+        release.set()
+        async_writer.close()
+        self.assertEqual(
+            [[record['payload'] for record in batch]
+             for batch in self.batches],
+            [[0], [1, 2], [3, 4]])
+        self.assertTrue(self.writer.close.called)
+
+    def test_copies_payload_containers(self):
+        payload = {'headers': CaseInsensitiveDict({'a': 'b'}),
+                   'list': ['a', ('b',)], 'body': b'body'}
+        async_writer = AsyncRecordWriter(self.writer)
+        async_writer.write_record(self.make_record(payload))
+        payload['list'].append('c')
+        async_writer.close()
+        self.assertEqual(
+            self.batches[0][0]['payload'],
+            {'headers': {'a': 'b'}, 'list': ['a', ['b']], 'body': b'body'})
+
+    def test_close_is_idempotent(self):
+        async_writer = AsyncRecordWriter(self.writer)
+        async_writer.close()
+        async_writer.close()
+        self.assertEqual(self.writer.close.call_count, 1)
+
+    def test_write_errors_are_not_raised(self):
+        self.writer.write_records.side_effect = ValueError()
+        async_writer = AsyncRecordWriter(self.writer)
+        async_writer.write_record(self.make_record(0))
+        async_writer.close()
+        self.assertTrue(self.writer.write_records.called)
+
+    def test_prunes_records_before_writing(self):
+        self.writer.prune_records.side_effect = ValueError()
+        async_writer = AsyncRecordWriter(self.writer)
+        async_writer.write_record(self.make_record(0))
+        async_writer.close()
+        self.writer.prune_records.assert_called_with(
+            min_interval=PRUNE_INTERVAL)
+        self.assertEqual(len(self.batches), 1)
+
+    def test_flush_waits_for_queued_records(self):
+        async_writer = AsyncRecordWriter(self.writer)
+        self.addCleanup(async_writer.close)
+        for i in range(5):
+            async_writer.write_record(self.make_record(i))
+        async_writer.flush()
+        self.assertEqual(
+            sum(len(batch) for batch in self.batches), 5)
+
+
 class ThreadedRecordBuilder(object):
     def __init__(self, tracker):
         self._read_q = queue.Queue()
@@ -507,8 +617,9 @@ class TestDatabaseRecordReader(BaseDatabaseRecordTester):
         expected_query = (
             '    SELECT * FROM records\n'
             '        WHERE id =\n'
-            '        (SELECT id FROM records WHERE timestamp =\n'
-            '        (SELECT max(timestamp) FROM records)) ORDER BY timestamp;'
+            '        (SELECT id FROM commands ORDER BY last_timestamp DESC '
+            'LIMIT 1)\n'
+            '        ORDER BY timestamp;'
         )
         [_ for _ in self.reader.iter_latest_records()]
         self.assertEqual(
@@ -538,6 +649,56 @@ class TestDatabaseRecordReader(BaseDatabaseRecordTester):
         self.assertEqual(records, records_to_get)
 
 
+class TestDatabaseRecord(unittest.TestCase):
+    def test_decodes_payload_when_accessed(self):
+        record = DatabaseRecord({'event_type': 'FOO', 'payload': '{"a": 1}'})
+        self.assertEqual(record['event_type'], 'FOO')
+        self.assertEqual(record['payload'], {'a': 1})
+        self.assertEqual(record['payload'], {'a': 1})
+        self.assertEqual(dict(record), {'event_type': 'FOO',
+                                        'payload': {'a': 1}})
+
+    def test_does_not_decode_payload_until_accessed(self):
+        record = DatabaseRecord({'event_type': 'FOO', 'payload': 'invalid'})
+        self.assertEqual(record['event_type'], 'FOO')
+        self.assertEqual(sorted(record), ['event_type', 'payload'])
+        with self.assertRaises(ValueError):
+            record['payload']
+
+
+class TestPayloadEncoding(unittest.TestCase):
+    def test_small_payload_is_stored_as_text(self):
+        encoded = encode_payload('{"foo": "bar"}')
+        self.assertEqual(encoded, '{"foo": "bar"}')
+        self.assertEqual(decode_payload(encoded), {'foo': 'bar'})
+
+    def test_large_payload_is_compressed(self):
+        serialized = json.dumps({'body': 'a' * 10000})
+        encoded = encode_payload(serialized)
+        self.assertLess(len(encoded), len(serialized))
+        self.assertEqual(decode_payload(encoded), {'body': 'a' * 10000})
+
+    def test_truncates_longest_strings(self):
+        serialized = json.dumps(
+            {'body': 'a' * 1000, 'other': 'b' * 100, 'short': 'c'})
+        truncated = json.loads(truncate_serialized_payload(serialized, 400))
+        self.assertEqual(truncated['short'], 'c')
+        self.assertEqual(truncated['other'], 'b' * 100)
+        self.assertTrue(truncated['body'].startswith('a' * 200))
+        self.assertTrue(truncated['body'].endswith('characters truncated]'))
+        self.assertLessEqual(len(json.dumps(truncated)), 400)
+
+    def test_truncates_all_strings_to_same_length(self):
+        serialized = json.dumps(['a' * 1000, 'b' * 1000])
+        truncated = json.loads(truncate_serialized_payload(serialized, 1000))
+        # The excess characters and room for the suffixes are removed
+        # evenly from both strings.
+        self.assertEqual(truncated, [
+            'a' * 465 + '... [535 characters truncated]',
+            'b' * 465 + '... [535 characters truncated]',
+        ])
+
+
 class TestPayloadSerialzier(unittest.TestCase):
     def test_can_serialize_basic_types(self):
         original = {
@@ -22,12 +22,17 @@ from awscli.compat import StringIO
 from awscli.customizations.history import attach_history_handler
 from awscli.customizations.history import add_history_commands
 from awscli.customizations.history import HistoryCommand
+from awscli.customizations.history.db import DatabaseConnection
 from awscli.customizations.history.db import DatabaseHistoryHandler
+from tests.unit.customizations.history import set_schema_version
 
 
 class TestAttachHistoryHandler(unittest.TestCase):
     def setUp(self):
         self.files = FileCreator()
+        atexit_patch = mock.patch('awscli.customizations.history.atexit')
+        self.atexit = atexit_patch.start()
+        self.addCleanup(atexit_patch.stop)
 
     def tearDown(self):
         self.files.remove_all()
@@ -44,12 +49,65 @@ class TestAttachHistoryHandler(unittest.TestCase):
 
         parsed_args = argparse.Namespace()
         parsed_args.command = 's3'
+        set_schema_version(mock_db_sqlite3.connect,
+                           DatabaseConnection.SCHEMA_VERSION)
 
         attach_history_handler(session=mock_session, parsed_args=parsed_args)
         self.assertEqual(mock_recorder.add_handler.call_count, 1)
         self.assertIsInstance(
             mock_recorder.add_handler.call_args[0][0], DatabaseHistoryHandler)
         self.assertTrue(mock_db_sqlite3.connect.called)
+        # The queued records are written at exit.
+        close = self.atexit.register.call_args[0][0]
+        close()
+        self.assertTrue(mock_db_sqlite3.connect.return_value.close.called)
+
+    @mock.patch('awscli.customizations.history.sqlite3')
+    @mock.patch('awscli.customizations.history.DatabaseRecordWriter')
+    @mock.patch('awscli.customizations.history.DatabaseConnection')
+    @mock.patch('awscli.customizations.history.HISTORY_RECORDER',
+                spec=HistoryRecorder)
+    def test_attach_history_handler_with_retention(
+            self, mock_recorder, mock_connection, mock_writer, mock_sqlite3):
+        mock_session = mock.Mock(Session)
+        mock_session.get_scoped_config.return_value = {
+            'cli_history': 'enabled',
+            'cli_history_retention_days': '30',
+            'cli_history_max_size_mb': '10',
+            'cli_history_max_payload_size_kb': '64',
+        }
+        parsed_args = argparse.Namespace()
+        parsed_args.command = 's3'
+
+        attach_history_handler(session=mock_session, parsed_args=parsed_args)
+        mock_writer.assert_called_with(
+            mock_connection.return_value, max_age_days=30,
+            max_size=10 * 1024 * 1024, max_payload_size=64 * 1024)
+
+    @mock.patch('awscli.customizations.history.sqlite3')
+    @mock.patch('awscli.customizations.history.DatabaseRecordWriter')
+    @mock.patch('awscli.customizations.history.DatabaseConnection')
+    @mock.patch('awscli.customizations.history.HISTORY_RECORDER',
+                spec=HistoryRecorder)
+    def test_attach_history_handler_ignores_invalid_retention(
+            self, mock_recorder, mock_connection, mock_writer, mock_sqlite3):
+        mock_session = mock.Mock(Session)
+        mock_session.get_scoped_config.return_value = {
+            'cli_history': 'enabled',
+            'cli_history_retention_days': 'forever',
+            'cli_history_max_size_mb': '0',
+        }
+        parsed_args = argparse.Namespace()
+        parsed_args.command = 's3'
+
+        with mock.patch('sys.stderr', StringIO()) as mock_stderr:
+            attach_history_handler(
+                session=mock_session, parsed_args=parsed_args)
+            self.assertIn(
+                'Ignoring cli_history_retention_days', mock_stderr.getvalue())
+            self.assertIn(
+                'Ignoring cli_history_max_size_mb', mock_stderr.getvalue())
+        mock_writer.assert_called_with(mock_connection.return_value)
 
     @mock.patch('awscli.customizations.history.sqlite3')
     @mock.patch('awscli.customizations.history.db.sqlite3')
@@ -121,6 +179,9 @@ class TestAttachHistoryHandler(unittest.TestCase):
         parsed_args = argparse.Namespace()
         parsed_args.command = 's3'
 
+        set_schema_version(mock_db_sqlite3.connect,
+                           DatabaseConnection.SCHEMA_VERSION)
+
         directory_to_create = os.path.join(self.files.rootdir, 'create-dir')
         db_filename = os.path.join(directory_to_create, 'name.db')
         with mock.patch('os.environ', {'AWS_CLI_HISTORY_FILE': db_filename}):
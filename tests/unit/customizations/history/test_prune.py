@@ -0,0 +1,43 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import argparse
+
+from botocore.session import Session
+
+from awscli.testutils import unittest, mock
+from awscli.customizations.history.db import DatabaseRecordWriter
+from awscli.customizations.history.prune import PruneCommand
+
+
+class TestPruneCommand(unittest.TestCase):
+    def setUp(self):
+        self.session = mock.Mock(Session)
+        self.db_writer = mock.Mock(DatabaseRecordWriter)
+        self.prune_cmd = PruneCommand(self.session, self.db_writer)
+        self.parsed_args = argparse.Namespace()
+        self.parsed_globals = argparse.Namespace(color='auto')
+
+    def test_prunes_then_vacuums(self):
+        rc = self.prune_cmd._run_main(self.parsed_args, self.parsed_globals)
+        self.assertEqual(rc, 0)
+        self.assertEqual(
+            self.db_writer.method_calls,
+            [mock.call.prune_records(), mock.call.vacuum(),
+             mock.call.close()])
+
+    def test_closes_writer_on_error(self):
+        self.db_writer.prune_records.side_effect = ValueError()
+        with self.assertRaises(ValueError):
+            self.prune_cmd._run_main(self.parsed_args, self.parsed_globals)
+        self.assertFalse(self.db_writer.vacuum.called)
+        self.assertTrue(self.db_writer.close.called)
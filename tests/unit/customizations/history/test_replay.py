@@ -0,0 +1,201 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import argparse
+import json
+import os
+
+from botocore.hooks import HierarchicalEmitter
+from botocore.session import Session
+
+from awscli.clidriver import create_clidriver
+from awscli.compat import BytesIO
+from awscli.utils import OutputStreamFactory
+from awscli.testutils import unittest, mock, FileCreator
+from awscli.customizations.history.db import DatabaseRecordReader
+from awscli.customizations.history.replay import RecordedResponses
+from awscli.customizations.history.replay import ReplayError
+from awscli.customizations.history.replay import PhaseTimer
+from awscli.customizations.history.replay import ReplayCommand
+
+
+DESCRIBE_REGIONS_RESPONSE = (
+    '<DescribeRegionsResponse '
+    'xmlns="http://ec2.amazonaws.com/doc/2016-11-15/">'
+    '<requestId>1234</requestId>'
+    '<regionInfo><item><regionName>us-east-1</regionName>'
+    '<regionEndpoint>ec2.us-east-1.amazonaws.com</regionEndpoint>'
+    '</item></regionInfo>'
+    '</DescribeRegionsResponse>'
+)
+
+
+class TestRecordedResponses(unittest.TestCase):
+    def test_serves_responses_in_order(self):
+        responses = RecordedResponses([
+            {'status_code': 200, 'headers': {'a': 'b'}, 'body': 'first'},
+            {'status_code': 500, 'headers': {}, 'body': None},
+        ])
+        request = mock.Mock(url='https://example.com')
+        first = responses(request=request)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.headers['a'], 'b')
+        self.assertEqual(first.content, b'first')
+        second = responses(request=request)
+        self.assertEqual(second.status_code, 500)
+        self.assertEqual(second.content, b'')
+        self.assertEqual(responses.served, 2)
+
+    def test_raises_error_when_out_of_responses(self):
+        responses = RecordedResponses([])
+        with self.assertRaises(ReplayError):
+            responses(request=mock.Mock())
+
+
+class TestPhaseTimer(unittest.TestCase):
+    @mock.patch('awscli.customizations.history.replay.time')
+    def test_times_phases(self, mock_time):
+        emitter = HierarchicalEmitter()
+        timer = PhaseTimer()
+        timer.register(emitter)
+        mock_time.time.return_value = 0
+        timer.start()
+        for now, event in [(1, 'before-parameter-build.ec2.Foo'),
+                           (3, 'before-send.ec2.Foo'),
+                           (4, 'after-call.ec2.Foo'),
+                           (5, 'before-parameter-build.ec2.Foo'),
+                           (6, 'before-send.ec2.Foo'),
+                           (8, 'after-call.ec2.Foo')]:
+            mock_time.time.return_value = now
+            emitter.emit(event)
+        mock_time.time.return_value = 10
+        self.assertEqual(timer.stop(), {
+            PhaseTimer.STARTUP: 1,
+            PhaseTimer.REQUEST: 3,
+            PhaseTimer.RESPONSE: 3,
+            PhaseTimer.OTHER: 3,
+        })
+
+    @mock.patch('awscli.customizations.history.replay.time')
+    def test_without_api_calls(self, mock_time):
+        timer = PhaseTimer()
+        mock_time.time.return_value = 0
+        timer.start()
+        mock_time.time.return_value = 2
+        self.assertEqual(timer.stop()[PhaseTimer.STARTUP], 2)
+
+
+class TestReplayCommand(unittest.TestCase):
+    def setUp(self):
+        self.files = FileCreator()
+        self.addCleanup(self.files.remove_all)
+        environ = {
+            'AWS_DATA_PATH': os.environ['AWS_DATA_PATH'],
+            'AWS_CONFIG_FILE': self.files.full_path('config'),
+            'AWS_SHARED_CREDENTIALS_FILE': self.files.full_path(
+                'credentials'),
+        }
+        environ_patch = mock.patch('os.environ', environ)
+        environ_patch.start()
+        self.addCleanup(environ_patch.stop)
+
+        self.output_stream_factory = mock.Mock(OutputStreamFactory)
+        output_stream_context = mock.MagicMock()
+        self.output_stream = BytesIO()
+        output_stream_context.__enter__.return_value = self.output_stream
+        self.output_stream_factory.get_stdout_stream.return_value = \
+            output_stream_context
+
+        self.db_reader = mock.Mock(DatabaseRecordReader)
+        self.records = [
+            {'event_type': 'CLI_ARGUMENTS',
+             'payload': ['ec2', 'describe-regions',
+                         '--region', 'us-east-1']},
+            {'event_type': 'API_CALL', 'payload': {}},
+            {'event_type': 'HTTP_RESPONSE',
+             'payload': {'status_code': 200, 'headers': {},
+                         'body': DESCRIBE_REGIONS_RESPONSE,
+                         'streaming': False}},
+            {'event_type': 'CLI_RC', 'payload': 0},
+        ]
+        self.db_reader.iter_records.return_value = self.records
+        self.db_reader.iter_latest_records.return_value = self.records
+        self.replay_cmd = ReplayCommand(
+            mock.Mock(Session), self.db_reader, self.output_stream_factory,
+            driver_factory=create_clidriver)
+        self.parsed_args = argparse.Namespace(
+            command_id='abc', iterations=2, format='json')
+        self.parsed_globals = argparse.Namespace(color='auto')
+
+    def run_replay(self):
+        with mock.patch('awscli.customizations.history.commands.is_a_tty',
+                        return_value=False):
+            self.replay_cmd._run_main(self.parsed_args, self.parsed_globals)
+        return json.loads(self.output_stream.getvalue().decode('utf-8'))
+
+    def test_replays_recorded_responses(self):
+        report = self.run_replay()
+        self.db_reader.iter_records.assert_called_with('abc')
+        self.assertTrue(self.db_reader.close.called)
+        self.assertEqual(report['Arguments'],
+                         ['ec2', 'describe-regions', '--region', 'us-east-1'])
+        self.assertEqual(report['Iterations'], 2)
+        self.assertEqual(report['ReturnCode'], 0)
+        self.assertEqual(report['RecordedReturnCode'], 0)
+        self.assertIsNone(report['Error'])
+        self.assertEqual(report['RecordedResponses'], 1)
+        self.assertEqual(report['ServedResponses'], 1)
+        self.assertEqual([phase['Phase'] for phase in report['Phases']],
+                         PhaseTimer.PHASES)
+
+    def test_replays_latest_command_as_table(self):
+        self.parsed_args.command_id = 'latest'
+        self.parsed_args.iterations = 1
+        self.parsed_args.format = 'table'
+        with mock.patch('awscli.customizations.history.commands.is_a_tty',
+                        return_value=False):
+            self.replay_cmd._run_main(self.parsed_args, self.parsed_globals)
+        self.assertTrue(self.db_reader.iter_latest_records.called)
+        output = self.output_stream.getvalue().decode('utf-8')
+        self.assertIn('Replayed: aws ec2 describe-regions', output)
+        self.assertIn('Responses served: 1 of 1 recorded', output)
+        self.assertIn(PhaseTimer.RESPONSE, output)
+
+    def test_reports_error_when_out_of_responses(self):
+        del self.records[2]
+        report = self.run_replay()
+        self.assertEqual(report['ReturnCode'], 255)
+        self.assertIn('more requests than the 0', report['Error'])
+
+    def test_requires_recorded_arguments(self):
+        del self.records[0]
+        with self.assertRaises(RuntimeError):
+            self.run_replay()
+
+    def test_does_not_replay_history_commands(self):
+        self.records[0]['payload'] = ['history', 'replay']
+        with self.assertRaises(RuntimeError):
+            self.run_replay()
+
+    def test_iterations_must_be_positive(self):
+        self.parsed_args.iterations = 0
+        with self.assertRaises(ValueError):
+            self.run_replay()
+
+    @mock.patch('awscli.clidriver.create_clidriver')
+    def test_replayed_command_is_not_recorded(self, mock_create_clidriver):
+        from awscli.customizations.history import attach_history_handler
+        replay_cmd = ReplayCommand(mock.Mock(Session))
+        driver = replay_cmd._create_driver()
+        self.assertIs(driver, mock_create_clidriver.return_value)
+        driver.session.unregister.assert_called_with(
+            'session-initialized', attach_history_handler)
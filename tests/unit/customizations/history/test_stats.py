@@ -0,0 +1,133 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import argparse
+import json
+
+from botocore.session import Session
+
+from awscli.compat import BytesIO
+from awscli.utils import OutputStreamFactory
+from awscli.testutils import unittest, mock
+from awscli.customizations.history.db import DatabaseStatsReader
+from awscli.customizations.history.stats import StatsCommand
+from awscli.customizations.history.stats import TableStatsFormatter
+from awscli.customizations.history.stats import JSONStatsFormatter
+
+
+COMMAND_STATS = {
+    'commands': 2, 'total_time': 1500, 'network_time': 300,
+    'cli_overhead': 1200,
+}
+OPERATION_STATS = [
+    {'service': 'ec2', 'operation': 'DescribeRegions', 'calls': 10,
+     'retries': 1, 'bytes_sent': 300, 'bytes_received': 12345,
+     'p50': 100, 'p90': 180, 'p99': 198},
+    {'service': 's3', 'operation': 'ListBuckets', 'calls': 1,
+     'retries': 0, 'bytes_sent': 0, 'bytes_received': 10,
+     'p50': None, 'p90': None, 'p99': None},
+]
+
+
+class TestTableStatsFormatter(unittest.TestCase):
+    def test_formats_table(self):
+        output_stream = BytesIO()
+        TableStatsFormatter(output_stream)(COMMAND_STATS, OPERATION_STATS)
+        self.assertEqual(
+            output_stream.getvalue().decode('utf-8'),
+            'Commands:     2\n'
+            'Total time:   1500 ms\n'
+            'Network time: 300 ms\n'
+            'CLI overhead: 1200 ms\n'
+            '\n'
+            'Service  Operation        Calls  Retries  p50 (ms)  p90 (ms)'
+            '  p99 (ms)  Sent (bytes)  Received (bytes)\n'
+            'ec2      DescribeRegions     10        1       100       180'
+            '       198           300             12345\n'
+            's3       ListBuckets          1        0         -         -'
+            '         -             0                10\n'
+        )
+
+    def test_formats_table_without_operations(self):
+        output_stream = BytesIO()
+        TableStatsFormatter(output_stream)(COMMAND_STATS, [])
+        self.assertTrue(
+            output_stream.getvalue().endswith(b'CLI overhead: 1200 ms\n'))
+
+
+class TestJSONStatsFormatter(unittest.TestCase):
+    def test_formats_json(self):
+        output_stream = BytesIO()
+        JSONStatsFormatter(output_stream)(COMMAND_STATS, OPERATION_STATS[:1])
+        stats = json.loads(output_stream.getvalue().decode('utf-8'))
+        self.assertEqual(stats, {
+            'Commands': {
+                'Count': 2, 'TotalTimeMs': 1500, 'NetworkTimeMs': 300,
+                'CliOverheadMs': 1200,
+            },
+            'Operations': [{
+                'Service': 'ec2', 'Operation': 'DescribeRegions',
+                'Calls': 10, 'Retries': 1, 'LatencyP50Ms': 100,
+                'LatencyP90Ms': 180, 'LatencyP99Ms': 198,
+                'BytesSent': 300, 'BytesReceived': 12345,
+            }],
+        })
+
+
+class TestStatsCommand(unittest.TestCase):
+    def setUp(self):
+        self.session = mock.Mock(Session)
+        self.output_stream_factory = mock.Mock(OutputStreamFactory)
+        output_stream_context = mock.MagicMock()
+        self.output_stream = BytesIO()
+        output_stream_context.__enter__.return_value = self.output_stream
+        self.output_stream_factory.get_stdout_stream.return_value = \
+            output_stream_context
+
+        self.db_reader = mock.Mock(DatabaseStatsReader)
+        self.db_reader.get_command_stats.return_value = COMMAND_STATS
+        self.db_reader.iter_operation_stats.return_value = iter(
+            OPERATION_STATS)
+        self.stats_cmd = StatsCommand(
+            self.session, self.db_reader, self.output_stream_factory)
+
+        self.parsed_args = argparse.Namespace(
+            last=None, since=None, until=None, format='json')
+        self.parsed_globals = argparse.Namespace(color='auto')
+
+    @mock.patch('awscli.customizations.history.commands.is_a_tty',
+                mock.Mock(return_value=False))
+    def test_passes_range_to_reader(self):
+        self.parsed_args.last = 5
+        self.parsed_args.since = '1970-01-01T00:00:01Z'
+        self.parsed_args.until = '1970-01-01T00:00:02+00:00'
+        self.stats_cmd._run_main(self.parsed_args, self.parsed_globals)
+        expected_range = {'since': 1000, 'until': 2000, 'limit': 5}
+        self.db_reader.get_command_stats.assert_called_with(**expected_range)
+        self.db_reader.iter_operation_stats.assert_called_with(
+            **expected_range)
+        stats = json.loads(self.output_stream.getvalue().decode('utf-8'))
+        self.assertEqual(len(stats['Operations']), 2)
+        self.assertTrue(self.db_reader.close.called)
+
+    def test_no_commands_in_range(self):
+        self.db_reader.get_command_stats.return_value = dict(
+            COMMAND_STATS, commands=0)
+        with self.assertRaises(RuntimeError):
+            self.stats_cmd._run_main(self.parsed_args, self.parsed_globals)
+        self.assertFalse(self.db_reader.iter_operation_stats.called)
+        self.assertTrue(self.db_reader.close.called)
+
+    def test_last_must_be_positive(self):
+        self.parsed_args.last = 0
+        with self.assertRaises(ValueError):
+            self.stats_cmd._run_main(self.parsed_args, self.parsed_globals)
@@ -0,0 +1,184 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import mock
+from botocore.exceptions import ClientError
+
+from awscli.testutils import unittest
+from awscli.compat import queue
+from awscli.customizations.s3.fileinfo import FileInfo
+from awscli.customizations.s3.utils import WarningResult
+from awscli.customizations.s3.objectattributes import get_target_attributes
+from awscli.customizations.s3.objectattributes import needs_head_object
+from awscli.customizations.s3.objectattributes import \
+    matches_target_attributes
+from awscli.customizations.s3.objectattributes import carry_over_attributes
+from awscli.customizations.s3.objectattributes import \
+    ObjectAttributesProvider
+
+
+class TestGetTargetAttributes(unittest.TestCase):
+    def test_maps_cli_params(self):
+        self.assertEqual(
+            get_target_attributes(
+                {'storage_class': 'STANDARD_IA', 'cache_control': 'no-cache'}),
+            {'StorageClass': 'STANDARD_IA', 'CacheControl': 'no-cache'}
+        )
+
+    def test_ignores_non_attribute_params(self):
+        self.assertEqual(
+            get_target_attributes(
+                {'metadata': {'foo': 'bar'}, 'request_payer': 'requester'}),
+            {'Metadata': {'foo': 'bar'}}
+        )
+
+    def test_no_attributes(self):
+        self.assertEqual(get_target_attributes({}), {})
+
+
+class TestNeedsHeadObject(unittest.TestCase):
+    def test_not_needed_if_listed_attributes_match(self):
+        self.assertFalse(needs_head_object(
+            {'StorageClass': 'STANDARD_IA'}, {'StorageClass': 'STANDARD_IA'}))
+
+    def test_needed_if_listed_attributes_differ(self):
+        self.assertTrue(needs_head_object(
+            {'StorageClass': 'STANDARD'}, {'StorageClass': 'STANDARD_IA'}))
+
+    def test_needed_for_head_object_attributes(self):
+        self.assertTrue(needs_head_object(
+            {'StorageClass': 'STANDARD'}, {'ContentType': 'text/plain'}))
+
+    def test_not_needed_if_already_has_head_object_data(self):
+        self.assertFalse(needs_head_object(
+            {'Metadata': {}}, {'ContentType': 'text/plain'}))
+
+
+class TestMatchesTargetAttributes(unittest.TestCase):
+    def test_matches(self):
+        self.assertTrue(matches_target_attributes(
+            {'StorageClass': 'STANDARD_IA', 'ContentType': 'text/plain',
+             'Metadata': {}},
+            {'StorageClass': 'STANDARD_IA', 'ContentType': 'text/plain'}
+        ))
+
+    def test_does_not_match(self):
+        self.assertFalse(matches_target_attributes(
+            {'StorageClass': 'STANDARD_IA'}, {'StorageClass': 'STANDARD'}))
+
+    def test_uses_defaults_for_missing_attributes(self):
+        self.assertTrue(matches_target_attributes(
+            {'Metadata': {}}, {'StorageClass': 'STANDARD'}))
+
+    def test_requires_head_object_data_to_match(self):
+        self.assertFalse(matches_target_attributes(
+            {'StorageClass': 'STANDARD'}, {'ContentType': 'text/plain'}))
+
+    def test_unverifiable_attributes_never_match(self):
+        self.assertFalse(matches_target_attributes(
+            {'Metadata': {}}, {'ACL': 'private'}))
+
+    def test_no_response_data(self):
+        self.assertFalse(matches_target_attributes(
+            None, {'StorageClass': 'STANDARD_IA'}))
+
+
+class TestCarryOverAttributes(unittest.TestCase):
+    def test_carries_over_unchanged_attributes(self):
+        request_params = {'StorageClass': 'STANDARD_IA'}
+        carry_over_attributes(
+            request_params,
+            {'StorageClass': 'STANDARD', 'ContentType': 'text/plain',
+             'Metadata': {'foo': 'bar'}, 'ContentLength': 100}
+        )
+        self.assertEqual(
+            request_params,
+            {'StorageClass': 'STANDARD_IA', 'ContentType': 'text/plain',
+             'Metadata': {'foo': 'bar'}, 'MetadataDirective': 'REPLACE'}
+        )
+
+    def test_does_not_carry_over_kms_key_if_setting_encryption(self):
+        request_params = {'ServerSideEncryption': 'AES256'}
+        carry_over_attributes(
+            request_params,
+            {'ServerSideEncryption': 'aws:kms', 'SSEKMSKeyId': 'key',
+             'Metadata': {}}
+        )
+        self.assertEqual(
+            request_params,
+            {'ServerSideEncryption': 'AES256', 'MetadataDirective': 'REPLACE'}
+        )
+
+    def test_noop_without_head_object_data(self):
+        request_params = {'StorageClass': 'STANDARD_IA'}
+        carry_over_attributes(request_params, {'StorageClass': 'STANDARD'})
+        self.assertEqual(request_params, {'StorageClass': 'STANDARD_IA'})
+
+
+class TestObjectAttributesProvider(unittest.TestCase):
+    def setUp(self):
+        self.client = mock.Mock()
+        self.result_queue = queue.Queue()
+        self.cli_params = {'storage_class': 'STANDARD_IA'}
+
+    def get_provider(self):
+        return ObjectAttributesProvider(
+            self.client, self.cli_params, self.result_queue,
+            max_concurrency=2)
+
+    def create_fileinfo(self, key, storage_class='STANDARD'):
+        return FileInfo(
+            src='bucket/' + key, operation_name='set-attributes',
+            associated_response_data={'StorageClass': storage_class})
+
+    def test_adds_head_object_data(self):
+        self.client.head_object.return_value = {'Metadata': {'a': 'b'}}
+        fileinfo = self.create_fileinfo('foo')
+        results = list(self.get_provider().call([fileinfo]))
+        self.assertEqual(results, [fileinfo])
+        self.assertEqual(
+            fileinfo.associated_response_data,
+            {'StorageClass': 'STANDARD', 'Metadata': {'a': 'b'}})
+        self.client.head_object.assert_called_with(
+            Bucket='bucket', Key='foo')
+
+    def test_does_not_head_matching_objects(self):
+        fileinfo = self.create_fileinfo('foo', 'STANDARD_IA')
+        results = list(self.get_provider().call([fileinfo]))
+        self.assertEqual(results, [fileinfo])
+        self.assertFalse(self.client.head_object.called)
+
+    def test_does_not_head_glacier_objects(self):
+        fileinfo = self.create_fileinfo('foo', 'GLACIER')
+        results = list(self.get_provider().call([fileinfo]))
+        self.assertEqual(results, [fileinfo])
+        self.assertFalse(self.client.head_object.called)
+
+    def test_preserves_order(self):
+        self.client.head_object.return_value = {'Metadata': {}}
+        fileinfos = [
+            self.create_fileinfo(str(i), ['STANDARD', 'STANDARD_IA'][i % 2])
+            for i in range(50)
+        ]
+        results = list(self.get_provider().call(fileinfos))
+        self.assertEqual(results, fileinfos)
+        self.assertEqual(self.client.head_object.call_count, 25)
+
+    def test_warns_and_skips_on_head_object_error(self):
+        self.client.head_object.side_effect = ClientError(
+            {'Error': {'Code': '403', 'Message': 'Forbidden'}}, 'HeadObject')
+        fileinfo = self.create_fileinfo('foo')
+        results = list(self.get_provider().call([fileinfo]))
+        self.assertEqual(results, [])
+        warning = self.result_queue.get()
+        self.assertIsInstance(warning, WarningResult)
+        self.assertIn('s3://bucket/foo', warning.message)
@@ -0,0 +1,237 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import threading
+
+import mock
+from botocore.exceptions import ClientError
+from concurrent.futures import CancelledError
+
+from awscli.testutils import unittest
+from awscli.compat import queue
+from awscli.customizations.s3.results import SuccessResult
+from awscli.customizations.s3.results import FailureResult
+from awscli.customizations.s3.restore import is_restore_ongoing
+from awscli.customizations.s3.restore import ThrottlingBackoff
+from awscli.customizations.s3.restore import RestoreManager
+from awscli.customizations.s3.restore import RestoreWaiter
+
+
+def create_client_error(code, status_code=400):
+    return ClientError(
+        {'Error': {'Code': code, 'Message': 'message'},
+         'ResponseMetadata': {'HTTPStatusCode': status_code}},
+        'RestoreObject'
+    )
+
+
+class TestIsRestoreOngoing(unittest.TestCase):
+    def test_ongoing(self):
+        self.assertTrue(is_restore_ongoing(
+            {'Restore': 'ongoing-request="true"'}))
+
+    def test_completed(self):
+        self.assertFalse(is_restore_ongoing(
+            {'Restore': 'ongoing-request="false", '
+                        'expiry-date="Fri, 23 Dec 2012 00:00:00 GMT"'}))
+
+    def test_no_restore(self):
+        self.assertFalse(is_restore_ongoing({}))
+
+
+class TestThrottlingBackoff(unittest.TestCase):
+    def setUp(self):
+        self.sleep = mock.Mock()
+        self.func = mock.Mock()
+        self.backoff = ThrottlingBackoff(
+            max_attempts=3, base_delay=1, max_delay=60, sleep=self.sleep,
+            rand=lambda: 1)
+
+    def test_returns_response(self):
+        self.func.return_value = {'foo': 'bar'}
+        self.assertEqual(self.backoff(self.func, Bucket='bucket'),
+                         {'foo': 'bar'})
+        self.func.assert_called_with(Bucket='bucket')
+        self.assertFalse(self.sleep.called)
+
+    def test_retries_throttling_errors(self):
+        self.func.side_effect = [create_client_error('SlowDown'), {}]
+        self.assertEqual(self.backoff(self.func), {})
+        self.assertEqual(self.func.call_count, 2)
+        self.assertEqual(self.sleep.call_count, 1)
+
+    def test_retries_service_unavailable_status(self):
+        self.func.side_effect = [create_client_error('503', 503), {}]
+        self.assertEqual(self.backoff(self.func), {})
+        self.assertEqual(self.func.call_count, 2)
+
+    def test_does_not_retry_other_errors(self):
+        self.func.side_effect = create_client_error('AccessDenied', 403)
+        with self.assertRaises(ClientError):
+            self.backoff(self.func)
+        self.assertEqual(self.func.call_count, 1)
+        self.assertFalse(self.sleep.called)
+
+    def test_raises_after_max_attempts(self):
+        self.func.side_effect = create_client_error('SlowDown', 503)
+        with self.assertRaises(ClientError):
+            self.backoff(self.func)
+        self.assertEqual(self.func.call_count, 3)
+
+    def test_delay_is_capped(self):
+        backoff = ThrottlingBackoff(base_delay=1, max_delay=4, rand=lambda: 1)
+        self.assertEqual(backoff._get_delay(1), 1)
+        self.assertEqual(backoff._get_delay(2), 2)
+        self.assertEqual(backoff._get_delay(5), 4)
+
+    def test_delay_is_jittered(self):
+        backoff = ThrottlingBackoff(base_delay=1, rand=lambda: 0.5)
+        self.assertEqual(backoff._get_delay(3), 2)
+
+
+class TestRestoreManager(unittest.TestCase):
+    def setUp(self):
+        self.client = mock.Mock()
+        self.backoff = ThrottlingBackoff(sleep=mock.Mock())
+
+    def test_restore_object(self):
+        self.client.restore_object.return_value = {}
+        with RestoreManager(self.client, backoff=self.backoff) as manager:
+            future = manager.restore_object(
+                'bucket', 'key', {'RestoreRequest': {'Days': 1}})
+        self.assertEqual(future.result(), {})
+        self.client.restore_object.assert_called_with(
+            Bucket='bucket', Key='key', RestoreRequest={'Days': 1})
+
+    def test_head_object(self):
+        self.client.head_object.return_value = {'Restore': 'foo'}
+        with RestoreManager(self.client, backoff=self.backoff) as manager:
+            future = manager.head_object('bucket', 'key')
+        self.assertEqual(future.result(), {'Restore': 'foo'})
+        self.client.head_object.assert_called_with(
+            Bucket='bucket', Key='key')
+
+    def test_propagates_errors(self):
+        self.client.restore_object.side_effect = create_client_error(
+            'AccessDenied', 403)
+        with RestoreManager(self.client, backoff=self.backoff) as manager:
+            future = manager.restore_object('bucket', 'key')
+        with self.assertRaises(ClientError):
+            future.result()
+
+    def test_cancels_pending_requests_on_error(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def restore_object(**kwargs):
+            started.set()
+            release.wait(5)
+            return {}
+
+        self.client.restore_object.side_effect = restore_object
+        futures = []
+        try:
+            with RestoreManager(self.client, max_concurrency=1,
+                                backoff=self.backoff) as manager:
+                futures.append(manager.restore_object('bucket', 'first'))
+                started.wait(5)
+                futures.append(manager.restore_object('bucket', 'second'))
+                release.set()
+                raise KeyboardInterrupt()
+        except KeyboardInterrupt:
+            pass
+        self.assertEqual(futures[0].result(), {})
+        with self.assertRaises(CancelledError):
+            futures[1].result()
+        self.assertEqual(self.client.restore_object.call_count, 1)
+
+
+class TestRestoreWaiter(unittest.TestCase):
+    def setUp(self):
+        self.client = mock.Mock()
+        self.result_queue = queue.Queue()
+        self.sleep = mock.Mock()
+        self.waiter = RestoreWaiter(
+            self.client, self.result_queue, min_delay=30, max_delay=60,
+            sleep=self.sleep)
+
+    def result_kwargs(self, key):
+        return {
+            'transfer_type': 'restore',
+            'src': 's3://bucket/' + key,
+            'dest': None,
+        }
+
+    def get_results(self):
+        results = []
+        while not self.result_queue.empty():
+            results.append(self.result_queue.get())
+        return results
+
+    def test_waits_until_restored(self):
+        self.client.head_object.side_effect = [
+            {'Restore': 'ongoing-request="true"'},
+            {'Restore': 'ongoing-request="true"'},
+            {'Restore': 'ongoing-request="false"'},
+        ]
+        self.waiter.add('bucket', 'key', self.result_kwargs('key'))
+        self.waiter.wait()
+        self.assertEqual(self.client.head_object.call_count, 3)
+        self.assertEqual(
+            self.sleep.call_args_list,
+            [mock.call(30), mock.call(60), mock.call(60)])
+        self.assertEqual(
+            self.get_results(),
+            [SuccessResult(**self.result_kwargs('key'))])
+
+    def test_passes_head_object_args(self):
+        self.client.head_object.return_value = {}
+        waiter = RestoreWaiter(
+            self.client, self.result_queue,
+            head_object_args={'RequestPayer': 'requester'}, sleep=self.sleep)
+        waiter.add('bucket', 'key', self.result_kwargs('key'))
+        waiter.wait()
+        self.client.head_object.assert_called_with(
+            Bucket='bucket', Key='key', RequestPayer='requester')
+
+    def test_only_polls_pending_objects(self):
+        responses = {
+            'done': [{}],
+            'ongoing': [
+                {'Restore': 'ongoing-request="true"'},
+                {'Restore': 'ongoing-request="false"'},
+            ]
+        }
+        self.client.head_object.side_effect = \
+            lambda Bucket, Key: responses[Key].pop(0)
+        self.waiter.add('bucket', 'done', self.result_kwargs('done'))
+        self.waiter.add('bucket', 'ongoing', self.result_kwargs('ongoing'))
+        self.waiter.wait()
+        self.assertEqual(self.client.head_object.call_count, 3)
+        self.assertEqual(
+            self.get_results(),
+            [SuccessResult(**self.result_kwargs('done')),
+             SuccessResult(**self.result_kwargs('ongoing'))])
+
+    def test_puts_failure_on_error(self):
+        error = create_client_error('AccessDenied', 403)
+        self.client.head_object.side_effect = error
+        self.waiter.add('bucket', 'key', self.result_kwargs('key'))
+        self.waiter.wait()
+        self.assertEqual(
+            self.get_results(),
+            [FailureResult(exception=error, **self.result_kwargs('key'))])
+
+    def test_no_pending_objects(self):
+        self.waiter.wait()
+        self.assertFalse(self.sleep.called)
+        self.assertFalse(self.client.head_object.called)
@@ -13,6 +13,8 @@
 import os
 
 import mock
+from botocore.exceptions import ClientError
+from concurrent.futures import Future, CancelledError
 from s3transfer.manager import TransferManager
 
 from awscli.testutils import unittest
@@ -23,10 +25,14 @@ from awscli.customizations.s3.s3handler import S3TransferHandlerFactory
 from awscli.customizations.s3.s3handler import UploadRequestSubmitter
 from awscli.customizations.s3.s3handler import DownloadRequestSubmitter
 from awscli.customizations.s3.s3handler import CopyRequestSubmitter
+from awscli.customizations.s3.s3handler import SetAttributesRequestSubmitter
 from awscli.customizations.s3.s3handler import UploadStreamRequestSubmitter
 from awscli.customizations.s3.s3handler import DownloadStreamRequestSubmitter
 from awscli.customizations.s3.s3handler import DeleteRequestSubmitter
 from awscli.customizations.s3.s3handler import LocalDeleteRequestSubmitter
+from awscli.customizations.s3.s3handler import RestoreRequestSubmitter
+from awscli.customizations.s3.s3handler import S3RestoreHandler
+from awscli.customizations.s3.s3handler import S3RestoreHandlerFactory
 from awscli.customizations.s3.fileinfo import FileInfo
 from awscli.customizations.s3.results import QueuedResult
 from awscli.customizations.s3.results import SuccessResult
@@ -34,6 +40,7 @@ from awscli.customizations.s3.results import FailureResult
 from awscli.customizations.s3.results import UploadResultSubscriber
 from awscli.customizations.s3.results import DownloadResultSubscriber
 from awscli.customizations.s3.results import CopyResultSubscriber
+from awscli.customizations.s3.results import SetAttributesResultSubscriber
 from awscli.customizations.s3.results import UploadStreamResultSubscriber
 from awscli.customizations.s3.results import DownloadStreamResultSubscriber
 from awscli.customizations.s3.results import DeleteResultSubscriber
@@ -41,6 +48,9 @@ from awscli.customizations.s3.results import ResultRecorder
 from awscli.customizations.s3.results import ResultProcessor
 from awscli.customizations.s3.results import CommandResultRecorder
 from awscli.customizations.s3.results import DryRunResult
+from awscli.customizations.s3.results import CtrlCResult
+from awscli.customizations.s3.restore import RestoreManager
+from awscli.customizations.s3.restore import RestoreWaiter
 from awscli.customizations.s3.utils import MAX_UPLOAD_SIZE
 from awscli.customizations.s3.utils import NonSeekableStream
 from awscli.customizations.s3.utils import StdoutBytesWriter
@@ -72,6 +82,12 @@ class TestS3TransferHandlerFactory(unittest.TestCase):
         self.assertIsInstance(
             factory(self.client, self.result_queue), S3TransferHandler)
 
+    def test_restore_handler(self):
+        factory = S3RestoreHandlerFactory(
+            self.cli_params, self.runtime_config)
+        self.assertIsInstance(
+            factory(self.client, self.result_queue), S3RestoreHandler)
+
 
 class TestS3TransferHandler(unittest.TestCase):
     def setUp(self):
@@ -805,6 +821,99 @@ class TestCopyRequestSubmitter(BaseTransferRequestSubmitterTest):
             self.assertIsInstance(actual_subscriber, ref_subscribers[i])
 
 
+class TestSetAttributesRequestSubmitter(BaseTransferRequestSubmitterTest):
+    def setUp(self):
+        super(TestSetAttributesRequestSubmitter, self).setUp()
+        self.cli_params['storage_class'] = 'STANDARD_IA'
+        self.transfer_request_submitter = SetAttributesRequestSubmitter(
+            self.transfer_manager, self.result_queue, self.cli_params)
+
+    def create_fileinfo(self, response_data):
+        return FileInfo(
+            src=self.bucket+'/'+self.key, dest=self.bucket+'/'+self.key,
+            operation_name='set-attributes', size=100,
+            associated_response_data=response_data)
+
+    def test_can_submit(self):
+        fileinfo = self.create_fileinfo({})
+        self.assertTrue(
+            self.transfer_request_submitter.can_submit(fileinfo))
+        fileinfo.operation_name = 'copy'
+        self.assertFalse(
+            self.transfer_request_submitter.can_submit(fileinfo))
+
+    def test_submit(self):
+        fileinfo = self.create_fileinfo({
+            'StorageClass': 'STANDARD', 'ContentType': 'text/plain',
+            'Metadata': {'foo': 'bar'}
+        })
+        future = self.transfer_request_submitter.submit(fileinfo)
+        self.assertIs(self.transfer_manager.copy.return_value, future)
+        copy_call_kwargs = self.transfer_manager.copy.call_args[1]
+        self.assertEqual(
+            copy_call_kwargs['copy_source'],
+            {'Bucket': self.bucket, 'Key': self.key})
+        self.assertEqual(copy_call_kwargs['bucket'], self.bucket)
+        self.assertEqual(copy_call_kwargs['key'], self.key)
+        self.assertEqual(
+            copy_call_kwargs['extra_args'],
+            {'StorageClass': 'STANDARD_IA', 'ContentType': 'text/plain',
+             'Metadata': {'foo': 'bar'}, 'MetadataDirective': 'REPLACE'})
+
+        ref_subscribers = [
+            ProvideSizeSubscriber,
+            SetAttributesResultSubscriber
+        ]
+        actual_subscribers = copy_call_kwargs['subscribers']
+        self.assertEqual(len(ref_subscribers), len(actual_subscribers))
+        for i, actual_subscriber in enumerate(actual_subscribers):
+            self.assertIsInstance(actual_subscriber, ref_subscribers[i])
+
+    def test_skips_objects_with_matching_attributes(self):
+        fileinfo = self.create_fileinfo({'StorageClass': 'STANDARD_IA'})
+        future = self.transfer_request_submitter.submit(fileinfo)
+        self.assertIsNone(future)
+        self.assertEqual(len(self.transfer_manager.copy.call_args_list), 0)
+        # Skipping an object that is already up to date is not a warning.
+        self.assertTrue(self.result_queue.empty())
+
+    def test_warns_that_multipart_copy_drops_tags(self):
+        fileinfo = self.create_fileinfo({'StorageClass': 'STANDARD'})
+        fileinfo.size = 5 * (1024 ** 3)
+        future = self.transfer_request_submitter.submit(fileinfo)
+        self.assertIs(self.transfer_manager.copy.return_value, future)
+        warning_result = self.result_queue.get()
+        self.assertIsInstance(warning_result, WarningResult)
+        self.assertIn(
+            'tags of the object are not kept', warning_result.message)
+
+    def test_no_tags_warning_for_single_copy(self):
+        fileinfo = self.create_fileinfo({'StorageClass': 'STANDARD'})
+        self.transfer_request_submitter.submit(fileinfo)
+        self.assertTrue(self.result_queue.empty())
+
+    def test_warn_glacier_for_incompatible(self):
+        fileinfo = self.create_fileinfo({'StorageClass': 'GLACIER'})
+        future = self.transfer_request_submitter.submit(fileinfo)
+        self.assertIsNone(future)
+        warning_result = self.result_queue.get()
+        self.assertIsInstance(warning_result, WarningResult)
+        self.assertIn(
+            'Unable to perform set-attributes operations on GLACIER objects',
+            warning_result.message)
+
+    def test_dry_run(self):
+        self.cli_params['dryrun'] = True
+        fileinfo = self.create_fileinfo({'StorageClass': 'STANDARD'})
+        self.transfer_request_submitter.submit(fileinfo)
+
+        result = self.result_queue.get()
+        self.assertIsInstance(result, DryRunResult)
+        self.assertEqual(result.transfer_type, 'set-attributes')
+        self.assertEqual(result.src, 's3://' + self.bucket + '/' + self.key)
+        self.assertIsNone(result.dest)
+
+
 class TestUploadStreamRequestSubmitter(BaseTransferRequestSubmitterTest):
     def setUp(self):
         super(TestUploadStreamRequestSubmitter, self).setUp()
@@ -995,6 +1104,119 @@ class TestDeleteRequestSubmitter(BaseTransferRequestSubmitterTest):
         self.assertIsNone(result.dest)
 
 
+class TestRestoreRequestSubmitter(BaseTransferRequestSubmitterTest):
+    def setUp(self):
+        super(TestRestoreRequestSubmitter, self).setUp()
+        self.restore_manager = mock.Mock(spec=RestoreManager)
+        self.restore_future = Future()
+        self.restore_manager.restore_object.return_value = \
+            self.restore_future
+        self.cli_params['days'] = 7
+        self.restore_waiter = None
+
+    def get_submitter(self):
+        return RestoreRequestSubmitter(
+            self.restore_manager, self.result_queue, self.cli_params,
+            restore_waiter=self.restore_waiter)
+
+    def create_fileinfo(self, storage_class='GLACIER'):
+        return FileInfo(
+            src=self.bucket+'/'+self.key, dest=None, operation_name='restore',
+            associated_response_data={'StorageClass': storage_class})
+
+    def submit_and_complete(self, result=None, exception=None):
+        future = self.get_submitter().submit(self.create_fileinfo())
+        self.assertIs(future, self.restore_future)
+        queued_result = self.result_queue.get()
+        self.assertIsInstance(queued_result, QueuedResult)
+        self.assertEqual(queued_result.total_transfer_size, 0)
+        if exception is not None:
+            self.restore_future.set_exception(exception)
+        else:
+            self.restore_future.set_result(result or {})
+
+    def test_can_submit(self):
+        fileinfo = self.create_fileinfo()
+        self.assertTrue(self.get_submitter().can_submit(fileinfo))
+        fileinfo.operation_name = 'delete'
+        self.assertFalse(self.get_submitter().can_submit(fileinfo))
+
+    def test_submit(self):
+        self.submit_and_complete()
+        self.restore_manager.restore_object.assert_called_with(
+            self.bucket, self.key, {'RestoreRequest': {'Days': 7}})
+        result = self.result_queue.get()
+        self.assertIsInstance(result, SuccessResult)
+        self.assertEqual(result.transfer_type, 'restore')
+        self.assertEqual(result.src, 's3://' + self.bucket + '/' + self.key)
+        self.assertIsNone(result.dest)
+
+    def test_submit_with_tier(self):
+        self.cli_params['tier'] = 'Bulk'
+        self.submit_and_complete()
+        self.restore_manager.restore_object.assert_called_with(
+            self.bucket, self.key,
+            {'RestoreRequest': {
+                'Days': 7, 'GlacierJobParameters': {'Tier': 'Bulk'}}})
+
+    def test_failure(self):
+        error = ClientError(
+            {'Error': {'Code': 'AccessDenied', 'Message': 'Denied'}},
+            'RestoreObject')
+        self.submit_and_complete(exception=error)
+        result = self.result_queue.get()
+        self.assertIsInstance(result, FailureResult)
+        self.assertIs(result.exception, error)
+
+    def test_restore_already_in_progress_is_not_a_failure(self):
+        error = ClientError(
+            {'Error': {'Code': 'RestoreAlreadyInProgress', 'Message': ''}},
+            'RestoreObject')
+        self.submit_and_complete(exception=error)
+        self.assertIsInstance(self.result_queue.get(), SuccessResult)
+
+    def test_cancelled(self):
+        self.submit_and_complete(exception=CancelledError())
+        self.assertIsInstance(self.result_queue.get(), CtrlCResult)
+
+    def test_adds_to_restore_waiter(self):
+        self.restore_waiter = mock.Mock(spec=RestoreWaiter)
+        self.submit_and_complete()
+        self.restore_waiter.add.assert_called_with(
+            self.bucket, self.key,
+            {'transfer_type': 'restore',
+             'src': 's3://' + self.bucket + '/' + self.key,
+             'dest': None})
+        self.assertTrue(self.result_queue.empty())
+
+    def test_skips_objects_that_are_not_archived(self):
+        future = self.get_submitter().submit(
+            self.create_fileinfo('STANDARD'))
+        self.assertIsNone(future)
+        self.assertFalse(self.restore_manager.restore_object.called)
+        warning_result = self.result_queue.get()
+        self.assertIsInstance(warning_result, WarningResult)
+        self.assertIn('Only archived objects', warning_result.message)
+        self.assertIn('(GLACIER or DEEP_ARCHIVE)', warning_result.message)
+
+    def test_does_not_warn_for_unarchived_objects_in_dir_op(self):
+        self.cli_params['dir_op'] = True
+        future = self.get_submitter().submit(
+            self.create_fileinfo('STANDARD'))
+        self.assertIsNone(future)
+        self.assertTrue(self.result_queue.empty())
+
+    def test_dry_run(self):
+        self.cli_params['dryrun'] = True
+        self.get_submitter().submit(self.create_fileinfo())
+        result = self.result_queue.get()
+        self.assertIsInstance(result, DryRunResult)
+        self.assertEqual(result.transfer_type, 'restore')
+        self.assertEqual(result.src, 's3://' + self.bucket + '/' + self.key)
+        self.assertIsNone(result.dest)
+        self.assertFalse(self.restore_manager.restore_object.called)
+
+
 class TestLocalDeleteRequestSubmitter(BaseTransferRequestSubmitterTest):
     def setUp(self):
         super(TestLocalDeleteRequestSubmitter, self).setUp()
@@ -0,0 +1,90 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import threading
+
+import mock
+from botocore.paginate import Paginator
+
+from awscli.testutils import unittest
+from awscli.customizations.parallelsegments import SegmentedPageIterator
+
+
+class TestSegmentedPageIterator(unittest.TestCase):
+    def setUp(self):
+        self.config = {
+            'input_token': 'ExclusiveStartKey',
+            'output_token': 'LastEvaluatedKey',
+            'result_key': ['Items', 'Count'],
+            'non_aggregate_keys': ['ConsumedCapacity'],
+        }
+        # The pages of each segment, by segment.
+        self.segments = {
+            0: [{'Items': ['a', 'b'], 'Count': 2, 'LastEvaluatedKey': 'b',
+                 'ConsumedCapacity': {'TableName': 'table'}},
+                {'Items': ['c'], 'Count': 1}],
+            1: [{'Items': ['d'], 'Count': 1}],
+        }
+
+    def scan(self, **kwargs):
+        pages = self.segments[kwargs['Segment']]
+        if 'ExclusiveStartKey' in kwargs:
+            return pages[1]
+        return pages[0]
+
+    def paginate(self, total_segments=2, method=None):
+        paginator = Paginator(
+            mock.Mock(side_effect=method or self.scan), self.config,
+            mock.Mock())
+        return SegmentedPageIterator(
+            [paginator.paginate(Segment=segment, TotalSegments=total_segments)
+             for segment in range(total_segments)], 1)
+
+    def test_merges_pages_of_segments(self):
+        pages = list(self.paginate())
+        self.assertEqual(
+            sorted(item for page in pages for item in page['Items']),
+            ['a', 'b', 'c', 'd'])
+        # The pages of a segment are still in order.
+        self.assertLess(pages.index(self.segments[0][0]),
+                        pages.index(self.segments[0][1]))
+
+    def test_full_result(self):
+        result = self.paginate().build_full_result()
+        self.assertEqual(sorted(result['Items']), ['a', 'b', 'c', 'd'])
+        self.assertEqual(result['Count'], 4)
+        self.assertEqual(result['ConsumedCapacity'], {'TableName': 'table'})
+        self.assertNotIn('NextToken', result)
+
+    def test_reads_segments_concurrently(self):
+        barrier = threading.Event()
+        started = []
+
+        def scan(**kwargs):
+            started.append(kwargs['Segment'])
+            if len(started) == 2:
+                barrier.set()
+            # Only completes if both segments are read at the same time
+            self.assertTrue(barrier.wait(5))
+            return {'Items': [kwargs['Segment']], 'Count': 1}
+
+        result = self.paginate(method=scan).build_full_result()
+        self.assertEqual(sorted(result['Items']), [0, 1])
+
+    def test_raises_errors_of_segments(self):
+        def scan(**kwargs):
+            if kwargs['Segment'] == 1:
+                raise ValueError('scan failed')
+            return self.scan(**kwargs)
+
+        with self.assertRaises(ValueError):
+            list(self.paginate(method=scan))
@@ -250,6 +250,77 @@ class TestS3Uploader(unittest.TestCase):
         with self.assertRaises(RuntimeError):
             uploader.file_exists(key)
 
+    def create_listing_uploader(self, prefix=None):
+        return S3Uploader(
+            self.s3client, self.bucket_name, self.region, prefix, None,
+            False, self.transfer_manager_mock, list_existing_objects=True)
+
+    def test_file_exists_lists_prefix_once(self):
+        s3uploader = self.create_listing_uploader("prefix")
+        self.s3client_stub.add_response(
+            "list_objects_v2",
+            {"Contents": [{"Key": "prefix/abc"}, {"Key": "prefix/def"}]},
+            {"Bucket": self.bucket_name, "Prefix": "prefix/",
+             "Delimiter": "/"})
+        with self.s3client_stub:
+            self.assertTrue(s3uploader.file_exists("prefix/abc"))
+            self.assertTrue(s3uploader.file_exists("prefix/def"))
+            self.assertFalse(s3uploader.file_exists("prefix/ghi"))
+        self.s3client_stub.assert_no_pending_responses()
+
+    def test_file_exists_lists_all_pages(self):
+        s3uploader = self.create_listing_uploader()
+        self.s3client_stub.add_response(
+            "list_objects_v2",
+            {"Contents": [{"Key": "abc"}], "IsTruncated": True,
+             "NextContinuationToken": "token"},
+            {"Bucket": self.bucket_name, "Prefix": "", "Delimiter": "/"})
+        self.s3client_stub.add_response(
+            "list_objects_v2",
+            {"Contents": [{"Key": "def"}]},
+            {"Bucket": self.bucket_name, "Prefix": "", "Delimiter": "/",
+             "ContinuationToken": "token"})
+        with self.s3client_stub:
+            self.assertTrue(s3uploader.file_exists("def"))
+            self.assertFalse(s3uploader.file_exists("ghi"))
+
+    def test_file_exists_falls_back_to_head_object_if_listing_fails(self):
+        s3uploader = self.create_listing_uploader()
+        self.s3client_stub.add_client_error(
+            "list_objects_v2", "AccessDenied", "Access Denied")
+        self.s3client_stub.add_response(
+            "head_object", {}, {"Bucket": self.bucket_name, "Key": "abc"})
+        with self.s3client_stub:
+            self.assertTrue(s3uploader.file_exists("abc"))
+
+    def test_file_exists_falls_back_to_head_object_for_large_prefix(self):
+        s3uploader = self.create_listing_uploader()
+        s3uploader.MAX_LISTED_KEYS = 1
+        self.s3client_stub.add_response(
+            "list_objects_v2",
+            {"Contents": [{"Key": "abc"}], "IsTruncated": True,
+             "NextContinuationToken": "token"},
+            {"Bucket": self.bucket_name, "Prefix": "", "Delimiter": "/"})
+        self.s3client_stub.add_client_error(
+            "head_object", "404", "Not Found")
+        with self.s3client_stub:
+            self.assertTrue(s3uploader.file_exists("abc"))
+            self.assertFalse(s3uploader.file_exists("def"))
+        self.s3client_stub.assert_no_pending_responses()
+
+    @patch('os.path.getsize', return_value=1)
+    @patch("awscli.customizations.s3uploader.ProgressPercentage")
+    def test_upload_adds_to_existing_keys(self, progress_percentage_mock,
+                                          get_size_patch):
+        s3uploader = self.create_listing_uploader()
+        self.s3client_stub.add_response(
+            "list_objects_v2", {},
+            {"Bucket": self.bucket_name, "Prefix": "", "Delimiter": "/"})
+        with self.s3client_stub:
+            s3uploader.upload("filename", "abc")
+            self.assertTrue(s3uploader.file_exists("abc"))
+        self.assertEqual(self.transfer_manager_mock.upload.call_count, 1)
+
     def test_file_checksum(self):
         num_chars = 4096*5
         data = ''.join(random.choice(string.ascii_uppercase)
@@ -0,0 +1,277 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import binascii
+import io
+import os
+import struct
+import threading
+import time
+import zipfile
+
+from awscli.testutils import unittest, mock, FileCreator, skip_if_windows
+from awscli.customizations.zipbuilder import find_files
+from awscli.customizations.zipbuilder import make_zip_archive
+from awscli.customizations.zipbuilder import CompressedMember
+from awscli.customizations.zipbuilder import StreamedMember
+from awscli.customizations.zipbuilder import ZipArchiveWriter
+
+
+class BaseZipBuilderTest(unittest.TestCase):
+    def setUp(self):
+        self.file_creator = FileCreator()
+        self.rootdir = self.file_creator.rootdir
+
+    def tearDown(self):
+        self.file_creator.remove_all()
+
+    def make_zip(self, **kwargs):
+        fileobj = io.BytesIO()
+        make_zip_archive(fileobj, self.rootdir, **kwargs)
+        return fileobj.getvalue()
+
+    def open_zip(self, contents):
+        return zipfile.ZipFile(io.BytesIO(contents))
+
+
+class TestFindFiles(BaseZipBuilderTest):
+    def test_sorted_relative_arcnames(self):
+        self.file_creator.create_file('b', '')
+        self.file_creator.create_file(os.path.join('a', 'z'), '')
+        self.file_creator.create_file('a-file', '')
+        files = find_files(self.rootdir)
+        self.assertEqual(
+            [arcname for _, arcname in files], ['a-file', 'a/z', 'b'])
+        self.assertEqual(
+            files[1][0], os.path.join(self.rootdir, 'a', 'z'))
+
+    def test_ignore_hidden_files(self):
+        self.file_creator.create_file('.hidden', '')
+        self.file_creator.create_file(os.path.join('.git', 'config'), '')
+        self.file_creator.create_file('visible', '')
+        files = find_files(self.rootdir, ignore_hidden_files=True)
+        self.assertEqual([arcname for _, arcname in files], ['visible'])
+
+    def test_includes_hidden_files_by_default(self):
+        self.file_creator.create_file('.hidden', '')
+        files = find_files(self.rootdir)
+        self.assertEqual([arcname for _, arcname in files], ['.hidden'])
+
+
+class TestMakeZipArchive(BaseZipBuilderTest):
+    def create_files(self, count=20):
+        for i in range(count):
+            self.file_creator.create_file(
+                os.path.join('dir%s' % (i % 3), 'file%s' % i),
+                'contents %s\n' % i * (i * 100))
+
+    def test_contents(self):
+        self.create_files()
+        zf = self.open_zip(self.make_zip())
+        self.assertIsNone(zf.testzip())
+        self.assertEqual(len(zf.namelist()), 20)
+        self.assertEqual(zf.namelist(), sorted(zf.namelist()))
+        self.assertEqual(
+            zf.read('dir1/file4'), b'contents 4\n' * 400)
+        self.assertEqual(
+            zf.getinfo('dir1/file4').compress_type, zipfile.ZIP_DEFLATED)
+
+    def test_empty_file(self):
+        self.file_creator.create_file('empty', '')
+        zf = self.open_zip(self.make_zip())
+        self.assertEqual(zf.read('empty'), b'')
+
+    def test_stored(self):
+        self.create_files()
+        zf = self.open_zip(self.make_zip(compression=zipfile.ZIP_STORED))
+        self.assertIsNone(zf.testzip())
+        self.assertEqual(
+            zf.getinfo('dir1/file4').compress_type, zipfile.ZIP_STORED)
+
+    def test_explicit_files(self):
+        self.create_files()
+        files = [f for f in find_files(self.rootdir) if f[1].endswith('1')]
+        zf = self.open_zip(self.make_zip(files=files))
+        self.assertEqual(
+            zf.namelist(), ['dir1/file1', 'dir2/file11'])
+
+    def test_deterministic_across_workers(self):
+        self.create_files()
+        self.assertEqual(
+            self.make_zip(max_workers=1), self.make_zip(max_workers=4))
+
+    def test_deterministic_across_modification_times(self):
+        self.create_files(1)
+        original = self.make_zip()
+        full_path = os.path.join(self.rootdir, 'dir0', 'file0')
+        os.utime(full_path, (time.time() - 3600, time.time() - 3600))
+        self.assertEqual(self.make_zip(), original)
+
+    def test_fixed_timestamps(self):
+        self.create_files(1)
+        info = self.open_zip(self.make_zip()).getinfo('dir0/file0')
+        self.assertEqual(info.date_time, (1980, 1, 1, 0, 0, 0))
+
+    @skip_if_windows('Permissions are not supported on Windows.')
+    def test_normalizes_permissions(self):
+        regular = self.file_creator.create_file('regular', '')
+        executable = self.file_creator.create_file('executable', '')
+        os.chmod(regular, 0o600)
+        os.chmod(executable, 0o700)
+        zf = self.open_zip(self.make_zip())
+        self.assertEqual(
+            zf.getinfo('regular').external_attr >> 16, 0o100644)
+        self.assertEqual(
+            zf.getinfo('executable').external_attr >> 16, 0o100755)
+
+    def test_unicode_filename(self):
+        self.file_creator.create_file(u'\u00e9.txt', 'contents')
+        zf = self.open_zip(self.make_zip())
+        self.assertEqual(zf.namelist(), [u'\u00e9.txt'])
+        self.assertEqual(zf.read(u'\u00e9.txt'), b'contents')
+
+    def test_propagates_read_errors(self):
+        self.create_files()
+        files = find_files(self.rootdir)
+        files.insert(5, (os.path.join(self.rootdir, 'missing'), 'missing'))
+        with self.assertRaises(IOError):
+            self.make_zip(files=files)
+
+
+class TestStreamedZipArchive(BaseZipBuilderTest):
+    def create_files(self, count=20):
+        for i in range(count):
+            self.file_creator.create_file(
+                os.path.join('dir%s' % (i % 3), 'file%s' % i),
+                'contents %s\n' % i * (i * 100))
+
+    def make_zip(self, **kwargs):
+        fileobj = WriteOnlyStream()
+        make_zip_archive(fileobj, self.rootdir, stream=True, **kwargs)
+        return fileobj.getvalue()
+
+    def test_contents_are_same_as_not_streamed(self):
+        self.create_files()
+        original = self.open_zip(super(
+            TestStreamedZipArchive, self).make_zip())
+        zf = self.open_zip(self.make_zip())
+        self.assertIsNone(zf.testzip())
+        self.assertEqual(zf.namelist(), original.namelist())
+        for info in zf.infolist():
+            original_info = original.getinfo(info.filename)
+            self.assertEqual(info.flag_bits & 0x08, 0x08)
+            self.assertEqual(info.CRC, original_info.CRC)
+            self.assertEqual(info.compress_size, original_info.compress_size)
+            self.assertEqual(
+                info.external_attr, original_info.external_attr)
+            self.assertEqual(
+                zf.read(info.filename), original.read(info.filename))
+
+    def test_members_larger_than_queued_chunks(self):
+        self.file_creator.create_file(
+            'large', os.urandom(1024) * 3000, mode='wb')
+        with mock.patch(
+                'awscli.customizations.zipbuilder.READ_CHUNK_SIZE', 1024):
+            zf = self.open_zip(self.make_zip(max_workers=2))
+        self.assertIsNone(zf.testzip())
+        self.assertEqual(zf.getinfo('large').file_size, 1024 * 3000)
+
+    def test_stored(self):
+        self.create_files()
+        zf = self.open_zip(self.make_zip(compression=zipfile.ZIP_STORED))
+        self.assertIsNone(zf.testzip())
+
+    def test_deterministic_across_workers(self):
+        self.create_files()
+        self.assertEqual(
+            self.make_zip(max_workers=1), self.make_zip(max_workers=4))
+
+    def test_propagates_read_errors(self):
+        self.create_files()
+        with mock.patch('awscli.customizations.zipbuilder.open',
+                        side_effect=IOError(), create=True):
+            with self.assertRaises(IOError):
+                self.make_zip()
+
+    def test_stops_compressing_when_writing_fails(self):
+        self.create_files()
+        fileobj = WriteOnlyStream()
+        fileobj.write = mock.Mock(side_effect=ValueError())
+        with self.assertRaises(ValueError):
+            make_zip_archive(fileobj, self.rootdir, stream=True)
+
+
+class WriteOnlyStream(object):
+    # Like an upload, the archive can not be seeked or read back.
+    def __init__(self):
+        self._data = io.BytesIO()
+
+    def write(self, data):
+        self._data.write(data)
+
+    def getvalue(self):
+        return self._data.getvalue()
+
+
+class TestZipArchiveWriter(unittest.TestCase):
+    def test_zip64_member(self):
+        fileobj = io.BytesIO()
+        writer = ZipArchiveWriter(fileobj)
+        writer.write_member(CompressedMember(
+            arcname='large', data=io.BytesIO(b'data'), crc=0,
+            file_size=5 * 1024 ** 3, compress_size=4,
+            compression=zipfile.ZIP_DEFLATED, mode=0o644))
+        writer.close()
+        info = zipfile.ZipFile(fileobj).getinfo('large')
+        self.assertEqual(info.file_size, 5 * 1024 ** 3)
+        self.assertEqual(info.compress_size, 4)
+
+    def test_writes_from_current_position(self):
+        fileobj = io.BytesIO()
+        fileobj.write(b'prefix')
+        writer = ZipArchiveWriter(fileobj)
+        writer.write_member(CompressedMember(
+            arcname='foo', data=io.BytesIO(b'data'), crc=binascii.crc32(
+                b'data') & 0xffffffff, file_size=4, compress_size=4,
+            compression=zipfile.ZIP_STORED, mode=0o644))
+        writer.close()
+        data = fileobj.getvalue()
+        # The offset of the central directory in the end of central
+        # directory record is from the start of the file.
+        end_record = struct.unpack('<4s4H2LH', data[-22:])
+        self.assertEqual(end_record[6], data.index(b'PK\x01\x02'))
+        zf = zipfile.ZipFile(fileobj)
+        self.assertEqual(zf.getinfo('foo').header_offset, len(b'prefix'))
+        self.assertEqual(zf.read('foo'), b'data')
+
+    def test_zip64_streamed_member(self):
+        file_creator = FileCreator()
+        self.addCleanup(file_creator.remove_all)
+        full_path = file_creator.create_file('large', 'data')
+        member = StreamedMember(full_path, 'large')
+        # The member may grow past the zip64 limit while it is read.
+        member.expected_size = 5 * 1024 ** 3
+        thread = threading.Thread(target=member.compress)
+        thread.start()
+        fileobj = io.BytesIO()
+        writer = ZipArchiveWriter(fileobj)
+        writer.write_streamed_member(member)
+        writer.close()
+        thread.join()
+        zf = zipfile.ZipFile(fileobj)
+        self.assertIsNone(zf.testzip())
+        self.assertEqual(zf.read('large'), b'data')
+
+    def test_empty_archive(self):
+        fileobj = io.BytesIO()
+        ZipArchiveWriter(fileobj).close()
+        self.assertEqual(zipfile.ZipFile(fileobj).namelist(), [])
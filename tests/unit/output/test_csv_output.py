@@ -0,0 +1,102 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import jmespath
+import mock
+from botocore.paginate import Paginator
+
+from awscli.compat import six
+from awscli.formatter import CSVFormatter
+from awscli.testutils import BaseAWSCommandParamsTest, unittest
+
+
+class TestDescribeInstances(BaseAWSCommandParamsTest):
+    def setUp(self):
+        super(TestDescribeInstances, self).setUp()
+        self.parsed_responses = [
+            {'Reservations': [{'Instances': [
+                {'InstanceId': 'i-1', 'State': {'Name': 'running'}},
+                {'InstanceId': 'i-2', 'State': {'Name': 'stopped'}},
+            ]}], 'NextToken': 'token'},
+            {'Reservations': [{'Instances': [
+                {'InstanceId': 'i-3', 'State': {'Name': 'running'}},
+            ]}]},
+        ]
+
+    def test_csv_response_with_query(self):
+        output = self.run_cmd(
+            'ec2 describe-instances --output csv --query '
+            'Reservations[].Instances[].{Id:InstanceId,State:State.Name}')[0]
+        self.assertEqual(
+            output, 'Id,State\ni-1,running\ni-2,stopped\ni-3,running\n')
+
+    def test_csv_response_writes_next_token_to_stderr(self):
+        stdout, stderr, _ = self.run_cmd(
+            'ec2 describe-instances --output csv --max-items 1')
+        self.assertNotIn('NextToken', stdout)
+        self.assertIn('NextToken: ', stderr)
+
+
+class TestCSVFormatter(unittest.TestCase):
+    def setUp(self):
+        self.args = mock.Mock(query=None)
+        self.stream = six.StringIO()
+
+    def paginate(self, pages):
+        config = {'input_token': 'NextMarker', 'output_token': 'NextMarker',
+                  'result_key': 'Contents'}
+        method = mock.Mock(side_effect=pages)
+        return Paginator(method, config, mock.Mock()).paginate()
+
+    def format(self, response):
+        CSVFormatter(self.args)('list-objects', response, self.stream)
+        return self.stream.getvalue()
+
+    def test_columns_are_inferred_from_first_page(self):
+        pages = [
+            {'Contents': [{'Key': 'a', 'Size': 1}, {'Key': 'b', 'Tag': 't'}],
+             'NextMarker': 'b'},
+            {'Contents': [{'Key': 'c', 'Size': 3, 'Other': 'o'}]},
+        ]
+        self.assertEqual(
+            self.format(self.paginate(pages)),
+            'Key,Size,Tag\na,1,\nb,,t\nc,3,\n')
+
+    def test_values_are_quoted(self):
+        pages = [{'Contents': [
+            {'Key': 'a,b', 'Quote': 'say "hi"', 'List': [1, 2],
+             'Object': {'Name': 'value'}, 'Line': 'a\nb'}]}]
+        self.args.query = jmespath.compile(
+            'Contents[].{Key: Key, Quote: Quote, List: List, '
+            'Object: Object, Line: Line}')
+        self.assertEqual(
+            self.format(self.paginate(pages)),
+            'Key,Quote,List,Object,Line\n'
+            '"a,b","say ""hi""","[1,2]","{""Name"":""value""}","a\nb"\n')
+
+    def test_booleans_are_lowercase(self):
+        pages = [{'Contents': [{'Key': 'a', 'Enabled': True},
+                               {'Key': 'b', 'Enabled': False}]}]
+        self.assertEqual(
+            self.format(self.paginate(pages)),
+            'Key,Enabled\na,true\nb,false\n')
+
+    def test_scalar_and_list_records(self):
+        pages = [{'Contents': [{'Key': 'a', 'Size': 1}]}]
+        self.args.query = jmespath.compile('Contents[].Key')
+        self.assertEqual(self.format(self.paginate(pages)), 'a\n')
+        self.stream = six.StringIO()
+        self.args.query = jmespath.compile('Contents[].[Key, Size]')
+        self.assertEqual(self.format(self.paginate(pages)), 'a,1\n')
+
+    def test_empty_result_writes_nothing(self):
+        self.assertEqual(self.format(self.paginate([{'Contents': []}])), '')
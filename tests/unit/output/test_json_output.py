@@ -12,10 +12,18 @@
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
 from botocore.compat import json
+import copy
+import datetime
 import platform
+import jmespath
 import mock
+from botocore.paginate import Paginator
 from awscli.compat import six
-from awscli.formatter import JSONFormatter
+from awscli.formatter import JSONFormatter, get_streamable_result_keys
+from awscli.formatter import is_streamable_query
+from awscli.formatter import iter_page_query_results, join_query_results
+from awscli.formatter import IndentedJSONEncoder
+from awscli.utils import json_encoder
 
 from awscli.testutils import BaseAWSCommandParamsTest, unittest
 from awscli.testutils import skip_if_windows
@@ -129,3 +137,304 @@ class TestFormattersHandleClosedPipes(unittest.TestCase):
         # we still should have called the flush() on the
         # stream.
         fake_closed_stream.flush.assert_called_with()
+
+
+class TestJSONFormatterWrites(unittest.TestCase):
+    def setUp(self):
+        self.response = {
+            'Users': [{'UserName': 'user%s' % i, 'Tags': []}
+                      for i in range(100)],
+            'IsTruncated': False,
+        }
+        self.stream = mock.Mock(spec=six.StringIO)
+
+    def get_output(self):
+        return ''.join(
+            call[0][0] for call in self.stream.write.call_args_list)
+
+    def test_writes_response_at_once(self):
+        JSONFormatter(mock.Mock(query=None))(
+            'list-users', self.response, self.stream)
+        self.assertEqual(self.stream.write.call_count, 1)
+        self.assertEqual(
+            self.get_output(),
+            json.dumps(self.response, indent=4, ensure_ascii=False) + '\n')
+
+    def test_writes_large_response_in_chunks(self):
+        formatter = JSONFormatter(mock.Mock(query=None))
+        formatter.CHUNK_SIZE = 1000
+        formatter('list-users', self.response, self.stream)
+        self.assertGreater(self.stream.write.call_count, 1)
+        self.assertEqual(
+            self.get_output(),
+            json.dumps(self.response, indent=4, ensure_ascii=False) + '\n')
+
+
+class TestIndentedJSONEncoder(unittest.TestCase):
+    def setUp(self):
+        self.value = {
+            'Reservations': [{
+                'ReservationId': 'r-1',
+                'Groups': [],
+                'Instances': [{
+                    'InstanceId': 'i-1',
+                    'LaunchTime': datetime.datetime(2018, 11, 20, 8, 0),
+                    'State': {'Code': 16, 'Name': 'running'},
+                    'Tags': [{'Key': 'Name', 'Value': u'\u2713'}],
+                    'EbsOptimized': False,
+                    'Nested': [[1, 2.5], [], {}, None, 'a"b\n'],
+                    'Monitoring': {},
+                }],
+            }],
+            'NextToken': None,
+        }
+
+    def assert_same_as_json_dumps(self, value):
+        expected = json.dumps(value, indent=4, default=json_encoder,
+                              ensure_ascii=False)
+        encoder = IndentedJSONEncoder()
+        self.assertEqual(encoder.encode(value), expected)
+        self.assertEqual(''.join(encoder.iterencode(value)), expected)
+        self.assertEqual(encoder.encode(value, 2),
+                         expected.replace('\n', '\n' + ' ' * 8))
+
+    def test_same_as_json_dumps(self):
+        self.assert_same_as_json_dumps(self.value)
+
+    def test_scalars_and_empty_values(self):
+        for value in ['a', u'\u2713', 1, 1.5, True, None, [], {}, [[]]]:
+            self.assert_same_as_json_dumps(value)
+
+    def test_top_level_list(self):
+        self.assert_same_as_json_dumps(self.value['Reservations'])
+
+    def test_same_as_json_dumps_without_c_encoder(self):
+        with mock.patch('awscli.formatter.c_make_encoder', None):
+            self.assert_same_as_json_dumps(self.value)
+
+    def test_same_as_json_dumps_with_other_separators(self):
+        # The item separator json.dumps indents with is ', ' on python 2.
+        class JSONEncoder(json.JSONEncoder):
+            def __init__(self, *args, **kwargs):
+                super(JSONEncoder, self).__init__(*args, **kwargs)
+                if kwargs.get('indent') is not None and \
+                        kwargs.get('separators') is None:
+                    self.item_separator = ', '
+
+        with mock.patch.object(json, 'JSONEncoder', JSONEncoder):
+            self.assert_same_as_json_dumps(self.value)
+            with mock.patch('awscli.formatter.c_make_encoder', None):
+                self.assert_same_as_json_dumps(self.value)
+
+    def test_iterencode_yields_list_items_separately(self):
+        items = [{'Key': 'a'}, {'Key': 'b'}]
+        chunks = list(IndentedJSONEncoder().iterencode(
+            {'Items': items, 'Count': 2}))
+        for item in items:
+            encoded_item = json.dumps(item, indent=4).replace(
+                '\n', '\n' + ' ' * 8)
+            self.assertEqual(
+                len([chunk for chunk in chunks
+                     if chunk.endswith('\n' + ' ' * 8 + encoded_item)]), 1)
+
+
+class TestStreamingJSONFormatter(unittest.TestCase):
+    def setUp(self):
+        self.args = mock.Mock(query=None)
+        self.config = {
+            'input_token': 'NextMarker',
+            'output_token': 'NextMarker',
+            'limit_key': 'MaxItems',
+            'result_key': ['Contents', 'CommonPrefixes', 'Count'],
+            'non_aggregate_keys': ['Name'],
+        }
+
+    def paginate(self, pages, max_items=None):
+        method = mock.Mock(side_effect=copy.deepcopy(pages))
+        paginator = Paginator(method, self.config, mock.Mock())
+        return paginator.paginate(PaginationConfig={'MaxItems': max_items})
+
+    def format(self, response):
+        stream = six.StringIO()
+        JSONFormatter(self.args)('list-objects', response, stream)
+        return stream.getvalue()
+
+    def assert_same_as_full_result(self, pages, max_items=None):
+        stream = six.StringIO()
+        full_result = self.paginate(pages, max_items).build_full_result()
+        JSONFormatter(self.args)._format_response(
+            'list-objects', full_result, stream)
+        output = self.format(self.paginate(pages, max_items))
+        self.assertEqual(output, stream.getvalue())
+        return output
+
+    def test_streams_items_as_pages_arrive(self):
+        stream = six.StringIO()
+        pages = [
+            {'Contents': [{'Key': 'a'}], 'NextMarker': 'a'},
+            {'Contents': [{'Key': 'b'}]},
+        ]
+
+        def list_objects(**kwargs):
+            if 'NextMarker' in kwargs:
+                # The items of the first page were written before the
+                # second page was requested.
+                self.assertIn('"a"', stream.getvalue())
+            return copy.deepcopy(pages[len(method.call_args_list) - 1])
+        method = mock.Mock(side_effect=list_objects)
+        response = Paginator(method, self.config, mock.Mock()).paginate()
+        JSONFormatter(self.args)('list-objects', response, stream)
+        self.assertEqual(method.call_count, 2)
+        self.assertIn('"b"', stream.getvalue())
+
+    def test_same_as_full_result(self):
+        pages = [
+            {'Contents': [{'Key': 'a', 'Size': 1}, {'Key': u'\u2713'}],
+             'CommonPrefixes': [{'Prefix': 'x/'}], 'Count': 2,
+             'Name': 'bucket', 'NextMarker': 'b'},
+            {'Contents': [], 'Count': 0, 'NextMarker': 'c'},
+            {'Contents': [{'Key': 'c', 'Nested': {'List': [1, [2]]}}],
+             'CommonPrefixes': [{'Prefix': 'y/'}], 'Count': 1},
+        ]
+        output = self.assert_same_as_full_result(pages)
+        self.assertEqual(json.loads(output)['Count'], 3)
+
+    def test_same_as_full_result_with_resume_token(self):
+        pages = [
+            {'Contents': [{'Key': 'a'}, {'Key': 'b'}], 'NextMarker': 'b'},
+            {'Contents': [{'Key': 'c'}]},
+        ]
+        output = self.assert_same_as_full_result(pages, max_items=1)
+        self.assertIn('NextToken', json.loads(output))
+
+    def test_same_as_full_result_with_datetimes(self):
+        pages = [{'Contents': [
+            {'LastModified': datetime.datetime(2018, 11, 20, 8, 0, 0)}]}]
+        self.assert_same_as_full_result(pages)
+
+    def test_same_as_full_result_without_items(self):
+        self.assert_same_as_full_result(
+            [{'Contents': [], 'Name': 'bucket'}])
+        self.assert_same_as_full_result([{'Count': 0, 'Contents': []}])
+
+    def test_empty_result_prints_nothing(self):
+        del self.config['non_aggregate_keys']
+        self.assertEqual(self.format(self.paginate([{}])), '')
+
+    def test_same_as_full_result_if_first_result_key_is_not_a_list(self):
+        self.config['result_key'] = ['Contents', 'Count']
+        pages = [
+            {'Count': 1, 'NextMarker': 'a'},
+            {'Count': 1, 'Contents': [{'Key': 'b'}]},
+        ]
+        self.assert_same_as_full_result(pages)
+
+    def test_nested_result_keys_are_not_streamed(self):
+        self.config['result_key'] = 'ListBucketResult.Contents'
+        self.assertIsNone(get_streamable_result_keys(self.paginate([{}])))
+
+    def assert_same_as_full_result_query(self, pages, expression):
+        self.args.query = jmespath.compile(expression)
+        stream = six.StringIO()
+        full_result = self.paginate(pages).build_full_result()
+        JSONFormatter(self.args)._format_response(
+            'list-objects', self.args.query.search(full_result), stream)
+        output = self.format(self.paginate(pages))
+        self.assertEqual(output, stream.getvalue())
+        return output
+
+    def test_streamable_queries(self):
+        pages = [
+            {'Contents': [{'Key': 'a', 'Size': 0}, {'Key': 'b', 'Size': 1}],
+             'NextMarker': 'b'},
+            {'Count': 0, 'NextMarker': 'c'},
+            {'Contents': [{'Key': 'c', 'Size': 2, 'Tags': [['x'], 'y']}]},
+        ]
+        for expression in ['Contents[].Key', 'Contents[?Size > `0`].Key',
+                           'Contents[*].[Key, Size]', 'Contents[].Tags[]',
+                           'Contents[?Size > `5`]', 'Count[].Key']:
+            response = self.paginate(pages)
+            self.assertTrue(is_streamable_query(
+                jmespath.compile(expression), response), expression)
+            self.assert_same_as_full_result_query(pages, expression)
+
+    def test_streamable_query_without_result(self):
+        output = self.assert_same_as_full_result_query(
+            [{'Count': 0}], 'Contents[].Key')
+        self.assertEqual(output, 'null\n')
+
+    def test_streams_query_results_as_pages_arrive(self):
+        stream = six.StringIO()
+        pages = [
+            {'Contents': [{'Key': 'a'}], 'NextMarker': 'a'},
+            {'Contents': [{'Key': 'b'}]},
+        ]
+
+        def list_objects(**kwargs):
+            if 'NextMarker' in kwargs:
+                self.assertEqual(stream.getvalue(), '[\n    "a"')
+            return copy.deepcopy(pages[len(method.call_args_list) - 1])
+        method = mock.Mock(side_effect=list_objects)
+        response = Paginator(method, self.config, mock.Mock()).paginate()
+        self.args.query = jmespath.compile('Contents[].Key')
+        JSONFormatter(self.args)('list-objects', response, stream)
+        self.assertEqual(stream.getvalue(), '[\n    "a",\n    "b"\n]\n')
+
+    def test_aggregate_queries_are_not_streamable(self):
+        response = self.paginate([{}])
+        for expression in ['length(Contents)', 'sort_by(Contents, &Key)',
+                           'Contents[0]', 'Contents[:2].Key', 'Contents',
+                           'Contents[].Key | [0]', 'Name[].Key',
+                           '{Keys: Contents[].Key}']:
+            self.assertFalse(is_streamable_query(
+                jmespath.compile(expression), response), expression)
+
+    def test_aggregate_queries_use_full_result(self):
+        pages = [
+            {'Contents': [{'Key': 'b'}], 'NextMarker': 'b'},
+            {'Contents': [{'Key': 'a'}]},
+        ]
+        output = self.assert_same_as_full_result_query(
+            pages, 'sort_by(Contents, &Key)[0].Key')
+        self.assertEqual(output, '"a"\n')
+
+
+class TestPageQueryResults(unittest.TestCase):
+    def paginate(self, pages):
+        config = {'input_token': 'NextMarker', 'output_token': 'NextMarker',
+                  'result_key': 'Contents'}
+        method = mock.Mock(side_effect=pages)
+        return Paginator(method, config, mock.Mock()).paginate()
+
+    def search_pages(self, expression, pages):
+        return join_query_results(iter_page_query_results(
+            jmespath.compile(expression), self.paginate(pages)))
+
+    def test_skips_pages_without_results(self):
+        response = self.paginate([
+            {'Contents': [{'Key': 'a'}], 'NextMarker': 'a'},
+            {'NextMarker': 'b'},
+            {'Contents': [{'Key': 'b'}]},
+        ])
+        results = iter_page_query_results(
+            jmespath.compile('Contents[].Key'), response)
+        self.assertEqual(list(results), [['a'], ['b']])
+
+    def test_concatenates_page_results(self):
+        self.assertEqual(
+            join_query_results([['a'], [], ['b', 'c']]), ['a', 'b', 'c'])
+
+    def test_same_as_query_of_full_result(self):
+        self.assertEqual(
+            self.search_pages('Contents[].Key', [
+                {'Contents': [{'Key': 'a'}], 'NextMarker': 'a'},
+                {'NextMarker': 'b'},
+                {'Contents': [{'Key': 'b'}]},
+            ]),
+            ['a', 'b'])
+
+    def test_no_results(self):
+        self.assertIsNone(join_query_results([]))
+        self.assertIsNone(self.search_pages('Contents[].Key', [{}]))
+        self.assertEqual(
+            self.search_pages('Contents[].Key', [{'Contents': []}]), [])
@@ -0,0 +1,118 @@
+# Copyright 2018 Amazon.com, Inc. or its affiliates. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"). You
+# may not use this file except in compliance with the License. A copy of
+# the License is located at
+#
+#     http://aws.amazon.com/apache2.0/
+#
+# or in the "license" file accompanying this file. This file is
+# distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
+# ANY KIND, either express or implied. See the License for the specific
+# language governing permissions and limitations under the License.
+import copy
+import datetime
+
+import jmespath
+import mock
+from botocore.paginate import Paginator
+
+from awscli.compat import six
+from awscli.formatter import JSONLinesFormatter
+from awscli.testutils import BaseAWSCommandParamsTest, unittest
+
+
+class TestListUsers(BaseAWSCommandParamsTest):
+    def setUp(self):
+        super(TestListUsers, self).setUp()
+        self.parsed_responses = [
+            {'Users': [{'UserName': 'first', 'Path': '/'}],
+             'IsTruncated': True, 'Marker': 'marker'},
+            {'Users': [{'UserName': 'second', 'Path': '/'}],
+             'IsTruncated': False},
+        ]
+
+    def test_jsonl_response(self):
+        output = self.run_cmd('iam list-users --output jsonl')[0]
+        self.assertEqual(
+            output,
+            '{"UserName":"first","Path":"/"}\n'
+            '{"UserName":"second","Path":"/"}\n')
+
+    def test_jsonl_response_with_query(self):
+        output = self.run_cmd(
+            'iam list-users --output jsonl --query Users[].UserName')[0]
+        self.assertEqual(output, '"first"\n"second"\n')
+
+    def test_jsonl_response_with_max_items(self):
+        output = self.run_cmd(
+            'iam list-users --output jsonl --max-items 1')[0]
+        lines = output.splitlines()
+        self.assertEqual(lines[0], '{"UserName":"first","Path":"/"}')
+        self.assertEqual(len(lines), 2)
+        self.assertIn('"NextToken"', lines[1])
+
+
+class TestJSONLinesFormatter(unittest.TestCase):
+    def setUp(self):
+        self.args = mock.Mock(query=None)
+        self.config = {
+            'input_token': 'NextMarker',
+            'output_token': 'NextMarker',
+            'result_key': ['Contents', 'CommonPrefixes', 'Count'],
+        }
+        self.stream = six.StringIO()
+
+    def paginate(self, pages):
+        method = mock.Mock(side_effect=copy.deepcopy(pages))
+        return Paginator(method, self.config, mock.Mock()).paginate()
+
+    def format(self, response):
+        JSONLinesFormatter(self.args)('list-objects', response, self.stream)
+        return self.stream.getvalue()
+
+    def test_writes_records_of_result_keys(self):
+        pages = [
+            {'Contents': [{'Key': 'a'}, {'Key': 'b'}], 'Count': 2,
+             'CommonPrefixes': [{'Prefix': 'x/'}], 'NextMarker': 'b'},
+            {'Contents': [{'Key': u'\u2713'}], 'Count': 1},
+        ]
+        self.assertEqual(
+            self.format(self.paginate(pages)),
+            u'{"Key":"a"}\n{"Key":"b"}\n{"Prefix":"x/"}\n{"Key":"\u2713"}\n')
+
+    def test_writes_records_as_pages_arrive(self):
+        pages = [
+            {'Contents': [{'Key': 'a'}], 'NextMarker': 'a'},
+            {'Contents': [{'Key': 'b'}]},
+        ]
+
+        def list_objects(**kwargs):
+            if 'NextMarker' in kwargs:
+                self.assertEqual(self.stream.getvalue(), '{"Key":"a"}\n')
+            return copy.deepcopy(pages[len(method.call_args_list) - 1])
+        method = mock.Mock(side_effect=list_objects)
+        response = Paginator(method, self.config, mock.Mock()).paginate()
+        self.assertEqual(self.format(response), '{"Key":"a"}\n{"Key":"b"}\n')
+
+    def test_datetimes(self):
+        pages = [{'Contents': [
+            {'LastModified': datetime.datetime(2018, 11, 20, 8, 0, 0)}]}]
+        self.assertEqual(self.format(self.paginate(pages)),
+                         '{"LastModified":"2018-11-20T08:00:00"}\n')
+
+    def test_query_that_needs_full_result(self):
+        self.args.query = jmespath.compile('sort_by(Contents, &Key)[].Key')
+        pages = [
+            {'Contents': [{'Key': 'b'}], 'NextMarker': 'b'},
+            {'Contents': [{'Key': 'a'}]},
+        ]
+        self.assertEqual(self.format(self.paginate(pages)), '"a"\n"b"\n')
+
+    def test_response_that_is_not_paginated(self):
+        self.assertEqual(
+            self.format({'Name': 'value', 'ResponseMetadata': {}}),
+            '{"Name":"value"}\n')
+
+    def test_empty_response_writes_nothing(self):
+        self.assertEqual(self.format({}), '')
@@ -10,7 +10,11 @@
 # distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
+import copy
 import unittest
+import jmespath
+import mock
+from botocore.paginate import Paginator
 from awscli.compat import six
 
 from awscli.formatter import TableFormatter
@@ -425,3 +429,93 @@ class TestTableFormatter(unittest.TestCase):
     def test_jmespath_filtered_dict_response(self):
         self.assert_data_renders_to(data=JMESPATH_FILTERED_RESPONSE_DICT,
                                     table=JMESPATH_FILTERED_RESPONSE_DICT_TABLE)
+
+    def test_streamable_query_of_paginated_response(self):
+        pages = [
+            {'Instances': JMESPATH_FILTERED_RESPONSE[:1], 'NextToken': 'a'},
+            {'Instances': JMESPATH_FILTERED_RESPONSE[1:]},
+        ]
+        config = {'input_token': 'NextToken', 'output_token': 'NextToken',
+                  'result_key': 'Instances'}
+        method = mock.Mock(side_effect=pages)
+        response = Paginator(method, config, mock.Mock()).paginate()
+        self.formatter._args.query = jmespath.compile(
+            'Instances[?InstanceType != `none`]')
+        with mock.patch.object(response, 'build_full_result') as full:
+            self.assert_data_renders_to(
+                data=response, table=JMESPATH_FILTERED_RESPONSE_TABLE)
+            self.assertFalse(full.called)
+
+
+class TestStreamedTableFormatter(unittest.TestCase):
+    def setUp(self):
+        self.args = Object(color='off')
+        self.stream = six.StringIO()
+        self.config = {'input_token': 'Marker', 'output_token': 'Marker',
+                       'result_key': ['Contents', 'Count']}
+        self.pages = [
+            {'Contents': [{'Key': 'a', 'Size': 1}, {'Key': 'b', 'Size': 2}],
+             'Count': 2, 'Marker': 'b'},
+            {'Contents': [{'Key': 'c', 'Size': 3}], 'Count': 1,
+             'Marker': 'c'},
+            {'Contents': [{'Key': 'd' * 7, 'Size': 4}], 'Count': 1},
+        ]
+
+    def paginate(self, pages):
+        method = mock.Mock(side_effect=copy.deepcopy(pages))
+        return Paginator(method, self.config, mock.Mock()).paginate()
+
+    def format(self, response, window_size=2, stream=None):
+        formatter = TableFormatter(self.args)
+        formatter.table = MultiTable(initial_section=False,
+                                     column_separator='|', styler=Styler(),
+                                     auto_reformat=False)
+        formatter.WINDOW_SIZE = window_size
+        formatter('ListObjects', response, stream=stream or self.stream)
+        return self.stream.getvalue()
+
+    def test_small_response_renders_like_full_result(self):
+        full_result = self.paginate(self.pages).build_full_result()
+        expected = six.StringIO()
+        self.format(full_result, stream=expected)
+        self.assertEqual(self.format(self.paginate(self.pages), 10),
+                         expected.getvalue())
+
+    def test_large_response_is_streamed(self):
+        def list_objects(**kwargs):
+            if kwargs.get('Marker') == 'c':
+                # The rows of the first pages were written before the
+                # last page was requested.
+                self.assertIn('|  c ', self.stream.getvalue())
+            return copy.deepcopy(self.pages[len(method.call_args_list) - 1])
+        method = mock.Mock(side_effect=list_objects)
+        response = Paginator(method, self.config, mock.Mock()).paginate()
+        output = self.format(response)
+        self.assertEqual(method.call_count, 3)
+        self.assertEqual(
+            output,
+            '-------------------\n'
+            '|   ListObjects   |\n'
+            '+-----------------+\n'
+            '||   Contents    ||\n'
+            '|+------+--------+|\n'
+            '||  Key | Size   ||\n'
+            '|+------+--------+|\n'
+            '||  a   |  1     ||\n'
+            '||  b   |  2     ||\n'
+            '||  c   |  3     ||\n'
+            '||  ddd |  4     ||\n'
+            '||  ddd |        ||\n'
+            '||  d   |        ||\n'
+            '|+------+--------+|\n'
+            '|   ListObjects   |\n'
+            '+----------+------+\n'
+            '|  Count   |  4   |\n'
+            '+----------+------+\n')
+
+    def test_large_response_with_streamable_query(self):
+        self.args.query = jmespath.compile('Contents[].Key')
+        output = self.format(self.paginate(self.pages), window_size=1)
+        self.assertIn('|  a        |\n|  b        |\n|  c        |\n',
+                      output)
+        self.assertNotIn('Count', output)
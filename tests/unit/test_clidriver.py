@@ -32,6 +32,8 @@ from awscli.clidriver import CustomArgument
 from awscli.clidriver import CLICommand
 from awscli.clidriver import ServiceCommand
 from awscli.clidriver import ServiceOperation
+from awscli.clidriver import CLIOperationCaller
+from awscli.utils import PrefetchingPageIterator
 from awscli.paramfile import URIArgumentHandler
 from awscli.customizations.commands import BasicCommand
 from awscli import formatter
@@ -953,5 +955,49 @@ class TestServiceOperation(unittest.TestCase):
                          'Idempotency tokens should not be required')
 
 
+class TestCLIOperationCaller(unittest.TestCase):
+    def setUp(self):
+        self.session = mock.Mock()
+        self.scoped_config = {}
+        self.session.get_scoped_config.return_value = self.scoped_config
+        self.client = mock.Mock()
+        self.client.can_paginate.return_value = True
+        self.paginator = self.client.get_paginator.return_value
+        self.parsed_globals = mock.Mock(paginate=True)
+        self.caller = CLIOperationCaller(self.session)
+
+    def make_client_call(self):
+        return self.caller._make_client_call(
+            self.client, 'ListObjects', {'Bucket': 'bucket'},
+            self.parsed_globals)
+
+    def test_prefetches_pages_by_default(self):
+        response = self.make_client_call()
+        self.assertIsInstance(response, PrefetchingPageIterator)
+        self.paginator.paginate.assert_called_with(Bucket='bucket')
+
+    def test_prefetch_depth_from_config(self):
+        self.scoped_config['cli_pagination_prefetch'] = '5'
+        response = self.make_client_call()
+        self.assertIsInstance(response, PrefetchingPageIterator)
+        self.assertEqual(response._depth, 5)
+
+    def test_prefetching_can_be_disabled(self):
+        self.scoped_config['cli_pagination_prefetch'] = '0'
+        response = self.make_client_call()
+        self.assertIs(response, self.paginator.paginate.return_value)
+
+    def test_invalid_prefetch_depth(self):
+        for value in ['-1', 'many']:
+            self.scoped_config['cli_pagination_prefetch'] = value
+            with self.assertRaises(ValueError):
+                self.make_client_call()
+
+    def test_no_prefetching_without_pagination(self):
+        self.parsed_globals.paginate = False
+        response = self.make_client_call()
+        self.assertIs(response, self.client.list_objects.return_value)
+
+
 if __name__ == '__main__':
     unittest.main()
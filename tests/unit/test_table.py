@@ -21,7 +21,9 @@
 #
 import unittest
 
-from awscli.table import Section, MultiTable, convert_to_vertical_table
+from awscli.compat import six
+from awscli.table import Section, MultiTable, Styler
+from awscli.table import convert_to_vertical_table, wrap_text
 
 
 class TestSection(unittest.TestCase):
@@ -109,6 +111,95 @@ class TestMultiTable(unittest.TestCase):
         self.table.add_row(['12345', '1234567'])
 
 
+class TestStreamedMultiTable(unittest.TestCase):
+    def setUp(self):
+        self.table = MultiTable(initial_section=False, styler=Styler(),
+                                auto_reformat=False)
+        self.stream = six.StringIO()
+
+    def test_rows_are_written_when_added(self):
+        self.table.new_section('foo')
+        self.table.add_row_header(['one', 'two'])
+        self.table.add_row(['12345', '1234567'])
+        self.table.start_streaming(self.stream)
+        self.assertIn('1234567', self.stream.getvalue())
+        self.table.add_row(['abc', 'def'])
+        self.assertTrue(self.stream.getvalue().endswith(
+            '|  abc   |  def      |\n'))
+        self.table.render(self.stream)
+        self.assertEqual(
+            self.stream.getvalue(),
+            '----------------------\n'
+            '|         foo        |\n'
+            '+--------+-----------+\n'
+            '|   one  |    two    |\n'
+            '+--------+-----------+\n'
+            '|  12345 |  1234567  |\n'
+            '|  abc   |  def      |\n'
+            '+--------+-----------+\n')
+
+    def test_elements_that_do_not_fit_are_wrapped(self):
+        self.table.new_section('foo')
+        self.table.add_row_header(['one', 'two'])
+        self.table.add_row(['12345', '1234567'])
+        self.table.start_streaming(self.stream)
+        self.table.add_row(['abcdefghij', 'x'])
+        self.table.render(self.stream)
+        self.assertIn(
+            '|  abcde |  x        |\n'
+            '|  fghij |           |\n', self.stream.getvalue())
+
+    def test_sections_with_same_headers_reuse_column_widths(self):
+        self.table.new_section('foo')
+        self.table.add_row_header(['one', 'two'])
+        self.table.add_row(['12345', '1234567'])
+        self.table.start_streaming(self.stream)
+        self.table.new_section('foo', indent_level=1)
+        self.table.add_row_header(['a'])
+        self.table.add_row(['b'])
+        self.table.new_section('foo')
+        self.table.add_row_header(['one', 'two'])
+        self.table.add_row(['1', '2'])
+        self.table.render(self.stream)
+        self.assertIn('||        foo       ||', self.stream.getvalue())
+        self.assertTrue(self.stream.getvalue().endswith(
+            '|   one  |    two    |\n'
+            '+--------+-----------+\n'
+            '|  1     |  2        |\n'
+            '+--------+-----------+\n'))
+
+    def test_single_row_sections_are_converted_to_vertical(self):
+        table = MultiTable(initial_section=False, styler=Styler())
+        table.new_section('foo')
+        table.add_row_header(['one', 'two'])
+        table.add_row(['x' * 40, 'y' * 40])
+        table.add_row(['x', 'y'])
+        table.new_section('bar')
+        table.add_row_header(['one', 'two'])
+        table.add_row(['x' * 40, 'y' * 40])
+        table._terminal_width = 80
+        table.start_streaming(self.stream)
+        table.new_section('baz')
+        table.add_row_header(['one', 'two'])
+        table.add_row(['x', 'y'])
+        self.assertNotIn('baz', self.stream.getvalue())
+        table.render(self.stream)
+        output = self.stream.getvalue()
+        self.assertIn('|  one', output.split('bar')[1])
+        self.assertIn('|  one', output.split('baz')[1])
+
+
+class TestWrapText(unittest.TestCase):
+    def test_wrap_text(self):
+        self.assertEqual(wrap_text('abcdefg', 3), ['abc', 'def', 'g'])
+        self.assertEqual(wrap_text('abc', 3), ['abc'])
+        self.assertEqual(wrap_text('', 3), [''])
+
+    def test_wrap_full_width_text(self):
+        self.assertEqual(wrap_text(u'\u4f60\u597d\u4e16', 5),
+                         [u'\u4f60\u597d', u'\u4e16'])
+
+
 class TestVerticalTableConversion(unittest.TestCase):
     def setUp(self):
         self.table = MultiTable()
@@ -14,11 +14,15 @@ import signal
 import platform
 import subprocess
 import os
+import threading
+
+from botocore.paginate import Paginator
 
 from awscli.testutils import unittest, skip_if_windows, mock
 from awscli.utils import (split_on_commas, ignore_ctrl_c,
                           find_service_and_method_in_event_name,
-                          OutputStreamFactory)
+                          OutputStreamFactory, PrefetchingPageIterator,
+                          wait_until)
 
 
 class TestCSVSplit(unittest.TestCase):
@@ -203,3 +207,125 @@ class TestOutputStreamFactory(unittest.TestCase):
                     pass
         except IOError:
             self.fail('Should not raise IOError')
+
+
+class TestWaitUntil(unittest.TestCase):
+    def test_waits_with_timeout_until_predicate_is_true(self):
+        results = [False, False, True]
+        wait = mock.Mock()
+        wait_until(lambda: results.pop(0), wait, timeout=0.5)
+        self.assertEqual(wait.call_args_list, [mock.call(0.5)] * 2)
+
+    def test_does_not_wait_if_predicate_is_true(self):
+        wait = mock.Mock()
+        wait_until(lambda: True, wait)
+        self.assertFalse(wait.called)
+
+    def test_waits_for_condition(self):
+        condition = threading.Condition()
+        done = []
+
+        def set_done():
+            with condition:
+                done.append(True)
+                condition.notify_all()
+
+        with condition:
+            threading.Thread(target=set_done).start()
+            wait_until(lambda: done, condition.wait)
+        self.assertEqual(done, [True])
+
+
+class TestPrefetchingPageIterator(unittest.TestCase):
+    def setUp(self):
+        self.pages = [
+            {'Contents': [{'Key': 'a'}, {'Key': 'b'}], 'Name': 'bucket',
+             'NextMarker': 'b'},
+            {'Contents': [{'Key': 'c'}], 'NextMarker': 'c'},
+            {'Contents': [{'Key': 'd'}, {'Key': 'e'}]},
+        ]
+        self.requested = []
+        self.lock = threading.Lock()
+        self.method = mock.Mock(side_effect=self.list_objects)
+
+    def list_objects(self, **kwargs):
+        with self.lock:
+            self.requested.append(kwargs.get('Marker'))
+            page = self.pages[len(self.requested) - 1]
+        if isinstance(page, Exception):
+            raise page
+        return page
+
+    def paginate(self, max_items=None):
+        config = {'input_token': 'Marker', 'output_token': 'NextMarker',
+                  'result_key': 'Contents', 'non_aggregate_keys': ['Name']}
+        return Paginator(self.method, config, mock.Mock()).paginate(
+            PaginationConfig={'MaxItems': max_items})
+
+    def wait_for_requests(self, count):
+        for _ in range(100):
+            if len(self.requested) >= count:
+                return
+            threading.Event().wait(0.01)
+
+    def test_yields_pages_in_order(self):
+        pages = list(PrefetchingPageIterator(self.paginate(), 2))
+        self.assertEqual(pages, self.pages)
+        self.assertEqual(self.requested, [None, 'b', 'c'])
+
+    def test_same_full_result(self):
+        expected = self.paginate(max_items=2).build_full_result()
+        del self.requested[:]
+        self.assertEqual(
+            PrefetchingPageIterator(
+                self.paginate(max_items=2), 2).build_full_result(),
+            expected)
+        self.assertIn('NextToken', expected)
+
+    def test_resume_token_of_truncated_response(self):
+        page_iterator = self.paginate(max_items=3)
+        prefetching = PrefetchingPageIterator(page_iterator, 1)
+        pages = list(prefetching)
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(prefetching.resume_token,
+                         page_iterator.resume_token)
+        self.assertIsNotNone(prefetching.resume_token)
+        self.assertEqual(prefetching.non_aggregate_part, {'Name': 'bucket'})
+
+    def test_requests_pages_ahead_up_to_depth(self):
+        pages = iter(PrefetchingPageIterator(self.paginate(), 1))
+        next(pages)
+        # The second page is requested while the first one is consumed,
+        # but not the third.
+        self.wait_for_requests(2)
+        threading.Event().wait(0.05)
+        self.assertEqual(self.requested, [None, 'b'])
+        next(pages)
+        self.wait_for_requests(3)
+        self.assertEqual(self.requested, [None, 'b', 'c'])
+
+    def test_waits_for_pages_slower_than_poll_interval(self):
+        prefetching = PrefetchingPageIterator(self.paginate(), 1)
+        prefetching._POLL_INTERVAL = 0.01
+        list_objects = self.method.side_effect
+
+        def slow_list_objects(**kwargs):
+            threading.Event().wait(0.05)
+            return list_objects(**kwargs)
+        self.method.side_effect = slow_list_objects
+        self.assertEqual(list(prefetching), self.pages)
+
+    def test_raises_errors_of_requests(self):
+        self.pages[1] = ValueError('request failed')
+        pages = iter(PrefetchingPageIterator(self.paginate(), 2))
+        self.assertEqual(next(pages), self.pages[0])
+        with self.assertRaises(ValueError):
+            next(pages)
+
+    def test_stops_requesting_when_pages_are_not_consumed(self):
+        pages = iter(PrefetchingPageIterator(self.paginate(), 1))
+        next(pages)
+        self.wait_for_requests(2)
+        pages.close()
+        threading.Event().wait(0.3)
+        self.assertEqual(self.requested, [None, 'b'])